@@ -1,6 +1,9 @@
 import os
+import shutil
 from multiprocessing import cpu_count
 
+from prometheus_client import multiprocess
+
 bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8386')}"
 workers = int(os.getenv("WORKERS", cpu_count() * 2 + 1))
 worker_class = "uvicorn.workers.UvicornWorker"
@@ -10,3 +13,17 @@ graceful_timeout = 30
 
 accesslog = "-"
 errorlog = "-"
+
+
+def on_starting(server):
+    # The metrics files of the workers of a previous run would be aggregated otherwise
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir)
+
+
+def child_exit(server, worker):
+    # The live gauges of an exited worker are dropped, its counters and histograms are kept
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -14,6 +14,44 @@ class Environment(str, Enum):
         return self == Environment.PRODUCTION
 
 
+class Durability(str, Enum):
+    """When checkpoints are persisted to DynamoDB.
+
+    - sync: every checkpoint and write is persisted before the graph continues
+    - async: checkpoints are persisted in the background, one flush per super-step
+    - exit: checkpoints are persisted when the run ends
+    """
+
+    SYNC = "sync"
+    ASYNC = "async"
+    EXIT = "exit"
+
+
+class CheckpointSerializer(str, Enum):
+    """How checkpoint channel values and writes are serialized.
+
+    - jsonplus: LangGraph's default JsonPlusSerializer
+    - msgpack: MsgpackSerializer, which also loads values written by jsonplus
+    """
+
+    JSONPLUS = "jsonplus"
+    MSGPACK = "msgpack"
+
+
+class IntentDetectionMode(str, Enum):
+    """How the graph detects the intent of a message.
+
+    - sequential: the node of the intent runs once the intent is detected
+    - speculative: the knowledge retrieval, and the search properties filters building if
+      enabled, run while the intent is detected
+    - combined: a single LLM call detects the intent and builds the search properties filters
+    """
+
+    SEQUENTIAL = "sequential"
+    SPECULATIVE = "speculative"
+    COMBINED = "combined"
+
+
 class Database:
     RESOURCE_NAME = "dynamodb"
 
@@ -22,3 +60,7 @@ class Database:
     SCRAPED_URL_TRACKER_TABLE_NAME = "ScrapedUrlTracker"
     SCRAPED_CONTENT_TABLE_NAME = "ScrapedContent"
     USER_MESSAGE_LOGS_TABLE_NAME = "UserMessageLogs"
+
+
+class Storage:
+    CHECKPOINT_BLOBS_BUCKET_NAME = "weavens-checkpoint-blobs"
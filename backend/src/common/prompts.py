@@ -140,6 +140,60 @@ build_search_properties_filters_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
+message_intent_and_search_properties_filters_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            You are a helpful AI assistant tasked with detecting the intent of a user's message, and with extracting the parameters for filtering property listings when the user is looking for a property. Your goal is to understand and categorize the message into one of the following intents: greeting, house_buying_knowledge_question, finding_property_finland, unsupported_intent. Here are the definitions of each intent:
+
+                1. greeting: A simple salutation or farewell, such as "Hello," "Hi," "Good morning," "Goodbye," or "See you later."
+                2. house_buying_knowledge_question: Any questions related to buying property in Finland, including but not limited to:
+                    - Financial aspects (prices, mortgages, loans, down payments, costs)
+                    - Legal requirements and processes
+                    - Taxes and fees
+                    - Property rights and ownership
+                    - Required documentation
+                    - Real estate market conditions
+                    - Property inspection and assessment
+                    - Insurance requirements
+                    - Renovation and maintenance responsibilities
+                3. finding_property_finland: The user wants to find a property (apartment, house, land, any real estate) in Finland. The message might contain a city, price range, number of rooms, etc but the main idea is that the user is looking for a property.
+                4. unsupported_intent: Any question that does not fall under the above intent categories.
+         """,
+        ),
+        (
+            "human",
+            """
+            <chat_history>
+            {chat_history}
+            </chat_history>
+
+            <question>
+            {question}
+            </question>
+
+            Carefully read and analyze the message to determine its intent based on the definitions provided above.
+
+            Guidelines for categorization:
+            - If the message is a simple greeting or farewell, classify it as "greeting"
+            - If the message is a question related to buying property in Finland, classify it as "house_buying_knowledge_question"
+            - If the message is about finding a property to buy in Finland, classify it as "finding_property_finland"
+            - For questions that do not fall under the above categories or cannot be answered based on the chat history, classify it as "unsupported_intent"
+
+            Only if the intent is "finding_property_finland", build the search properties filters from the question:
+            1. Analyze the question and extract all relevant parameters for filtering property listings.
+            2. Do not make any assumptions or make up any information.
+            3. In the "filters" object, at least one of these keys must be present: "city", "district". If this is not the case, just set the value for the object key "filters" to an empty object and set the value for the object key "has_enough_search_properties_filters" to "False".
+            4. If there are enough parameters to build search properties filters, populate the "filters" object and set the value for the object key "has_enough_search_properties_filters" to "True".
+            For any other intent, leave out the "filters" object.
+
+            After analyzing the question, provide your reasoning for the intent classification and the search properties filters.
+            """,
+        ),
+    ]
+)
+
 generate_properties_search_answer_prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -151,7 +205,7 @@ generate_properties_search_answer_prompt = ChatPromptTemplate.from_messages(
         (
             "human",
             """
-            Here is the retrieved property listings
+            Here is the retrieved property listings, a table with a row per listing. The renovations of the listings are listed below the table by their number, the text of long renovations is cut short with "…".
             ###
             {property_listings}
             ###
@@ -226,3 +280,36 @@ generate_properties_search_answer_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 )
+
+summarize_chat_history_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
+            You are a helpful AI assistant tasked with summarizing the earlier part of a conversation between a user and a real estate assistant in Finland. The summary replaces these messages in the chat history of the assistant.
+            """,
+        ),
+        (
+            "human",
+            """
+            <summary>
+            {summary}
+            </summary>
+
+            <messages>
+            {messages}
+            </messages>
+
+            Extend the summary of the conversation so far with the messages above. If there is no summary yet, summarize the messages.
+
+            Guidelines for the summary:
+            - Keep what the user is looking for and asked about: cities, districts, price ranges, number of rooms, other requirements and questions about buying a property.
+            - Keep the facts and listings the assistant gave that the user may refer to later.
+            - Leave out greetings and small talk.
+            - Be concise, write at most 200 words in the language of the conversation.
+
+            Only answer with the summary.
+            """,
+        ),
+    ]
+)
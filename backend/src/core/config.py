@@ -2,7 +2,12 @@ import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
-from src.common.constants import Environment
+from src.common.constants import (
+    CheckpointSerializer,
+    Durability,
+    Environment,
+    IntentDetectionMode,
+)
 
 
 class Settings(BaseSettings):
@@ -20,6 +25,88 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     FIRECRAWL_API_KEY: str
 
+    # Prometheus metrics of the agent, exported on /metrics
+    METRICS_ENABLED: bool = Field(default=True)
+    # Interval at which every worker exports the stats of its components
+    METRICS_COMPONENT_STATS_INTERVAL_SECONDS: float = Field(default=15.0)
+
+    # Connection pool of the LLM clients shared by the graph nodes
+    LLM_HTTP_MAX_CONNECTIONS: int = Field(default=100)
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20)
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = Field(default=60.0)
+
+    # Connection pools of the async OpenSearch and DynamoDB clients of the property search
+    PROPERTY_SEARCH_MAX_CONNECTIONS: int = Field(default=100)
+
+    # Token budget of the renovations of a listing in the properties search answer prompt
+    LISTING_RENOVATIONS_MAX_TOKENS: int = Field(default=48)
+
+    # Coalescing of concurrent identical LLM, embedding and property search calls
+    SINGLEFLIGHT_ENABLED: bool = Field(default=True)
+
+    # Cache of the embeddings of questions, 0 entries disables it
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = Field(default=4096)
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = Field(default=3600.0)
+
+    # Threads of the Chroma queries of the graph nodes, off the event loop
+    CHROMA_QUERY_MAX_WORKERS: int = Field(default=4)
+
+    # Token budget of the chat history sent to the LLMs, older messages are summarized
+    CHAT_HISTORY_MAX_TOKENS: int = Field(default=2000)
+    CHAT_HISTORY_SUMMARY_ENABLED: bool = Field(default=True)
+
+    # Local intent classifier in front of the intent detection LLM
+    INTENT_CLASSIFIER_ENABLED: bool = Field(default=True)
+    INTENT_CLASSIFIER_MIN_SIMILARITY: float = Field(default=0.85)
+    INTENT_CLASSIFIER_MIN_AGREEMENT: float = Field(default=0.8)
+    # How long the intent detection waits for the kNN stage before calling the LLM, a LLM
+    # call started meanwhile is still paid for when kNN turns out confident
+    INTENT_CLASSIFIER_KNN_TIMEOUT_SECONDS: float = Field(default=0.3)
+
+    # How the intent is detected, see IntentDetectionMode. The speculative mode runs the
+    # search properties filters building along with the intent detection only if enabled
+    INTENT_DETECTION_MODE: IntentDetectionMode = Field(
+        default=IntentDetectionMode.SEQUENTIAL
+    )
+    SPECULATIVE_FILTERS_ENABLED: bool = Field(default=False)
+
+    # Semantic cache of small talk and house buying knowledge answers
+    ANSWER_CACHE_ENABLED: bool = Field(default=True)
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = Field(default=0.95)
+    ANSWER_CACHE_MAX_ENTRIES: int = Field(default=2048)
+    ANSWER_CACHE_TTL_SECONDS: float = Field(default=24 * 3600)
+
+    # Checkpoint cache configs
+    CHECKPOINT_CACHE_ENABLED: bool = Field(default=True)
+    CHECKPOINT_CACHE_MAX_ENTRIES: int = Field(default=1024)
+    CHECKPOINT_CACHE_TTL_SECONDS: float = Field(default=300.0)
+
+    # Checkpoint retention configs
+    CHECKPOINT_RETENTION_KEEP_LAST: int = Field(default=20)
+    CHECKPOINT_RETENTION_KEEP_NEWER_THAN_SECONDS: int = Field(default=7 * 24 * 3600)
+    # 0 disables the TTL of checkpoints, writes and channel blobs. Once enabled, DynamoDB
+    # deletes every conversation, including existing ones, inactive for longer than the TTL
+    CHECKPOINT_RETENTION_TTL_SECONDS: int = Field(default=0)
+    CHECKPOINT_COMPACTION_INTERVAL_SECONDS: float = Field(default=600.0)
+
+    # Checkpoint durability configs, async and exit buffer checkpoints and may lose the
+    # latest ones when the process dies. The Redis tier keeps the configured durability, it
+    # only mirrors checkpoints to DynamoDB in the background with async
+    CHECKPOINT_DURABILITY: Durability = Field(default=Durability.SYNC)
+    CHECKPOINT_MAX_PENDING_WRITES: int = Field(default=10_000)
+
+    # Redis tier of active threads, disabled without a URL
+    CHECKPOINT_REDIS_URL: str | None = Field(default=None)
+    CHECKPOINT_REDIS_TTL_SECONDS: int = Field(default=1800)
+
+    # Checkpoint serialization configs, checkpoints written by msgpack can not be loaded
+    # again after switching back to jsonplus
+    CHECKPOINT_SERIALIZER: CheckpointSerializer = Field(
+        default=CheckpointSerializer.JSONPLUS
+    )
+    # Values of at least this size are (de)serialized off the event loop, 0 disables it
+    CHECKPOINT_SERDE_THREAD_THRESHOLD_BYTES: int = Field(default=64 * 1024)
+
     model_config = SettingsConfigDict(
         env_file=".env" if os.getenv("ENVIRONMENT") == Environment.LOCAL else None,
         env_file_encoding="utf-8",
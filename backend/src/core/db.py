@@ -1,4 +1,11 @@
+from decimal import Decimal
+
 import boto3
+from aiodynamo.client import Client
+from aiodynamo.credentials import Credentials
+from aiodynamo.http.aiohttp import AIOHTTP
+from aiohttp import ClientSession
+from yarl import URL
 
 from src.common.constants import Database
 
@@ -31,3 +38,20 @@ class DynamoDB:
 
 def get_db() -> DynamoDB:
     return DynamoDB()
+
+
+def create_async_dynamodb_client(session: ClientSession) -> Client:
+    """
+    Create an async DynamoDB client sending its requests with the connection pool of the session.
+
+    Numbers are read as Decimal like boto3 does.
+    """
+    return Client(
+        http=AIOHTTP(session),
+        credentials=Credentials.auto(),
+        region=settings.AWS_REGION_NAME,
+        endpoint=URL.build(scheme="http", host="localhost", port=8000)
+        if settings.ENVIRONMENT.is_local
+        else None,
+        numeric_type=Decimal,
+    )
@@ -0,0 +1,70 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+
+from .logging import Logger
+
+logger = Logger(__name__).logger
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop runs a callback scheduled at a fixed interval.
+
+    The lag is the time a ready task waits for the loop, e.g. a chunk of an SSE stream waiting
+    for another request to finish serializing a checkpoint. Samples above warn_threshold_ms are
+    logged.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 0.1,
+        *,
+        max_samples: int = 6000,
+        warn_threshold_ms: float = 100.0,
+    ):
+        self.interval_seconds = interval_seconds
+        self.warn_threshold_ms = warn_threshold_ms
+        self._lags_ms: deque[float] = deque(maxlen=max_samples)
+        self._task: asyncio.Task | None = None
+
+    @property
+    def stats(self) -> dict[str, float]:
+        lags_ms = sorted(self._lags_ms)
+        if not lags_ms:
+            return {"samples": 0, "lag_ms_p50": 0.0, "lag_ms_p99": 0.0, "lag_ms_max": 0.0}
+
+        return {
+            "samples": len(lags_ms),
+            "lag_ms_p50": statistics.median(lags_ms),
+            "lag_ms_p99": lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))],
+            "lag_ms_max": lags_ms[-1],
+        }
+
+    def reset(self) -> None:
+        self._lags_ms.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            scheduled_at = time.perf_counter()
+            await asyncio.sleep(self.interval_seconds)
+            lag_ms = max(
+                0.0,
+                (time.perf_counter() - scheduled_at - self.interval_seconds) * 1000,
+            )
+            self._lags_ms.append(lag_ms)
+            if lag_ms >= self.warn_threshold_ms:
+                logger.warning(f"Event loop lagged {lag_ms:.0f} ms")
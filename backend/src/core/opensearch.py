@@ -1,4 +1,11 @@
-from opensearchpy import OpenSearch, AWSV4SignerAuth, RequestsHttpConnection
+from opensearchpy import (
+    AsyncHttpConnection,
+    AsyncOpenSearch,
+    AWSV4SignerAsyncAuth,
+    AWSV4SignerAuth,
+    OpenSearch,
+    RequestsHttpConnection,
+)
 import boto3
 
 from src.core.config import settings
@@ -13,8 +20,15 @@ auth = AWSV4SignerAuth(
     service="es",
 )
 
+opensearch_hosts = [
+    {
+        "host": settings.OPENSEARCH_DOMAIN,
+        "port": 443 if settings.ENVIRONMENT == "production" else 9200,
+    }
+]
+
 opensearch_client = OpenSearch(
-    hosts=[{"host": settings.OPENSEARCH_DOMAIN, "port": 443 if settings.ENVIRONMENT == "production" else 9200}],
+    hosts=opensearch_hosts,
     http_auth=auth,
     use_ssl=True if settings.ENVIRONMENT == "production" else False,
     verify_certs=True,
@@ -26,6 +40,25 @@ opensearch_client = OpenSearch(
 )
 
 
+def create_async_opensearch_client(max_connections: int = 20) -> AsyncOpenSearch:
+    """Create an async OpenSearch client, its connection pool holds up to max_connections connections."""
+    return AsyncOpenSearch(
+        hosts=opensearch_hosts,
+        http_auth=AWSV4SignerAsyncAuth(
+            credentials=credentials,
+            region=settings.AWS_REGION_NAME,
+            service="es",
+        ),
+        use_ssl=True if settings.ENVIRONMENT == "production" else False,
+        verify_certs=True,
+        connection_class=AsyncHttpConnection,
+        maxsize=max_connections,
+        timeout=15,
+        max_retries=3,
+        retry_on_timeout=True,
+    )
+
+
 # TODO: migrate this to a proper data migration script
 def initialize_search_properties_index():
     logger.info("Initializing search properties index")
@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import json
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generic,
+    Hashable,
+    TypeVar,
+)
+
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+
+from src.core.config import settings
+
+T = TypeVar("T")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, BaseMessage):
+        return [value.type, _normalize(value.content)]
+    if isinstance(value, BaseModel):
+        return _normalize(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def make_key(namespace: str, *parts: Any) -> tuple[str, str]:
+    """The key of a call, the digest of its normalized inputs within a namespace.
+
+    Strings, including the content of messages, are compared with their whitespace collapsed,
+    so a question submitted twice with a trailing newline is the same call. The namespace
+    names the called function along with its fixed parameters, e.g. an LLM chain and thus its
+    prompt and model.
+    """
+    data = json.dumps(_normalize(parts), sort_keys=True, default=str)
+    return namespace, hashlib.sha256(data.encode()).hexdigest()
+
+
+class _Flight:
+    """An in-flight call, the items it produced so far and the number of its callers."""
+
+    def __init__(self):
+        self.items: list = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.callers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def publish(self) -> None:
+        # Wakes up the callers waiting for a change, later waits use a new event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class FlightStream(Generic[T]):
+    """The items streamed by a coalesced call, see `SingleFlight.stream`."""
+
+    def __init__(
+        self,
+        single_flight: "SingleFlight",
+        key: Hashable,
+        flight: _Flight,
+        is_leader: bool,
+    ):
+        self.is_leader = is_leader
+        self._single_flight = single_flight
+        self._key = key
+        self._flight = flight
+
+    async def __aiter__(self) -> AsyncIterator[T]:
+        flight = self._flight
+        index = 0
+        try:
+            while True:
+                while index < len(flight.items):
+                    yield flight.items[index]
+                    index += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.wait()
+        finally:
+            self._single_flight._release(self._key, flight)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into a single in-flight call.
+
+    The first caller of a key, the leader, starts the call, the callers of the same key until
+    the call completes, the followers, share its result or its error. Nothing is kept once the
+    call completes, a later caller starts a new call, caching is left to the answer cache and
+    to the query embedding cache.
+
+    The call runs in a task of its own, so a caller that is cancelled, e.g. as its client
+    disconnected, does not fail the others. The call is cancelled once every caller is gone.
+    The task copies the context of the leader, the callbacks of the leader's run observe the
+    call while those of the followers do not.
+
+    Streamed calls are fanned out, a follower joining late gets the items streamed so far
+    and then every new item along with the leader.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.leaders = 0
+        self.followers = 0
+        self._flights: dict[Hashable, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "in_flight": len(self),
+        }
+
+    async def ado(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Runs a call, or waits for the identical call in flight.
+
+        Args:
+            key (Hashable): The key of the call, see `make_key`.
+            call (Callable): Starts the call, only called by the leader.
+
+        Returns:
+            T: The result of the call, the same object for the leader and its followers.
+        """
+        if not self.enabled:
+            return await call()
+
+        async def produce(flight: _Flight) -> None:
+            flight.items.append(await call())
+
+        flight, _ = self._join(key, produce)
+        try:
+            while not flight.done:
+                await flight.wait()
+        finally:
+            self._release(key, flight)
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.items[0]
+
+    def stream(
+        self, key: Hashable, call: Callable[[], AsyncIterator[T]]
+    ) -> FlightStream[T]:
+        """Streams a call, or the identical call in flight.
+
+        Args:
+            key (Hashable): The key of the call, see `make_key`.
+            call (Callable): Starts the streamed call, only called by the leader.
+
+        Returns:
+            FlightStream[T]: The items streamed by the call, to be iterated to the end. The
+                callbacks of a follower's run do not observe the call, a follower streams the
+                items to its client itself.
+        """
+
+        async def produce(flight: _Flight) -> None:
+            async for item in call():
+                flight.items.append(item)
+                flight.publish()
+
+        if not self.enabled:
+            key = object()
+
+        flight, is_leader = self._join(key, produce)
+        return FlightStream(self, key, flight, is_leader)
+
+    def _join(
+        self, key: Hashable, produce: Callable[[_Flight], Awaitable[None]]
+    ) -> tuple[_Flight, bool]:
+        flight = self._flights.get(key)
+        is_leader = flight is None
+        if is_leader:
+            self.leaders += 1
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._aproduce(key, flight, produce))
+        else:
+            self.followers += 1
+
+        flight.callers += 1
+        return flight, is_leader
+
+    async def _aproduce(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        produce: Callable[[_Flight], Awaitable[None]],
+    ) -> None:
+        try:
+            await produce(flight)
+        except Exception as e:
+            flight.error = e
+        except asyncio.CancelledError as e:
+            flight.error = e
+            raise
+        finally:
+            flight.done = True
+            self._forget(key, flight)
+            flight.publish()
+
+    def _release(self, key: Hashable, flight: _Flight) -> None:
+        flight.callers -= 1
+        if flight.callers == 0 and not flight.done:
+            # Every caller is gone, e.g. their clients disconnected
+            self._forget(key, flight)
+            flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+@lru_cache
+def get_singleflight() -> SingleFlight:
+    """Get the single flight of the process, its keys are namespaced by the called function."""
+    return SingleFlight(enabled=settings.SINGLEFLIGHT_ENABLED)
@@ -1,24 +1,60 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+
 from chromadb import Documents
 
+from src.core.config import settings
 from src.core.logging import Logger
 
 from .vectordb import get_chroma_db
-from .utils import generate_text_chunk_fingerprint_with_file_name
+from .utils import (
+    generate_text_chunk_content_hash,
+    generate_text_chunk_fingerprint_with_file_name,
+)
 
 logger = Logger(__name__).logger
 
 
+@lru_cache
+def get_query_executor() -> ThreadPoolExecutor:
+    """Get the threads the Chroma queries of async callers run in.
+
+    The pool is bounded and separate from the default executor of the event loop, so a burst of
+    queries does not hold up the other work offloaded to threads, e.g. checkpoint serialization.
+    """
+    return ThreadPoolExecutor(
+        max_workers=settings.CHROMA_QUERY_MAX_WORKERS, thread_name_prefix="chroma-query"
+    )
+
+
 class EmbeddingService:
     def __init__(self):
         self.document_collection = get_chroma_db().document_collection
 
-    def query_similar_documents(self, query_text: str, n_results: int = 5) -> dict:
+    def query_similar_documents(
+        self,
+        query_text: str,
+        n_results: int = 5,
+        query_embedding: list[float] | None = None,
+    ) -> dict:
         """
         Query similar documents to the query text.
+
+        Args:
+            query_text (str): The query text.
+            n_results (int): Number of documents to return.
+            query_embedding (list[float] | None): The embedding of the query text if it was already embedded with the embedding model of the collection, so it is not embedded again.
         """
         try:
-            response = self.document_collection.query(
-                query_texts=[query_text], n_results=n_results
+            response = (
+                self.document_collection.query(
+                    query_embeddings=[query_embedding], n_results=n_results
+                )
+                if query_embedding is not None
+                else self.document_collection.query(
+                    query_texts=[query_text], n_results=n_results
+                )
             )
 
             results = {
@@ -33,6 +69,57 @@ class EmbeddingService:
             logger.error(f"Error querying similar documents: {e}")
             raise e
 
+    async def aquery_similar_documents(
+        self,
+        query_text: str,
+        n_results: int = 5,
+        query_embedding: list[float] | None = None,
+    ) -> dict:
+        """
+        Query similar documents like `query_similar_documents`, in a thread of the query executor so the event loop is not blocked.
+
+        The query text is embedded by the embedding function of the collection if no query embedding is given, which blocks the thread instead.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            get_query_executor(),
+            partial(
+                self.query_similar_documents,
+                query_text,
+                n_results=n_results,
+                query_embedding=query_embedding,
+            ),
+        )
+
+    def has_unchanged_documents(self, content_hashes: dict[str, str]) -> bool:
+        """
+        Whether all the documents are still in the collection with the same content.
+
+        Args:
+            content_hashes (dict[str, str]): The hashes of the content of the documents by their IDs, see `generate_text_chunk_content_hash`. The IDs are fingerprints of the start and end of the content only.
+        """
+        if not content_hashes:
+            return True
+
+        response = self.document_collection.get(
+            ids=list(content_hashes), include=["documents"]
+        )
+        current_hashes = {
+            id: generate_text_chunk_content_hash(document)
+            for id, document in zip(response["ids"], response["documents"])
+        }
+        return current_hashes == content_hashes
+
+    async def ahas_unchanged_documents(self, content_hashes: dict[str, str]) -> bool:
+        """
+        Whether all the documents are still in the collection with the same content like `has_unchanged_documents`, in a thread of the query executor.
+        """
+        if not content_hashes:
+            return True
+
+        return await asyncio.get_running_loop().run_in_executor(
+            get_query_executor(), self.has_unchanged_documents, content_hashes
+        )
+
     def add_text_chunks_to_collection(
         self,
         text_chunks: Documents,
@@ -1,3 +1,4 @@
+import threading
 import pytest
 from unittest.mock import Mock, MagicMock, patch
 
@@ -92,3 +93,23 @@ class TestAddTextChunksToCollection:
             "documents": ["document1", "document2"],
             "metadatas": [{"key": "value"}, {"key": "value"}],
         }
+
+    @pytest.mark.unit
+    async def test_aquery_similar_documents_should_query_in_executor_thread(self):
+        query_threads = []
+
+        def query(**kwargs):
+            query_threads.append(threading.current_thread().name)
+            return {"ids": [["id1"]], "documents": [["document1"]], "metadatas": [[{}]]}
+
+        self.mock_document_collection.query.side_effect = query
+
+        results = await self.embedding_service.aquery_similar_documents(
+            "query", n_results=3, query_embedding=[0.1, 0.2]
+        )
+
+        assert results == {"ids": ["id1"], "documents": ["document1"], "metadatas": [{}]}
+        self.mock_document_collection.query.assert_called_once_with(
+            query_embeddings=[[0.1, 0.2]], n_results=3
+        )
+        assert query_threads[0].startswith("chroma-query")
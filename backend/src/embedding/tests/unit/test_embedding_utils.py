@@ -1,5 +1,8 @@
 import pytest
-from ...utils import generate_text_chunk_fingerprint_with_file_name
+from ...utils import (
+    generate_text_chunk_content_hash,
+    generate_text_chunk_fingerprint_with_file_name,
+)
 from hashlib import md5
 
 
@@ -29,3 +32,19 @@ class TestGenerateTextChunkFingerprintWithFileName:
             self.text_chunk, self.file_name
         )
         assert fingerprint == expected_hash
+
+
+class TestGenerateTextChunkContentHash:
+    text_chunk = "This is a sample text chunk for testing."
+
+    @pytest.mark.unit
+    def test_should_change_when_middle_of_text_chunk_changes(self):
+        edited_text_chunk = self.text_chunk.replace("sample", "edited")
+        file_name = "test_house_buying_knowledge.md"
+
+        assert generate_text_chunk_fingerprint_with_file_name(
+            edited_text_chunk, file_name
+        ) == generate_text_chunk_fingerprint_with_file_name(self.text_chunk, file_name)
+        assert generate_text_chunk_content_hash(
+            edited_text_chunk
+        ) != generate_text_chunk_content_hash(self.text_chunk)
@@ -15,3 +15,10 @@ def generate_text_chunk_fingerprint_with_file_name(
     )
 
     return hashlib.md5(fingerprint).hexdigest()
+
+
+def generate_text_chunk_content_hash(text_chunk: str) -> str:
+    """
+    Generate a hash of the whole content of a text chunk, unlike its fingerprint it changes with any edit of the chunk.
+    """
+    return hashlib.md5(text_chunk.encode("utf-8")).hexdigest()
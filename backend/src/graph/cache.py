@@ -0,0 +1,117 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from langgraph.checkpoint.base import CheckpointTuple, copy_checkpoint
+
+
+@dataclass
+class _CacheEntry:
+    checkpoint_tuple: CheckpointTuple
+    expires_at: float
+
+    @property
+    def checkpoint_id(self) -> str:
+        return self.checkpoint_tuple.config["configurable"]["checkpoint_id"]
+
+
+class CheckpointCache:
+    """Bounded LRU cache of the latest checkpoint of each thread namespace.
+
+    Entries expire after ttl_seconds and the least recently used entry is evicted once the
+    cache holds max_entries. The cache does not know whether an entry is still the latest
+    checkpoint in DynamoDB, callers look up the ID of the latest checkpoint, pass it to `get`
+    and invalidate the entry if another worker wrote a newer checkpoint.
+
+    Only checkpoints are cached, they are immutable. Their pending writes are not, any worker
+    may add writes to the latest checkpoint, so callers read them from DynamoDB.
+
+    Cached checkpoints are copied on the way in and out, so callers can not mutate them.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], _CacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def _get_entry(self, thread_id: str, checkpoint_ns: str) -> _CacheEntry | None:
+        entry = self._entries.get((thread_id, checkpoint_ns))
+        if entry and entry.expires_at <= time.monotonic():
+            del self._entries[(thread_id, checkpoint_ns)]
+            return None
+
+        return entry
+
+    def has(self, thread_id: str, checkpoint_ns: str) -> bool:
+        """Whether a (not expired) checkpoint of the thread namespace is cached."""
+        return self._get_entry(thread_id, checkpoint_ns) is not None
+
+    def get(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str | None
+    ) -> CheckpointTuple | None:
+        """Returns the cached checkpoint of a thread namespace if it is the given checkpoint.
+
+        Args:
+            thread_id (str): The thread ID of the checkpoint.
+            checkpoint_ns (str): The namespace of the checkpoint.
+            checkpoint_id (str | None): The ID of the requested checkpoint.
+
+        Returns:
+            CheckpointTuple | None: A copy of the cached checkpoint tuple without its pending
+                writes, or None on a miss.
+        """
+        entry = self._get_entry(thread_id, checkpoint_ns)
+        if not entry or entry.checkpoint_id != checkpoint_id:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end((thread_id, checkpoint_ns))
+        checkpoint_tuple = entry.checkpoint_tuple
+        return checkpoint_tuple._replace(
+            checkpoint=copy_checkpoint(checkpoint_tuple.checkpoint)
+        )
+
+    def get_checkpoint_id(self, thread_id: str, checkpoint_ns: str) -> str | None:
+        """Returns the ID of the cached checkpoint of a thread namespace, without a lookup."""
+        entry = self._get_entry(thread_id, checkpoint_ns)
+        return entry.checkpoint_id if entry else None
+
+    def put(self, checkpoint_tuple: CheckpointTuple) -> None:
+        """Caches a checkpoint as the latest checkpoint of its thread namespace.
+
+        A cached checkpoint is never replaced by an older one (checkpoint IDs are time-ordered),
+        e.g. when a slow read completes after a newer checkpoint was written.
+
+        Args:
+            checkpoint_tuple (CheckpointTuple): The checkpoint tuple to cache, its pending
+                writes are dropped.
+        """
+        configurable = checkpoint_tuple.config["configurable"]
+        key = (configurable["thread_id"], configurable["checkpoint_ns"])
+        entry = self._get_entry(*key)
+        if entry and entry.checkpoint_id > configurable["checkpoint_id"]:
+            return
+
+        self._entries[key] = _CacheEntry(
+            checkpoint_tuple=checkpoint_tuple._replace(
+                checkpoint=copy_checkpoint(checkpoint_tuple.checkpoint),
+                pending_writes=None,
+            ),
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, thread_id: str, checkpoint_ns: str) -> None:
+        self._entries.pop((thread_id, checkpoint_ns), None)
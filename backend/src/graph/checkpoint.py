@@ -1,15 +1,36 @@
+import asyncio
+import math
+import random
+import time
+from collections import OrderedDict, defaultdict
 from contextlib import asynccontextmanager
 from typing import (
     Any,
     AsyncIterator,
+    Iterable,
     Sequence,
 )
 
 from aiodynamo.client import Client, Table
 from aiodynamo.credentials import Credentials
-from aiodynamo.expressions import F, HashKey, RangeKey
+from aiodynamo.errors import ItemNotFound
+from aiodynamo.expressions import (
+    Condition,
+    F,
+    HashKey,
+    ProjectionExpression,
+    RangeKey,
+)
 from aiodynamo.http.aiohttp import AIOHTTP
-from aiodynamo.models import KeySchema, KeySpec, KeyType, Throughput
+from aiodynamo.models import (
+    BatchGetRequest,
+    BatchWriteRequest,
+    KeySchema,
+    KeySpec,
+    KeyType,
+    Page,
+    Throughput,
+)
 from aiohttp import ClientSession
 from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.base import (
@@ -22,11 +43,27 @@ from langgraph.checkpoint.base import (
     get_checkpoint_id,
 )
 from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.types import ChannelProtocol
 from yarl import URL
 
+from src.common.constants import Durability, Storage
 from src.core.config import settings
-
+from src.core.logging import Logger
+
+from .cache import CheckpointCache
+from .metrics import observe_checkpoint_io
+from .offload import DEFAULT_THREAD_THRESHOLD_BYTES, SerdeOffloader
+from .payloads import PAYLOAD_REF_SUFFIX, LocalBlobStore, PayloadCodec, S3BlobStore
+from .retention import (
+    CompactionResult,
+    RetentionPolicy,
+    checkpoint_timestamp,
+    estimate_item_size,
+)
+from .serde import make_serializer
+from .write_behind import WriteBehindBuffer
 from .schemas import (
+    ChannelVersion,
     CheckpointConfigurable,
     CompositeKey,
     WritesConfigurable,
@@ -34,6 +71,26 @@ from .schemas import (
 )
 
 DYNAMODB_KEY_SEPARATOR = "#"
+DYNAMODB_BATCH_WRITE_LIMIT = 25
+DYNAMODB_BATCH_GET_LIMIT = 100
+BATCH_MAX_ATTEMPTS = 5
+BATCH_BASE_BACKOFF_SECONDS = 0.05
+METADATA_ATTRIBUTE_PREFIX = "metadata_"
+EMPTY_CHANNEL_TYPE = "empty"
+TTL_ATTRIBUTE_NAME = "expires_at"
+# The channel versions of a checkpoint are also stored as a map of strings, so compaction
+# finds the blobs it references without deserializing it
+CHANNEL_VERSIONS_ATTRIBUTE_NAME = "channel_versions"
+# Items of a checkpoint newer than the latest one compacted are only deleted once they are
+# older than this, they may belong to a checkpoint that is being written.
+COMPACTION_IN_FLIGHT_GRACE_SECONDS = 15 * 60
+# Number of channel blob keys the saver remembers to exist, see `_aget_stale_blob_versions`
+MAX_KNOWN_BLOB_KEYS = 100_000
+# Number of the newest writes of a namespace read along with its latest checkpoint, see
+# `_aget_latest_pending_writes`
+LATEST_WRITES_PAGE_SIZE = 25
+
+logger = Logger(__name__).logger
 
 
 def _make_checkpoint_key(
@@ -96,6 +153,45 @@ def _make_writes_key(
     }
 
 
+def _make_channel_blob_key(
+    thread_id: str, checkpoint_ns: str, channel: str, version: ChannelVersion
+) -> CompositeKey:
+    """Generates a composite key for the value of a channel at a given version.
+
+    The key is formatted as follows:
+        PK: "blobs#<thread_id>"
+        SK: "<checkpoint_ns>#<channel>#<version>"
+
+    Args:
+        thread_id (str): The thread ID of the checkpoint.
+        checkpoint_ns (str): The namespace of the checkpoint.
+        channel (str): The name of the channel.
+        version (ChannelVersion): The version of the channel.
+
+    Returns:
+        CompositeKey: The composite key for the channel blob.
+    """
+    return {
+        "PK": DYNAMODB_KEY_SEPARATOR.join(["blobs", thread_id]),
+        "SK": DYNAMODB_KEY_SEPARATOR.join([checkpoint_ns, channel, str(version)]),
+    }
+
+
+def _make_checkpoint_blob_key(key: CompositeKey) -> str:
+    """Generates the blob store key of an offloaded payload of a checkpoint or channel blob item.
+
+    The key is formatted as follows:
+        "<PK>/<SK>", e.g. "checkpoint#<thread_id>/<checkpoint_ns>#<checkpoint_id>"
+
+    Args:
+        key (CompositeKey): The composite key of the item.
+
+    Returns:
+        str: The blob store key of the payload.
+    """
+    return "/".join([key["PK"], key["SK"]])
+
+
 def _parse_checkpoint_key(key: CompositeKey) -> CheckpointConfigurable:
     """Parses a checkpoint key into its components.
 
@@ -150,37 +246,57 @@ def _parse_writes_key(key: CompositeKey) -> WritesConfigurable:
     }
 
 
-def _filter_keys(
-    keys: list[CompositeKey], before: RunnableConfig | None, limit: int | None
-) -> list[CompositeKey]:
-    """Filters a list of keys based on the before and limit parameters.
+def _is_filterable_metadata_value(value: Any) -> bool:
+    """Whether a metadata value can be stored and matched as a DynamoDB scalar attribute."""
+    return isinstance(value, (str, int, float, bool))
 
-    The keys are sorted in descending order (newest first). If the before parameter is provided, only keys created before
-    the specified checkpoint are returned. If the limit parameter is provided, only the first n keys are returned.
+
+def _make_metadata_attributes(metadata: CheckpointMetadata) -> dict[str, Any]:
+    """Generates top-level item attributes for the scalar values of the checkpoint metadata.
+
+    The attributes are named "metadata_<key>" so that alist filters can be evaluated by
+    DynamoDB. Non-scalar values (e.g. "writes", "parents") only live in the serialized metadata.
 
     Args:
-        keys (list[CompositeKey]): The list of keys to filter.
-        before (RunnableConfig | None): The configuration of the checkpoint to filter keys before.
-        limit (int | None): The maximum number of keys to return.
+        metadata (CheckpointMetadata): The checkpoint metadata.
 
     Returns:
-        list[CompositeKey]: The filtered list of keys.
+        dict[str, Any]: The metadata attributes of the checkpoint item.
     """
-    if before:
-        keys = [
-            key
-            for key in keys
-            if _parse_checkpoint_key(key)["checkpoint_id"]
-            < before["configurable"]["checkpoint_id"]
-        ]
+    return {
+        f"{METADATA_ATTRIBUTE_PREFIX}{key}": value
+        for key, value in metadata.items()
+        if _is_filterable_metadata_value(value)
+    }
 
-    keys = sorted(
-        keys, key=lambda k: _parse_checkpoint_key(k)["checkpoint_id"], reverse=True
-    )
-    if limit:
-        keys = keys[:limit]
 
-    return keys
+def _make_metadata_filter(
+    filter: dict[str, Any] | None,
+) -> tuple[Condition | None, dict[str, Any]]:
+    """Splits a metadata filter into a DynamoDB filter expression and a filter evaluated in Python.
+
+    Scalar values are matched against the "metadata_<key>" attributes by DynamoDB, any other
+    value is compared with the deserialized metadata.
+
+    Args:
+        filter (dict[str, Any] | None): The metadata filter.
+
+    Returns:
+        tuple[Condition | None, dict[str, Any]]: The filter expression and the remaining filter.
+    """
+    filter_expression = None
+    remaining_filter = {}
+    for key, value in (filter or {}).items():
+        if not _is_filterable_metadata_value(value):
+            remaining_filter[key] = value
+            continue
+
+        condition = F(f"{METADATA_ATTRIBUTE_PREFIX}{key}").equals(value)
+        filter_expression = (
+            condition if filter_expression is None else filter_expression & condition
+        )
+
+    return filter_expression, remaining_filter
 
 
 def _dump_writes(
@@ -229,8 +345,8 @@ def _load_writes(
     return writes
 
 
-def _parse_checkpoint_data(
-    serde: SerializerProtocol,
+async def _aparse_checkpoint_data(
+    serde_offloader: SerdeOffloader,
     key: CompositeKey,
     data: dict,
     pending_writes: list[PendingWrite] | None = None,
@@ -238,7 +354,8 @@ def _parse_checkpoint_data(
     """Parses a checkpoint data entry into a CheckpointTuple.
 
     Args:
-        serde (SerializerProtocol): The serializer protocol to use.
+        serde_offloader (SerdeOffloader): The serializer to use, large checkpoints are
+            deserialized in a worker thread.
         key (CompositeKey): The composite key of the checkpoint.
         data (dict): The data of the checkpoint.
         pending_writes (list[PendingWrite] | None): The pending writes. Defaults to None.
@@ -262,8 +379,8 @@ def _parse_checkpoint_data(
         }
     }
 
-    checkpoint = serde.loads_typed((data["type"], data["checkpoint"]))
-    metadata = serde.loads(data["metadata"])
+    checkpoint = await serde_offloader.aloads_typed((data["type"], data["checkpoint"]))
+    metadata = serde_offloader.serde.loads(data["metadata"])
     parent_checkpoint_id = data.get("parent_checkpoint_id", "")
     parent_config = (
         {
@@ -286,24 +403,122 @@ def _parse_checkpoint_data(
     )
 
 
+def _is_superseded(
+    checkpoint_id: str, latest_checkpoint_id: str | None, now: float
+) -> bool:
+    """Whether a write or channel blob of a checkpoint can be deleted by compaction.
+
+    Only called for items that no retained checkpoint needs. Items of checkpoints older than
+    the latest checkpoint of their namespace were superseded.
+    Items of a checkpoint newer than the latest one (or in a namespace without checkpoints)
+    are only deleted after the in-flight grace period, the checkpoint may be being written.
+
+    Args:
+        checkpoint_id (str): The ID of the checkpoint the item belongs to, "" if unknown.
+        latest_checkpoint_id (str | None): The ID of the latest checkpoint of the namespace.
+        now (float): The current Unix time.
+
+    Returns:
+        bool: Whether the item can be deleted.
+    """
+    if not checkpoint_id:
+        return True
+    if latest_checkpoint_id and checkpoint_id <= latest_checkpoint_id:
+        return checkpoint_id < latest_checkpoint_id
+
+    return checkpoint_timestamp(checkpoint_id) < now - COMPACTION_IN_FLIGHT_GRACE_SECONDS
+
+
+def _is_blob_expiry_stale(blob_expires_at: int | None, expires_at: int | None) -> bool:
+    """Whether a channel blob must be rewritten with a new "expires_at" for a checkpoint.
+
+    A blob must not expire before a checkpoint that references it. A blob without
+    "expires_at", written before blobs expired, gets one once it is referenced by an
+    expiring checkpoint, so the TTL bounds the storage of blobs as well.
+
+    Args:
+        blob_expires_at (int | None): The "expires_at" of the blob, None if it does not expire.
+        expires_at (int | None): The "expires_at" of the checkpoint, None if it does not expire.
+
+    Returns:
+        bool: Whether the blob must be rewritten.
+    """
+    if blob_expires_at is None or expires_at is None:
+        return blob_expires_at != expires_at
+
+    return blob_expires_at < expires_at
+
+
 class AsyncDynamoDBSaver(BaseCheckpointSaver):
     client: Client
     table: Table
-
-    def __init__(self, client: Client, table: Table):
-        super().__init__()
+    payload_codec: PayloadCodec
+    cache: CheckpointCache | None
+    retention_policy: RetentionPolicy
+    durability: Durability
+    write_buffer: WriteBehindBuffer | None
+    serde_offloader: SerdeOffloader
+
+    def __init__(
+        self,
+        client: Client,
+        table: Table,
+        *,
+        payload_codec: PayloadCodec | None = None,
+        cache: CheckpointCache | None = None,
+        retention_policy: RetentionPolicy | None = None,
+        durability: Durability = Durability.SYNC,
+        max_pending_writes: int = 10_000,
+        max_concurrent_batch_writes: int = 4,
+        serde: SerializerProtocol | None = None,
+        serde_thread_threshold: int = DEFAULT_THREAD_THRESHOLD_BYTES,
+    ):
+        super().__init__(serde=serde)
         self.client = client
         self.table = table
+        self.payload_codec = payload_codec or PayloadCodec()
+        self.cache = cache
+        self.retention_policy = retention_policy or RetentionPolicy()
+        self.durability = Durability(durability)
+        self.write_buffer = (
+            WriteBehindBuffer(self._abatch_put_items, max_items=max_pending_writes)
+            if self.durability != Durability.SYNC
+            else None
+        )
+        self._batch_write_semaphore = asyncio.Semaphore(max_concurrent_batch_writes)
+        self.serde_offloader = SerdeOffloader(
+            self.serde, threshold_bytes=serde_thread_threshold
+        )
+        self._touched_thread_ids: set[str] = set()
+        # The "expires_at" of the channel blobs known to exist, None if they do not expire
+        self._known_blob_keys: OrderedDict[tuple[str, str], int | None] = OrderedDict()
 
     @classmethod
     @asynccontextmanager
     async def from_conn_info(
-        cls, *, region: str, table_name: str
+        cls,
+        *,
+        region: str,
+        table_name: str,
+        cache: CheckpointCache | None = None,
+        retention_policy: RetentionPolicy | None = None,
+        durability: Durability = Durability.SYNC,
+        max_pending_writes: int = 10_000,
+        serde: SerializerProtocol | None = None,
+        serde_thread_threshold: int = DEFAULT_THREAD_THRESHOLD_BYTES,
     ) -> AsyncIterator["AsyncDynamoDBSaver"]:
+        """Connects a saver to the checkpoints table.
+
+        The serializer defaults to CHECKPOINT_SERIALIZER, so the API, compaction and
+        migrations read and write checkpoints in the same format.
+        """
         endpoint = None
 
         if settings.ENVIRONMENT.is_local:
             endpoint = URL.build(scheme="http", host="localhost", port=8000)
+            blob_store = LocalBlobStore()
+        else:
+            blob_store = S3BlobStore(Storage.CHECKPOINT_BLOBS_BUCKET_NAME)
 
         async with ClientSession() as session:
             client = Client(
@@ -312,20 +527,90 @@ class AsyncDynamoDBSaver(BaseCheckpointSaver):
                 region=region,
                 endpoint=endpoint,
             )
-            table = client.table(table_name)
+            saver = cls(
+                client,
+                client.table(table_name),
+                payload_codec=PayloadCodec(
+                    blob_store, thread_threshold=serde_thread_threshold
+                ),
+                cache=cache,
+                retention_policy=retention_policy,
+                durability=durability,
+                max_pending_writes=max_pending_writes,
+                serde=serde or make_serializer(settings.CHECKPOINT_SERIALIZER),
+                serde_thread_threshold=serde_thread_threshold,
+            )
 
             if settings.ENVIRONMENT.is_local:
-                if not await table.exists():
-                    await table.create(
-                        keys=KeySchema(
-                            KeySpec("PK", KeyType.string),
-                            KeySpec("SK", KeyType.string),
-                        ),
-                        throughput=Throughput(read=3, write=3),
-                    )
+                await saver.asetup()
+
+            saver.start()
+            try:
+                yield saver
+            finally:
+                await saver.aclose()
+
+    def start(self) -> None:
+        """Starts the background flusher of the async durability mode."""
+        if self.durability == Durability.ASYNC:
+            self.write_buffer.start()
 
-            yield cls(region, table)
+    async def aclose(self) -> None:
+        """Stops the background flusher and persists every buffered checkpoint."""
+        if self.write_buffer is not None:
+            await self.write_buffer.aclose()
+
+    async def aflush(self, thread_id: str | None = None) -> None:
+        """Persists the buffered checkpoints and writes of a thread, or of every thread.
+
+        Called when a run ends, which is when the exit durability mode persists checkpoints.
+        A no-op in the sync durability mode.
+
+        Args:
+            thread_id (str | None): The thread ID to flush, or None for every thread.
+                Defaults to None.
+        """
+        if self.write_buffer is not None:
+            await self.write_buffer.aflush(thread_id)
+
+    async def asetup(self) -> None:
+        """Creates the checkpoints table if it does not exist yet.
+
+        Only used against dynamodb-local, the production table is managed by terraform.
+        """
+        if not await self.table.exists():
+            await self.table.create(
+                keys=KeySchema(
+                    KeySpec("PK", KeyType.string),
+                    KeySpec("SK", KeyType.string),
+                ),
+                throughput=Throughput(read=3, write=3),
+                wait_for_active=True,
+            )
 
+    def get_next_version(
+        self, current: ChannelVersion | None, channel: ChannelProtocol
+    ) -> float:
+        """Generates the next version of a channel.
+
+        Channel values are stored once per version, so a version must never be reused for a
+        different value, which integer versions do when a thread is forked from an older
+        checkpoint. The random fraction makes versions unique within a thread, and float
+        versions still compare with the integer versions of existing threads.
+
+        Args:
+            current (ChannelVersion | None): The current version of the channel.
+            channel (ChannelProtocol): The channel being versioned (unused).
+
+        Returns:
+            float: The next version of the channel.
+        """
+        # The version is part of the SK of the channel blob, "<checkpoint_ns>#<channel>#<version>".
+        # Two checkpoints forked from the same parent both get floor(current) + 1, without
+        # the random fraction the second fork would overwrite the blob the first one references.
+        return math.floor(current or 0) + 1 + random.random()
+
+    @observe_checkpoint_io("put")
     async def aput(
         self,
         config: RunnableConfig,
@@ -338,6 +623,21 @@ class AsyncDynamoDBSaver(BaseCheckpointSaver):
         This method saves a checkpoint to DynamoDB. The checkpoint is associated
         with the provided config and its parent config (if any).
 
+        Only the channels in new_versions are written, each as a separate blob item keyed by
+        (thread, channel, version). The checkpoint item itself is a manifest without channel
+        values, they are resolved from its channel_versions when it is read. The unchanged
+        channels of a checkpoint whose parent stores its channel values inline, i.e. was written
+        before channel blobs existed, have no blob yet, these are written as well.
+
+        With a TTL in the retention policy, the checkpoint item gets an "expires_at" attribute.
+        Channel blobs are shared by the checkpoints that did not change them and expire after
+        twice the TTL, the blobs of unchanged channels that would expire before the checkpoint
+        are rewritten along with it. Compaction deletes blobs earlier, once no retained
+        checkpoint references them.
+
+        In the async and exit durability modes, the items are buffered instead of written and
+        this returns without waiting for DynamoDB. Reads of the thread flush it first.
+
         Args:
             config (RunnableConfig): The config to associate with the checkpoint.
             checkpoint (Checkpoint): The checkpoint to save.
@@ -353,29 +653,94 @@ class AsyncDynamoDBSaver(BaseCheckpointSaver):
         parent_checkpoint_id = config["configurable"].get("checkpoint_id")
         key = _make_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
 
-        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        manifest = checkpoint.copy()
+        channel_values = manifest.pop("channel_values")
+        ttl_attributes = self._make_ttl_attributes()
+        blob_versions = dict(new_versions)
+        if parent_checkpoint_id:
+            blob_versions.update(
+                await self._aget_stale_blob_versions(
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["channel_versions"],
+                    new_versions,
+                    ttl_attributes.get(TTL_ATTRIBUTE_NAME),
+                )
+            )
+        blob_items = [
+            await self._adump_channel_blob(
+                thread_id, checkpoint_ns, checkpoint_id, channel, version, channel_values
+            )
+            for channel, version in blob_versions.items()
+        ]
+        # Blobs are written before the manifest, so a checkpoint never references a missing blob
+        if self.write_buffer is None:
+            await self._abatch_put_items(blob_items)
+        self._remember_blob_keys(blob_items)
+
+        type_, serialized_checkpoint = self.serde.dumps_typed(manifest)
         serialized_metadata = self.serde.dumps(metadata)
+        # Large checkpoints are offloaded before the item is written, so an item never
+        # references a blob that does not exist.
+        checkpoint_attributes = await self.payload_codec.aencode(
+            "checkpoint", _make_checkpoint_blob_key(key), serialized_checkpoint
+        )
         item = {
             **key,
-            "checkpoint": serialized_checkpoint,
+            **checkpoint_attributes,
             "type": type_,
             "checkpoint_id": checkpoint_id,
             "metadata": serialized_metadata,
             "parent_checkpoint_id": parent_checkpoint_id
             if parent_checkpoint_id
             else "",
+            **_make_metadata_attributes(metadata),
+            CHANNEL_VERSIONS_ATTRIBUTE_NAME: {
+                channel: str(version)
+                for channel, version in checkpoint["channel_versions"].items()
+            },
+            **ttl_attributes,
         }
 
-        await self.table.put_item(item)
+        if self.write_buffer is None:
+            await self.table.put_item(item)
+        else:
+            await self.write_buffer.aput(
+                thread_id,
+                blob_items,
+                item,
+                request_flush=self.durability == Durability.ASYNC,
+            )
+        self._touched_thread_ids.add(thread_id)
 
-        return {
+        checkpoint_config = {
             "configurable": {
                 "thread_id": thread_id,
                 "checkpoint_ns": checkpoint_ns,
                 "checkpoint_id": checkpoint_id,
             }
         }
+        if self.cache is not None:
+            self.cache.put(
+                CheckpointTuple(
+                    config=checkpoint_config,
+                    checkpoint=checkpoint,
+                    metadata=metadata,
+                    parent_config={
+                        "configurable": {
+                            "thread_id": thread_id,
+                            "checkpoint_ns": checkpoint_ns,
+                            "checkpoint_id": parent_checkpoint_id,
+                        }
+                    }
+                    if parent_checkpoint_id
+                    else None,
+                )
+            )
 
+        return checkpoint_config
+
+    @observe_checkpoint_io("put_writes")
     async def aput_writes(
         self,
         config: RunnableConfig,
@@ -398,13 +763,24 @@ class AsyncDynamoDBSaver(BaseCheckpointSaver):
         checkpoint_ns = config["configurable"]["checkpoint_ns"]
         checkpoint_id = config["configurable"]["checkpoint_id"]
 
-        for idx, data in enumerate(_dump_writes(self.serde, writes)):
-            key = _make_writes_key(
-                thread_id, checkpoint_ns, checkpoint_id, task_id, idx
-            )
-            await self.table.put_item({**key, **data})
+        # The key of a write is derived from (task_id, idx), so retrying the same writes
+        # overwrites the same items instead of duplicating them.
+        items = [
+            {
+                **_make_writes_key(thread_id, checkpoint_ns, checkpoint_id, task_id, idx),
+                **data,
+                **self._make_ttl_attributes(),
+            }
+            for idx, data in enumerate(_dump_writes(self.serde, writes))
+        ]
+        # Writes are flushed together with the checkpoint that ends their super-step
+        if self.write_buffer is None:
+            await self._abatch_put_items(items)
+        else:
+            await self.write_buffer.aput(thread_id, items)
         return config
 
+    @observe_checkpoint_io("get_tuple")
     async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
         """Get a checkpoint tuple from DynamoDB asynchronously.
 
@@ -413,6 +789,14 @@ class AsyncDynamoDBSaver(BaseCheckpointSaver):
         the matching thread ID and checkpoint ID is retrieved. Otherwise, the latest checkpoint
         for the given thread ID is retrieved.
 
+        The pending writes are read concurrently with the checkpoint. The ID of the latest
+        checkpoint is not known before it is read, so the newest writes of the namespace are
+        read along with it, see `_aget_latest_pending_writes`.
+
+        With a cache, the latest checkpoint is served from memory when a keys-only read
+        confirms that no other worker wrote a newer checkpoint since it was cached. Its pending
+        writes are always read from DynamoDB, other workers may have added some.
+
         Args:
             config (RunnableConfig): The config to use for retrieving the checkpoint.
 
@@ -422,55 +806,57 @@ class AsyncDynamoDBSaver(BaseCheckpointSaver):
         thread_id = config["configurable"]["thread_id"]
         checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
         checkpoint_id = get_checkpoint_id(config)
-        if not get_checkpoint_id(config):
-            config = {
-                "configurable": {
-                    "thread_id": thread_id,
-                    "checkpoint_ns": checkpoint_ns,
-                    "checkpoint_id": checkpoint_id,
-                }
-            }
+        await self.aflush(thread_id)
 
-        checkpoint_key = await self._aget_checkpoint_key(
-            thread_id, checkpoint_ns, checkpoint_id
-        )
-        if not checkpoint_key:
-            return None
-        checkpoint_data = await self.table.get_item(checkpoint_key)
+        if self.cache is not None and (
+            cached_tuple := await self._aget_cached_tuple(
+                thread_id, checkpoint_ns, checkpoint_id
+            )
+        ):
+            return cached_tuple
 
-        checkpoint_id = (
-            checkpoint_id or _parse_checkpoint_key(checkpoint_key)["checkpoint_id"]
-        )
-        writes_key = _make_writes_key(thread_id, checkpoint_ns, checkpoint_id, "", None)
-        matching_keys = [
-            key
-            async for key in self.table.query(
-                key_condition=HashKey("PK", writes_key["PK"])
-                & RangeKey("SK").begins_with(writes_key["SK"]),
-                projection=F("PK") & F("SK"),
+        if checkpoint_id:
+            checkpoint_key = _make_checkpoint_key(
+                thread_id, checkpoint_ns, checkpoint_id
             )
-        ]
-        parsed_keys = [_parse_writes_key(key) for key in matching_keys]
-        pending_writes = _load_writes(
-            self.serde,
-            {
-                (parsed_keys["task_id"], parsed_keys["idx"]): await self.table.get_item(
-                    key
-                )
-                for key, parsed_keys in sorted(
-                    zip(matching_keys, parsed_keys), key=lambda x: x[1]["idx"]
-                )
-            },
-        )
-        return _parse_checkpoint_data(
-            self.serde, checkpoint_key, checkpoint_data, pending_writes
+            checkpoint_data, pending_writes = await asyncio.gather(
+                self._aget_checkpoint_data(checkpoint_key),
+                self._aget_pending_writes(thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            checkpoint_data, writes_page = await asyncio.gather(
+                self._aget_latest_checkpoint_data(thread_id, checkpoint_ns),
+                self._aget_latest_writes_page(thread_id, checkpoint_ns),
+            )
+            if not checkpoint_data:
+                return None
+
+            checkpoint_key = {"PK": checkpoint_data["PK"], "SK": checkpoint_data["SK"]}
+            pending_writes = await self._aget_latest_pending_writes(
+                thread_id,
+                checkpoint_ns,
+                _parse_checkpoint_key(checkpoint_key)["checkpoint_id"],
+                writes_page,
+            )
+
+        checkpoint_tuple = await _aparse_checkpoint_data(
+            self.serde_offloader,
+            checkpoint_key,
+            await self._adecode_checkpoint_data(checkpoint_data),
+            list(pending_writes.values()),
         )
+        if checkpoint_tuple:
+            await self._aload_channel_values([checkpoint_tuple])
+            if self.cache is not None and not checkpoint_id:
+                self.cache.put(checkpoint_tuple)
+
+        return checkpoint_tuple
 
+    @observe_checkpoint_io("list")
     async def alist(
         self,
         config: RunnableConfig | None,
         *,
-        # TODO: Implement filtering
         filter: dict[str, Any] | None = None,
         before: RunnableConfig | None = None,
         limit: int | None = None,
@@ -482,7 +868,7 @@ class AsyncDynamoDBSaver(BaseCheckpointSaver):
 
         Args:
             config (RunnableConfig | None): Base configuration for filtering checkpoints.
-            filter (dict[str, Any] | None): Additional filtering criteria for metadata. Defaults to None.
+            filter (dict[str, Any] | None): Additional filtering criteria for metadata, scalar values are evaluated by DynamoDB as filter expressions. Defaults to None.
             before (RunnableConfig | None): If provided, only checkpoints before the specified checkpoint ID are returned. Defaults to None.
             limit (int | None): Maximum number of checkpoints to return. Defaults to None.
 
@@ -491,56 +877,764 @@ class AsyncDynamoDBSaver(BaseCheckpointSaver):
         """
         thread_id = config["configurable"]["thread_id"]
         checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
-        key = _make_checkpoint_key(thread_id, checkpoint_ns, "")
-        matching_keys = _filter_keys(
-            [
-                key
-                async for key in self.table.query(
-                    key_condition=HashKey("PK", key["PK"])
-                    & RangeKey("SK").begins_with(key["SK"]),
-                    projection=F("PK") & F("SK"),
+        checkpoint_id = get_checkpoint_id(config)
+        before_checkpoint_id = get_checkpoint_id(before) if before else None
+        await self.aflush(thread_id)
+
+        key = _make_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id or "")
+        excluded_sk = None
+        if checkpoint_id:
+            sk_condition = RangeKey("SK").equals(key["SK"])
+        elif before_checkpoint_id:
+            # Every SK between "<ns>#" and "<ns>#<before_id>" belongs to the namespace. The
+            # range is inclusive, so the "before" checkpoint itself is skipped below.
+            excluded_sk = _make_checkpoint_key(
+                thread_id, checkpoint_ns, before_checkpoint_id
+            )["SK"]
+            sk_condition = RangeKey("SK").between(key["SK"], excluded_sk)
+        else:
+            sk_condition = RangeKey("SK").begins_with(key["SK"])
+        filter_expression, remaining_filter = _make_metadata_filter(filter)
+
+        # Pages are fetched newest first and yielded as they arrive, with the remaining limit
+        # pushed down as the page size, so only the returned checkpoints are ever read.
+        # DynamoDB applies the page size before the filter expression, so filtered listings
+        # read full pages instead.
+        remaining = limit or None
+        start_key = None
+        while True:
+            page = await self.table.query_single_page(
+                key_condition=HashKey("PK", key["PK"]) & sk_condition,
+                start_key=start_key,
+                filter_expression=filter_expression,
+                scan_forward=False,
+                limit=remaining + (excluded_sk is not None)
+                if remaining and not filter
+                else None,
+            )
+            checkpoint_tuples = []
+            for data in page.items:
+                if data["SK"] == excluded_sk:
+                    continue
+
+                checkpoint_tuple = await _aparse_checkpoint_data(
+                    self.serde_offloader, data, await self._adecode_checkpoint_data(data)
                 )
-            ],
-            before,
-            limit,
+                if any(
+                    checkpoint_tuple.metadata.get(filter_key) != filter_value
+                    for filter_key, filter_value in remaining_filter.items()
+                ):
+                    continue
+
+                checkpoint_tuples.append(checkpoint_tuple)
+                if remaining is not None and len(checkpoint_tuples) == remaining:
+                    break
+
+            # The channel blobs of a page are loaded together, checkpoints of the same thread
+            # share the blobs of their unchanged channels.
+            await self._aload_channel_values(checkpoint_tuples)
+            for checkpoint_tuple in checkpoint_tuples:
+                yield checkpoint_tuple
+
+            if remaining is not None:
+                remaining -= len(checkpoint_tuples)
+                if remaining == 0:
+                    return
+            if page.is_last_page:
+                return
+            # The "before" checkpoint can only be the first item of the first page
+            excluded_sk = None
+            start_key = page.last_evaluated_key
+
+    def pop_touched_thread_ids(self) -> set[str]:
+        """Returns the IDs of the threads that got new checkpoints since the last call."""
+        thread_ids, self._touched_thread_ids = self._touched_thread_ids, set()
+        return thread_ids
+
+    async def acompact_thread(self, thread_id: str) -> CompactionResult:
+        """Deletes the items of a thread that are no longer needed under the retention policy.
+
+        In every namespace of the thread, the following items are deleted in batches:
+            - checkpoints that are not retained by the retention policy
+            - writes of checkpoints that are not retained, or of missing checkpoints older
+              than the latest one
+            - channel blobs that are not referenced by a retained checkpoint
+            - the offloaded payloads of the deleted checkpoints and channel blobs
+
+        The latest checkpoint of a namespace is always retained. Writes and blobs of a
+        checkpoint newer than the latest one may belong to a checkpoint that is being written
+        and are only deleted once they are older than the in-flight grace period.
+
+        Checkpoint items are read without their encoded checkpoint and metadata, so the
+        reclaimed bytes only count their projected attributes.
+
+        Args:
+            thread_id (str): The ID of the thread to compact.
+
+        Returns:
+            CompactionResult: The items reclaimed in the thread.
+        """
+        await self.aflush(thread_id)
+        now = time.time()
+        checkpoint_items: dict[str, list[dict]] = defaultdict(list)
+        # Only the attributes deciding what to delete are read, not the encoded checkpoints
+        async for item in self.table.query(
+            key_condition=HashKey(
+                "PK", DYNAMODB_KEY_SEPARATOR.join(["checkpoint", thread_id])
+            ),
+            scan_forward=False,
+            projection=F("PK")
+            & F("SK")
+            & F(CHANNEL_VERSIONS_ATTRIBUTE_NAME)
+            & F(f"checkpoint{PAYLOAD_REF_SUFFIX}"),
+        ):
+            checkpoint_items[_parse_checkpoint_key(item)["checkpoint_ns"]].append(item)
+
+        latest_checkpoint_ids: dict[str, str] = {}
+        retained_checkpoint_ids: set[tuple[str, str]] = set()
+        referenced_blob_keys: set[tuple[str, str]] = set()
+        deleted_checkpoints = []
+        for checkpoint_ns, items in checkpoint_items.items():
+            latest_checkpoint_ids[checkpoint_ns] = _parse_checkpoint_key(items[0])[
+                "checkpoint_id"
+            ]
+            for position, item in enumerate(items):
+                checkpoint_id = _parse_checkpoint_key(item)["checkpoint_id"]
+                if position and not self.retention_policy.is_retained(
+                    position, checkpoint_id, now
+                ):
+                    deleted_checkpoints.append(item)
+                    continue
+
+                retained_checkpoint_ids.add((checkpoint_ns, checkpoint_id))
+                channel_versions = await self._aget_channel_versions(item)
+                for channel, version in channel_versions.items():
+                    key = _make_channel_blob_key(
+                        thread_id, checkpoint_ns, channel, version
+                    )
+                    referenced_blob_keys.add((key["PK"], key["SK"]))
+
+        deleted_writes = []
+        async for item in self.table.query(
+            key_condition=HashKey("PK", DYNAMODB_KEY_SEPARATOR.join(["writes", thread_id])),
+        ):
+            parsed_key = _parse_writes_key(item)
+            if (
+                parsed_key["checkpoint_ns"],
+                parsed_key["checkpoint_id"],
+            ) not in retained_checkpoint_ids and _is_superseded(
+                parsed_key["checkpoint_id"],
+                latest_checkpoint_ids.get(parsed_key["checkpoint_ns"]),
+                now,
+            ):
+                deleted_writes.append(item)
+        deleted_blobs = [
+            item
+            async for item in self.table.query(
+                key_condition=HashKey(
+                    "PK", DYNAMODB_KEY_SEPARATOR.join(["blobs", thread_id])
+                ),
+            )
+            if (item["PK"], item["SK"]) not in referenced_blob_keys
+            and _is_superseded(
+                item.get("checkpoint_id", ""),
+                latest_checkpoint_ids.get(
+                    item["SK"].split(DYNAMODB_KEY_SEPARATOR)[0]
+                ),
+                now,
+            )
+        ]
+
+        deleted_items = deleted_checkpoints + deleted_writes + deleted_blobs
+        await self._abatch_delete_keys(
+            [{"PK": item["PK"], "SK": item["SK"]} for item in deleted_items]
+        )
+        # The offloaded payloads are deleted last, so an item never references a missing one
+        offloaded_payload_keys = [
+            item[f"checkpoint{PAYLOAD_REF_SUFFIX}"]
+            for item in deleted_checkpoints
+            if f"checkpoint{PAYLOAD_REF_SUFFIX}" in item
+        ] + [
+            item[f"value{PAYLOAD_REF_SUFFIX}"]
+            for item in deleted_blobs
+            if f"value{PAYLOAD_REF_SUFFIX}" in item
+        ]
+        if offloaded_payload_keys:
+            await self.payload_codec.blob_store.adelete(offloaded_payload_keys)
+
+        return CompactionResult(
+            threads=1,
+            checkpoints=len(deleted_checkpoints),
+            writes=len(deleted_writes),
+            blobs=len(deleted_blobs),
+            offloaded_payloads=len(offloaded_payload_keys),
+            bytes=sum(estimate_item_size(item) for item in deleted_items),
+        )
+
+    def _make_ttl_attributes(self) -> dict[str, int]:
+        """Generates the "expires_at" attribute of an item written now, if the policy has a TTL."""
+        expires_at = self.retention_policy.expires_at()
+        return {TTL_ATTRIBUTE_NAME: expires_at} if expires_at else {}
+
+    def _make_blob_ttl_attributes(self) -> dict[str, int]:
+        """Generates the "expires_at" attribute of a channel blob written now, if the policy has a TTL."""
+        expires_at = self.retention_policy.blob_expires_at()
+        return {TTL_ATTRIBUTE_NAME: expires_at} if expires_at else {}
+
+    async def _abatch_put_items(self, items: list[dict]) -> None:
+        """Writes items with BatchWriteItem.
+
+        The items are split into batches of 25 (the BatchWriteItem limit) which are sent
+        concurrently, bounded by the saver's batch write semaphore.
+
+        Args:
+            items (list[dict]): The items to write.
+        """
+        await asyncio.gather(
+            *(
+                self._abatch_write_chunk(
+                    items_to_put=items[i : i + DYNAMODB_BATCH_WRITE_LIMIT]
+                )
+                for i in range(0, len(items), DYNAMODB_BATCH_WRITE_LIMIT)
+            )
         )
-        for key in matching_keys:
-            data = await self.table.get_item(key)
-            if data and "checkpoint" in data and "metadata" in data:
-                yield _parse_checkpoint_data(self.serde, key, data)
 
-    async def _aget_checkpoint_key(
+    async def _abatch_delete_keys(self, keys: list[CompositeKey]) -> None:
+        """Deletes items with BatchWriteItem.
+
+        The keys are split into batches of 25 (the BatchWriteItem limit) which are sent
+        concurrently, bounded by the saver's batch write semaphore.
+
+        Args:
+            keys (list[CompositeKey]): The keys of the items to delete.
+        """
+        await asyncio.gather(
+            *(
+                self._abatch_write_chunk(
+                    keys_to_delete=keys[i : i + DYNAMODB_BATCH_WRITE_LIMIT]
+                )
+                for i in range(0, len(keys), DYNAMODB_BATCH_WRITE_LIMIT)
+            )
+        )
+
+    async def _abatch_get_items(
+        self,
+        keys: list[CompositeKey],
+        projection: ProjectionExpression | None = None,
+    ) -> list[dict]:
+        """Reads items with BatchGetItem.
+
+        The keys are split into batches of 100 (the BatchGetItem limit) which are sent
+        concurrently. Missing items are not returned.
+
+        Args:
+            keys (list[CompositeKey]): The keys of the items to read.
+            projection (ProjectionExpression | None): If provided, only the projected
+                attributes are read. Defaults to None.
+
+        Returns:
+            list[dict]: The found items, in no particular order.
+        """
+        chunks = await asyncio.gather(
+            *(
+                self._abatch_get_chunk(
+                    keys[i : i + DYNAMODB_BATCH_GET_LIMIT], projection
+                )
+                for i in range(0, len(keys), DYNAMODB_BATCH_GET_LIMIT)
+            )
+        )
+        return [item for chunk in chunks for item in chunk]
+
+    async def _abatch_get_chunk(
+        self,
+        keys: list[CompositeKey],
+        projection: ProjectionExpression | None = None,
+    ) -> list[dict]:
+        """Reads up to 100 items with a single BatchGetItem call.
+
+        DynamoDB may leave some keys unprocessed when the table is throttled or the response
+        exceeds 16 MB, these are retried with exponential backoff.
+
+        Args:
+            keys (list[CompositeKey]): The keys of the items to read.
+            projection (ProjectionExpression | None): If provided, only the projected
+                attributes are read. Defaults to None.
+
+        Raises:
+            RuntimeError: If some keys are still unprocessed after all attempts.
+
+        Returns:
+            list[dict]: The found items.
+        """
+        items = []
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(BATCH_BASE_BACKOFF_SECONDS * 2**attempt)
+
+            response = await self.client.batch_get(
+                {self.table.name: BatchGetRequest(keys=keys, projection=projection)}
+            )
+            items += response.items.get(self.table.name, [])
+            keys = response.unprocessed_keys.get(self.table.name, [])
+            if not keys:
+                return items
+
+        raise RuntimeError(
+            f"{len(keys)} keys were left unprocessed after {BATCH_MAX_ATTEMPTS} attempts"
+        )
+
+    async def _abatch_write_chunk(
+        self,
+        *,
+        items_to_put: list[dict] | None = None,
+        keys_to_delete: list[CompositeKey] | None = None,
+    ) -> None:
+        """Writes or deletes up to 25 items with a single BatchWriteItem call.
+
+        DynamoDB may leave some requests unprocessed when the table is throttled, these are
+        retried with exponential backoff.
+
+        Args:
+            items_to_put (list[dict] | None): The items to write. Defaults to None.
+            keys_to_delete (list[CompositeKey] | None): The keys of the items to delete.
+                Defaults to None.
+
+        Raises:
+            RuntimeError: If some requests are still unprocessed after all attempts.
+        """
+        items_to_put = items_to_put or []
+        keys_to_delete = keys_to_delete or []
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(BATCH_BASE_BACKOFF_SECONDS * 2**attempt)
+
+            async with self._batch_write_semaphore:
+                result = await self.client.batch_write(
+                    {
+                        self.table.name: BatchWriteRequest(
+                            items_to_put=items_to_put, keys_to_delete=keys_to_delete
+                        )
+                    }
+                )
+
+            unprocessed = result.get(self.table.name)
+            items_to_put = unprocessed.unput_items if unprocessed else []
+            keys_to_delete = unprocessed.undeleted_keys if unprocessed else []
+            if not items_to_put and not keys_to_delete:
+                return
+
+        raise RuntimeError(
+            f"{len(items_to_put) + len(keys_to_delete)} items were left unprocessed after {BATCH_MAX_ATTEMPTS} attempts"
+        )
+
+    async def _adump_channel_blob(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        channel: str,
+        version: ChannelVersion,
+        channel_values: dict[str, Any],
+    ) -> dict:
+        """Serializes the value of a channel at a given version into a blob item.
+
+        Channels that were updated to an empty value are stored with the "empty" type. The
+        blob records the checkpoint that wrote it, so compaction can tell the blobs of a
+        checkpoint that is being written from unreferenced ones. With a TTL in the retention
+        policy, the blob gets an "expires_at" attribute.
+
+        Args:
+            thread_id (str): The thread ID of the checkpoint.
+            checkpoint_ns (str): The namespace of the checkpoint.
+            checkpoint_id (str): The ID of the checkpoint writing the blob.
+            channel (str): The name of the channel.
+            version (ChannelVersion): The new version of the channel.
+            channel_values (dict[str, Any]): The channel values of the checkpoint.
+
+        Returns:
+            dict: The blob item.
+        """
+        key = _make_channel_blob_key(thread_id, checkpoint_ns, channel, version)
+        if channel not in channel_values:
+            return {
+                **key,
+                "type": EMPTY_CHANNEL_TYPE,
+                "checkpoint_id": checkpoint_id,
+                **self._make_blob_ttl_attributes(),
+            }
+
+        # The previous version of the channel tells whether the value is large
+        type_, value = await self.serde_offloader.adumps_typed(
+            channel_values[channel], (thread_id, checkpoint_ns, channel)
+        )
+        return {
+            **key,
+            "type": type_,
+            "checkpoint_id": checkpoint_id,
+            **await self.payload_codec.aencode(
+                "value", _make_checkpoint_blob_key(key), value
+            ),
+            **self._make_blob_ttl_attributes(),
+        }
+
+    async def _aload_channel_values(
+        self, checkpoint_tuples: list[CheckpointTuple]
+    ) -> None:
+        """Resolves the channel values of checkpoint manifests from their channel blobs in place.
+
+        Checkpoints written before channel blobs existed still store their channel values
+        inline and are left untouched. The blobs of all given checkpoints are fetched together,
+        each distinct (channel, version) once.
+
+        Args:
+            checkpoint_tuples (list[CheckpointTuple]): The checkpoint tuples to resolve.
+        """
+        manifests = [
+            checkpoint_tuple
+            for checkpoint_tuple in checkpoint_tuples
+            if "channel_values" not in checkpoint_tuple.checkpoint
+        ]
+        blob_keys = {
+            (key["PK"], key["SK"]): key
+            for checkpoint_tuple in manifests
+            for channel, version in checkpoint_tuple.checkpoint[
+                "channel_versions"
+            ].items()
+            for key in [
+                _make_channel_blob_key(
+                    checkpoint_tuple.config["configurable"]["thread_id"],
+                    checkpoint_tuple.config["configurable"]["checkpoint_ns"],
+                    channel,
+                    version,
+                )
+            ]
+        }
+        blobs = {
+            (item["PK"], item["SK"]): item
+            for item in await self._abatch_get_items(list(blob_keys.values()))
+        }
+        self._remember_blob_keys(blobs.values())
+
+        for checkpoint_tuple in manifests:
+            configurable = checkpoint_tuple.config["configurable"]
+            channel_values = {}
+            for channel, version in checkpoint_tuple.checkpoint["channel_versions"].items():
+                key = _make_channel_blob_key(
+                    configurable["thread_id"],
+                    configurable["checkpoint_ns"],
+                    channel,
+                    version,
+                )
+                blob = blobs.get((key["PK"], key["SK"]))
+                if not blob:
+                    logger.warning(
+                        f"Missing blob of channel {channel} (version {version}) for checkpoint {configurable['checkpoint_id']}"
+                    )
+                    continue
+                if blob["type"] == EMPTY_CHANNEL_TYPE:
+                    continue
+
+                channel_values[channel] = await self.serde_offloader.aloads_typed(
+                    (blob["type"], await self.payload_codec.adecode("value", blob)),
+                    (configurable["thread_id"], configurable["checkpoint_ns"], channel),
+                )
+
+            checkpoint_tuple.checkpoint["channel_values"] = channel_values
+
+    async def _aget_stale_blob_versions(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        channel_versions: ChannelVersions,
+        new_versions: ChannelVersions,
+        expires_at: int | None,
+    ) -> ChannelVersions:
+        """Finds the unchanged channels of a new checkpoint whose blob must be rewritten.
+
+        The unchanged channels reference the blobs of their version in the parent checkpoint.
+        These do not exist when the parent stores its channel values inline, and they must not
+        expire before the new checkpoint does. Blobs written or read by the saver are
+        remembered along with their "expires_at", so only the others are looked up, with a
+        keys-only read. In practice, only the first checkpoint of a thread after channel blobs
+        were introduced, or of a fork from an inline checkpoint, reads them.
+
+        Args:
+            thread_id (str): The thread ID of the checkpoint.
+            checkpoint_ns (str): The namespace of the checkpoint.
+            channel_versions (ChannelVersions): The channel versions of the new checkpoint.
+            new_versions (ChannelVersions): The channel versions changed by the new checkpoint.
+            expires_at (int | None): The "expires_at" of the new checkpoint, None if it does
+                not expire.
+
+        Returns:
+            ChannelVersions: The versions of the unchanged channels whose blob is missing or
+                expires before the new checkpoint.
+        """
+        blob_keys = {
+            (key["PK"], key["SK"]): channel
+            for channel, version in channel_versions.items()
+            if channel not in new_versions
+            for key in [_make_channel_blob_key(thread_id, checkpoint_ns, channel, version)]
+        }
+        unknown_blob_keys = [key for key in blob_keys if key not in self._known_blob_keys]
+        if unknown_blob_keys:
+            self._remember_blob_keys(
+                await self._abatch_get_items(
+                    [{"PK": pk, "SK": sk} for pk, sk in unknown_blob_keys],
+                    projection=F("PK") & F("SK") & F(TTL_ATTRIBUTE_NAME),
+                )
+            )
+
+        return {
+            channel: channel_versions[channel]
+            for key, channel in blob_keys.items()
+            if key not in self._known_blob_keys
+            or _is_blob_expiry_stale(self._known_blob_keys[key], expires_at)
+        }
+
+    def _remember_blob_keys(self, blob_items: Iterable[dict]) -> None:
+        """Remembers that channel blobs exist, the least recently used keys are forgotten."""
+        for item in blob_items:
+            key = (item["PK"], item["SK"])
+            self._known_blob_keys[key] = item.get(TTL_ATTRIBUTE_NAME)
+            self._known_blob_keys.move_to_end(key)
+        while len(self._known_blob_keys) > MAX_KNOWN_BLOB_KEYS:
+            self._known_blob_keys.popitem(last=False)
+
+    async def _aget_channel_versions(self, item: dict) -> ChannelVersions:
+        """Returns the channel versions of a checkpoint item.
+
+        Items written before the versions were stored as an attribute are read in full and
+        deserialized off the event loop.
+
+        Args:
+            item (dict): The checkpoint item, only its key and channel versions are read.
+
+        Returns:
+            ChannelVersions: The channel versions of the checkpoint.
+        """
+        if CHANNEL_VERSIONS_ATTRIBUTE_NAME in item:
+            return item[CHANNEL_VERSIONS_ATTRIBUTE_NAME]
+
+        data = await self._adecode_checkpoint_data(
+            await self._aget_checkpoint_data({"PK": item["PK"], "SK": item["SK"]})
+        )
+        checkpoint = await self.serde_offloader.aloads_typed(
+            (data["type"], data["checkpoint"])
+        )
+        return checkpoint["channel_versions"]
+
+    async def _adecode_checkpoint_data(self, data: dict | None) -> dict | None:
+        """Replaces the encoded checkpoint payload of an item with the serialized checkpoint.
+
+        Args:
+            data (dict | None): The checkpoint item.
+
+        Returns:
+            dict | None: The checkpoint item with its decoded payload, or None if there is no item.
+        """
+        if not data:
+            return data
+
+        return {**data, "checkpoint": await self.payload_codec.adecode("checkpoint", data)}
+
+    async def _aget_checkpoint_data(self, key: CompositeKey) -> dict | None:
+        """Fetches a checkpoint item by its key.
+
+        Args:
+            key (CompositeKey): The composite key of the checkpoint.
+
+        Returns:
+            dict | None: The checkpoint item, or None if it does not exist.
+        """
+        try:
+            return await self.table.get_item(key)
+        except ItemNotFound:
+            return None
+
+    async def _aget_cached_tuple(
         self, thread_id: str, checkpoint_ns: str, checkpoint_id: str | None
-    ) -> CompositeKey | None:
-        """Determines the latest checkpoint key
+    ) -> CheckpointTuple | None:
+        """Looks up a checkpoint in the cache, along with its pending writes from DynamoDB.
+
+        Checkpoints are immutable, so a cached checkpoint requested by ID is always valid. For
+        the latest checkpoint, the ID of the latest checkpoint is read with a consistent
+        keys-only query, and the cached checkpoint is dropped if another worker wrote a newer
+        one. The pending writes of the cached checkpoint are read concurrently.
 
         Args:
             thread_id (str): The thread ID of the checkpoint.
             checkpoint_ns (str): The namespace of the checkpoint.
-            checkpoint_id (str | None): The ID of the checkpoint
+            checkpoint_id (str | None): The ID of the checkpoint, or None for the latest one.
 
         Returns:
-            CompositeKey | None: The latest checkpoint key.
+            CheckpointTuple | None: The cached checkpoint tuple, or None on a miss.
         """
         if checkpoint_id:
-            return _make_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
-
-        all_keys = [
-            key
-            async for key in self.table.query(
-                key_condition=HashKey("PK", f"checkpoint#{thread_id}")
-                & RangeKey("SK").begins_with(
-                    DYNAMODB_KEY_SEPARATOR.join([checkpoint_ns, ""])
-                ),
+            checkpoint_tuple = self.cache.get(thread_id, checkpoint_ns, checkpoint_id)
+            if not checkpoint_tuple:
+                return None
+
+            pending_writes = await self._aget_pending_writes(
+                thread_id, checkpoint_ns, checkpoint_id
+            )
+            return checkpoint_tuple._replace(pending_writes=list(pending_writes.values()))
+
+        cached_checkpoint_id = self.cache.get_checkpoint_id(thread_id, checkpoint_ns)
+        if not cached_checkpoint_id:
+            return self.cache.get(thread_id, checkpoint_ns, None)
+
+        latest_key, pending_writes = await asyncio.gather(
+            self._aget_latest_checkpoint_data(
+                thread_id,
+                checkpoint_ns,
                 projection=F("PK") & F("SK"),
+                consistent_read=True,
+            ),
+            self._aget_pending_writes(thread_id, checkpoint_ns, cached_checkpoint_id),
+        )
+        checkpoint_tuple = self.cache.get(
+            thread_id,
+            checkpoint_ns,
+            _parse_checkpoint_key(latest_key)["checkpoint_id"] if latest_key else None,
+        )
+        if not checkpoint_tuple:
+            self.cache.invalidate(thread_id, checkpoint_ns)
+            return None
+
+        return checkpoint_tuple._replace(pending_writes=list(pending_writes.values()))
+
+    async def _aget_pending_writes(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> dict[tuple[str, int], PendingWrite]:
+        """Loads all pending writes of a checkpoint.
+
+        The writes of a checkpoint share the "<checkpoint_ns>#<checkpoint_id>#" SK prefix, so
+        they are fetched as full items with a single (paginated) query instead of one
+        get_item per write.
+
+        Args:
+            thread_id (str): The thread ID of the checkpoint.
+            checkpoint_ns (str): The namespace of the checkpoint.
+            checkpoint_id (str): The ID of the checkpoint.
+
+        Returns:
+            dict[tuple[str, int], PendingWrite]: The pending writes by task ID and write index,
+                ordered by task ID and write index.
+        """
+        writes_key = _make_writes_key(thread_id, checkpoint_ns, checkpoint_id, "", None)
+        items = [
+            item
+            async for item in self.table.query(
+                key_condition=HashKey("PK", writes_key["PK"])
+                & RangeKey("SK").begins_with(writes_key["SK"]),
             )
         ]
+        return self._load_pending_writes(items)
 
-        if not all_keys:
-            return None
+    async def _aget_latest_writes_page(self, thread_id: str, checkpoint_ns: str) -> Page:
+        """Fetches the newest writes of a thread and namespace, newest checkpoint first.
+
+        Args:
+            thread_id (str): The thread ID of the checkpoints.
+            checkpoint_ns (str): The namespace of the checkpoints.
 
-        latest_key = max(
-            all_keys, key=lambda k: _parse_checkpoint_key(k)["checkpoint_id"]
+        Returns:
+            Page: A page of at most LATEST_WRITES_PAGE_SIZE writes items.
+        """
+        return await self.table.query_single_page(
+            key_condition=HashKey(
+                "PK", DYNAMODB_KEY_SEPARATOR.join(["writes", thread_id])
+            )
+            & RangeKey("SK").begins_with(
+                DYNAMODB_KEY_SEPARATOR.join([checkpoint_ns, ""])
+            ),
+            scan_forward=False,
+            limit=LATEST_WRITES_PAGE_SIZE,
+        )
+
+    async def _aget_latest_pending_writes(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        writes_page: Page,
+    ) -> dict[tuple[str, int], PendingWrite]:
+        """Loads the pending writes of the latest checkpoint from the newest writes.
+
+        The newest writes were read before the ID of the latest checkpoint was known. Writes
+        are sorted by checkpoint ID, so they hold every write of the latest checkpoint unless
+        the page is full and does not reach the writes of an older checkpoint. The writes of
+        the latest checkpoint are then queried again, which only happens for checkpoints with
+        more than LATEST_WRITES_PAGE_SIZE writes, or while a newer checkpoint is being written.
+
+        Args:
+            thread_id (str): The thread ID of the checkpoint.
+            checkpoint_ns (str): The namespace of the checkpoint.
+            checkpoint_id (str): The ID of the latest checkpoint.
+            writes_page (Page): The newest writes of the namespace, see
+                `_aget_latest_writes_page`.
+
+        Returns:
+            dict[tuple[str, int], PendingWrite]: The pending writes by task ID and write index,
+                ordered by task ID and write index.
+        """
+        items = [
+            item
+            for item in writes_page.items
+            if _parse_writes_key(item)["checkpoint_id"] == checkpoint_id
+        ]
+        if not writes_page.is_last_page and (
+            not writes_page.items
+            or _parse_writes_key(writes_page.items[-1])["checkpoint_id"] >= checkpoint_id
+        ):
+            return await self._aget_pending_writes(thread_id, checkpoint_ns, checkpoint_id)
+
+        return self._load_pending_writes(items)
+
+    def _load_pending_writes(
+        self, items: list[dict]
+    ) -> dict[tuple[str, int], PendingWrite]:
+        """Deserializes writes items of a checkpoint, ordered by task ID and write index."""
+        task_id_to_data: dict[tuple[str, int], dict] = {}
+        for item in items:
+            parsed_key = _parse_writes_key(item)
+            task_id_to_data[(parsed_key["task_id"], parsed_key["idx"])] = item
+
+        task_id_to_data = dict(sorted(task_id_to_data.items()))
+        return dict(zip(task_id_to_data, _load_writes(self.serde, task_id_to_data)))
+
+    async def _aget_latest_checkpoint_data(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        projection: ProjectionExpression | None = None,
+        consistent_read: bool = False,
+    ) -> dict | None:
+        """Fetches the latest checkpoint item of a thread and namespace.
+
+        Checkpoint IDs are time-ordered UUIDs (uuid6), so the "<checkpoint_ns>#<checkpoint_id>"
+        SK sorts chronologically and the latest checkpoint is the first item of a descending
+        query. This is a single read regardless of how many checkpoints the thread has.
+
+        Args:
+            thread_id (str): The thread ID of the checkpoint.
+            checkpoint_ns (str): The namespace of the checkpoint.
+            projection (ProjectionExpression | None): If provided, only the projected attributes
+                are read. Defaults to None.
+            consistent_read (bool): Whether to use a strongly consistent read. Defaults to False.
+
+        Returns:
+            dict | None: The latest checkpoint item, or None if the thread has no checkpoints.
+        """
+        key = _make_checkpoint_key(thread_id, checkpoint_ns, "")
+        page = await self.table.query_single_page(
+            key_condition=HashKey("PK", key["PK"])
+            & RangeKey("SK").begins_with(key["SK"]),
+            scan_forward=False,
+            limit=1,
+            projection=projection,
+            consistent_read=consistent_read,
         )
 
-        return latest_key
+        return page.items[0] if page.items else None
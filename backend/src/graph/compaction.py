@@ -0,0 +1,109 @@
+"""Compaction of the Checkpoints table under the checkpoint retention policy.
+
+The API compacts the threads it wrote to in the background. Threads that are no longer written
+to are only reclaimed by their TTL, run `python -m src.graph.compaction` to compact the whole
+table, e.g. after changing the retention policy.
+"""
+
+import asyncio
+from datetime import timedelta
+
+from aiodynamo.expressions import F
+
+from src.common.constants import Database
+from src.core.config import settings
+from src.core.logging import Logger
+
+from .checkpoint import DYNAMODB_KEY_SEPARATOR, AsyncDynamoDBSaver
+from .retention import CompactionResult, RetentionPolicy
+
+logger = Logger(__name__).logger
+
+
+async def compact_threads(
+    saver: AsyncDynamoDBSaver, thread_ids: set[str]
+) -> CompactionResult:
+    """Compacts threads one after another, a failing thread does not stop the others.
+
+    Args:
+        saver (AsyncDynamoDBSaver): The saver of the table to compact.
+        thread_ids (set[str]): The IDs of the threads to compact.
+
+    Returns:
+        CompactionResult: The items reclaimed in all threads.
+    """
+    result = CompactionResult()
+    for thread_id in sorted(thread_ids):
+        try:
+            result += await saver.acompact_thread(thread_id)
+        except Exception:
+            logger.exception(f"Failed to compact checkpoints of thread {thread_id}")
+
+    return result
+
+
+async def compact_table(saver: AsyncDynamoDBSaver) -> CompactionResult:
+    """Compacts every thread of the table.
+
+    Threads are found by scanning the keys of the table, which includes threads whose
+    checkpoints already expired but whose channel blobs, which expire later, are left.
+
+    Args:
+        saver (AsyncDynamoDBSaver): The saver of the table to compact.
+
+    Returns:
+        CompactionResult: The items reclaimed in all threads.
+    """
+    thread_ids = set()
+    async for key in saver.table.scan(projection=F("PK")):
+        _, thread_id = key["PK"].split(DYNAMODB_KEY_SEPARATOR, 1)
+        thread_ids.add(thread_id)
+
+    return await compact_threads(saver, thread_ids)
+
+
+async def run_periodic_compaction(
+    saver: AsyncDynamoDBSaver, interval_seconds: float
+) -> None:
+    """Compacts the threads that got new checkpoints every interval, until cancelled.
+
+    Args:
+        saver (AsyncDynamoDBSaver): The saver whose threads are compacted.
+        interval_seconds (float): The interval between two compactions.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+
+        thread_ids = saver.pop_touched_thread_ids()
+        if not thread_ids:
+            continue
+
+        result = await compact_threads(saver, thread_ids)
+        logger.info(f"Checkpoint compaction: {result}")
+
+
+def get_retention_policy() -> RetentionPolicy:
+    """Returns the checkpoint retention policy configured in settings."""
+    return RetentionPolicy(
+        keep_last=settings.CHECKPOINT_RETENTION_KEEP_LAST,
+        keep_newer_than=timedelta(
+            seconds=settings.CHECKPOINT_RETENTION_KEEP_NEWER_THAN_SECONDS
+        ),
+        ttl=timedelta(seconds=settings.CHECKPOINT_RETENTION_TTL_SECONDS)
+        if settings.CHECKPOINT_RETENTION_TTL_SECONDS
+        else None,
+    )
+
+
+async def main() -> None:
+    async with AsyncDynamoDBSaver.from_conn_info(
+        region=settings.AWS_REGION_NAME,
+        table_name=Database.CHECKPOINTS_TABLE_NAME,
+        retention_policy=get_retention_policy(),
+    ) as saver:
+        result = await compact_table(saver)
+        logger.info(f"Checkpoint compaction finished: {result}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
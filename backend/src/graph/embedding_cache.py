@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class _CachedEmbedding:
+    embedding: tuple[float, ...]
+    expires_at: float
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of the embeddings of query texts.
+
+    Repeated questions, e.g. suggested questions of the UI or a retried message, skip the
+    embedding round trip to OpenAI. Texts are looked up exactly, after stripping the
+    surrounding whitespace, so a hit returns the embedding OpenAI returned for the same text.
+    Entries expire after ttl_seconds and the least recently used entry is evicted once the
+    cache holds max_entries.
+
+    The cache is kept per embedding model, see `LLMRegistry.aembed_query`.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _CachedEmbedding] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def get(self, text: str) -> list[float] | None:
+        """Returns the cached embedding of a text, or None on a miss."""
+        key = text.strip()
+        entry = self._entries.get(key)
+        if entry and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return list(entry.embedding)
+
+    def put(self, text: str, embedding: list[float]) -> None:
+        """Caches the embedding of a text, evicting the least recently used entry if full."""
+        if self.max_entries <= 0:
+            return
+
+        key = text.strip()
+        self._entries[key] = _CachedEmbedding(
+            embedding=tuple(embedding), expires_at=time.monotonic() + self.ttl_seconds
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
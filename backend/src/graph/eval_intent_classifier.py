@@ -0,0 +1,195 @@
+"""
+Offline evaluation of the local intent classifier on labelled messages it was not built from.
+
+Reports the share of messages the classifier short-circuits, their accuracy, the intent
+detection latency it saves and the LLM calls it avoids. The latency of the LLM is measured
+with --llm, otherwise it is estimated with --llm-latency-ms.
+
+The intent detection latency of each message is derived from the flow of `detect_intent`:
+the LLM is called once kNN is not confident, or after --knn-timeout-ms when kNN is slower.
+A LLM call started after the timeout is cancelled when kNN turns out confident, it is then
+not avoided although its latency is hidden.
+
+Usage:
+    python -m src.graph.eval_intent_classifier [--rules-only] [--llm] [--llm-latency-ms 800]
+        [--knn-timeout-ms 300]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.core.config import settings
+
+from .intent_classifier import LocalIntentClassifier
+from .llm import get_llm_registry
+from .schemas import LLMChain, QuestionIntent
+
+EVAL_MESSAGES: list[tuple[str, QuestionIntent]] = [
+    ("hi", QuestionIntent.GREETING),
+    ("Hello there!", QuestionIntent.GREETING),
+    ("Good evening", QuestionIntent.GREETING),
+    ("Thanks, bye!", QuestionIntent.GREETING),
+    ("Terve", QuestionIntent.GREETING),
+    ("Hey, how is it going?", QuestionIntent.GREETING),
+    ("Kiitos paljon", QuestionIntent.GREETING),
+    ("Great, thank you for the help", QuestionIntent.GREETING),
+    ("What does debt-free price mean?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("How does varainsiirtovero work?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("Do first-time buyers pay transfer tax?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What is included in the maintenance charge?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("How much do I need to save before getting a mortgage?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What is a housing company?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("Who is responsible for renovations in an apartment building?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What is a property manager's certificate?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("Can I buy an apartment in Finland without being a resident?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("How long does it take to close the deal on a house?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("Is a leasehold plot a bad idea?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What is the state guarantee for home loans?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("find me a 2-room flat in Espoo", QuestionIntent.FINDING_PROPERTY),
+    ("Show me houses in Vantaa under 400k", QuestionIntent.FINDING_PROPERTY),
+    ("I'm looking for a studio in Kamppi", QuestionIntent.FINDING_PROPERTY),
+    ("3 room apartment in Tampere with a balcony", QuestionIntent.FINDING_PROPERTY),
+    ("Any apartments for sale near Aalto University?", QuestionIntent.FINDING_PROPERTY),
+    ("I'd like a row house in Oulu with a sauna", QuestionIntent.FINDING_PROPERTY),
+    ("Etsin kaksiota Turusta", QuestionIntent.FINDING_PROPERTY),
+    ("Search for homes with an elevator in Töölö", QuestionIntent.FINDING_PROPERTY),
+    ("Cheap flats in Lahti?", QuestionIntent.FINDING_PROPERTY),
+    ("Houses built after 2010 in Jyväskylä", QuestionIntent.FINDING_PROPERTY),
+    ("What's the exchange rate of the euro?", QuestionIntent.UNSUPPORTED),
+    ("Tell me a joke", QuestionIntent.UNSUPPORTED),
+    ("Which bus goes to the airport?", QuestionIntent.UNSUPPORTED),
+    ("Write an email to my landlord about a broken heater", QuestionIntent.UNSUPPORTED),
+    ("Who is the president of Finland?", QuestionIntent.UNSUPPORTED),
+    ("How do I apply for a Finnish driving licence?", QuestionIntent.UNSUPPORTED),
+    ("What's a good gym in Helsinki?", QuestionIntent.UNSUPPORTED),
+    ("Explain quantum computing", QuestionIntent.UNSUPPORTED),
+]
+
+
+async def _adetect_intent_with_llm(message: str) -> tuple[QuestionIntent, float]:
+    intent_detection_llm = get_llm_registry().get_chain(LLMChain.INTENT_DETECTION)
+    started_at = time.perf_counter()
+    response = await intent_detection_llm.ainvoke({"chat_history": [], "question": message})
+    return response.intent, (time.perf_counter() - started_at) * 1000
+
+
+def _intent_detection_latency_ms(
+    local_latency_ms: float,
+    llm_latency_ms: float,
+    knn_timeout_ms: float,
+    classified: bool,
+    with_knn: bool,
+) -> tuple[float, bool]:
+    """Returns the latency of `detect_intent` for a message and whether it called the LLM."""
+    if classified and (not with_knn or local_latency_ms <= knn_timeout_ms):
+        return local_latency_ms, False
+    if classified:
+        # The LLM call started after the timeout and is cancelled
+        return local_latency_ms, True
+    if not with_knn or local_latency_ms <= knn_timeout_ms:
+        return local_latency_ms + llm_latency_ms, True
+    return max(local_latency_ms, knn_timeout_ms + llm_latency_ms), True
+
+
+async def evaluate(
+    rules_only: bool, with_llm: bool, llm_latency_ms: float, knn_timeout_ms: float
+) -> None:
+    classifier = LocalIntentClassifier(None if rules_only else get_llm_registry().embeddings)
+    if not rules_only:
+        # Embed the examples before measuring
+        await classifier.aembed_examples()
+
+    local_latencies_ms, llm_latencies_ms, saved_latencies_ms = [], [], []
+    classified, correct, llm_correct, llm_calls = 0, 0, 0, 0
+    mistakes = []
+    for message, intent in EVAL_MESSAGES:
+        started_at = time.perf_counter()
+        prediction = classifier.classify_with_rules(message)
+        # Messages classified by the keyword rules never wait for kNN
+        with_knn = prediction is None and not rules_only
+        if with_knn:
+            embedding = await classifier.embeddings.aembed_query(message)
+            prediction = await classifier.aclassify_with_knn(embedding)
+        local_latency_ms = (time.perf_counter() - started_at) * 1000
+        local_latencies_ms.append(local_latency_ms)
+
+        if prediction is not None:
+            classified += 1
+            correct += prediction.intent == intent
+            if prediction.intent != intent:
+                mistakes.append((message, intent, prediction))
+        message_llm_latency_ms = llm_latency_ms
+        if with_llm:
+            llm_intent, message_llm_latency_ms = await _adetect_intent_with_llm(message)
+            llm_latencies_ms.append(message_llm_latency_ms)
+            llm_correct += llm_intent == intent
+
+        latency_ms, llm_called = _intent_detection_latency_ms(
+            local_latency_ms,
+            message_llm_latency_ms,
+            knn_timeout_ms,
+            prediction is not None,
+            with_knn,
+        )
+        # Compared with detecting the intent of every message with the LLM only
+        saved_latencies_ms.append(message_llm_latency_ms - latency_ms)
+        llm_calls += llm_called
+
+    if llm_latencies_ms:
+        llm_latency_ms = statistics.mean(llm_latencies_ms)
+    local_latency_ms = statistics.mean(local_latencies_ms)
+    saved_ms = statistics.mean(saved_latencies_ms)
+    avoided_llm_calls = len(EVAL_MESSAGES) - llm_calls
+
+    print(f"Messages:                 {len(EVAL_MESSAGES)}")
+    print(f"Classified locally:       {classified / len(EVAL_MESSAGES):.0%} ({classified})")
+    print(f"Local accuracy:           {correct / classified if classified else 0:.0%}")
+    print(f"Local latency (mean):     {local_latency_ms:.1f} ms")
+    print(
+        f"LLM latency (mean):       {llm_latency_ms:.1f} ms"
+        f"{'' if llm_latencies_ms else ' (estimated)'}"
+    )
+    if with_llm:
+        print(f"LLM accuracy:             {llm_correct / len(EVAL_MESSAGES):.0%}")
+    print(f"kNN timeout:              {knn_timeout_ms:.0f} ms")
+    print(f"Latency saved per message: {saved_ms:.1f} ms")
+    print(
+        f"LLM calls avoided:        {avoided_llm_calls / len(EVAL_MESSAGES):.0%} "
+        f"({avoided_llm_calls})"
+    )
+    print(f"Classifier stats:         {classifier.stats}")
+    for message, intent, prediction in mistakes:
+        print(f"  {message!r}: expected {intent.value}, got {prediction}")
+
+    await get_llm_registry().aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--rules-only",
+        action="store_true",
+        help="Only evaluate the keyword rules, which does not call OpenAI",
+    )
+    parser.add_argument(
+        "--llm", action="store_true", help="Measure the accuracy and latency of the LLM"
+    )
+    parser.add_argument(
+        "--llm-latency-ms",
+        type=float,
+        default=800.0,
+        help="The estimated latency of the LLM without --llm",
+    )
+    parser.add_argument(
+        "--knn-timeout-ms",
+        type=float,
+        default=settings.INTENT_CLASSIFIER_KNN_TIMEOUT_SECONDS * 1000,
+        help="How long the intent detection waits for kNN before calling the LLM",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        evaluate(args.rules_only, args.llm, args.llm_latency_ms, args.knn_timeout_ms)
+    )
@@ -1,9 +1,17 @@
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 
+from src.common.constants import IntentDetectionMode
+from src.core.config import settings
+
 from .nodes import (
+    lookup_cached_answer,
+    cache_answer,
+    decide_cached_answer_routing,
     pure_llm_answer,
     detect_intent,
+    detect_intent_speculatively,
+    detect_intent_with_search_properties_filters,
     decide_routing,
     knowledge_retrieval,
     generate_knowledge_answer,
@@ -17,53 +25,85 @@ from .nodes import (
 from .schemas import OverallState, GraphNode
 
 
+DETECT_INTENT_NODES = {
+    IntentDetectionMode.SEQUENTIAL: detect_intent,
+    IntentDetectionMode.SPECULATIVE: detect_intent_speculatively,
+    IntentDetectionMode.COMBINED: detect_intent_with_search_properties_filters,
+}
+
+
 # Graph
-builder = StateGraph(OverallState)
+def build_graph(
+    intent_detection_mode: IntentDetectionMode = IntentDetectionMode.SEQUENTIAL,
+) -> StateGraph:
+    """Build the graph of the agent, the routing is the same in every intent detection mode."""
+    builder = StateGraph(OverallState)
 
-builder.add_node(GraphNode.DETECT_INTENT, detect_intent)
-builder.add_node(GraphNode.PURE_LLM_ANSWER, pure_llm_answer)
-builder.add_node(GraphNode.KNOWLEDGE_RETRIEVAL, knowledge_retrieval)
-builder.add_node(GraphNode.GENERATE_RAG_KNOWLEDGE_ANSWER, generate_knowledge_answer)
-builder.add_node(
-    GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS, build_search_properties_filters
-)
-builder.add_node(
-    GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS,
-    request_user_to_provide_more_filters_parameters,
-)
-builder.add_node(GraphNode.FIND_PROPERTY_LISTINGS, find_property_listings)
-builder.add_node(GraphNode.GENERATE_PROPERTIES_SEARCH_ANSWER, generate_properties_search_answer)
-builder.add_node(GraphNode.REFUSE_UNSUPPORTED_INTENT, refuse_unsupported_intent)
+    builder.add_node(
+        GraphNode.DETECT_INTENT, DETECT_INTENT_NODES[intent_detection_mode]
+    )
+    builder.add_node(GraphNode.LOOKUP_CACHED_ANSWER, lookup_cached_answer)
+    builder.add_node(GraphNode.CACHE_ANSWER, cache_answer)
+    builder.add_node(GraphNode.PURE_LLM_ANSWER, pure_llm_answer)
+    builder.add_node(GraphNode.KNOWLEDGE_RETRIEVAL, knowledge_retrieval)
+    builder.add_node(GraphNode.GENERATE_RAG_KNOWLEDGE_ANSWER, generate_knowledge_answer)
+    builder.add_node(
+        GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS, build_search_properties_filters
+    )
+    builder.add_node(
+        GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS,
+        request_user_to_provide_more_filters_parameters,
+    )
+    builder.add_node(GraphNode.FIND_PROPERTY_LISTINGS, find_property_listings)
+    builder.add_node(GraphNode.GENERATE_PROPERTIES_SEARCH_ANSWER, generate_properties_search_answer)
+    builder.add_node(GraphNode.REFUSE_UNSUPPORTED_INTENT, refuse_unsupported_intent)
 
-# Edges and conditional routing
-builder.set_entry_point(GraphNode.DETECT_INTENT)
-builder.add_conditional_edges(
-    GraphNode.DETECT_INTENT,
-    decide_routing,
-    {
-        GraphNode.PURE_LLM_ANSWER: GraphNode.PURE_LLM_ANSWER,
-        GraphNode.KNOWLEDGE_RETRIEVAL: GraphNode.KNOWLEDGE_RETRIEVAL,
-        GraphNode.REFUSE_UNSUPPORTED_INTENT: GraphNode.REFUSE_UNSUPPORTED_INTENT,
-        GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS: GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS,
-    },
-)
-builder.add_edge(GraphNode.PURE_LLM_ANSWER, END)
+    # Edges and conditional routing
+    builder.set_entry_point(GraphNode.DETECT_INTENT)
+    builder.add_conditional_edges(
+        GraphNode.DETECT_INTENT,
+        decide_routing,
+        {
+            GraphNode.LOOKUP_CACHED_ANSWER: GraphNode.LOOKUP_CACHED_ANSWER,
+            GraphNode.REFUSE_UNSUPPORTED_INTENT: GraphNode.REFUSE_UNSUPPORTED_INTENT,
+            GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS: GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS,
+        },
+    )
 
-# Knowledge retrieval flow
-builder.add_edge(GraphNode.KNOWLEDGE_RETRIEVAL, GraphNode.GENERATE_RAG_KNOWLEDGE_ANSWER)
-builder.add_edge(GraphNode.GENERATE_RAG_KNOWLEDGE_ANSWER, END)
+    # Small talk and knowledge questions are answered from the semantic answer cache if possible
+    builder.add_conditional_edges(
+        GraphNode.LOOKUP_CACHED_ANSWER,
+        decide_cached_answer_routing,
+        {
+            GraphNode.PURE_LLM_ANSWER: GraphNode.PURE_LLM_ANSWER,
+            GraphNode.KNOWLEDGE_RETRIEVAL: GraphNode.KNOWLEDGE_RETRIEVAL,
+            END: END,
+        },
+    )
+    builder.add_edge(GraphNode.PURE_LLM_ANSWER, GraphNode.CACHE_ANSWER)
+    builder.add_edge(GraphNode.CACHE_ANSWER, END)
 
-# Property searching flow
-builder.add_conditional_edges(
-    GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS,
-    should_continue_properties_search,
-    {
-        GraphNode.FIND_PROPERTY_LISTINGS: GraphNode.FIND_PROPERTY_LISTINGS,
-        GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS: GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS,
-    },
-)
-builder.add_edge(GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS, END)
-builder.add_edge(GraphNode.FIND_PROPERTY_LISTINGS, GraphNode.GENERATE_PROPERTIES_SEARCH_ANSWER)
-builder.add_edge(GraphNode.GENERATE_PROPERTIES_SEARCH_ANSWER, END)
+    # Knowledge retrieval flow
+    builder.add_edge(GraphNode.KNOWLEDGE_RETRIEVAL, GraphNode.GENERATE_RAG_KNOWLEDGE_ANSWER)
+    builder.add_edge(GraphNode.GENERATE_RAG_KNOWLEDGE_ANSWER, GraphNode.CACHE_ANSWER)
+
+    # Property searching flow
+    builder.add_conditional_edges(
+        GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS,
+        should_continue_properties_search,
+        {
+            GraphNode.FIND_PROPERTY_LISTINGS: GraphNode.FIND_PROPERTY_LISTINGS,
+            GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS: GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS,
+        },
+    )
+    builder.add_edge(GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS, END)
+    builder.add_edge(GraphNode.FIND_PROPERTY_LISTINGS, GraphNode.GENERATE_PROPERTIES_SEARCH_ANSWER)
+    builder.add_edge(GraphNode.GENERATE_PROPERTIES_SEARCH_ANSWER, END)
+    builder.add_edge(GraphNode.REFUSE_UNSUPPORTED_INTENT, END)
 
-default_agent = builder.compile(checkpointer=MemorySaver())
+    return builder
+
+
+default_agent = build_graph(settings.INTENT_DETECTION_MODE).compile(
+    checkpointer=MemorySaver()
+)
@@ -0,0 +1,145 @@
+from functools import lru_cache
+from typing import Awaitable, Callable, Sequence
+
+import tiktoken
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from src.core.config import settings
+from src.core.logging import Logger
+
+from .utils import convert_message_content_to_string
+
+logger = Logger(__name__).logger
+
+# Tokens OpenAI adds around the content of every message of a chat completion request
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache
+def get_tokenizer() -> Callable[[str], int]:
+    """Get the token counter of the chat model, the encoding is loaded once per process.
+
+    tiktoken downloads the encoding on first use, if it cannot be loaded the tokens are
+    estimated at 4 characters each.
+    """
+    try:
+        encoding = tiktoken.encoding_for_model("gpt-4o-mini")
+    except Exception as e:
+        logger.warning(f"Failed to load the tokenizer, estimating tokens instead: {e}")
+        return lambda text: len(text) // 4 + 1
+
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class ChatHistoryWindow:
+    """Bounds the chat history sent to the LLMs to a token budget.
+
+    The most recent messages that fit max_tokens are sent as they are. Older messages are
+    folded into a rolling summary kept in the state, history_summary along with the ID of the
+    last summarized message, which is sent as a system message before them.
+
+    The summary is updated incrementally after a run, once the messages after the last
+    summarized one exceed max_tokens. The oldest of them are summarized along with the previous
+    summary until the rest fits summary_target_tokens, so the summary is not updated on every
+    turn. The window stays within the budget if the summary lags behind, the oldest messages
+    are dropped from it then.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        summary_target_tokens: int | None = None,
+        count_tokens: Callable[[str], int] | None = None,
+    ):
+        self.max_tokens = max_tokens
+        self.summary_target_tokens = summary_target_tokens or max_tokens // 2
+        self.count_tokens = count_tokens or get_tokenizer()
+
+    def count_message_tokens(self, message: BaseMessage) -> int:
+        return (
+            self.count_tokens(convert_message_content_to_string(message.content))
+            + MESSAGE_OVERHEAD_TOKENS
+        )
+
+    def build(self, state: dict) -> list[BaseMessage]:
+        """Builds the chat history of a prompt, ending with the latest message.
+
+        Args:
+            state (dict): The state with the messages and the rolling summary.
+
+        Returns:
+            list[BaseMessage]: The summary as a system message, if any, followed by the most
+                recent messages that fit the budget. The latest message is always included.
+        """
+        messages = self._unsummarized_messages(state)
+        tokens = 0
+        start = len(messages)
+        while start > 0:
+            tokens += self.count_message_tokens(messages[start - 1])
+            if tokens > self.max_tokens and start < len(messages):
+                break
+            start -= 1
+
+        history = list(messages[start:])
+        if state.get("history_summary"):
+            history.insert(
+                0,
+                SystemMessage(
+                    content=f"Summary of the earlier conversation: {state['history_summary']}"
+                ),
+            )
+        return history
+
+    async def aupdate_summary(
+        self,
+        state: dict,
+        summarize: Callable[[str | None, list[BaseMessage]], Awaitable[str]],
+    ) -> dict:
+        """Folds the oldest messages into the summary once the unsummarized messages exceed the
+        budget.
+
+        Args:
+            state (dict): The state with the messages and the rolling summary.
+            summarize (Callable): Returns the summary of the previous summary and the messages.
+
+        Returns:
+            dict: The state update of the summary, empty if it did not need to be updated.
+        """
+        messages = self._unsummarized_messages(state)
+        message_tokens = [self.count_message_tokens(message) for message in messages]
+        if sum(message_tokens) <= self.max_tokens:
+            return {}
+
+        # Fold messages until the rest fits the target, the latest message is never folded
+        remaining_tokens = sum(message_tokens)
+        end = 0
+        while end < len(messages) - 1 and remaining_tokens > self.summary_target_tokens:
+            remaining_tokens -= message_tokens[end]
+            end += 1
+        if end == 0:
+            return {}
+
+        summary = await summarize(state.get("history_summary"), list(messages[:end]))
+        return {
+            "history_summary": summary,
+            "summarized_message_id": messages[end - 1].id,
+        }
+
+    def _unsummarized_messages(self, state: dict) -> Sequence[BaseMessage]:
+        messages = state["messages"]
+        summarized_message_id = state.get("summarized_message_id")
+        if summarized_message_id is None:
+            return messages
+
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index].id == summarized_message_id:
+                return messages[index + 1 :]
+
+        # The summarized message was removed from the thread, none is known to be summarized
+        return messages
+
+
+@lru_cache
+def get_chat_history_window() -> ChatHistoryWindow:
+    """Get the chat history window of the process."""
+    return ChatHistoryWindow(max_tokens=settings.CHAT_HISTORY_MAX_TOKENS)
@@ -0,0 +1,185 @@
+import asyncio
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.core.config import settings
+
+from .intent_examples import INTENT_EXAMPLES
+from .llm import get_llm_registry
+from .schemas import QuestionIntent
+from .utils import normalize_embedding
+
+_WORD_PATTERN = re.compile(r"[a-zåäö0-9']+")
+
+GREETING_WORDS = frozenset(
+    {
+        "hi", "hello", "hey", "moi", "moikka", "hei", "terve", "good", "morning",
+        "afternoon", "evening", "thanks", "thank", "you", "so", "much", "a", "lot",
+        "bye", "goodbye", "see", "later", "kiitos", "there", "nice", "day",
+    }
+)  # fmt: skip
+PROPERTY_WORDS = frozenset(
+    {
+        "apartment", "apartments", "flat", "flats", "house", "houses", "home", "homes",
+        "studio", "studios", "townhouse", "townhouses", "property", "properties",
+        "condo", "condos", "asunto", "asunnot", "asuntoja", "yksiö", "kaksio", "kolmio",
+        "omakotitalo", "rivitalo",
+    }
+)  # fmt: skip
+SEARCH_WORDS = frozenset(
+    {"find", "search", "show", "list", "looking", "etsi", "etsin", "sale", "myytävä"}
+)
+# Words of questions about buying a property, the message is left to the LLM
+KNOWLEDGE_WORDS = frozenset(
+    {
+        "how", "why", "what", "when", "should", "tax", "taxes", "varainsiirtovero",
+        "loan", "mortgage", "fee", "fees", "insurance", "contract", "deposit",
+        "inspection", "process", "documents", "cost", "costs", "law", "legal",
+    }
+)  # fmt: skip
+_ROOMS_PATTERN = re.compile(r"\b\d+\s*-?\s*(room|rooms|bedroom|bedrooms|br|h)\b")
+
+
+@dataclass
+class IntentPrediction:
+    intent: QuestionIntent
+    confidence: float
+    source: str
+
+
+class LocalIntentClassifier:
+    """Classifies the intent of clear-cut messages without a LLM round trip.
+
+    Messages are classified in two stages, each returns no prediction when it is not confident
+    and the LLM of `detect_intent` classifies the message instead:
+        - Keyword rules recognize messages made only of greeting words and property searches
+          (a property word along with a search word or a number of rooms) that do not ask
+          about the buying process.
+        - A k-nearest neighbours vote over the embeddings of labelled examples, the nearest
+          example must be at least min_similarity similar and at least min_agreement of the
+          k nearest examples must have the same intent.
+
+    The labelled examples are embedded once, on the first kNN classification.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings | None = None,
+        examples: list[tuple[str, QuestionIntent]] = INTENT_EXAMPLES,
+        *,
+        k: int = 5,
+        min_similarity: float = 0.85,
+        min_agreement: float = 0.8,
+    ):
+        self.embeddings = embeddings
+        self.examples = examples
+        self.k = k
+        self.min_similarity = min_similarity
+        self.min_agreement = min_agreement
+        self.predictions: Counter = Counter()
+        self.cancelled_llm_calls = 0
+        self._example_embeddings: np.ndarray | None = None
+        self._embed_lock = asyncio.Lock()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "rules": self.predictions["rules"],
+            "knn": self.predictions["knn"],
+            "llm": self.predictions["llm"],
+            "llm_cancelled": self.cancelled_llm_calls,
+        }
+
+    def classify_with_rules(self, message: str) -> IntentPrediction | None:
+        """Classifies a message with the keyword rules.
+
+        Args:
+            message (str): The message to classify.
+
+        Returns:
+            IntentPrediction | None: The intent of the message, or None if no rule matched.
+        """
+        words = _WORD_PATTERN.findall(message.lower())
+        if not words:
+            return None
+
+        if len(words) <= 6 and all(word in GREETING_WORDS for word in words):
+            return self._predict(QuestionIntent.GREETING, 1.0, "rules")
+
+        word_set = set(words)
+        if (
+            word_set & PROPERTY_WORDS
+            and (word_set & SEARCH_WORDS or _ROOMS_PATTERN.search(message.lower()))
+            and not word_set & KNOWLEDGE_WORDS
+        ):
+            return self._predict(QuestionIntent.FINDING_PROPERTY, 1.0, "rules")
+
+        return None
+
+    async def aclassify_with_knn(
+        self, message_embedding: list[float]
+    ) -> IntentPrediction | None:
+        """Classifies a message by a vote of the labelled examples nearest to it.
+
+        Args:
+            message_embedding (list[float]): The embedding of the message, embedded with the
+                embeddings of the classifier.
+
+        Returns:
+            IntentPrediction | None: The intent of the message, or None if the vote was not
+                confident.
+        """
+        example_embeddings = await self.aembed_examples()
+        similarities = example_embeddings @ normalize_embedding(message_embedding)
+        nearest = np.argsort(-similarities)[: self.k]
+        if similarities[nearest[0]] < self.min_similarity:
+            return None
+
+        votes = Counter(self.examples[index][1] for index in nearest)
+        intent, count = votes.most_common(1)[0]
+        agreement = count / len(nearest)
+        if agreement < self.min_agreement:
+            return None
+
+        return self._predict(intent, agreement, "knn")
+
+    def record_llm_prediction(self) -> None:
+        self.predictions["llm"] += 1
+
+    def record_cancelled_llm_call(self) -> None:
+        """Records a LLM call started before a confident kNN prediction, it was paid for."""
+        self.cancelled_llm_calls += 1
+
+    def _predict(
+        self, intent: QuestionIntent, confidence: float, source: str
+    ) -> IntentPrediction:
+        self.predictions[source] += 1
+        return IntentPrediction(intent=intent, confidence=confidence, source=source)
+
+    async def aembed_examples(self) -> np.ndarray:
+        """Embeds the labelled examples, once."""
+        async with self._embed_lock:
+            if self._example_embeddings is None:
+                vectors = await self.embeddings.aembed_documents(
+                    [text for text, _ in self.examples]
+                )
+                self._example_embeddings = np.stack(
+                    [normalize_embedding(vector) for vector in vectors]
+                )
+
+        return self._example_embeddings
+
+
+@lru_cache
+def get_intent_classifier() -> LocalIntentClassifier:
+    """Get the local intent classifier of the process."""
+    return LocalIntentClassifier(
+        get_llm_registry().embeddings,
+        min_similarity=settings.INTENT_CLASSIFIER_MIN_SIMILARITY,
+        min_agreement=settings.INTENT_CLASSIFIER_MIN_AGREEMENT,
+    )
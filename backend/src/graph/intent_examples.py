@@ -0,0 +1,52 @@
+from .schemas import QuestionIntent
+
+# Labelled messages the local intent classifier compares messages with, see
+# `LocalIntentClassifier`. Keep them apart from the messages of the evaluation script.
+INTENT_EXAMPLES: list[tuple[str, QuestionIntent]] = [
+    # Greetings
+    ("Hello!", QuestionIntent.GREETING),
+    ("Hi there, how are you?", QuestionIntent.GREETING),
+    ("Good morning", QuestionIntent.GREETING),
+    ("Hey, nice to meet you", QuestionIntent.GREETING),
+    ("Thanks a lot, that was helpful!", QuestionIntent.GREETING),
+    ("Thank you, goodbye", QuestionIntent.GREETING),
+    ("See you later", QuestionIntent.GREETING),
+    ("Moi! Mitä kuuluu?", QuestionIntent.GREETING),
+    ("Hei, kiitos avusta", QuestionIntent.GREETING),
+    ("Have a nice day", QuestionIntent.GREETING),
+    # House buying knowledge
+    ("What is the debt-free price of an apartment?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("How does the transfer tax work when buying a flat?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("How much is varainsiirtovero for a first home?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What is a maintenance charge?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("Can a foreigner buy property in Finland?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("How big a down payment do I need for a mortgage?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What is ASP saving and how does it help first-time buyers?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What documents should I check before buying an apartment?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What does a housing company share mean?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("Who pays for a pipe renovation in a housing company?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("Do I need a condition inspection before buying a house?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("What is the difference between a leasehold and an owned plot?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("How long does the buying process of an apartment take?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    ("Is home insurance mandatory when I own a flat?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+    # Finding a property
+    ("Find me a 2-room flat in Espoo", QuestionIntent.FINDING_PROPERTY),
+    ("Show me apartments for sale in Kallio under 300 000 euros", QuestionIntent.FINDING_PROPERTY),
+    ("I am looking for a house with a sauna in Tampere", QuestionIntent.FINDING_PROPERTY),
+    ("Any three-bedroom homes in Vantaa with a balcony?", QuestionIntent.FINDING_PROPERTY),
+    ("Search for studios near the metro in Helsinki", QuestionIntent.FINDING_PROPERTY),
+    ("I want to buy a townhouse in Turku built after 2000", QuestionIntent.FINDING_PROPERTY),
+    ("List kaksio apartments in Oulu with an elevator", QuestionIntent.FINDING_PROPERTY),
+    ("Are there detached houses for sale in Jyväskylä?", QuestionIntent.FINDING_PROPERTY),
+    ("Etsi kolmio Helsingistä", QuestionIntent.FINDING_PROPERTY),
+    ("Cheap one-bedroom apartments in Lahti please", QuestionIntent.FINDING_PROPERTY),
+    # Unsupported
+    ("What is the weather like in Helsinki tomorrow?", QuestionIntent.UNSUPPORTED),
+    ("Write me a poem about the sea", QuestionIntent.UNSUPPORTED),
+    ("Who won the ice hockey world championship?", QuestionIntent.UNSUPPORTED),
+    ("Can you help me with my Python code?", QuestionIntent.UNSUPPORTED),
+    ("Recommend a good restaurant in Turku", QuestionIntent.UNSUPPORTED),
+    ("How do I rent a car in Finland?", QuestionIntent.UNSUPPORTED),
+    ("Translate this sentence to Swedish", QuestionIntent.UNSUPPORTED),
+    ("What is the capital of Australia?", QuestionIntent.UNSUPPORTED),
+]
@@ -0,0 +1,139 @@
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable
+
+from src.core.config import settings
+from src.properties.schemas import Property
+
+from .history import get_tokenizer
+
+# The columns of the listings table, the label of a column and the field of the property
+LISTING_COLUMNS: tuple[tuple[str, str], ...] = (
+    ("Address", "location"),
+    ("District", "district"),
+    ("Building", "building_type"),
+    ("Housing", "housing_type"),
+    ("Layout", "apartment_layout"),
+    ("m²", "living_area"),
+    ("Built", "build_year"),
+    ("Debt-free €", "debt_free_price"),
+    ("Plot", "plot_ownership"),
+    ("Maintenance €/mo", "maintenance_charge"),
+    ("Water €/mo", "water_charge"),
+    ("Housing charge €/mo", "total_housing_charge"),
+    ("Sauna", "building_has_sauna"),
+    ("Elevator", "building_has_elevator"),
+    ("URL", "url"),
+)
+RENOVATION_FIELDS: tuple[tuple[str, str], ...] = (
+    ("done", "completed_renovations"),
+    ("planned", "future_renovations"),
+)
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, Enum):
+        return str(value.value).replace("_", " ")
+    if isinstance(value, Decimal):
+        # 289000.00 is rendered as 289000 and 54.50 as 54.5
+        return format(value.normalize(), "f")
+    return " ".join(str(value).split()).replace("|", "/")
+
+
+class ListingRenderer:
+    """Renders property listings for the prompt of the properties search answer.
+
+    The listings are rendered as a Markdown table with a row per listing. Fields are formatted
+    compactly, e.g. prices without decimals, and columns that are empty for every listing are
+    omitted. The renovations are free text, they are listed below the table and each is
+    truncated to renovations_max_tokens tokens.
+
+    The columns and their formatters are compiled once, see `get_listing_renderer`.
+    """
+
+    def __init__(
+        self,
+        renovations_max_tokens: int = 48,
+        count_tokens: Callable[[str], int] | None = None,
+    ):
+        self.renovations_max_tokens = renovations_max_tokens
+        self.count_tokens = count_tokens or get_tokenizer()
+        self._columns = [(label, attrgetter(field)) for label, field in LISTING_COLUMNS]
+        self._renovation_fields = [
+            (label, attrgetter(field)) for label, field in RENOVATION_FIELDS
+        ]
+
+    def render(self, properties: list[Property]) -> str:
+        """Renders the listings, numbered from 1 in the given order.
+
+        Args:
+            properties (list[Property]): The listings to render.
+
+        Returns:
+            str: The table of the listings followed by their renovations, or an empty string
+                without listings.
+        """
+        if not properties:
+            return ""
+
+        rows = [
+            [_format_value(get_value(property)) for _, get_value in self._columns]
+            for property in properties
+        ]
+        kept_columns = [
+            index
+            for index in range(len(self._columns))
+            if any(row[index] for row in rows)
+        ]
+
+        lines = [
+            "| # | " + " | ".join(self._columns[index][0] for index in kept_columns) + " |",
+            "|---" * (len(kept_columns) + 1) + "|",
+        ]
+        for number, row in enumerate(rows, start=1):
+            lines.append(
+                f"| {number} | " + " | ".join(row[index] for index in kept_columns) + " |"
+            )
+
+        renovations = []
+        for number, property in enumerate(properties, start=1):
+            texts = [
+                f"{label}: {self.truncate(_format_value(value))}"
+                for label, get_value in self._renovation_fields
+                if (value := get_value(property))
+            ]
+            if texts:
+                renovations.append(f"{number}. " + "; ".join(texts))
+        if renovations:
+            lines += ["", "Renovations:", *renovations]
+
+        return "\n".join(lines)
+
+    def truncate(self, text: str) -> str:
+        """Truncates a text to the renovations token budget at a word boundary."""
+        if self.count_tokens(text) <= self.renovations_max_tokens:
+            return text
+
+        # The longest prefix of words within the budget, along with the ellipsis
+        words = text.split()
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(" ".join(words[:middle]) + "…") <= self.renovations_max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+
+        return " ".join(words[:low]) + "…"
+
+
+@lru_cache
+def get_listing_renderer() -> ListingRenderer:
+    """Get the listing renderer of the process."""
+    return ListingRenderer(renovations_max_tokens=settings.LISTING_RENOVATIONS_MAX_TOKENS)
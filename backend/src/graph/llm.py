@@ -0,0 +1,231 @@
+from functools import lru_cache
+from typing import Any
+from uuid import uuid4
+
+import httpx
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.messages import AIMessage, message_chunk_to_message
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from src.common.prompts import (
+    build_search_properties_filters_prompt,
+    generate_properties_search_answer_prompt,
+    knowledge_rag_answer_prompt,
+    message_intent_and_search_properties_filters_prompt,
+    message_intent_detection_prompt,
+    summarize_chat_history_prompt,
+)
+from src.core.config import settings
+from src.core.singleflight import SingleFlight, get_singleflight, make_key
+
+from .embedding_cache import QueryEmbeddingCache
+from .schemas import (
+    IntentAndSearchPropertiesFiltersResponse,
+    IntentDetectionResponse,
+    LLMChain,
+    SearchPropertiesFiltersResponse,
+)
+
+# Name of the custom events the answer chunks of a coalesced chain are streamed with to the
+# followers, see `LLMRegistry.astream_chain`
+COALESCED_ANSWER_CHUNK_EVENT = "coalesced_answer_chunk"
+
+
+class LLMRegistry:
+    """Builds the chat models, chains and embeddings of the graph nodes once per process.
+
+    The models share one async HTTP client, so requests to OpenAI reuse pooled keep-alive
+    connections and their TLS sessions instead of opening a new connection per node run. The
+    structured output schemas of the chains are built once as well.
+
+    Connections opened by the pool are counted with the httpcore trace extension, the requests
+    that did not open one reused a pooled connection.
+
+    Query embeddings are cached by their text, see `aembed_query`. Concurrent identical chain
+    invocations and embeddings, e.g. of a question submitted twice, share one call to OpenAI,
+    see `SingleFlight`.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        *,
+        base_url: str | None = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry_seconds: float = 60.0,
+        query_embedding_cache: QueryEmbeddingCache | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.http_async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry_seconds,
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            event_hooks={"request": [self._on_request]},
+        )
+        self._api_key = api_key or settings.OPENAI_API_KEY
+        self._base_url = base_url
+        self._chains = self._build_chains()
+        # The embedding model of the document collection, see `ChromaDB`
+        self.embeddings = OpenAIEmbeddings(
+            api_key=self._api_key,
+            base_url=self._base_url,
+            model="text-embedding-3-small",
+            http_async_client=self.http_async_client,
+        )
+        self.query_embedding_cache = query_embedding_cache or QueryEmbeddingCache()
+        self.single_flight = single_flight or SingleFlight()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.requests - self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+        }
+
+    def get_chain(self, name: LLMChain) -> Runnable:
+        return self._chains[name]
+
+    async def ainvoke_chain(self, name: LLMChain, inputs: Any) -> Any:
+        """Invokes a chain, concurrent invocations with the same inputs share one call.
+
+        Args:
+            name (LLMChain): The chain, which fixes the prompt and the model parameters.
+            inputs (Any): The inputs of the chain.
+
+        Returns:
+            Any: The output of the chain.
+        """
+        chain = self._chains[name]
+        return await self.single_flight.ado(
+            make_key(f"chain:{name.value}", inputs), lambda: chain.ainvoke(inputs)
+        )
+
+    async def astream_chain(
+        self, name: LLMChain, inputs: Any, config: RunnableConfig
+    ) -> AIMessage:
+        """Streams the answer of a chat model chain, concurrent streams with the same inputs
+        share one call.
+
+        The leader's chunks are streamed as chat model stream events of its run. The followers
+        get the chunks from the start, which are dispatched as COALESCED_ANSWER_CHUNK_EVENT
+        custom events with a message id of their own.
+
+        Args:
+            name (LLMChain): The chain, which fixes the prompt and the model parameters.
+            inputs (Any): The inputs of the chain.
+            config (RunnableConfig): The config of the node streaming the answer.
+
+        Returns:
+            AIMessage: The answer.
+        """
+        chain = self._chains[name]
+        stream = self.single_flight.stream(
+            make_key(f"chain:{name.value}", inputs),
+            lambda: chain.astream(inputs, config),
+        )
+
+        message_id = None if stream.is_leader else f"run-{uuid4()}"
+        response = None
+        async for chunk in stream:
+            if message_id is not None:
+                chunk = chunk.model_copy(update={"id": message_id})
+                await adispatch_custom_event(
+                    COALESCED_ANSWER_CHUNK_EVENT, chunk, config=config
+                )
+            response = chunk if response is None else response + chunk
+
+        return message_chunk_to_message(response)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embeds a query text with the embedding model of the document collection.
+
+        Args:
+            text (str): The query text.
+
+        Returns:
+            list[float]: The embedding, from the query embedding cache if the text was embedded
+                recently.
+        """
+        embedding = self.query_embedding_cache.get(text)
+        if embedding is None:
+            # Concurrent misses of the same text share one call
+            embedding = await self.single_flight.ado(
+                make_key("embedding", text), lambda: self.embeddings.aembed_query(text)
+            )
+            self.query_embedding_cache.put(text, embedding)
+
+        return embedding
+
+    async def aclose(self) -> None:
+        await self.http_async_client.aclose()
+
+    def _make_llm(self, **kwargs) -> ChatOpenAI:
+        return ChatOpenAI(
+            api_key=self._api_key,
+            base_url=self._base_url,
+            model="gpt-4o-mini",
+            streaming=True,
+            # The token usage of streamed responses, see `on_llm_end` of callback handlers
+            stream_usage=True,
+            http_async_client=self.http_async_client,
+            **kwargs,
+        )
+
+    def _build_chains(self) -> dict[LLMChain, Runnable]:
+        return {
+            LLMChain.PURE_LLM_ANSWER: self._make_llm(temperature=0.7),
+            LLMChain.INTENT_DETECTION: message_intent_detection_prompt
+            | self._make_llm(temperature=0.5).with_structured_output(
+                IntentDetectionResponse
+            ),
+            LLMChain.INTENT_DETECTION_WITH_SEARCH_PROPERTIES_FILTERS: message_intent_and_search_properties_filters_prompt
+            | self._make_llm(temperature=0.5, max_tokens=2048).with_structured_output(
+                IntentAndSearchPropertiesFiltersResponse
+            ),
+            LLMChain.GENERATE_KNOWLEDGE_ANSWER: knowledge_rag_answer_prompt
+            | self._make_llm(temperature=0.4, max_tokens=2048),
+            LLMChain.BUILD_SEARCH_PROPERTIES_FILTERS: build_search_properties_filters_prompt
+            | self._make_llm(temperature=0.5, max_tokens=2048).with_structured_output(
+                SearchPropertiesFiltersResponse
+            ),
+            LLMChain.GENERATE_PROPERTIES_SEARCH_ANSWER: generate_properties_search_answer_prompt
+            | self._make_llm(temperature=0.4),
+            # Not streamed, the tokens of the summary are not part of the answer
+            LLMChain.SUMMARIZE_HISTORY: summarize_chat_history_prompt
+            | self._make_llm(temperature=0.2, max_tokens=512, disable_streaming=True),
+        }
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+
+@lru_cache
+def get_llm_registry() -> LLMRegistry:
+    """Get the LLM registry of the process."""
+    return LLMRegistry(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry_seconds=settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        query_embedding_cache=QueryEmbeddingCache(
+            max_entries=settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+        ),
+        single_flight=get_singleflight(),
+    )
@@ -0,0 +1,278 @@
+import asyncio
+import functools
+import inspect
+import os
+import time
+from typing import Any, Callable
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import REGISTRY, CollectorRegistry, Gauge, Histogram, multiprocess
+
+NAMESPACE = "house_hunt"
+UNKNOWN_INTENT = "unknown"
+
+# Node runs and LLM calls take from milliseconds to tens of seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+NODE_DURATION = Histogram(
+    "graph_node_duration_seconds",
+    "Wall time of a graph node run",
+    ["node", "intent"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+LLM_DURATION = Histogram(
+    "llm_call_duration_seconds",
+    "Wall time of a LLM call",
+    ["node", "intent", "model"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from the start of a streamed LLM call to its first token",
+    ["node", "intent", "model"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "llm_tokens",
+    "Tokens of a LLM call, direction is input or output",
+    ["node", "intent", "model", "direction"],
+    namespace=NAMESPACE,
+    buckets=TOKEN_BUCKETS,
+)
+RETRIEVAL_DURATION = Histogram(
+    "retrieval_duration_seconds",
+    "Latency of a knowledge retrieval or a property listings search",
+    ["node", "intent", "source"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+CHECKPOINT_IO_DURATION = Histogram(
+    "checkpoint_io_duration_seconds",
+    "Latency of a checkpoint saver operation",
+    ["saver", "operation"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+ANSWER_TIME_TO_FIRST_TOKEN = Histogram(
+    "answer_time_to_first_token_seconds",
+    "Time from the start of a streamed run to the first token or message of the answer",
+    ["intent", "mode"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+COMPONENT_STAT = Gauge(
+    "component_stat",
+    "Stats of a component of the process",
+    ["component", "stat"],
+    namespace=NAMESPACE,
+    # The stats of a worker, e.g. the entries of its caches, are labelled by its pid
+    multiprocess_mode="liveall",
+)
+
+
+def make_metrics_registry() -> CollectorRegistry:
+    """Returns the registry to serve on /metrics.
+
+    Gunicorn runs several worker processes, with PROMETHEUS_MULTIPROC_DIR set every worker
+    writes its metrics to files of that directory and the registry aggregates the metrics of
+    every worker, whichever one is scraped. Without it, the metrics of the process are served.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def intent_label(intent: Any) -> str:
+    """The label of an intent, the intent is not known before it is detected."""
+    return getattr(intent, "value", intent) or UNKNOWN_INTENT
+
+
+class GraphMetricsCallbackHandler(AsyncCallbackHandler):
+    """Records the wall time of the graph nodes, and the time to first token, the latency and
+    the tokens of the LLM calls of a run.
+
+    The observations are labelled with the node they ran in and the intent of the message.
+    Nodes that run before the intent is detected are labelled with the intent of the node
+    output that detected it, or unknown. A handler is created per run, see `parse_input`.
+    """
+
+    def __init__(self):
+        self.intent = UNKNOWN_INTENT
+        self._node_runs: dict[UUID, tuple[str, float]] = {}
+        self._llm_runs: dict[UUID, tuple[str, str, float]] = {}
+        self._first_token_runs: set[UUID] = set()
+
+    async def on_chain_start(
+        self,
+        serialized: dict[str, Any],
+        inputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        # The run of a node itself, not of the runnables it calls nor of the graph's input
+        if node and kwargs.get("name") == node and not node.startswith("__"):
+            self._node_runs[run_id] = (node, time.perf_counter())
+
+    async def on_chain_end(
+        self, outputs: Any, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        node_run = self._node_runs.pop(run_id, None)
+        if node_run is None:
+            return
+
+        if isinstance(outputs, dict) and outputs.get("intent"):
+            self.intent = intent_label(outputs["intent"])
+        node, started_at = node_run
+        NODE_DURATION.labels(node, self.intent).observe(time.perf_counter() - started_at)
+
+    async def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        node_run = self._node_runs.pop(run_id, None)
+        if node_run is not None:
+            node, started_at = node_run
+            NODE_DURATION.labels(node, self.intent).observe(
+                time.perf_counter() - started_at
+            )
+
+    async def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list,
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        metadata = metadata or {}
+        self._llm_runs[run_id] = (
+            metadata.get("langgraph_node", ""),
+            metadata.get("ls_model_name", ""),
+            time.perf_counter(),
+        )
+
+    async def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        llm_run = self._llm_runs.get(run_id)
+        if llm_run is None or run_id in self._first_token_runs:
+            return
+
+        # Tool call chunks of structured outputs have no text, they are tokens still
+        self._first_token_runs.add(run_id)
+        node, model, started_at = llm_run
+        LLM_TIME_TO_FIRST_TOKEN.labels(node, self.intent, model).observe(
+            time.perf_counter() - started_at
+        )
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        llm_run = self._llm_runs.pop(run_id, None)
+        self._first_token_runs.discard(run_id)
+        if llm_run is None:
+            return
+
+        node, model, started_at = llm_run
+        LLM_DURATION.labels(node, self.intent, model).observe(
+            time.perf_counter() - started_at
+        )
+        for generations in response.generations:
+            for generation in generations:
+                usage_metadata = getattr(generation.message, "usage_metadata", None)
+                if not usage_metadata:
+                    continue
+                LLM_TOKENS.labels(node, self.intent, model, "input").observe(
+                    usage_metadata["input_tokens"]
+                )
+                LLM_TOKENS.labels(node, self.intent, model, "output").observe(
+                    usage_metadata["output_tokens"]
+                )
+
+    async def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._llm_runs.pop(run_id, None)
+        self._first_token_runs.discard(run_id)
+
+
+def observe_checkpoint_io(operation: str) -> Callable:
+    """Decorates a checkpoint saver method to record its latency, the whole iteration of a
+    listing."""
+
+    def decorator(method: Callable) -> Callable:
+        if inspect.isasyncgenfunction(method):
+
+            @functools.wraps(method)
+            async def iterate(self, *args, **kwargs):
+                with CHECKPOINT_IO_DURATION.labels(type(self).__name__, operation).time():
+                    async for item in method(self, *args, **kwargs):
+                        yield item
+
+            return iterate
+
+        @functools.wraps(method)
+        async def call(self, *args, **kwargs):
+            with CHECKPOINT_IO_DURATION.labels(type(self).__name__, operation).time():
+                return await method(self, *args, **kwargs)
+
+        return call
+
+    return decorator
+
+
+class ComponentStats:
+    """Exports the stats of the process-wide components (caches, classifiers, pools) as gauges.
+
+    A component is registered with a function returning its stats, nested stats are flattened
+    into dotted names, e.g. branches.knowledge_retrieval.kept. The worker answering a scrape
+    can not read the stats of the other workers, so every worker refreshes its gauges
+    periodically, see `arun_periodic_refresh`.
+    """
+
+    def __init__(self, gauge: Gauge = COMPONENT_STAT):
+        self.gauge = gauge
+        self._providers: dict[str, Callable[[], dict]] = {}
+        self._exported_stats: dict[str, set[str]] = {}
+
+    def register(self, component: str, stats: Callable[[], dict]) -> None:
+        self._providers[component] = stats
+
+    def unregister(self, component: str) -> None:
+        self._providers.pop(component, None)
+        for stat in self._exported_stats.pop(component, ()):
+            self.gauge.remove(component, stat)
+
+    def refresh(self) -> None:
+        """Sets the gauges to the current stats of the registered components."""
+        for component, stats in list(self._providers.items()):
+            for stat, value in _flatten(stats()):
+                self.gauge.labels(component, stat).set(value)
+                self._exported_stats.setdefault(component, set()).add(stat)
+
+    async def arun_periodic_refresh(self, interval_seconds: float) -> None:
+        """Refreshes the gauges every interval, until cancelled."""
+        while True:
+            self.refresh()
+            await asyncio.sleep(interval_seconds)
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    for key, value in stats.items():
+        name = f"{prefix}{getattr(key, 'value', key)}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}.")
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+component_stats = ComponentStats()
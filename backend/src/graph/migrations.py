@@ -0,0 +1,176 @@
+"""Data migrations for the Checkpoints table.
+
+Run with `python -m src.graph.migrations <command>` against the environment configured in settings.
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+from functools import reduce
+
+from aiodynamo.expressions import F
+
+from src.common.constants import Database
+from src.core.config import settings
+from src.core.logging import Logger
+
+from .checkpoint import (
+    DYNAMODB_KEY_SEPARATOR,
+    AsyncDynamoDBSaver,
+    _make_channel_blob_key,
+    _make_metadata_attributes,
+    _parse_checkpoint_key,
+)
+
+logger = Logger(__name__).logger
+
+
+async def verify_latest_checkpoint_lookup(saver: AsyncDynamoDBSaver) -> dict[str, int]:
+    """Verifies that existing checkpoints can be resolved by the descending Limit=1 lookup.
+
+    Before, the latest checkpoint of a thread was resolved by reading every checkpoint key of the
+    thread and taking the max checkpoint ID in Python. The SK format ("<checkpoint_ns>#<checkpoint_id>")
+    is unchanged and checkpoint IDs are uuid6, so existing items already sort chronologically and
+    no rewrite is needed. This scans the table once and compares both lookups for every thread and
+    namespace, so the assumption can be checked on real data before deploying.
+
+    Args:
+        saver (AsyncDynamoDBSaver): The saver of the table to verify.
+
+    Returns:
+        dict[str, int]: The number of verified and mismatching thread namespaces.
+    """
+    latest_checkpoint_ids: dict[tuple[str, str], str] = defaultdict(str)
+    async for key in saver.table.scan(
+        projection=F("PK") & F("SK"),
+        filter_expression=F("PK").begins_with(
+            DYNAMODB_KEY_SEPARATOR.join(["checkpoint", ""])
+        ),
+    ):
+        parsed_key = _parse_checkpoint_key(key)
+        thread_ns = (parsed_key["thread_id"], parsed_key["checkpoint_ns"])
+        latest_checkpoint_ids[thread_ns] = max(
+            latest_checkpoint_ids[thread_ns], parsed_key["checkpoint_id"]
+        )
+
+    mismatches = 0
+    for (thread_id, checkpoint_ns), checkpoint_id in latest_checkpoint_ids.items():
+        data = await saver._aget_latest_checkpoint_data(thread_id, checkpoint_ns)
+        if not data or _parse_checkpoint_key(data)["checkpoint_id"] != checkpoint_id:
+            mismatches += 1
+            logger.warning(
+                f"Latest checkpoint mismatch for thread {thread_id} (ns: '{checkpoint_ns}')"
+            )
+
+    return {"verified": len(latest_checkpoint_ids) - mismatches, "mismatches": mismatches}
+
+
+async def backfill_metadata_attributes(saver: AsyncDynamoDBSaver) -> dict[str, int]:
+    """Adds the "metadata_<key>" attributes used by alist filters to existing checkpoints.
+
+    Checkpoints written before the attributes were introduced are not matched by metadata
+    filters until they are backfilled. Updating an already backfilled checkpoint is a no-op.
+
+    Args:
+        saver (AsyncDynamoDBSaver): The saver of the table to backfill.
+
+    Returns:
+        dict[str, int]: The number of updated checkpoints.
+    """
+    updated = 0
+    async for item in saver.table.scan(
+        projection=F("PK") & F("SK") & F("metadata"),
+        filter_expression=F("PK").begins_with(
+            DYNAMODB_KEY_SEPARATOR.join(["checkpoint", ""])
+        ),
+    ):
+        attributes = _make_metadata_attributes(saver.serde.loads(item["metadata"]))
+        if not attributes:
+            continue
+
+        await saver.table.update_item(
+            {"PK": item["PK"], "SK": item["SK"]},
+            reduce(
+                lambda x, y: x & y,
+                [F(name).set(value) for name, value in attributes.items()],
+            ),
+        )
+        updated += 1
+
+    return {"updated": updated}
+
+
+async def backfill_channel_blobs(saver: AsyncDynamoDBSaver) -> dict[str, int]:
+    """Writes the channel blobs of checkpoints that store their channel values inline.
+
+    Checkpoints are now manifests that reference one blob per (thread, channel, version) and
+    only the channels changed by a checkpoint are written. A new checkpoint on a thread created
+    before that references the unchanged channel versions of its inline parent, the saver
+    looks them up and writes the missing blobs itself. Backfilling them ahead saves that
+    lookup on the first new checkpoint of every thread, it is safe to run repeatedly. Inline
+    checkpoints are left as they are and still read as before.
+
+    Args:
+        saver (AsyncDynamoDBSaver): The saver of the table to backfill.
+
+    Returns:
+        dict[str, int]: The number of inline checkpoints and written blobs.
+    """
+    checkpoints = 0
+    written_keys: set[tuple[str, str]] = set()
+    async for item in saver.table.scan(
+        filter_expression=F("PK").begins_with(
+            DYNAMODB_KEY_SEPARATOR.join(["checkpoint", ""])
+        ),
+    ):
+        data = await saver._adecode_checkpoint_data(item)
+        checkpoint = saver.serde.loads_typed((data["type"], data["checkpoint"]))
+        if "channel_values" not in checkpoint:
+            continue
+
+        checkpoints += 1
+        parsed_key = _parse_checkpoint_key(item)
+        blob_items = []
+        for channel, version in checkpoint["channel_versions"].items():
+            key = _make_channel_blob_key(
+                parsed_key["thread_id"], parsed_key["checkpoint_ns"], channel, version
+            )
+            if (key["PK"], key["SK"]) in written_keys:
+                continue
+
+            written_keys.add((key["PK"], key["SK"]))
+            blob_items.append(
+                await saver._adump_channel_blob(
+                    parsed_key["thread_id"],
+                    parsed_key["checkpoint_ns"],
+                    parsed_key["checkpoint_id"],
+                    channel,
+                    version,
+                    checkpoint["channel_values"],
+                )
+            )
+        await saver._abatch_put_items(blob_items)
+
+    return {"checkpoints": checkpoints, "blobs": len(written_keys)}
+
+
+MIGRATIONS = {
+    "verify-latest-checkpoint-lookup": verify_latest_checkpoint_lookup,
+    "backfill-metadata-attributes": backfill_metadata_attributes,
+    "backfill-channel-blobs": backfill_channel_blobs,
+}
+
+
+async def main(command: str) -> None:
+    async with AsyncDynamoDBSaver.from_conn_info(
+        region=settings.AWS_REGION_NAME,
+        table_name=Database.CHECKPOINTS_TABLE_NAME,
+    ) as saver:
+        result = await MIGRATIONS[command](saver)
+        logger.info(f"Migration {command} finished: {result}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=MIGRATIONS.keys())
+    asyncio.run(main(parser.parse_args().command))
@@ -1,89 +1,410 @@
-from langchain_openai import ChatOpenAI
-
+import asyncio
+import re
+from functools import partial
+from typing import Awaitable, Callable, TypeVar
+from uuid import uuid4
 
 from src.core.config import settings
 from src.core.logging import Logger
-from langchain_core.messages import AIMessage
-from src.common.prompts import (
-    message_intent_detection_prompt,
-    knowledge_rag_answer_prompt,
-    build_search_properties_filters_prompt,
-    generate_properties_search_answer_prompt,
-)
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import END
 from src.embedding.service import EmbeddingService
-from src.properties.service import search_properties
+from src.embedding.utils import generate_text_chunk_content_hash
+from src.properties.service import get_property_search_service
 
 
 from ..graph.schemas import (
     OverallState,
     IntentDetectionResponse,
+    IntentAndSearchPropertiesFiltersResponse,
     QuestionIntent,
     GraphNode,
+    LLMChain,
     SearchPropertiesFiltersResponse,
+    SpeculativeResults,
     RetrievedDocument,
 )
-from ..graph.utils import parse_property_details_to_template
+from ..graph.answer_cache import CACHED_ANSWER_CHUNK_EVENT, get_answer_cache
+from ..graph.history import get_chat_history_window
+from ..graph.intent_classifier import (
+    IntentPrediction,
+    LocalIntentClassifier,
+    get_intent_classifier,
+)
+from ..graph.listings import get_listing_renderer
+from ..graph.llm import get_llm_registry
+from ..graph.metrics import RETRIEVAL_DURATION, UNKNOWN_INTENT, intent_label
+from ..graph.speculation import SpeculativeRun, get_speculation_stats
+from ..graph.utils import convert_message_content_to_string
 
 logger = Logger(__name__).logger
 
+T = TypeVar("T")
 
-async def pure_llm_answer(state: OverallState) -> OverallState:
+
+async def pure_llm_answer(state: OverallState, config: RunnableConfig) -> OverallState:
     """
     A LangGraph node that uses a LLM to answer a question.
     """
-    messages = state["messages"]
-    llm = ChatOpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        model="gpt-4o-mini",
-        temperature=0.7,
-        streaming=True,
+    messages = get_chat_history_window().build(state)
+    response = await get_llm_registry().astream_chain(
+        LLMChain.PURE_LLM_ANSWER, messages, config
     )
-    response = await llm.ainvoke(messages)
     return OverallState(messages=[response])
 
 
-def _setup_intent_detection():
-    llm = ChatOpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        model="gpt-4o-mini",
-        temperature=0.5,
-        streaming=True,
+async def detect_intent(state: OverallState) -> OverallState:
+    """
+    A LangGraph node that detects the intent of a message to determine the next node to run.
+
+    Clear-cut messages are classified by the local intent classifier, the others by a LLM.
+    """
+    return await _adetect_intent(state, with_search_properties_filters=False)
+
+
+async def detect_intent_with_search_properties_filters(
+    state: OverallState,
+) -> OverallState:
+    """
+    A LangGraph node that detects the intent of a message like `detect_intent`, the LLM builds the search properties filters of a property search in the same call.
+
+    The filters are kept for the `build_search_properties_filters` node, which does not call a LLM then.
+    """
+    return await _adetect_intent(state, with_search_properties_filters=True)
+
+
+async def _adetect_intent(
+    state: OverallState, with_search_properties_filters: bool
+) -> OverallState:
+    messages = state["messages"]
+
+    question = messages[-1].content
+
+    intent_classifier = (
+        get_intent_classifier() if settings.INTENT_CLASSIFIER_ENABLED else None
+    )
+    prediction = intent_classifier and intent_classifier.classify_with_rules(question)
+    if prediction is not None:
+        logger.debug(f"Intent classified locally: {prediction}")
+        return OverallState(intent=prediction.intent)
+
+    llm_classification = partial(
+        _adetect_intent_and_search_properties_filters_with_llm
+        if with_search_properties_filters
+        else _adetect_intent_with_llm,
+        state,
     )
-    structured_intent_output_llm = llm.with_structured_output(IntentDetectionResponse)
+    if intent_classifier is None:
+        response = await llm_classification()
+    else:
+        # The embedding is cached by the LLM registry, the answer cache lookup and the
+        # knowledge retrieval embed the question again without another call
+        prediction, response = await _aclassify_with_knn_or_llm(
+            intent_classifier,
+            get_llm_registry().aembed_query(question),
+            llm_classification,
+        )
+        if prediction is not None:
+            logger.debug(f"Intent classified locally: {prediction}")
+            return OverallState(intent=prediction.intent)
 
-    return message_intent_detection_prompt | structured_intent_output_llm
+    if not with_search_properties_filters:
+        return OverallState(intent=response)
 
+    return OverallState(
+        intent=response.intent,
+        speculative_results=SpeculativeResults(
+            message_id=messages[-1].id,
+            search_properties_filters_response=response.to_search_properties_filters_response(),
+        )
+        if response.intent == QuestionIntent.FINDING_PROPERTY
+        else None,
+    )
 
-async def detect_intent(state: OverallState) -> OverallState:
+
+async def detect_intent_speculatively(state: OverallState) -> OverallState:
     """
-    A LangGraph node that uses a LLM to detect the intent of a message to determine the next node to run.
+    A LangGraph node that detects the intent of a message like `detect_intent`, while the knowledge retrieval, and the search properties filters building if enabled, run speculatively.
+
+    Once the intent is detected, the branch it needs is kept for its node and the others are cancelled, see SpeculativeRun. Messages classified by the keyword rules are not speculated on.
     """
     messages = state["messages"]
 
     question = messages[-1].content
-    chat_history = messages[:-1]
 
-    intent_detection_llm = _setup_intent_detection()
-    response: IntentDetectionResponse = await intent_detection_llm.ainvoke(
+    intent_classifier = (
+        get_intent_classifier() if settings.INTENT_CLASSIFIER_ENABLED else None
+    )
+    prediction = intent_classifier and intent_classifier.classify_with_rules(question)
+    if prediction is not None:
+        return OverallState(intent=prediction.intent, speculative_results=None)
+
+    # The embedding keeps running when the speculative retrieval is cancelled, the answer
+    # cache lookup joins it through the LLM registry
+    embedding_task = asyncio.create_task(get_llm_registry().aembed_query(question))
+    embedding_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    speculative_run = SpeculativeRun(get_speculation_stats())
+    speculative_run.launch(
+        GraphNode.KNOWLEDGE_RETRIEVAL.value,
+        _aretrieve_documents_speculatively(question, embedding_task),
+    )
+    if settings.SPECULATIVE_FILTERS_ENABLED:
+        speculative_run.launch(
+            GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS.value,
+            _abuild_search_properties_filters(question),
+        )
+
+    try:
+        if intent_classifier is None:
+            intent = await _adetect_intent_with_llm(state)
+        else:
+            prediction, intent = await _aclassify_with_knn_or_llm(
+                intent_classifier,
+                embedding_task,
+                partial(_adetect_intent_with_llm, state),
+            )
+        if prediction is not None:
+            logger.debug(f"Intent classified locally: {prediction}")
+            intent = prediction.intent
+    except BaseException:
+        embedding_task.cancel()
+        speculative_run.cancel()
+        raise
+
+    match intent:
+        case QuestionIntent.HOUSE_BUYING_KNOWLEDGE:
+            kept_branch = GraphNode.KNOWLEDGE_RETRIEVAL.value
+        case QuestionIntent.FINDING_PROPERTY:
+            kept_branch = GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS.value
+        case _:
+            kept_branch = None
+    result = await speculative_run.aresolve(kept_branch)
+
+    return OverallState(
+        intent=intent,
+        speculative_results=SpeculativeResults(
+            message_id=messages[-1].id,
+            documents=result
+            if kept_branch == GraphNode.KNOWLEDGE_RETRIEVAL
+            else None,
+            search_properties_filters_response=result
+            if kept_branch == GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS
+            else None,
+        ),
+    )
+
+
+async def _aclassify_with_knn_or_llm(
+    intent_classifier: LocalIntentClassifier,
+    question_embedding: Awaitable[list[float]],
+    llm_classification: Callable[[], Awaitable[T]],
+) -> tuple[IntentPrediction | None, T | None]:
+    """Classifies a message with the kNN stage of the local classifier, or a LLM when kNN is not confident.
+
+    The LLM is only called once kNN was not confident, unless the message takes longer than
+    INTENT_CLASSIFIER_KNN_TIMEOUT_SECONDS to embed and classify. The LLM call then starts
+    meanwhile and is cancelled if kNN turns out confident. kNN is skipped when the message
+    can not be embedded.
+
+    Returns:
+        tuple[IntentPrediction | None, T | None]: The kNN prediction, or the result of the LLM
+            classification when kNN was not confident.
+    """
+    knn_task = asyncio.ensure_future(
+        _aclassify_with_knn(intent_classifier, question_embedding)
+    )
+    llm_task = None
+    try:
+        done, _ = await asyncio.wait(
+            {knn_task}, timeout=settings.INTENT_CLASSIFIER_KNN_TIMEOUT_SECONDS
+        )
+        if not done:
+            llm_task = asyncio.ensure_future(llm_classification())
+
+        prediction = await knn_task
+        if prediction is not None:
+            if llm_task is not None:
+                llm_task.cancel()
+                intent_classifier.record_cancelled_llm_call()
+            return prediction, None
+
+        intent_classifier.record_llm_prediction()
+        return None, await (llm_task or llm_classification())
+    except BaseException:
+        knn_task.cancel()
+        if llm_task is not None:
+            llm_task.cancel()
+        raise
+
+
+async def _aclassify_with_knn(
+    intent_classifier: LocalIntentClassifier,
+    question_embedding: Awaitable[list[float]],
+) -> IntentPrediction | None:
+    try:
+        return await intent_classifier.aclassify_with_knn(await question_embedding)
+    except Exception as e:
+        logger.warning(f"Classifying the intent with kNN failed: {e}")
+        return None
+
+
+async def _adetect_intent_with_llm(state: OverallState) -> QuestionIntent:
+    response: IntentDetectionResponse = await get_llm_registry().ainvoke_chain(
+        LLMChain.INTENT_DETECTION,
         {
-            "chat_history": chat_history,
-            "question": question,
-        }
+            "chat_history": get_chat_history_window().build(state)[:-1],
+            "question": state["messages"][-1].content,
+        },
+    )
+    return response.intent
+
+
+async def _adetect_intent_and_search_properties_filters_with_llm(
+    state: OverallState,
+) -> IntentAndSearchPropertiesFiltersResponse:
+    return await get_llm_registry().ainvoke_chain(
+        LLMChain.INTENT_DETECTION_WITH_SEARCH_PROPERTIES_FILTERS,
+        {
+            "chat_history": get_chat_history_window().build(state)[:-1],
+            "question": state["messages"][-1].content,
+        },
+    )
+
+
+def _get_speculative_results(state: OverallState) -> SpeculativeResults | None:
+    """The speculative results of the current message, results of earlier messages are stale."""
+    speculative_results = state.get("speculative_results")
+    if (
+        speculative_results is None
+        or speculative_results.message_id != state["messages"][-1].id
+    ):
+        return None
+    return speculative_results
+
+
+async def lookup_cached_answer(
+    state: OverallState, config: RunnableConfig
+) -> OverallState:
+    """
+    A LangGraph node that answers with the cached answer of a similar question, see SemanticAnswerCache.
+
+    The cached answer is streamed in chunks like the answer of a LLM. Small talk is only looked up at the start of a conversation, later answers depend on the chat history. is_answer_cached is None when the cache was not looked up, the answer is not cached then.
+    """
+    messages = state["messages"]
+    if not settings.ANSWER_CACHE_ENABLED or (
+        state["intent"] == QuestionIntent.GREETING and len(messages) > 1
+    ):
+        return OverallState(is_answer_cached=None)
+
+    question = messages[-1].content
+    # The question was usually embedded by the intent detection, the LLM registry caches it
+    question_embedding = await get_llm_registry().aembed_query(question)
+
+    answer_cache = get_answer_cache()
+    cached_answer = answer_cache.get(state["intent"], question_embedding)
+    if (
+        cached_answer
+        and cached_answer.source_hashes
+        and not await EmbeddingService().ahas_unchanged_documents(
+            cached_answer.source_hashes
+        )
+    ):
+        # The knowledge the answer is based on changed
+        answer_cache.invalidate(cached_answer)
+        cached_answer = None
+
+    if cached_answer is None:
+        return OverallState(is_answer_cached=False)
+
+    message_id = f"run-{uuid4()}"
+    for chunk in re.findall(r"\S*\s*", cached_answer.answer):
+        if chunk:
+            await adispatch_custom_event(
+                CACHED_ANSWER_CHUNK_EVENT,
+                AIMessageChunk(content=chunk, id=message_id),
+                config=config,
+            )
+
+    return OverallState(
+        messages=[
+            AIMessage(
+                content=cached_answer.answer,
+                id=message_id,
+                response_metadata={"answer_cache_similarity": cached_answer.similarity},
+            )
+        ],
+        is_answer_cached=True,
     )
 
-    return OverallState(intent=response.intent)
+
+async def cache_answer(state: OverallState) -> OverallState:
+    """
+    A LangGraph node that adds the answer to the user question to the semantic answer cache, when the cache was looked up and missed.
+    """
+    if settings.ANSWER_CACHE_ENABLED and state.get("is_answer_cached") is False:
+        *_, question, answer = state["messages"]
+        source_hashes = (
+            {
+                document.id: generate_text_chunk_content_hash(document.content)
+                for document in state["documents"]
+            }
+            if state["intent"] == QuestionIntent.HOUSE_BUYING_KNOWLEDGE
+            else None
+        )
+        get_answer_cache().put(
+            state["intent"],
+            await get_llm_registry().aembed_query(question.content),
+            convert_message_content_to_string(answer.content),
+            source_hashes,
+        )
+
+    return OverallState()
 
 
 async def knowledge_retrieval(state: OverallState) -> OverallState:
     """
     A LangGraph node to retrieve relevant knowledge, documents (web pages, etc.) for the user question.
     """
+    speculative_results = _get_speculative_results(state)
+    if speculative_results and speculative_results.documents is not None:
+        return OverallState(documents=speculative_results.documents)
+
     messages = state["messages"]
 
     question = messages[-1].content
-    embedding_service = EmbeddingService()
 
-    results = embedding_service.query_similar_documents(question, n_results=3)
+    # The question was usually embedded with the model of the collection by the local intent
+    # classifier or the answer cache lookup, the LLM registry caches it
+    question_embedding = await get_llm_registry().aembed_query(question)
+    with RETRIEVAL_DURATION.labels(
+        GraphNode.KNOWLEDGE_RETRIEVAL.value, intent_label(state.get("intent")), "chroma"
+    ).time():
+        documents = await _aretrieve_documents(question, question_embedding)
+
+    return OverallState(documents=documents)
+
+
+async def _aretrieve_documents_speculatively(
+    question: str, embedding_task: asyncio.Task
+) -> list[RetrievedDocument]:
+    # Cancelling the retrieval does not cancel the embedding shared with the intent detection
+    question_embedding = await asyncio.shield(embedding_task)
+    with RETRIEVAL_DURATION.labels(
+        GraphNode.DETECT_INTENT.value, UNKNOWN_INTENT, "chroma"
+    ).time():
+        return await _aretrieve_documents(question, question_embedding)
+
+
+async def _aretrieve_documents(
+    question: str, question_embedding: list[float]
+) -> list[RetrievedDocument]:
+    # The question is embedded beforehand with the async client, the Chroma query blocks and
+    # runs in a thread of the query executor
+    results = await EmbeddingService().aquery_similar_documents(
+        question, n_results=3, query_embedding=question_embedding
+    )
 
     documents = []
     for i in range(len(results["ids"])):
@@ -95,22 +416,12 @@ async def knowledge_retrieval(state: OverallState) -> OverallState:
             )
         )
 
-    return OverallState(documents=documents)
-
-
-def _setup_generate_knowledge_answer():
-    llm = ChatOpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        model="gpt-4o-mini",
-        temperature=0.4,
-        streaming=True,
-        max_tokens=2048,
-    )
-
-    return knowledge_rag_answer_prompt | llm
+    return documents
 
 
-async def generate_knowledge_answer(state: OverallState) -> OverallState:
+async def generate_knowledge_answer(
+    state: OverallState, config: RunnableConfig
+) -> OverallState:
     """
     A LangGraph node to generate an answer based on the retrieved knowledge.
     """
@@ -118,51 +429,33 @@ async def generate_knowledge_answer(state: OverallState) -> OverallState:
 
     question = messages[-1].content
 
-    generate_knowledge_answer_llm = _setup_generate_knowledge_answer()
-
     source = ""
     for index, document in enumerate(state["documents"]):
         source += f"{index+1}. Source URL(optional): {document.metadata['sourceURL']}\n{document.content}\n\n"
 
-    response = await generate_knowledge_answer_llm.ainvoke(
+    response = await get_llm_registry().astream_chain(
+        LLMChain.GENERATE_KNOWLEDGE_ANSWER,
         {
             "source": source,
             "question": question,
-        }
+        },
+        config,
     )
 
     return OverallState(messages=[response])
 
 
-def _setup_build_search_properties_filters():
-    llm = ChatOpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        model="gpt-4o-mini",
-        temperature=0.5,
-        streaming=True,
-        max_tokens=2048,
-    )
-
-    structured_output_llm = llm.with_structured_output(SearchPropertiesFiltersResponse)
-
-    return build_search_properties_filters_prompt | structured_output_llm
-
-
 async def build_search_properties_filters(
     state: OverallState,
 ) -> OverallState:
     """
     A LangGraph node to build search properties filters based on the user's question.
     """
-    messages = state["messages"]
-
-    question = messages[-1].content
-
-    build_search_properties_filters_llm = _setup_build_search_properties_filters()
-
-    response: SearchPropertiesFiltersResponse = (
-        await build_search_properties_filters_llm.ainvoke({"question": question})
-    )
+    speculative_results = _get_speculative_results(state)
+    if speculative_results and speculative_results.search_properties_filters_response:
+        response = speculative_results.search_properties_filters_response
+    else:
+        response = await _abuild_search_properties_filters(state["messages"][-1].content)
 
     return OverallState(
         search_properties_filters=response.filters,
@@ -170,6 +463,14 @@ async def build_search_properties_filters(
     )
 
 
+async def _abuild_search_properties_filters(
+    question: str,
+) -> SearchPropertiesFiltersResponse:
+    return await get_llm_registry().ainvoke_chain(
+        LLMChain.BUILD_SEARCH_PROPERTIES_FILTERS, {"question": question}
+    )
+
+
 def request_user_to_provide_more_filters_parameters(
     state: OverallState,
 ) -> OverallState:
@@ -185,13 +486,22 @@ def request_user_to_provide_more_filters_parameters(
     )
 
 
-def find_property_listings(state: OverallState) -> OverallState:
+async def find_property_listings(state: OverallState) -> OverallState:
     """
     A LangGraph node to find property listings based on the search properties filters.
     """
     search_properties_filters = state["search_properties_filters"]
 
-    search_properties_response = search_properties(search_properties_filters, 5)
+    with RETRIEVAL_DURATION.labels(
+        GraphNode.FIND_PROPERTY_LISTINGS.value,
+        intent_label(state.get("intent")),
+        "opensearch",
+    ).time():
+        search_properties_response = (
+            await get_property_search_service().asearch_properties(
+                search_properties_filters, 5
+            )
+        )
 
     return OverallState(
         # TODO: When we have new UI, replace this with a ToolMessage
@@ -200,18 +510,9 @@ def find_property_listings(state: OverallState) -> OverallState:
     )
 
 
-def _setup_generate_properties_search_answer():
-    llm = ChatOpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        model="gpt-4o-mini",
-        temperature=0.4,
-        streaming=True,
-    )
-
-    return generate_properties_search_answer_prompt | llm
-
-
-async def generate_properties_search_answer(state: OverallState) -> OverallState:
+async def generate_properties_search_answer(
+    state: OverallState, config: RunnableConfig
+) -> OverallState:
     """
     A LangGraph node to generate an answer based on the retrieved property listings.
     """
@@ -222,15 +523,15 @@ async def generate_properties_search_answer(state: OverallState) -> OverallState
 
     question = messages[-1].content
 
-    generate_properties_search_answer_llm = _setup_generate_properties_search_answer()
-
-    response = await generate_properties_search_answer_llm.ainvoke(
+    response = await get_llm_registry().astream_chain(
+        LLMChain.GENERATE_PROPERTIES_SEARCH_ANSWER,
         {
-            "property_listings": parse_property_details_to_template(
+            "property_listings": get_listing_renderer().render(
                 state["retrieved_property_listings"]
             ),
             "question": question,
-        }
+        },
+        config,
     )
 
     return OverallState(messages=[response])
@@ -249,6 +550,34 @@ def refuse_unsupported_intent(state: OverallState) -> OverallState:
     )
 
 
+async def summarize_history(state: OverallState) -> OverallState:
+    """
+    Folds the oldest messages into the rolling summary of the chat history once they exceed the token budget, see ChatHistoryWindow.
+
+    It is not a node of the graph, the summary of a run is updated after its response was sent, see `router.summarize_history_after_run`.
+    """
+    if not settings.CHAT_HISTORY_SUMMARY_ENABLED:
+        return OverallState()
+
+    summarize_history_llm = get_llm_registry().get_chain(LLMChain.SUMMARIZE_HISTORY)
+
+    async def summarize(summary: str | None, messages: list) -> str:
+        response = await summarize_history_llm.ainvoke(
+            {
+                "summary": summary or "",
+                "messages": "\n".join(
+                    f"{message.type}: {convert_message_content_to_string(message.content)}"
+                    for message in messages
+                ),
+            }
+        )
+        return convert_message_content_to_string(response.content)
+
+    return OverallState(
+        **await get_chat_history_window().aupdate_summary(state, summarize)
+    )
+
+
 # Edges
 def decide_routing(state: OverallState) -> str:
     """
@@ -256,10 +585,8 @@ def decide_routing(state: OverallState) -> str:
     """
     intent = state["intent"]
     match intent:
-        case QuestionIntent.GREETING:
-            return GraphNode.PURE_LLM_ANSWER
-        case QuestionIntent.HOUSE_BUYING_KNOWLEDGE:
-            return GraphNode.KNOWLEDGE_RETRIEVAL
+        case QuestionIntent.GREETING | QuestionIntent.HOUSE_BUYING_KNOWLEDGE:
+            return GraphNode.LOOKUP_CACHED_ANSWER
         case QuestionIntent.UNSUPPORTED:
             return GraphNode.REFUSE_UNSUPPORTED_INTENT
         case QuestionIntent.FINDING_PROPERTY:
@@ -268,6 +595,20 @@ def decide_routing(state: OverallState) -> str:
             return GraphNode.REFUSE_UNSUPPORTED_INTENT
 
 
+def decide_cached_answer_routing(state: OverallState) -> str:
+    """
+    A LangGraph edge to end the run with a cached answer or to answer with a LLM.
+    """
+    if state["is_answer_cached"]:
+        return END
+
+    return (
+        GraphNode.PURE_LLM_ANSWER
+        if state["intent"] == QuestionIntent.GREETING
+        else GraphNode.KNOWLEDGE_RETRIEVAL
+    )
+
+
 def should_continue_properties_search(state: OverallState) -> str:
     """
     A LangGraph edge to decide if graph should continue to search for property listings.
@@ -0,0 +1,99 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+DEFAULT_THREAD_THRESHOLD_BYTES = 64 * 1024
+
+
+class SerdeOffloader:
+    """Runs the (de)serialization of large checkpoint values in a worker thread.
+
+    Serializing a long message history or a page of listings takes milliseconds, which blocks
+    every other stream of the worker when it runs on the event loop. Values whose serialized
+    size reaches threshold_bytes are (de)serialized with `asyncio.to_thread` instead. The
+    serializer still holds the GIL most of the time, but the event loop gets to run every
+    switch interval instead of waiting for the whole value.
+
+    The serialized size of a value is only known after serializing it, so it is estimated from
+    the last value (de)serialized with the same size hint key, e.g. the previous version of the
+    same channel. Hints are kept for the max_size_hints most recent keys.
+
+    A process pool is not used, sending a value to another process pickles it, which costs as
+    much as serializing it.
+    """
+
+    def __init__(
+        self,
+        serde: SerializerProtocol,
+        *,
+        threshold_bytes: int = DEFAULT_THREAD_THRESHOLD_BYTES,
+        max_size_hints: int = 10_000,
+    ):
+        self.serde = serde
+        self.threshold_bytes = threshold_bytes
+        self.max_size_hints = max_size_hints
+        self.inline = 0
+        self.offloaded = 0
+        self._size_hints: OrderedDict[Hashable, int] = OrderedDict()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"inline": self.inline, "offloaded": self.offloaded}
+
+    def _should_offload(self, size: int | None) -> bool:
+        return bool(self.threshold_bytes) and (size or 0) >= self.threshold_bytes
+
+    def _put_size_hint(self, key: Hashable | None, size: int) -> None:
+        if key is None:
+            return
+
+        self._size_hints[key] = size
+        self._size_hints.move_to_end(key)
+        if len(self._size_hints) > self.max_size_hints:
+            self._size_hints.popitem(last=False)
+
+    async def adumps_typed(
+        self, obj: Any, size_hint_key: Hashable | None = None
+    ) -> tuple[str, bytes]:
+        """Serializes a value, in a worker thread if its last serialized size was large.
+
+        Args:
+            obj (Any): The value to serialize.
+            size_hint_key (Hashable | None): The key of the values the size is estimated from.
+                Defaults to None, which serializes on the event loop.
+
+        Returns:
+            tuple[str, bytes]: The type and the serialized value.
+        """
+        if self._should_offload(self._size_hints.get(size_hint_key)):
+            self.offloaded += 1
+            type_, data = await asyncio.to_thread(self.serde.dumps_typed, obj)
+        else:
+            self.inline += 1
+            type_, data = self.serde.dumps_typed(obj)
+
+        self._put_size_hint(size_hint_key, len(data))
+        return type_, data
+
+    async def aloads_typed(
+        self, data: tuple[str, bytes], size_hint_key: Hashable | None = None
+    ) -> Any:
+        """Deserializes a value, in a worker thread if it is large.
+
+        Args:
+            data (tuple[str, bytes]): The type and the serialized value.
+            size_hint_key (Hashable | None): The key to record the size of the value under, so
+                the next value with the same key is serialized accordingly. Defaults to None.
+
+        Returns:
+            Any: The deserialized value.
+        """
+        self._put_size_hint(size_hint_key, len(data[1]))
+        if self._should_offload(len(data[1])):
+            self.offloaded += 1
+            return await asyncio.to_thread(self.serde.loads_typed, data)
+
+        self.inline += 1
+        return self.serde.loads_typed(data)
@@ -0,0 +1,189 @@
+import asyncio
+import zlib
+from pathlib import Path
+from typing import Any, Protocol
+
+import boto3
+
+from src.core.config import settings
+
+from .offload import DEFAULT_THREAD_THRESHOLD_BYTES
+
+PAYLOAD_CODEC_NONE = "none"
+PAYLOAD_CODEC_ZLIB = "zlib"
+PAYLOAD_CODEC_SUFFIX = "_codec"
+PAYLOAD_REF_SUFFIX = "_ref"
+
+# Payloads below this size are stored as is, compressing them saves little and costs CPU
+DEFAULT_COMPRESSION_THRESHOLD_BYTES = 1024
+# DynamoDB items are limited to 400 KB, larger payloads leave room for the other attributes
+DEFAULT_OFFLOAD_THRESHOLD_BYTES = 300 * 1024
+
+
+class BlobStore(Protocol):
+    """Storage for payloads that are too large to be stored inline in a DynamoDB item."""
+
+    async def aput(self, key: str, data: bytes) -> None: ...
+
+    async def aget(self, key: str) -> bytes: ...
+
+    async def adelete(self, keys: list[str]) -> None: ...
+
+
+class LocalBlobStore:
+    """Blob store backed by the local filesystem, used locally and in tests instead of S3."""
+
+    def __init__(self, root: str = str(Path.home() / "weavens-checkpoint-blobs")):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def _delete(self, keys: list[str]) -> None:
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+
+    async def aput(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._put, key, data)
+
+    async def aget(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._path(key).read_bytes)
+
+    async def adelete(self, keys: list[str]) -> None:
+        await asyncio.to_thread(self._delete, keys)
+
+
+class S3BlobStore:
+    """Blob store backed by an S3 bucket.
+
+    boto3 is synchronous, so every request runs in the default thread pool instead of
+    blocking the event loop.
+    """
+
+    # DeleteObjects accepts at most 1000 keys per request
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(self, bucket_name: str, client: Any | None = None):
+        self.bucket_name = bucket_name
+        self.client = client or boto3.client("s3", region_name=settings.AWS_REGION_NAME)
+
+    def _get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket_name, Key=key)["Body"].read()
+
+    def _delete(self, keys: list[str]) -> None:
+        for i in range(0, len(keys), self.DELETE_BATCH_SIZE):
+            self.client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    "Objects": [
+                        {"Key": key} for key in keys[i : i + self.DELETE_BATCH_SIZE]
+                    ],
+                    "Quiet": True,
+                },
+            )
+
+    async def aput(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(
+            self.client.put_object, Bucket=self.bucket_name, Key=key, Body=data
+        )
+
+    async def aget(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._get, key)
+
+    async def adelete(self, keys: list[str]) -> None:
+        if keys:
+            await asyncio.to_thread(self._delete, keys)
+
+
+class PayloadCodec:
+    """Encodes serialized payloads into size-tiered DynamoDB item attributes.
+
+    A payload named "<name>" is stored as:
+        - "<name>" as is, when it is smaller than the compression threshold
+        - "<name>" compressed, when the compressed payload fits in the item
+        - "<name>_ref" pointing to the compressed payload in the blob store otherwise
+
+    "<name>_codec" records how the payload was encoded. Items written before the codec
+    existed have no codec attribute and are read as is.
+
+    Payloads of at least thread_threshold bytes are (de)compressed in a worker thread, zlib
+    releases the GIL meanwhile. 0 (de)compresses every payload on the event loop.
+    """
+
+    def __init__(
+        self,
+        blob_store: BlobStore | None = None,
+        *,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD_BYTES,
+        offload_threshold: int = DEFAULT_OFFLOAD_THRESHOLD_BYTES,
+        compression_level: int = 6,
+        thread_threshold: int = DEFAULT_THREAD_THRESHOLD_BYTES,
+    ):
+        self.blob_store = blob_store
+        self.compression_threshold = compression_threshold
+        self.offload_threshold = offload_threshold
+        self.compression_level = compression_level
+        self.thread_threshold = thread_threshold
+
+    def _in_thread(self, payload: bytes) -> bool:
+        return bool(self.thread_threshold) and len(payload) >= self.thread_threshold
+
+    async def aencode(self, name: str, blob_key: str, payload: bytes) -> dict[str, Any]:
+        """Encodes a payload into item attributes, offloading it to the blob store if needed.
+
+        Args:
+            name (str): The name of the payload attribute.
+            blob_key (str): The blob store key used if the payload is offloaded.
+            payload (bytes): The serialized payload.
+
+        Returns:
+            dict[str, Any]: The item attributes of the payload.
+        """
+        if len(payload) < self.compression_threshold:
+            return {name: payload, f"{name}{PAYLOAD_CODEC_SUFFIX}": PAYLOAD_CODEC_NONE}
+
+        if self._in_thread(payload):
+            compressed = await asyncio.to_thread(
+                zlib.compress, payload, self.compression_level
+            )
+        else:
+            compressed = zlib.compress(payload, self.compression_level)
+        if len(compressed) > self.offload_threshold and self.blob_store:
+            await self.blob_store.aput(blob_key, compressed)
+            return {
+                f"{name}{PAYLOAD_REF_SUFFIX}": blob_key,
+                f"{name}{PAYLOAD_CODEC_SUFFIX}": PAYLOAD_CODEC_ZLIB,
+            }
+
+        return {name: compressed, f"{name}{PAYLOAD_CODEC_SUFFIX}": PAYLOAD_CODEC_ZLIB}
+
+    async def adecode(self, name: str, data: dict) -> bytes:
+        """Decodes a payload from item attributes, fetching it from the blob store if needed.
+
+        Args:
+            name (str): The name of the payload attribute.
+            data (dict): The item.
+
+        Raises:
+            ValueError: If the payload was encoded with an unknown codec.
+
+        Returns:
+            bytes: The serialized payload.
+        """
+        blob_key = data.get(f"{name}{PAYLOAD_REF_SUFFIX}")
+        payload = await self.blob_store.aget(blob_key) if blob_key else data[name]
+
+        codec = data.get(f"{name}{PAYLOAD_CODEC_SUFFIX}", PAYLOAD_CODEC_NONE)
+        if codec == PAYLOAD_CODEC_NONE:
+            return payload
+        if codec == PAYLOAD_CODEC_ZLIB:
+            if self._in_thread(payload):
+                return await asyncio.to_thread(zlib.decompress, payload)
+            return zlib.decompress(payload)
+
+        raise ValueError(f"Unknown payload codec: {codec}")
@@ -0,0 +1,114 @@
+import time
+from dataclasses import dataclass, fields
+from datetime import timedelta
+from typing import Any
+
+from langgraph.checkpoint.base.id import UUID
+
+# Number of 100 ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_timestamp(checkpoint_id: str) -> float:
+    """Returns the creation time of a checkpoint (Unix seconds) from its uuid6 ID."""
+    return (UUID(checkpoint_id).time - UUID_EPOCH_OFFSET) / 10**7
+
+
+def estimate_item_size(value: Any) -> int:
+    """Estimates the size of a DynamoDB item or attribute value in bytes.
+
+    Follows the DynamoDB item size rules closely enough to report reclaimed storage: strings
+    and binaries count their length, numbers up to 21 bytes and attribute names their length.
+    """
+    if isinstance(value, dict):
+        return sum(len(key) + estimate_item_size(item) for key, item in value.items())
+    if isinstance(value, (list, set, tuple)):
+        return sum(estimate_item_size(item) for item in value)
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    return min(len(str(value)), 21)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Which checkpoints of a thread namespace are kept.
+
+    The latest keep_last checkpoints are kept, along with every checkpoint newer than
+    keep_newer_than. When ttl is set, checkpoints and writes also get an "expires_at"
+    attribute, so DynamoDB deletes threads that have been inactive for longer than ttl.
+    Channel blobs are shared by the checkpoints written while their channel is unchanged,
+    they expire after twice the ttl, see `blob_expires_at`.
+    """
+
+    keep_last: int = 20
+    keep_newer_than: timedelta = timedelta(days=7)
+    ttl: timedelta | None = None
+
+    def is_retained(self, position: int, checkpoint_id: str, now: float) -> bool:
+        """Whether a checkpoint is kept.
+
+        Args:
+            position (int): The position of the checkpoint in its namespace, 0 being the latest.
+            checkpoint_id (str): The ID of the checkpoint.
+            now (float): The current Unix time.
+
+        Returns:
+            bool: Whether the checkpoint is kept.
+        """
+        return (
+            position < self.keep_last
+            or checkpoint_timestamp(checkpoint_id)
+            >= now - self.keep_newer_than.total_seconds()
+        )
+
+    def expires_at(self) -> int | None:
+        """Returns the "expires_at" attribute of an item written now, or None without ttl."""
+        if self.ttl is None:
+            return None
+
+        return int(time.time() + self.ttl.total_seconds())
+
+    def blob_expires_at(self) -> int | None:
+        """Returns the "expires_at" attribute of a channel blob written now, or None without ttl.
+
+        A blob outlives the checkpoint written along with it by a ttl, so the checkpoints
+        written while its channel is unchanged only rewrite it once per ttl to outlive them.
+        """
+        if self.ttl is None:
+            return None
+
+        return int(time.time() + 2 * self.ttl.total_seconds())
+
+
+@dataclass
+class CompactionResult:
+    """Items reclaimed by a compaction."""
+
+    threads: int = 0
+    checkpoints: int = 0
+    writes: int = 0
+    blobs: int = 0
+    offloaded_payloads: int = 0
+    bytes: int = 0
+
+    @property
+    def items(self) -> int:
+        return self.checkpoints + self.writes + self.blobs
+
+    def __iadd__(self, other: "CompactionResult") -> "CompactionResult":
+        for field in fields(self):
+            setattr(
+                self, field.name, getattr(self, field.name) + getattr(other, field.name)
+            )
+        return self
+
+    def __str__(self) -> str:
+        return (
+            f"{self.items} items ({self.checkpoints} checkpoints, {self.writes} writes, "
+            f"{self.blobs} blobs) and {self.offloaded_payloads} offloaded payloads "
+            f"reclaimed in {self.threads} threads, {self.bytes / 1024:.1f} KB"
+        )
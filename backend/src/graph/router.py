@@ -1,17 +1,28 @@
 import asyncio
 import json
+import time
 from typing import AsyncGenerator
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
 from fastapi.responses import StreamingResponse
 from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph.state import CompiledStateGraph
 from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
 
 from src.common.exceptions import InternalServerErrorHTTPException
+from src.core.config import settings
 from src.core.logging import Logger
 from src.core.analytics import log_user_message
-from .schemas import UserInput, ThreadRunsStreamRequestParams
+from .answer_cache import CACHED_ANSWER_CHUNK_EVENT
+from .llm import COALESCED_ANSWER_CHUNK_EVENT
+from .checkpoint import AsyncDynamoDBSaver
+from .tiered import AsyncRedisTieredSaver
+from .schemas import GraphNode, UserInput, ThreadRunsStreamRequestParams
+from .metrics import ANSWER_TIME_TO_FIRST_TOKEN, intent_label
+from .nodes import summarize_history
+from .speculation import get_speculation_stats
 from .utils import (
     parse_input,
     langchain_to_chat_message,
@@ -21,11 +32,53 @@ logger = Logger(__name__).logger
 
 router = APIRouter(tags=["graph"])
 
+# The nodes whose messages and tokens answer the user, the time to first token is measured
+# up to the first of them. Other nodes stream intermediate LLM calls or placeholder messages.
+ANSWER_NODES = frozenset(
+    node.value
+    for node in (
+        GraphNode.LOOKUP_CACHED_ANSWER,
+        GraphNode.PURE_LLM_ANSWER,
+        GraphNode.GENERATE_RAG_KNOWLEDGE_ANSWER,
+        GraphNode.REQUEST_USER_TO_PROVIDE_MORE_FILTERS_PARAMETERS,
+        GraphNode.GENERATE_PROPERTIES_SEARCH_ANSWER,
+        GraphNode.REFUSE_UNSUPPORTED_INTENT,
+    )
+)
+
 
 async def get_app_agents(request: Request) -> dict[str, CompiledStateGraph]:
     return request.state.agents
 
 
+async def flush_checkpoints(agent: CompiledStateGraph, thread_id: str) -> None:
+    """Persists the checkpoints of a run that ended, see the checkpointer's durability mode."""
+    if isinstance(agent.checkpointer, (AsyncDynamoDBSaver, AsyncRedisTieredSaver)):
+        await agent.checkpointer.aflush(thread_id)
+
+
+async def summarize_history_after_run(agent: CompiledStateGraph, thread_id: str) -> None:
+    """Updates the rolling summary of the chat history of a thread once its run ended.
+
+    It runs after the response was sent and the run's checkpoints were persisted, so the
+    summarization LLM does not delay them. The summary is written as a checkpoint of its
+    own. If the next run of the thread started meanwhile, that run does not see it and the
+    summary lags behind by a turn, the history window stays within its budget regardless.
+    """
+    if not settings.CHAT_HISTORY_SUMMARY_ENABLED:
+        return
+
+    config = RunnableConfig(configurable={"thread_id": thread_id})
+    try:
+        state = await agent.aget_state(config)
+        update = await summarize_history(state.values)
+        if update:
+            await agent.aupdate_state(config, update)
+            await flush_checkpoints(agent, thread_id)
+    except Exception as e:
+        logger.error(f"Error summarizing the chat history of thread {thread_id}: {e}")
+
+
 async def message_generator(
     thread_id: str,
     request_params: ThreadRunsStreamRequestParams,
@@ -38,14 +91,53 @@ async def message_generator(
     """
     parsed_input = parse_input(thread_id, request_params.input)
 
-    async for event in app_agents["default"].astream_events(
-        **parsed_input, version="v2"
-    ):
+    try:
+        async for event in stream_events(app_agents["default"], parsed_input):
+            yield event
+    finally:
+        # The run ended, checkpoints are persisted after the last event reached the user
+        await flush_checkpoints(app_agents["default"], thread_id)
+
+
+async def stream_events(
+    agent: CompiledStateGraph, parsed_input: dict
+) -> AsyncGenerator[dict, None]:
+    """Stream the messages and tokens of a run as server-sent events.
+
+    The time to the first token or message of the answer is recorded per intent and intent
+    detection mode, see SpeculationStats. Only the events of ANSWER_NODES count as the answer.
+    """
+    started_at = time.perf_counter()
+    intent = None
+    has_first_token = False
+
+    def record_first_token() -> None:
+        nonlocal has_first_token
+        if not has_first_token:
+            has_first_token = True
+            latency_seconds = time.perf_counter() - started_at
+            get_speculation_stats().record_time_to_first_token(
+                intent, settings.INTENT_DETECTION_MODE.value, latency_seconds * 1000
+            )
+            ANSWER_TIME_TO_FIRST_TOKEN.labels(
+                intent_label(intent), settings.INTENT_DETECTION_MODE.value
+            ).observe(latency_seconds)
+
+    async for event in agent.astream_events(**parsed_input, version="v2"):
         if not event:
             continue
 
+        is_answer_event = event.get("metadata", {}).get("langgraph_node") in ANSWER_NODES
+
         new_messages = []
 
+        if (
+            event["event"] == "on_chain_end"
+            and any(t.startswith("graph:step:") for t in event.get("tags", []))
+            and "intent" in event["data"]["output"]
+        ):
+            intent = event["data"]["output"]["intent"].value
+
         if (
             event["event"] == "on_chain_end"
             and any(t.startswith("graph:step:") for t in event.get("tags", []))
@@ -77,6 +169,8 @@ async def message_generator(
                 }
                 continue
 
+            if chat_message.type == "ai" and is_answer_event:
+                record_first_token()
             yield {
                 "event": "messages/complete",
                 "data": json.dumps(
@@ -86,15 +180,23 @@ async def message_generator(
                 ),
             }
 
-        # Yield tokens streamed from LLMs.
-        if event["event"] == "on_chat_model_stream":
-            message = langchain_to_chat_message(event["data"]["chunk"])
+        # Yield tokens streamed from LLMs, and the chunks of cached answers and of answers
+        # coalesced with an identical in-flight answer.
+        is_dispatched_answer_chunk = event["event"] == "on_custom_event" and event[
+            "name"
+        ] in (CACHED_ANSWER_CHUNK_EVENT, COALESCED_ANSWER_CHUNK_EVENT)
+        if event["event"] == "on_chat_model_stream" or is_dispatched_answer_chunk:
+            message = langchain_to_chat_message(
+                event["data"] if is_dispatched_answer_chunk else event["data"]["chunk"]
+            )
 
             if message.content:
                 # Empty content in the context of OpenAI usually means
                 # that the model is asking for a tool to be invoked.
                 # So we only print non-empty content.
 
+                if is_answer_event:
+                    record_first_token()
                 yield {
                     "event": "messages/chunk",
                     "data": json.dumps(
@@ -114,6 +216,7 @@ async def message_generator(
 @router.post("/invoke")
 async def invoke(
     user_input: UserInput,
+    background_tasks: BackgroundTasks,
     app_agents: dict[str, CompiledStateGraph] = Depends(get_app_agents),
 ):
     """
@@ -122,6 +225,13 @@ async def invoke(
     Use thread_id to persist and continue a multi-turn conversation.
     """
     parsed_input = parse_input(user_input.thread_id, user_input)
+    # The run's checkpoints are persisted after the response is sent
+    background_tasks.add_task(
+        flush_checkpoints, app_agents["default"], user_input.thread_id
+    )
+    background_tasks.add_task(
+        summarize_history_after_run, app_agents["default"], user_input.thread_id
+    )
     try:
         response = await app_agents["default"].ainvoke(**parsed_input)
 
@@ -160,4 +270,8 @@ async def stream(
     return EventSourceResponse(
         message_generator(thread_id, request_params, app_agents),
         media_type="text/event-stream",
+        # Once the stream ended and the run's checkpoints were persisted
+        background=BackgroundTask(
+            summarize_history_after_run, app_agents["default"], thread_id
+        ),
     )
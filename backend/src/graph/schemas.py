@@ -45,21 +45,55 @@ class SearchPropertiesFiltersResponse(BaseModel):
     )
 
 
+class IntentAndSearchPropertiesFiltersResponse(IntentDetectionResponse):
+    """Structured output of the intent of the user's message, along with the search properties filters if the user is looking for a property"""
+
+    filters: Optional[SearchPropertiesFilters] = Field(
+        description="The search properties filters, only when the intent is finding_property_finland",
+        default=None,
+    )
+    has_enough_search_properties_filters: bool = Field(
+        description="Whether the user provided enough information to build search properties filters",
+        default=False,
+    )
+
+    def to_search_properties_filters_response(self) -> SearchPropertiesFiltersResponse:
+        return SearchPropertiesFiltersResponse(
+            filters=self.filters or SearchPropertiesFilters(),
+            has_enough_search_properties_filters=self.has_enough_search_properties_filters,
+            reasoning=self.reasoning,
+        )
+
+
 class RetrievedDocument(BaseModel):
     id: str
     content: str
     metadata: dict[str, Any]
 
 
+class SpeculativeResults(BaseModel):
+    """Results of a message computed along with its intent detection, by the speculative branches or the combined intent and filters call"""
+
+    message_id: str
+    documents: Optional[list[RetrievedDocument]] = None
+    search_properties_filters_response: Optional[SearchPropertiesFiltersResponse] = None
+
+
 class OverallState(MessagesState):
     intent: QuestionIntent
     documents: Optional[list[RetrievedDocument]]
     search_properties_filters: Optional[SearchPropertiesFilters]
     has_enough_search_properties_filters: Optional[bool]
     retrieved_property_listings: Optional[list[Property]]
+    is_answer_cached: Optional[bool]
+    speculative_results: Optional[SpeculativeResults]
+    history_summary: Optional[str]
+    summarized_message_id: Optional[str]
 
 
 class GraphNode(str, Enum):
+    LOOKUP_CACHED_ANSWER = "lookup_cached_answer"
+    CACHE_ANSWER = "cache_answer"
     PURE_LLM_ANSWER = "pure_llm_answer"
     KNOWLEDGE_RETRIEVAL = "knowledge_retrieval"
     DETECT_INTENT = "detect_intent"
@@ -73,6 +107,18 @@ class GraphNode(str, Enum):
     REFUSE_UNSUPPORTED_INTENT = "refuse_unsupported_intent"
 
 
+class LLMChain(str, Enum):
+    PURE_LLM_ANSWER = "pure_llm_answer"
+    INTENT_DETECTION = "intent_detection"
+    INTENT_DETECTION_WITH_SEARCH_PROPERTIES_FILTERS = (
+        "intent_detection_with_search_properties_filters"
+    )
+    GENERATE_KNOWLEDGE_ANSWER = "generate_knowledge_answer"
+    BUILD_SEARCH_PROPERTIES_FILTERS = "build_search_properties_filters"
+    GENERATE_PROPERTIES_SEARCH_ANSWER = "generate_properties_search_answer"
+    SUMMARIZE_HISTORY = "summarize_history"
+
+
 class UserInput(BaseModel):
     message: str
     thread_id: str
@@ -87,6 +133,9 @@ class StreamUserInput(UserInput):
     )
 
 
+ChannelVersion = str | int | float
+
+
 class CompositeKey(TypedDict):
     PK: str
     SK: str
@@ -0,0 +1,183 @@
+import decimal
+import importlib
+from collections import deque
+from enum import Enum
+from functools import cache
+from typing import Any
+
+import msgpack
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import (
+    JsonPlusSerializer,
+    _msgpack_default,
+    _msgpack_ext_hook,
+)
+from pydantic import BaseModel
+
+from src.common.constants import CheckpointSerializer
+
+MSGPACK_TYPE = "fastmsgpack"
+
+# JsonPlusSerializer uses ext codes 0-5, which are decoded by its ext hook
+EXT_PYDANTIC_MODEL = 16
+EXT_ENUM = 17
+EXT_DECIMAL = 18
+
+
+@cache
+def _import_class(module: str, name: str) -> type:
+    return getattr(importlib.import_module(module), name)
+
+
+@cache
+def _none_default_fields(cls: type[BaseModel]) -> frozenset[str]:
+    return frozenset(
+        name for name, field in cls.model_fields.items() if field.default is None
+    )
+
+
+def _class_path(obj: Any) -> tuple[str, str]:
+    return obj.__class__.__module__, obj.__class__.__name__
+
+
+def _construct_model(
+    cls: type[BaseModel], fields: dict, fields_set: set[str], extra: dict | None
+) -> BaseModel:
+    """Rebuilds a model from the fields of a validated model, without validating them again."""
+    fields = {**dict.fromkeys(cls.model_fields), **fields}
+    if cls.__pydantic_post_init__ or cls.__pydantic_root_model__:
+        return cls.model_construct(_fields_set=fields_set, **fields, **(extra or {}))
+
+    # The same attributes model_construct sets, without resolving aliases and defaults
+    model = cls.__new__(cls)
+    object.__setattr__(model, "__dict__", fields)
+    object.__setattr__(model, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(model, "__pydantic_extra__", extra)
+    object.__setattr__(model, "__pydantic_private__", None)
+    return model
+
+
+def _default(obj: Any) -> Any:
+    """Encodes the values msgpack can not pack natively.
+
+    The packer runs with strict types, so subclasses of built-in types (e.g. str enums) are
+    encoded here instead of losing their type.
+    """
+    if isinstance(obj, BaseModel):
+        # Fields left to a None default are restored when the model is loaded
+        none_default_fields = _none_default_fields(obj.__class__)
+        fields = {
+            name: value
+            for name, value in obj.__dict__.items()
+            if value is not None or name not in none_default_fields
+        }
+        # Usually the fields set are the packed ones, then they are not packed twice
+        fields_set = obj.model_fields_set
+        return msgpack.ExtType(
+            EXT_PYDANTIC_MODEL,
+            _pack(
+                (
+                    *_class_path(obj),
+                    fields,
+                    None if fields_set == fields.keys() else list(fields_set),
+                    obj.__pydantic_extra__,
+                )
+            ),
+        )
+    if isinstance(obj, Enum):
+        return msgpack.ExtType(EXT_ENUM, _pack((*_class_path(obj), obj.value)))
+    if isinstance(obj, decimal.Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(obj).encode())
+    if isinstance(obj, tuple):
+        return list(obj)
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, list):
+        return list(obj)
+    if isinstance(obj, str):
+        return str(obj)
+
+    return _msgpack_default(obj)
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == EXT_PYDANTIC_MODEL:
+        module, name, fields, fields_set, extra = _unpack(data)
+        return _construct_model(
+            _import_class(module, name),
+            fields,
+            set(fields) if fields_set is None else set(fields_set),
+            extra,
+        )
+    if code == EXT_ENUM:
+        module, name, value = _unpack(data)
+        return _import_class(module, name)(value)
+    if code == EXT_DECIMAL:
+        return decimal.Decimal(data.decode())
+
+    return _msgpack_ext_hook(code, data)
+
+
+_PACKERS: deque[msgpack.Packer] = deque(maxlen=32)
+
+
+def _pack(obj: Any) -> bytes:
+    # A packer can not be reused while it packs, nested models take another one from the pool
+    try:
+        packer = _PACKERS.popleft()
+    except IndexError:
+        packer = msgpack.Packer(default=_default, strict_types=True)
+    try:
+        return packer.pack(obj)
+    finally:
+        _PACKERS.append(packer)
+
+
+def _unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_ext_hook, strict_map_key=False)
+
+
+class MsgpackSerializer(SerializerProtocol):
+    """Checkpoint serializer that packs pydantic models with msgpack without re-validating them.
+
+    JsonPlusSerializer dumps pydantic models (LangChain messages, listings, documents) to dicts
+    and validates them again when they are loaded, which is most of its cost for our state.
+    Models are packed here as their field values and rebuilt like model_construct does, enums
+    and Decimals keep their type. Other values are encoded like JsonPlusSerializer does.
+
+    Values written by JsonPlusSerializer are still loaded, metadata is serialized by it as
+    before. Checkpoints written by this serializer can not be loaded by JsonPlusSerializer.
+    """
+
+    def __init__(self):
+        self._fallback = JsonPlusSerializer()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._fallback.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self._fallback.loads(data)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        if isinstance(obj, (bytes, bytearray)):
+            return self._fallback.dumps_typed(obj)
+
+        try:
+            return MSGPACK_TYPE, _pack(obj)
+        except UnicodeEncodeError:
+            return self._fallback.dumps_typed(obj)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_ == MSGPACK_TYPE:
+            return _unpack(payload)
+
+        return self._fallback.loads_typed(data)
+
+
+def make_serializer(serializer: CheckpointSerializer) -> SerializerProtocol:
+    """Returns the checkpoint serializer configured by CHECKPOINT_SERIALIZER."""
+    if serializer == CheckpointSerializer.MSGPACK:
+        return MsgpackSerializer()
+
+    return JsonPlusSerializer()
@@ -0,0 +1,156 @@
+import asyncio
+import statistics
+import time
+from collections import Counter, defaultdict, deque
+from functools import lru_cache
+from typing import Any, Coroutine
+
+from src.core.logging import Logger
+
+logger = Logger(__name__).logger
+
+
+class SpeculationStats:
+    """Counts the cost and the payoff of the branches run speculatively along with the intent
+    detection, along with the time to first token of the runs.
+
+    For each branch:
+        - launched, kept, cancelled, discarded (finished but not needed) and failed runs.
+        - saved_ms, the time a kept branch overlapped the intent detection, the time the
+          sequential graph would have waited for it on top.
+        - wasted_ms, the time a branch that was not kept ran. A cancelled LLM call is still
+          billed for the prompt tokens sent.
+
+    The time to first token is recorded per intent and per intent detection mode, so the modes
+    can be compared on the same traffic, e.g. by switching the mode between two deployments.
+    The most recent max_samples samples of each are kept.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self.branches: defaultdict[str, Counter] = defaultdict(Counter)
+        self._time_to_first_token_ms: defaultdict[str, deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.max_samples)
+        )
+
+    @property
+    def stats(self) -> dict[str, dict]:
+        return {
+            "branches": {
+                branch: {
+                    "launched": counter["launched"],
+                    "kept": counter["kept"],
+                    "cancelled": counter["cancelled"],
+                    "discarded": counter["discarded"],
+                    "failed": counter["failed"],
+                    "saved_ms": round(counter["saved_ms"], 1),
+                    "wasted_ms": round(counter["wasted_ms"], 1),
+                }
+                for branch, counter in self.branches.items()
+            },
+            "time_to_first_token_ms": {
+                key: {
+                    "samples": len(samples),
+                    "p50": statistics.median(samples),
+                    "p95": sorted(samples)[min(len(samples) - 1, int(len(samples) * 0.95))],
+                }
+                for key, samples in self._time_to_first_token_ms.items()
+                if samples
+            },
+        }
+
+    def record(self, branch: str, outcome: str, *, saved_ms=0.0, wasted_ms=0.0) -> None:
+        counter = self.branches[branch]
+        counter[outcome] += 1
+        counter["saved_ms"] += saved_ms
+        counter["wasted_ms"] += wasted_ms
+
+    def record_time_to_first_token(
+        self, intent: str | None, mode: str, latency_ms: float
+    ) -> None:
+        self._time_to_first_token_ms[f"{mode}:{intent or 'unknown'}"].append(latency_ms)
+
+
+class SpeculativeRun:
+    """The branches started speculatively while the intent of a message is detected.
+
+    Each branch is an asyncio task. Once the intent is known, `aresolve` keeps the branch the
+    intent needs and cancels the others, or discards them if they already finished.
+    """
+
+    def __init__(self, stats: SpeculationStats):
+        self.stats = stats
+        self.started_at = time.perf_counter()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._finished_at: dict[str, float] = {}
+
+    def launch(self, branch: str, coro: Coroutine) -> None:
+        task = asyncio.create_task(self._arun(branch, coro))
+        # The exception of a branch that is not kept is never retrieved otherwise
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        self._tasks[branch] = task
+        self.stats.record(branch, "launched")
+
+    def cancel(self) -> None:
+        """Cancels all the branches, e.g. when the intent detection failed."""
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def aresolve(self, kept_branch: str | None) -> Any | None:
+        """Keeps a branch and cancels or discards the others.
+
+        Args:
+            kept_branch (str | None): The branch the detected intent needs, None if it needs
+                none of them.
+
+        Returns:
+            Any | None: The result of the kept branch, None if it was not launched or failed,
+                the node of the branch runs it again then.
+        """
+        resolved_at = time.perf_counter()
+        for branch, task in self._tasks.items():
+            if branch == kept_branch:
+                continue
+            if task.done():
+                self.stats.record(
+                    branch, "discarded", wasted_ms=self._ran_ms(branch, resolved_at)
+                )
+            else:
+                task.cancel()
+                self.stats.record(
+                    branch, "cancelled", wasted_ms=self._ran_ms(branch, resolved_at)
+                )
+
+        task = self._tasks.get(kept_branch)
+        if task is None:
+            return None
+
+        try:
+            result = await task
+        except Exception as e:
+            logger.warning(f"Speculative branch {kept_branch} failed: {e}")
+            self.stats.record(kept_branch, "failed")
+            return None
+
+        # The branch would have run after the intent detection, it overlapped it until then
+        self.stats.record(
+            kept_branch, "kept", saved_ms=self._ran_ms(kept_branch, resolved_at)
+        )
+        return result
+
+    async def _arun(self, branch: str, coro: Coroutine) -> Any:
+        try:
+            return await coro
+        finally:
+            self._finished_at[branch] = time.perf_counter()
+
+    def _ran_ms(self, branch: str, until: float) -> float:
+        """The time a branch ran until the given time."""
+        finished_at = min(self._finished_at.get(branch, until), until)
+        return (finished_at - self.started_at) * 1000
+
+
+@lru_cache
+def get_speculation_stats() -> SpeculationStats:
+    """Get the speculation stats of the process."""
+    return SpeculationStats()
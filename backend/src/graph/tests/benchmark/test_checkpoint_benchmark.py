@@ -0,0 +1,582 @@
+import asyncio
+import json
+import sys
+from datetime import timedelta
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from src.common.constants import Durability
+from src.core.event_loop import EventLoopLagMonitor
+
+from ...cache import CheckpointCache
+from ...checkpoint import AsyncDynamoDBSaver
+from ...payloads import LocalBlobStore, PayloadCodec
+from ...retention import RetentionPolicy
+from ...serde import MsgpackSerializer
+from .utils import make_listing, measure, report
+
+
+async def _put_checkpoint_with_pending_writes(saver, thread_id: str, writes_count: int):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    config = await saver.aput(
+        config, create_checkpoint(empty_checkpoint(), None, 1), {"step": 1}, {}
+    )
+    if writes_count:
+        await saver.aput_writes(
+            config,
+            [
+                (f"channel_{i}", AIMessage(content=f"pending write {i} " * 20))
+                for i in range(writes_count)
+            ],
+            task_id="task",
+        )
+    return config
+
+
+def _make_turn_messages(turn: int) -> list:
+    """Messages of a property search turn, the answer lists retrieved listings."""
+    listings = [
+        {
+            "id": turn * 100 + i,
+            "title": f"Bright {i + 1}-room apartment close to the metro",
+            "location": "Helsinki, Kallio",
+            "price": 250000 + i * 1000,
+            "description": "Renovated kitchen, sauna and a glazed balcony. " * 5,
+        }
+        for i in range(10)
+    ]
+    return [
+        HumanMessage(content=f"Show me apartments in Kallio, turn {turn}"),
+        AIMessage(content=json.dumps(listings)),
+    ]
+
+
+@pytest.mark.benchmark
+class TestCheckpointReadPathBenchmark:
+    async def test_aget_tuple_round_trips_and_latency_by_pending_writes(
+        self, dynamodb_local_saver, capsys
+    ):
+        saver, round_trip_counter = dynamodb_local_saver
+
+        results = []
+        for writes_count in (0, 10, 100):
+            thread_id = f"thread-{writes_count}-writes"
+            await _put_checkpoint_with_pending_writes(saver, thread_id, writes_count)
+            latest_config = {"configurable": {"thread_id": thread_id}}
+
+            checkpoint_tuple = await saver.aget_tuple(latest_config)
+            assert len(checkpoint_tuple.pending_writes) == writes_count
+
+            results.append(
+                await measure(
+                    f"aget_tuple (latest) with {writes_count} pending writes",
+                    lambda: saver.aget_tuple(latest_config),
+                    round_trip_counter,
+                )
+            )
+
+        with capsys.disabled():
+            report("AsyncDynamoDBSaver.aget_tuple", results)
+
+        # The pending writes are read along with the checkpoint. Past LATEST_WRITES_PAGE_SIZE
+        # writes, the newest writes do not hold them all and they are queried again.
+        assert [result.sequential_round_trips for result in results] == [1, 1, 2]
+        assert [result.round_trips for result in results] == [2, 2, 3]
+
+    async def test_latest_aget_tuple_round_trips_and_latency_by_thread_length(
+        self, dynamodb_local_saver, capsys
+    ):
+        saver, round_trip_counter = dynamodb_local_saver
+
+        results = []
+        for checkpoints_count in (1, 50, 200):
+            thread_id = f"thread-{checkpoints_count}-checkpoints"
+            config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+            checkpoint = empty_checkpoint()
+            for step in range(checkpoints_count):
+                checkpoint = create_checkpoint(checkpoint, None, step)
+                config = await saver.aput(config, checkpoint, {"step": step}, {})
+            latest_config = {"configurable": {"thread_id": thread_id}}
+
+            checkpoint_tuple = await saver.aget_tuple(latest_config)
+            assert checkpoint_tuple.config == config
+
+            results.append(
+                await measure(
+                    f"aget_tuple (latest) with {checkpoints_count} checkpoints",
+                    lambda: saver.aget_tuple(latest_config),
+                    round_trip_counter,
+                )
+            )
+
+        with capsys.disabled():
+            report("AsyncDynamoDBSaver.aget_tuple", results)
+
+        # Resolving the latest checkpoint must not get slower as the thread grows
+        assert len({result.round_trips for result in results}) == 1
+
+    async def test_aput_writes_round_trips_and_latency_by_writes_count(
+        self, dynamodb_local_saver, capsys
+    ):
+        saver, round_trip_counter = dynamodb_local_saver
+        config = await _put_checkpoint_with_pending_writes(saver, "thread", 0)
+
+        results = []
+        for writes_count in (1, 10, 100):
+            writes = [
+                (f"channel_{i}", AIMessage(content=f"pending write {i} " * 20))
+                for i in range(writes_count)
+            ]
+            results.append(
+                await measure(
+                    f"aput_writes with {writes_count} writes",
+                    lambda: saver.aput_writes(config, writes, task_id="task"),
+                    round_trip_counter,
+                )
+            )
+
+        with capsys.disabled():
+            report("AsyncDynamoDBSaver.aput_writes", results)
+
+        assert [result.round_trips for result in results] == [1, 1, 4]
+
+    async def test_alist_round_trips_and_latency_by_thread_length(
+        self, dynamodb_local_saver, capsys
+    ):
+        saver, round_trip_counter = dynamodb_local_saver
+
+        results = []
+        for checkpoints_count in (10, 50, 200):
+            thread_id = f"thread-{checkpoints_count}-checkpoints"
+            config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+            checkpoint = empty_checkpoint()
+            for step in range(checkpoints_count):
+                checkpoint = create_checkpoint(checkpoint, None, step)
+                config = await saver.aput(config, checkpoint, {"step": step}, {})
+
+            thread_config = {"configurable": {"thread_id": thread_id}}
+
+            async def list_history():
+                return [
+                    checkpoint_tuple
+                    async for checkpoint_tuple in saver.alist(
+                        thread_config, before=config, limit=5
+                    )
+                ]
+
+            assert len(await list_history()) == 5
+            results.append(
+                await measure(
+                    f"alist(before, limit=5) with {checkpoints_count} checkpoints",
+                    list_history,
+                    round_trip_counter,
+                )
+            )
+
+        with capsys.disabled():
+            report("AsyncDynamoDBSaver.alist", results)
+
+        assert [result.round_trips for result in results] == [1, 1, 1]
+
+    async def test_latest_aget_tuple_round_trips_and_latency_with_cache(
+        self, dynamodb_local_saver, capsys
+    ):
+        saver, round_trip_counter = dynamodb_local_saver
+        config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+        checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+        version = saver.get_next_version(None, None)
+        checkpoint["channel_values"] = {
+            "messages": [message for turn in range(10) for message in _make_turn_messages(turn)]
+        }
+        checkpoint["channel_versions"] = {"messages": version}
+        latest_config = {"configurable": {"thread_id": "thread"}}
+
+        results = []
+        for cache in (None, CheckpointCache()):
+            saver.cache = cache
+            config = await saver.aput(config, checkpoint, {"step": 1}, {"messages": version})
+            await saver.aput_writes(
+                config, [(f"channel_{i}", i) for i in range(10)], task_id="task"
+            )
+            results.append(
+                await measure(
+                    f"aget_tuple (latest) {'with' if cache else 'without'} cache",
+                    lambda: saver.aget_tuple(latest_config),
+                    round_trip_counter,
+                )
+            )
+            assert (await saver.aget_tuple(latest_config)).checkpoint == checkpoint
+
+        with capsys.disabled():
+            report("AsyncDynamoDBSaver.aget_tuple", results)
+
+        # A miss reads the pending writes along with the checkpoint, then its channel blobs.
+        # A cache hit only costs the keys-only version check and the pending writes, which
+        # are read concurrently.
+        assert [result.round_trips for result in results] == [3, 2]
+        assert [result.sequential_round_trips for result in results] == [2, 1]
+
+
+@pytest.mark.benchmark
+class TestCheckpointPayloadBenchmark:
+    async def test_bytes_written_and_read_latency_per_turn(
+        self, dynamodb_local_saver, tmp_path, capsys
+    ):
+        saver, round_trip_counter = dynamodb_local_saver
+        codecs = {
+            "inline": PayloadCodec(compression_threshold=sys.maxsize),
+            "zlib": PayloadCodec(LocalBlobStore(str(tmp_path))),
+        }
+
+        results = {name: [] for name in codecs}
+        for name, codec in codecs.items():
+            saver.payload_codec = codec
+            thread_id = f"thread-{name}"
+            config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+            checkpoint = empty_checkpoint()
+            messages = []
+            version = None
+            for turn in range(1, 31):
+                messages += _make_turn_messages(turn)
+                version = saver.get_next_version(version, None)
+                checkpoint = create_checkpoint(checkpoint, None, turn)
+                checkpoint["channel_values"] = {"messages": messages}
+                checkpoint["channel_versions"] = {"messages": version}
+                new_versions = {"messages": version}
+                if turn not in (1, 10, 30):
+                    config = await saver.aput(
+                        config, checkpoint, {"step": turn}, new_versions
+                    )
+                    continue
+
+                async def put_checkpoint():
+                    return await saver.aput(
+                        config, checkpoint, {"step": turn}, new_versions
+                    )
+
+                latest_config = {"configurable": {"thread_id": thread_id}}
+                put_result = await measure(
+                    f"{name}: aput at turn {turn}",
+                    put_checkpoint,
+                    round_trip_counter,
+                    iterations=5,
+                )
+                get_result = await measure(
+                    f"{name}: aget_tuple at turn {turn}",
+                    lambda: saver.aget_tuple(latest_config),
+                    round_trip_counter,
+                )
+                results[name] += [put_result, get_result]
+                config = await put_checkpoint()
+
+                checkpoint_tuple = await saver.aget_tuple(latest_config)
+                assert checkpoint_tuple.checkpoint["channel_values"] == {
+                    "messages": messages
+                }
+
+        with capsys.disabled():
+            for name, codec_results in results.items():
+                report(f"AsyncDynamoDBSaver payloads ({name})", codec_results)
+
+        # Bytes written by the last turn's aput
+        assert results["zlib"][-2].bytes_sent < results["inline"][-2].bytes_sent / 2
+
+    async def test_bytes_written_per_turn_by_changed_channels(
+        self, dynamodb_local_saver, capsys
+    ):
+        saver, round_trip_counter = dynamodb_local_saver
+        saver.payload_codec = PayloadCodec(compression_threshold=sys.maxsize)
+
+        bytes_written = {}
+        for write_all_channels in (True, False):
+            name = "full state" if write_all_channels else "changed channels"
+            config = {"configurable": {"thread_id": name, "checkpoint_ns": ""}}
+            checkpoint = empty_checkpoint()
+            channel_values = {}
+            messages = []
+            for turn in range(1, 31):
+                round_trip_counter.reset()
+                question, answer = _make_turn_messages(turn)
+                # The supersteps of a property search turn, each updates a single channel
+                for step, (channel, value) in enumerate(
+                    [
+                        ("messages", messages := messages + [question]),
+                        ("intent", "finding_property_finland"),
+                        ("retrieved_property_listings", json.loads(answer.content)),
+                        ("messages", messages := messages + [answer]),
+                    ]
+                ):
+                    checkpoint = create_checkpoint(checkpoint, None, step)
+                    channel_values = {**channel_values, channel: value}
+                    checkpoint["channel_values"] = channel_values
+                    checkpoint["channel_versions"] = {
+                        **checkpoint["channel_versions"],
+                        channel: saver.get_next_version(
+                            checkpoint["channel_versions"].get(channel), None
+                        ),
+                    }
+                    new_versions = (
+                        checkpoint["channel_versions"]
+                        if write_all_channels
+                        else {channel: checkpoint["channel_versions"][channel]}
+                    )
+                    config = await saver.aput(config, checkpoint, {}, new_versions)
+                bytes_written[(name, turn)] = round_trip_counter.bytes_sent
+
+            checkpoint_tuple = await saver.aget_tuple(
+                {"configurable": {"thread_id": name}}
+            )
+            assert checkpoint_tuple.checkpoint["channel_values"] == channel_values
+
+        with capsys.disabled():
+            print("\nAsyncDynamoDBSaver bytes written per turn (4 checkpoints)")
+            for (name, turn), sent in bytes_written.items():
+                if turn in (1, 10, 30):
+                    print(f"  {name + f' at turn {turn}':<48} sent: {sent / 1024:>8.1f} KB")
+
+        assert (
+            bytes_written[("changed channels", 30)]
+            < bytes_written[("full state", 30)] / 2
+        )
+
+
+@pytest.mark.benchmark
+class TestCheckpointCompactionBenchmark:
+    async def test_reclaimed_items_and_history_latency_after_compaction(
+        self, dynamodb_local_saver, capsys
+    ):
+        saver, round_trip_counter = dynamodb_local_saver
+        saver.retention_policy = RetentionPolicy(
+            keep_last=20, keep_newer_than=timedelta(0)
+        )
+        config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+        checkpoint = empty_checkpoint()
+        messages = []
+        for turn in range(1, 51):
+            for step, message in enumerate(_make_turn_messages(turn)):
+                messages = messages + [message]
+                checkpoint = create_checkpoint(checkpoint, None, step)
+                checkpoint["channel_values"] = {"messages": messages}
+                new_versions = {
+                    "messages": saver.get_next_version(
+                        checkpoint["channel_versions"].get("messages"), None
+                    )
+                }
+                checkpoint["channel_versions"] = new_versions
+                config = await saver.aput(config, checkpoint, {}, new_versions)
+                await saver.aput_writes(config, [("messages", message)], "task")
+        thread_config = {"configurable": {"thread_id": "thread"}}
+
+        async def list_history():
+            return [
+                checkpoint_tuple
+                async for checkpoint_tuple in saver.alist(thread_config)
+            ]
+
+        results = [
+            await measure(
+                "alist (full history) before compaction",
+                list_history,
+                round_trip_counter,
+                iterations=10,
+            )
+        ]
+        compaction_result = await saver.acompact_thread("thread")
+        results.append(
+            await measure(
+                "alist (full history) after compaction",
+                list_history,
+                round_trip_counter,
+                iterations=10,
+            )
+        )
+
+        with capsys.disabled():
+            report("AsyncDynamoDBSaver compaction (100 checkpoints)", results)
+            print(f"  {compaction_result}")
+
+        assert len(await list_history()) == 20
+        assert (await saver.aget_tuple(thread_config)).checkpoint == checkpoint
+        assert compaction_result.checkpoints == 80
+        assert results[1].bytes_received < results[0].bytes_received / 2
+
+
+@pytest.mark.benchmark
+class TestCheckpointDurabilityBenchmark:
+    async def test_super_step_latency_by_durability(self, dynamodb_local_saver, capsys):
+        dynamodb_local_saver, round_trip_counter = dynamodb_local_saver
+
+        results = []
+        for durability in Durability:
+            saver = AsyncDynamoDBSaver(
+                dynamodb_local_saver.client,
+                dynamodb_local_saver.table,
+                durability=durability,
+            )
+            saver.start()
+            config = {
+                "configurable": {"thread_id": durability.value, "checkpoint_ns": ""}
+            }
+            checkpoint = empty_checkpoint()
+            messages = []
+
+            async def super_step():
+                # What the graph waits for in a super-step: the checkpoint of the step and
+                # the writes of its task
+                nonlocal config, checkpoint, messages
+                question, answer = _make_turn_messages(len(messages))
+                messages = messages + [question, answer]
+                checkpoint = create_checkpoint(checkpoint, None, len(messages))
+                checkpoint["channel_values"] = {"messages": messages}
+                new_versions = {
+                    "messages": saver.get_next_version(
+                        checkpoint["channel_versions"].get("messages"), None
+                    )
+                }
+                checkpoint["channel_versions"] = new_versions
+                config = await saver.aput(config, checkpoint, {}, new_versions)
+                await saver.aput_writes(config, [("messages", answer)], "task")
+                # The next node runs, the background flusher gets to run meanwhile
+                await asyncio.sleep(0.005)
+
+            results.append(
+                await measure(
+                    f"aput_writes + aput ({durability.value})",
+                    super_step,
+                    round_trip_counter,
+                    iterations=30,
+                )
+            )
+            await saver.aclose()
+            if saver.write_buffer is not None:
+                results[-1].name += f", {saver.write_buffer.stats['flushes']} flushes"
+
+            checkpoint_tuple = await saver.aget_tuple(
+                {"configurable": {"thread_id": durability.value}}
+            )
+            assert checkpoint_tuple.checkpoint == checkpoint
+
+        with capsys.disabled():
+            report("AsyncDynamoDBSaver super-step latency by durability", results)
+
+        sync, async_, exit_ = results
+        assert exit_.round_trips == 0
+        assert async_.p50 < sync.p50
+
+
+@pytest.mark.benchmark
+class TestRedisTieredSaverBenchmark:
+    async def test_latest_aget_tuple_latency_by_tier(
+        self, redis_local_tiered_saver, capsys
+    ):
+        tiered_saver, round_trip_counter = redis_local_tiered_saver
+        config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+        checkpoint = empty_checkpoint()
+        messages = []
+        for turn in range(10):
+            messages = messages + _make_turn_messages(turn)
+            checkpoint = create_checkpoint(checkpoint, None, turn)
+            checkpoint["channel_values"] = {"messages": messages}
+            new_versions = {
+                "messages": tiered_saver.get_next_version(
+                    checkpoint["channel_versions"].get("messages"), None
+                )
+            }
+            checkpoint["channel_versions"] = new_versions
+            config = await tiered_saver.aput(config, checkpoint, {}, new_versions)
+            await tiered_saver.aput_writes(config, [("messages", messages[-1])], "task")
+        await tiered_saver.aflush()
+        latest_config = {"configurable": {"thread_id": "thread"}}
+
+        results = [
+            await measure(
+                f"aget_tuple (latest) from {name}",
+                lambda: saver.aget_tuple(latest_config),
+                round_trip_counter,
+            )
+            for name, saver in (
+                ("DynamoDB", tiered_saver.durable),
+                ("Redis", tiered_saver),
+            )
+        ]
+
+        with capsys.disabled():
+            report("AsyncRedisTieredSaver latest checkpoint reads", results)
+
+        dynamodb, redis = results
+        assert redis.round_trips == 0
+        assert redis.p50 < dynamodb.p50
+
+
+@pytest.mark.benchmark
+class TestCheckpointSerdeOffloadBenchmark:
+    async def test_event_loop_lag_under_concurrent_streams(
+        self, dynamodb_local_saver, capsys
+    ):
+        dynamodb_local_saver, round_trip_counter = dynamodb_local_saver
+        messages = []
+        for turn in range(200):
+            messages += _make_turn_messages(turn)
+        listings = [make_listing(i) for i in range(50)]
+
+        lines = []
+        lags = {}
+        for name, serde_thread_threshold in (("on the event loop", 0), ("offloaded", 64 * 1024)):
+            saver = AsyncDynamoDBSaver(
+                dynamodb_local_saver.client,
+                dynamodb_local_saver.table,
+                serde=MsgpackSerializer(),
+                serde_thread_threshold=serde_thread_threshold,
+            )
+            monitor = EventLoopLagMonitor(interval_seconds=0.002, warn_threshold_ms=1000)
+            stop = asyncio.Event()
+
+            async def stream():
+                # An SSE stream sending a chunk every few milliseconds
+                while not stop.is_set():
+                    await asyncio.sleep(0.002)
+
+            async def conversation(thread_id: str):
+                config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+                checkpoint = empty_checkpoint()
+                for step in range(5):
+                    checkpoint = create_checkpoint(checkpoint, None, step)
+                    checkpoint["channel_values"] = {
+                        "messages": messages,
+                        "retrieved_property_listings": listings,
+                    }
+                    new_versions = {
+                        channel: saver.get_next_version(
+                            checkpoint["channel_versions"].get(channel), None
+                        )
+                        for channel in checkpoint["channel_values"]
+                    }
+                    checkpoint["channel_versions"] = new_versions
+                    config = await saver.aput(config, checkpoint, {}, new_versions)
+                    await saver.aget_tuple({"configurable": {"thread_id": thread_id}})
+
+            streams = [asyncio.create_task(stream()) for _ in range(20)]
+            monitor.start()
+            await asyncio.gather(
+                *(conversation(f"{serde_thread_threshold}-{i}") for i in range(4))
+            )
+            await monitor.aclose()
+            stop.set()
+            await asyncio.gather(*streams)
+
+            lags[name] = monitor.stats
+            lines.append(
+                f"{name:<20} lag p50: {monitor.stats['lag_ms_p50']:>6.2f} ms"
+                f"   p99: {monitor.stats['lag_ms_p99']:>6.2f} ms"
+                f"   max: {monitor.stats['lag_ms_max']:>6.2f} ms"
+                f"   {saver.serde_offloader.stats}"
+            )
+
+        with capsys.disabled():
+            print("\nEvent loop lag with 4 conversations of 200 turns and 20 streams")
+            for line in lines:
+                print(f"  {line}")
+
+        assert lags["offloaded"]["lag_ms_max"] < lags["on the event loop"]["lag_ms_max"]
@@ -0,0 +1,176 @@
+import pytest
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from .utils import measure, report
+
+# Runs against every checkpoint saver of CHECKPOINT_SAVER_FIXTURES in conftest.py, the
+# assertions only check how the round trips scale, not the number of round trips of a saver
+
+THREAD_LENGTHS = (10, 50, 200)
+CHECKPOINT_NAMESPACES = ("", "retrieve:1", "retrieve:1|rerank:2")
+WRITES_COUNTS = (1, 10, 100)
+
+
+class _Thread:
+    """Puts the checkpoints of a thread namespace, each adds a message to the messages channel."""
+
+    def __init__(self, saver, thread_id: str, checkpoint_ns: str = ""):
+        self.saver = saver
+        self.latest_config = {
+            "configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        }
+        self.config = self.latest_config
+        self.checkpoint = empty_checkpoint()
+        self.configs = []
+
+    async def aput(self) -> dict:
+        step = len(self.configs)
+        self.checkpoint = create_checkpoint(self.checkpoint, None, step)
+        messages = self.checkpoint["channel_values"].get("messages", [])
+        self.checkpoint["channel_values"] = {
+            "messages": messages + [f"Message {step} of the conversation " * 10]
+        }
+        new_versions = {
+            "messages": self.saver.get_next_version(
+                self.checkpoint["channel_versions"].get("messages"), None
+            )
+        }
+        self.checkpoint["channel_versions"] = new_versions
+        self.config = await self.saver.aput(
+            self.config, self.checkpoint, {"source": "loop", "step": step}, new_versions
+        )
+        self.configs.append(self.config)
+        return self.config
+
+    async def aput_steps(self, steps: int) -> None:
+        for _ in range(steps):
+            await self.aput()
+        await _aflush(self.saver)
+
+
+async def _aflush(saver) -> None:
+    # Savers that write behind are flushed so the round trips of the background writes are not
+    # counted in the next measurement
+    if hasattr(saver, "aflush"):
+        await saver.aflush()
+
+
+@pytest.mark.benchmark
+class TestCheckpointSaverBenchmark:
+    async def test_round_trips_and_latency_by_thread_length(
+        self, metered_checkpoint_saver, capsys
+    ):
+        saver, round_trip_counter = metered_checkpoint_saver
+
+        results = {}
+        for thread_length in THREAD_LENGTHS:
+            thread = _Thread(saver, f"thread-{thread_length}-checkpoints")
+            await thread.aput_steps(thread_length)
+            first_config = thread.configs[0]
+
+            async def list_history():
+                return [
+                    checkpoint_tuple
+                    async for checkpoint_tuple in saver.alist(thread.latest_config, limit=10)
+                ]
+
+            assert (await saver.aget_tuple(thread.latest_config)).config == thread.config
+            assert (await saver.aget_tuple(first_config)).config == first_config
+            assert len(await list_history()) == 10
+
+            for operation, name in (
+                (lambda: saver.aget_tuple(thread.latest_config), "aget_tuple (latest)"),
+                (lambda: saver.aget_tuple(first_config), "aget_tuple (first)"),
+                (list_history, "alist(limit=10)"),
+            ):
+                results[(name, thread_length)] = await measure(
+                    f"{name} with {thread_length} checkpoints",
+                    operation,
+                    round_trip_counter,
+                )
+            results[("aput", thread_length)] = await measure(
+                f"aput with {thread_length} checkpoints",
+                thread.aput,
+                round_trip_counter,
+                iterations=20,
+            )
+            await _aflush(saver)
+
+        with capsys.disabled():
+            report(f"{type(saver).__name__} by thread length", list(results.values()))
+
+        # Reading a checkpoint or a page of history must not get slower as the thread grows
+        for name in ("aget_tuple (latest)", "aget_tuple (first)", "alist(limit=10)"):
+            assert len({results[(name, length)].round_trips for length in THREAD_LENGTHS}) == 1
+
+    async def test_round_trips_and_latency_by_namespace(
+        self, metered_checkpoint_saver, capsys
+    ):
+        saver, round_trip_counter = metered_checkpoint_saver
+        threads = {
+            checkpoint_ns: _Thread(saver, "thread", checkpoint_ns)
+            for checkpoint_ns in CHECKPOINT_NAMESPACES
+        }
+        for thread in threads.values():
+            await thread.aput_steps(10)
+
+        results = []
+        for checkpoint_ns, thread in threads.items():
+            checkpoint_tuple = await saver.aget_tuple(thread.latest_config)
+            assert checkpoint_tuple.config == thread.config
+            assert checkpoint_tuple.checkpoint == thread.checkpoint
+
+            results.append(
+                await measure(
+                    f"aget_tuple (latest) in ns {checkpoint_ns!r}",
+                    lambda: saver.aget_tuple(thread.latest_config),
+                    round_trip_counter,
+                )
+            )
+
+        with capsys.disabled():
+            report(f"{type(saver).__name__} by checkpoint namespace", results)
+
+        # Subgraph namespaces are read like the root namespace
+        assert len({result.round_trips for result in results}) == 1
+
+    async def test_round_trips_and_latency_by_writes_count(
+        self, metered_checkpoint_saver, capsys
+    ):
+        saver, round_trip_counter = metered_checkpoint_saver
+
+        results = {}
+        for writes_count in WRITES_COUNTS:
+            thread = _Thread(saver, f"thread-{writes_count}-writes")
+            await thread.aput_steps(1)
+            writes = [
+                (f"channel_{i}", f"Write {i} of the task " * 10) for i in range(writes_count)
+            ]
+
+            results[("aput_writes", writes_count)] = await measure(
+                f"aput_writes with {writes_count} writes",
+                lambda: saver.aput_writes(thread.config, writes, task_id="task"),
+                round_trip_counter,
+                iterations=20,
+            )
+            await _aflush(saver)
+            assert len((await saver.aget_tuple(thread.latest_config)).pending_writes) == (
+                writes_count
+            )
+
+            results[("aget_tuple", writes_count)] = await measure(
+                f"aget_tuple (latest) with {writes_count} pending writes",
+                lambda: saver.aget_tuple(thread.latest_config),
+                round_trip_counter,
+            )
+
+        with capsys.disabled():
+            report(f"{type(saver).__name__} by writes count", list(results.values()))
+
+        # The pending writes are read along with the checkpoint, many of them may take one
+        # more round trip
+        sequential_round_trips = [
+            results[("aget_tuple", count)].sequential_round_trips for count in WRITES_COUNTS
+        ]
+        assert sequential_round_trips[0] == sequential_round_trips[1]
+        assert sequential_round_trips[-1] <= sequential_round_trips[0] + 1
@@ -0,0 +1,128 @@
+import os
+import statistics
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+import pytest
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from ...llm import LLMRegistry
+from ...schemas import LLMChain, QuestionIntent
+from ..conftest import is_listening
+
+QUESTIONS = [
+    "Find me a 2-room apartment in Espoo under 300 000 euros",
+    "I'm looking for a house in Vantaa with at least 4 rooms",
+    "Show me studios in Kallio",
+    "Any row houses for sale in Tampere built after 2000?",
+    "I want a 3 room flat in Helsinki with a sauna and a balcony",
+    "Apartments near the sea in Lauttasaari, max 450k",
+    "Looking for a place to buy in Turku",
+    "I want to buy a home",
+    "What is the transfer tax on an apartment?",
+    "Hello!",
+]
+
+OPENAI_BASE_URL = httpx.URL(os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"))
+
+
+class _TokenCounter(AsyncCallbackHandler):
+    """Counts the LLM calls and the tokens they used, the chat models stream their usage."""
+
+    def __init__(self):
+        self.usage: Counter = Counter()
+
+    async def on_llm_end(self, response: LLMResult, **kwargs) -> None:
+        self.usage["calls"] += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage_metadata = getattr(generation.message, "usage_metadata", None) or {}
+                self.usage["input_tokens"] += usage_metadata.get("input_tokens", 0)
+                self.usage["output_tokens"] += usage_metadata.get("output_tokens", 0)
+
+
+@dataclass
+class _PathResult:
+    name: str
+    latencies_ms: list[float] = field(default_factory=list)
+    usage: Counter = field(default_factory=Counter)
+    predictions: list[tuple] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        questions = len(self.latencies_ms)
+        return (
+            f"{self.name:<12} LLM calls: {self.usage['calls'] / questions:>4.1f}"
+            f"   input tokens: {self.usage['input_tokens'] / questions:>7.1f}"
+            f"   output tokens: {self.usage['output_tokens'] / questions:>6.1f}"
+            f"   p50: {statistics.median(self.latencies_ms):>7.1f} ms"
+            f"   mean: {statistics.mean(self.latencies_ms):>7.1f} ms"
+        )
+
+
+async def _asequential(registry: LLMRegistry, question: str, config: dict) -> tuple:
+    """detect_intent then build_search_properties_filters, as the sequential graph runs them."""
+    response = await registry.get_chain(LLMChain.INTENT_DETECTION).ainvoke(
+        {"chat_history": [], "question": question}, config
+    )
+    if response.intent != QuestionIntent.FINDING_PROPERTY:
+        return response.intent, None
+
+    filters_response = await registry.get_chain(
+        LLMChain.BUILD_SEARCH_PROPERTIES_FILTERS
+    ).ainvoke({"question": question}, config)
+    return response.intent, filters_response.filters.city
+
+
+async def _acombined(registry: LLMRegistry, question: str, config: dict) -> tuple:
+    """detect_intent_with_search_properties_filters, the combined graph's single call."""
+    response = await registry.get_chain(
+        LLMChain.INTENT_DETECTION_WITH_SEARCH_PROPERTIES_FILTERS
+    ).ainvoke({"chat_history": [], "question": question}, config)
+    if response.intent != QuestionIntent.FINDING_PROPERTY:
+        return response.intent, None
+
+    return response.intent, response.to_search_properties_filters_response().filters.city
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(
+    not is_listening(OPENAI_BASE_URL.host, OPENAI_BASE_URL.port or 443),
+    reason="OpenAI is not reachable",
+)
+class TestIntentDetectionBenchmark:
+    """Compares the sequential intent detection and filters building of a property search
+    with the combined single call, on a fixed set of questions against OpenAI."""
+
+    async def test_sequential_and_combined_latency_and_tokens(self, capsys):
+        registry = LLMRegistry()
+        results = [_PathResult("sequential"), _PathResult("combined")]
+        for result, apath in zip(results, (_asequential, _acombined)):
+            await apath(registry, QUESTIONS[-1], {})  # warm up the connection
+            for question in QUESTIONS:
+                token_counter = _TokenCounter()
+                started_at = time.perf_counter()
+                prediction = await apath(
+                    registry, question, {"callbacks": [token_counter]}
+                )
+                result.latencies_ms.append((time.perf_counter() - started_at) * 1000)
+                result.usage.update(token_counter.usage)
+                result.predictions.append(prediction)
+        await registry.aclose()
+
+        sequential, combined = results
+        agreement = sum(
+            a == b for a, b in zip(sequential.predictions, combined.predictions)
+        ) / len(QUESTIONS)
+        with capsys.disabled():
+            print(f"\nIntent detection and filters building ({len(QUESTIONS)} questions)")
+            for result in results:
+                print(f"  {result}")
+            print(f"  Intent and city agreement: {agreement:.0%}")
+            for question, a, b in zip(
+                QUESTIONS, sequential.predictions, combined.predictions
+            ):
+                if a != b:
+                    print(f"    {question!r}: sequential {a}, combined {b}")
@@ -0,0 +1,121 @@
+import os
+import statistics
+import time
+
+import httpx
+import pytest
+
+from src.common.prompts import generate_properties_search_answer_prompt
+from src.properties.schemas import Property
+
+from ...history import get_tokenizer
+from ...listings import get_listing_renderer
+from ...llm import LLMRegistry
+from ...schemas import LLMChain
+from ..conftest import is_listening
+from .utils import make_listing
+
+QUESTION = "Find me a 2-room apartment in Kallio with a sauna under 300 000 euros"
+LISTINGS = [make_listing(i) for i in range(5)]
+
+OPENAI_BASE_URL = httpx.URL(os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"))
+
+
+def _render_verbose(properties: list[Property]) -> str:
+    """The listings rendering before the compact renderer, 17 indented lines per listing."""
+    property_details_template = ""
+    for index, property in enumerate(properties):
+        property_details_template += f"""
+        {index + 1}. {property.location}
+        # URL: {property.url}
+        # Location: {property.location}
+        # District: {property.district}
+        # Building type: {property.building_type}
+        # Housing type: {property.housing_type}
+        # Debt-free price: {property.debt_free_price}
+        # Living area: {property.living_area}
+        # Build year: {property.build_year}
+        # Apartment layout: {property.apartment_layout}
+        # Plot ownership: {property.plot_ownership}
+        # Maintenance charge: {property.maintenance_charge}
+        # Water charge: {property.water_charge}
+        # Total housing charge: {property.total_housing_charge}
+        # Completed renovations: {property.completed_renovations}
+        # Future renovations: {property.future_renovations}
+        # Has sauna: {property.building_has_sauna}
+        # Has elevator: {property.building_has_elevator}
+        """
+    return property_details_template
+
+
+RENDERERS = {
+    "verbose": _render_verbose,
+    "compact": get_listing_renderer().render,
+}
+
+
+def _prompt_tokens(property_listings: str) -> int:
+    count_tokens = get_tokenizer()
+    messages = generate_properties_search_answer_prompt.format_messages(
+        property_listings=property_listings, question=QUESTION
+    )
+    return sum(count_tokens(message.content) for message in messages)
+
+
+@pytest.mark.benchmark
+class TestListingRenderingBenchmark:
+    """Compares the prompt of the properties search answer with the verbose and the compact
+    rendering of the same listings."""
+
+    def test_prompt_tokens_and_render_time(self, capsys):
+        results = {}
+        for name, render in RENDERERS.items():
+            started_at = time.perf_counter()
+            for _ in range(1000):
+                property_listings = render(LISTINGS)
+            render_us = (time.perf_counter() - started_at) * 1000
+            results[name] = (_prompt_tokens(property_listings), render_us)
+
+        with capsys.disabled():
+            print(f"\nProperties search answer prompt with {len(LISTINGS)} listings")
+            for name, (tokens, render_us) in results.items():
+                print(
+                    f"  {name:<8} prompt tokens: {tokens:>6}   render: {render_us:>7.1f} µs"
+                )
+
+        assert results["compact"][0] < results["verbose"][0]
+
+    @pytest.mark.skipif(
+        not is_listening(OPENAI_BASE_URL.host, OPENAI_BASE_URL.port or 443),
+        reason="OpenAI is not reachable",
+    )
+    async def test_time_to_first_token(self, capsys):
+        registry = LLMRegistry()
+        llm = registry.get_chain(LLMChain.GENERATE_PROPERTIES_SEARCH_ANSWER)
+
+        results = {}
+        for name, render in RENDERERS.items():
+            inputs = {"property_listings": render(LISTINGS), "question": QUESTION}
+            await llm.ainvoke(inputs)  # warm up the connection
+            ttfts_ms = []
+            input_tokens = 0
+            for _ in range(5):
+                started_at = time.perf_counter()
+                ttft_ms = None
+                async for chunk in llm.astream(inputs):
+                    if ttft_ms is None and chunk.content:
+                        ttft_ms = (time.perf_counter() - started_at) * 1000
+                    if chunk.usage_metadata:
+                        input_tokens = chunk.usage_metadata["input_tokens"]
+                ttfts_ms.append(ttft_ms)
+            results[name] = (input_tokens, ttfts_ms)
+        await registry.aclose()
+
+        with capsys.disabled():
+            print("\nTime to first token of the properties search answer")
+            for name, (input_tokens, ttfts_ms) in results.items():
+                print(
+                    f"  {name:<8} input tokens: {input_tokens:>6}"
+                    f"   TTFT p50: {statistics.median(ttfts_ms):>7.1f} ms"
+                    f"   mean: {statistics.mean(ttfts_ms):>7.1f} ms"
+                )
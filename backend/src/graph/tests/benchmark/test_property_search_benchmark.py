@@ -0,0 +1,232 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from enum import Enum
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import boto3
+import pytest
+from aiodynamo.client import Client
+from aiodynamo.credentials import Key, StaticCredentials
+from aiodynamo.http.aiohttp import AIOHTTP
+from aiohttp import ClientSession, TCPConnector, web
+from boto3.dynamodb.types import TypeSerializer
+from decimal import Decimal
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph
+from opensearchpy import (
+    AsyncHttpConnection,
+    AsyncOpenSearch,
+    OpenSearch,
+    RequestsHttpConnection,
+)
+from yarl import URL
+
+from src.common.constants import Database
+from src.core.config import settings
+from src.core.event_loop import EventLoopLagMonitor
+from src.properties.schemas import SearchPropertiesFilters
+from src.properties.service import AsyncPropertySearchService, search_properties
+
+from ...nodes import find_property_listings
+from ...schemas import GraphNode, OverallState
+from .utils import make_listing
+
+# Latency of an OpenSearch search and of a DynamoDB batch get, the round trip to the AWS
+# services along with the time they take to serve the request
+SERVICE_LATENCY_SECONDS = 0.05
+CONCURRENT_STREAMS = (8, 32, 128)
+LISTINGS_PER_SEARCH = 5
+
+
+def _to_dynamodb_item(listing_id: int) -> dict:
+    serializer = TypeSerializer()
+    item = make_listing(listing_id).model_dump(exclude_none=True)
+    return {
+        key: serializer.serialize(value.value if isinstance(value, Enum) else value)
+        for key, value in item.items()
+    }
+
+
+DYNAMODB_ITEMS = {i: _to_dynamodb_item(i) for i in range(LISTINGS_PER_SEARCH)}
+
+
+async def _search(request: web.Request) -> web.Response:
+    await asyncio.sleep(SERVICE_LATENCY_SECONDS)
+    hits = [{"_source": {"id": i}} for i in range(LISTINGS_PER_SEARCH)]
+    return web.json_response({"hits": {"total": {"value": 120}, "hits": hits}})
+
+
+async def _batch_get_item(request: web.Request) -> web.Response:
+    await asyncio.sleep(SERVICE_LATENCY_SECONDS)
+    keys = json.loads(await request.read())["RequestItems"][
+        Database.PROPERTIES_TABLE_NAME
+    ]["Keys"]
+    items = [DYNAMODB_ITEMS[int(key["id"]["N"])] for key in keys]
+    return web.Response(
+        body=json.dumps(
+            {
+                "Responses": {Database.PROPERTIES_TABLE_NAME: items},
+                "UnprocessedKeys": {},
+            }
+        ),
+        content_type="application/x-amz-json-1.0",
+    )
+
+
+@pytest.fixture
+def aws_services_url():
+    """Yields the URL of a server answering OpenSearch searches and DynamoDB batch gets of
+    property listings after SERVICE_LATENCY_SECONDS.
+
+    The server runs its own event loop in a thread, so serving the requests does not add to
+    the event loop lag of the worker under test.
+    """
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_post("/properties/_search", _search)
+    app.router.add_post("/", _batch_get_item)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", 0).start())
+    host, port = runner.addresses[0]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    yield URL.build(scheme="http", host=host, port=port)
+
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def _find_property_listings_in_thread(state: OverallState) -> OverallState:
+    """The sync node before the async property search, LangGraph runs it in a thread."""
+    search_properties_response = search_properties(state["search_properties_filters"], 5)
+    return OverallState(
+        messages=[AIMessage(content="Let me find the property listings for you...")],
+        retrieved_property_listings=search_properties_response.properties,
+    )
+
+
+def _build_graph(node):
+    builder = StateGraph(OverallState)
+    builder.add_node(GraphNode.FIND_PROPERTY_LISTINGS, node)
+    builder.add_edge(START, GraphNode.FIND_PROPERTY_LISTINGS)
+    builder.add_edge(GraphNode.FIND_PROPERTY_LISTINGS, END)
+    return builder.compile()
+
+
+async def _aload(graph, streams: int) -> dict[str, float]:
+    """Runs streams concurrent searches while SSE streams send a chunk every 2 ms."""
+    monitor = EventLoopLagMonitor(interval_seconds=0.002, warn_threshold_ms=1000)
+    stop = asyncio.Event()
+
+    async def sse_stream():
+        while not stop.is_set():
+            await asyncio.sleep(0.002)
+
+    async def search(index: int):
+        started_at = time.perf_counter()
+        # Distinct filters, identical concurrent searches would share one search
+        filters = SearchPropertiesFilters(
+            city="Helsinki", max_debt_free_price=300_000 + index
+        )
+        output = await graph.ainvoke({"search_properties_filters": filters})
+        assert len(output["retrieved_property_listings"]) == LISTINGS_PER_SEARCH
+        return (time.perf_counter() - started_at) * 1000
+
+    sse_streams = [asyncio.create_task(sse_stream()) for _ in range(20)]
+    monitor.start()
+    started_at = time.perf_counter()
+    latencies_ms = await asyncio.gather(*(search(i) for i in range(streams)))
+    elapsed = time.perf_counter() - started_at
+    await monitor.aclose()
+    stop.set()
+    await asyncio.gather(*sse_streams)
+
+    return {
+        "throughput": streams / elapsed,
+        "p50": statistics.median(latencies_ms),
+        "p95": statistics.quantiles(latencies_ms, n=100, method="inclusive")[94],
+        "lag_ms_p99": monitor.stats["lag_ms_p99"],
+    }
+
+
+@pytest.mark.benchmark
+class TestPropertySearchLoadBenchmark:
+    async def test_concurrent_stream_throughput_per_worker(self, aws_services_url, capsys):
+        opensearch_client = OpenSearch(
+            hosts=[{"host": aws_services_url.host, "port": aws_services_url.port}],
+            connection_class=RequestsHttpConnection,
+            pool_maxsize=20,
+        )
+        dynamodb = SimpleNamespace(
+            resource=boto3.resource(
+                "dynamodb",
+                region_name=settings.AWS_REGION_NAME,
+                endpoint_url=str(aws_services_url),
+                aws_access_key_id="local",
+                aws_secret_access_key="local",
+            )
+        )
+        session = ClientSession(
+            connector=TCPConnector(limit=settings.PROPERTY_SEARCH_MAX_CONNECTIONS)
+        )
+        property_search_service = AsyncPropertySearchService(
+            AsyncOpenSearch(
+                hosts=[{"host": aws_services_url.host, "port": aws_services_url.port}],
+                connection_class=AsyncHttpConnection,
+                maxsize=settings.PROPERTY_SEARCH_MAX_CONNECTIONS,
+            ),
+            Client(
+                http=AIOHTTP(session),
+                credentials=StaticCredentials(Key("local", "local")),
+                region=settings.AWS_REGION_NAME,
+                endpoint=aws_services_url,
+                numeric_type=Decimal,
+            ),
+        )
+        graphs = {
+            "sync in threads": _build_graph(_find_property_listings_in_thread),
+            "async": _build_graph(find_property_listings),
+        }
+
+        results = {}
+        with (
+            patch("src.properties.service.opensearch_client", opensearch_client),
+            patch("src.properties.service.get_db", return_value=dynamodb),
+            patch(
+                "src.graph.nodes.get_property_search_service",
+                return_value=property_search_service,
+            ),
+        ):
+            for name, graph in graphs.items():
+                await _aload(graph, 4)  # warm up connections
+                for streams in CONCURRENT_STREAMS:
+                    results[name, streams] = await _aload(graph, streams)
+        await property_search_service.aclose()
+        await session.close()
+
+        with capsys.disabled():
+            print(
+                "\nfind_property_listings under concurrent streams, "
+                f"{SERVICE_LATENCY_SECONDS * 1000:.0f} ms per OpenSearch and DynamoDB request"
+            )
+            for (name, streams), result in results.items():
+                print(
+                    f"  {name:<16} {streams:>4} streams"
+                    f"   throughput: {result['throughput']:>7.1f} searches/s"
+                    f"   p50: {result['p50']:>7.1f} ms   p95: {result['p95']:>7.1f} ms"
+                    f"   loop lag p99: {result['lag_ms_p99']:>6.2f} ms"
+                )
+
+        most_streams = CONCURRENT_STREAMS[-1]
+        assert (
+            results["async", most_streams]["throughput"]
+            > results["sync in threads", most_streams]["throughput"]
+        )
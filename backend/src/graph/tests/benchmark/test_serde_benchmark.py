@@ -0,0 +1,77 @@
+import statistics
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.properties.schemas import SearchPropertiesFilters
+
+from ...schemas import QuestionIntent, RetrievedDocument
+from ...serde import MsgpackSerializer
+from .utils import make_listing
+
+
+def _make_state(turns: int) -> dict:
+    """An OverallState snapshot after a property search conversation of the given turns."""
+    messages = []
+    for turn in range(turns):
+        messages += [
+            HumanMessage(content=f"Show me 2-room apartments in Kallio, turn {turn}"),
+            AIMessage(
+                content="Here are a few listings matching your search. " * 10,
+                response_metadata={"model_name": "gpt-4o-mini", "finish_reason": "stop"},
+            ),
+        ]
+    return {
+        "messages": messages,
+        "intent": QuestionIntent.FINDING_PROPERTY,
+        "documents": [
+            RetrievedDocument(
+                id=f"doc-{i}",
+                content="Transfer tax of a housing company share is 1.5%. " * 20,
+                metadata={"source": "guide.pdf", "page": i},
+            )
+            for i in range(5)
+        ],
+        "search_properties_filters": SearchPropertiesFilters(
+            city="Helsinki", district="Kallio"
+        ),
+        "has_enough_search_properties_filters": True,
+        "retrieved_property_listings": [make_listing(i) for i in range(10)],
+    }
+
+
+def _p50_ms(operation, iterations: int) -> float:
+    latencies_ms = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        operation()
+        latencies_ms.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(latencies_ms)
+
+
+@pytest.mark.benchmark
+class TestCheckpointSerializerBenchmark:
+    def test_encode_decode_latency_and_size_by_turns(self, capsys):
+        lines = []
+        for turns in (1, 10, 50):
+            state = _make_state(turns)
+            for serde in (JsonPlusSerializer(), MsgpackSerializer()):
+                data = serde.dumps_typed(state)
+                assert serde.loads_typed(data) == state
+
+                iterations = 200 if turns < 50 else 50
+                encode_ms = _p50_ms(lambda: serde.dumps_typed(state), iterations)
+                decode_ms = _p50_ms(lambda: serde.loads_typed(data), iterations)
+                lines.append(
+                    f"{type(serde).__name__:<20} {turns:>3} turns"
+                    f"   size: {len(data[1]) / 1024:>7.1f} KB"
+                    f"   encode p50: {encode_ms:>7.3f} ms"
+                    f"   decode p50: {decode_ms:>7.3f} ms"
+                )
+
+        with capsys.disabled():
+            print("\nCheckpoint serializers (OverallState snapshot)")
+            for line in lines:
+                print(f"  {line}")
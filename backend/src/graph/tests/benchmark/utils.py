@@ -0,0 +1,105 @@
+import statistics
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Awaitable, Callable
+
+from src.properties.schemas import BuildingType, HousingType, Property
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    latencies_ms: list[float]
+    round_trips: float
+    sequential_round_trips: float
+    bytes_sent: float
+    bytes_received: float
+    consumed_capacity: float = 0.0
+
+    @property
+    def p50(self) -> float:
+        return statistics.median(self.latencies_ms)
+
+    @property
+    def p95(self) -> float:
+        return statistics.quantiles(self.latencies_ms, n=100, method="inclusive")[94]
+
+    @property
+    def p99(self) -> float:
+        return statistics.quantiles(self.latencies_ms, n=100, method="inclusive")[98]
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<48} round trips: {self.round_trips:>6.1f}"
+            f"   sequential: {self.sequential_round_trips:>6.1f}"
+            f"   capacity: {self.consumed_capacity:>6.1f}"
+            f"   sent: {self.bytes_sent / 1024:>8.1f} KB"
+            f"   received: {self.bytes_received / 1024:>8.1f} KB"
+            f"   p50: {self.p50:>8.2f} ms   p95: {self.p95:>8.2f} ms"
+            f"   p99: {self.p99:>8.2f} ms"
+        )
+
+
+async def measure(
+    name: str,
+    operation: Callable[[], Awaitable],
+    round_trip_counter,
+    iterations: int = 50,
+) -> BenchmarkResult:
+    """Runs an async operation repeatedly and records its latency, DynamoDB round trips
+    (in total and sequential), bytes and consumed capacity units."""
+    await operation()  # warm up connections
+
+    latencies_ms = []
+    round_trip_counter.reset()
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        await operation()
+        latencies_ms.append((time.perf_counter() - started_at) * 1000)
+
+    return BenchmarkResult(
+        name=name,
+        latencies_ms=latencies_ms,
+        round_trips=round_trip_counter.total / iterations,
+        sequential_round_trips=round_trip_counter.sequential / iterations,
+        bytes_sent=round_trip_counter.bytes_sent / iterations,
+        bytes_received=round_trip_counter.bytes_received / iterations,
+        consumed_capacity=round_trip_counter.consumed_capacity / iterations,
+    )
+
+
+def report(title: str, results: list[BenchmarkResult]) -> None:
+    print(f"\n{title}")
+    for result in results:
+        print(f"  {result}")
+
+
+def make_listing(listing_id: int) -> Property:
+    """A listing with the fields scraped for a typical Helsinki apartment."""
+    return Property(
+        id=listing_id,
+        oikotie_id=20_000_000 + listing_id,
+        url=f"https://asunnot.oikotie.fi/myytavat-asunnot/helsinki/{listing_id}",
+        image_urls=[f"https://cdn.oikotie.fi/{listing_id}/{i}.jpg" for i in range(8)],
+        location="Helsinginkatu 10, Kallio, Helsinki",
+        city="Helsinki",
+        district="Kallio",
+        building_type=BuildingType.APARTMENT,
+        housing_type=HousingType.OWNERSHIP,
+        build_year=1938,
+        floor=3,
+        total_floors=6,
+        living_area=Decimal("54.5"),
+        apartment_layout="2h + kk + s",
+        number_of_rooms=2,
+        has_balcony=True,
+        building_has_elevator=True,
+        building_has_sauna=True,
+        energy_class="D",
+        heating="District heating",
+        completed_renovations="Pipe renovation 2015, facade 2019. " * 3,
+        debt_free_price=Decimal("289000.00") + listing_id,
+        sales_price=Decimal("275000.00"),
+        maintenance_charge=Decimal("245.25"),
+    )
@@ -0,0 +1,211 @@
+import socket
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Mapping
+from uuid import uuid4
+
+import pytest
+from aiodynamo.client import Client
+from aiodynamo.credentials import Key, StaticCredentials
+from aiodynamo.http.aiohttp import AIOHTTP
+from aiodynamo.http.types import Request, Response
+from aiohttp import ClientSession
+from redis.asyncio import Redis
+from yarl import URL
+
+from src.common.constants import Durability
+from src.core.config import settings
+
+from ..checkpoint import AsyncDynamoDBSaver
+from ..tiered import AsyncRedisTieredSaver
+
+DYNAMODB_LOCAL_HOST = "localhost"
+DYNAMODB_LOCAL_PORT = 8000
+REDIS_LOCAL_HOST = "localhost"
+REDIS_LOCAL_PORT = 6379
+
+# The actions DynamoDB reports the consumed capacity of with ReturnConsumedCapacity
+CAPACITY_ACTIONS = frozenset(
+    {
+        "BatchGetItem",
+        "BatchWriteItem",
+        "DeleteItem",
+        "GetItem",
+        "PutItem",
+        "Query",
+        "Scan",
+        "TransactGetItems",
+        "TransactWriteItems",
+        "UpdateItem",
+    }
+)
+
+# The fixtures of the checkpoint savers the conformance tests and the checkpoint saver
+# benchmarks run against, an alternative saver only needs a fixture added here
+CHECKPOINT_SAVER_FIXTURES = {
+    "dynamodb": "dynamodb_local_saver",
+    "redis_tiered": "redis_local_tiered_saver",
+}
+
+
+def pytest_collection_modifyitems(config, items):
+    """Benchmarks are slow, they only run when explicitly selected with `-m benchmark`."""
+    if "benchmark" in (config.getoption("-m") or ""):
+        return
+
+    skip_benchmark = pytest.mark.skip(reason="select with -m benchmark to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+def is_listening(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def is_dynamodb_local_running() -> bool:
+    return is_listening(DYNAMODB_LOCAL_HOST, DYNAMODB_LOCAL_PORT)
+
+
+@dataclass
+class RoundTripCounter:
+    """aiodynamo HTTP implementation that counts the DynamoDB requests per action.
+
+    The size of the request and response bodies is counted as well, along with the capacity
+    units consumed by the requests of a `CapacityMeteredClient`. Requests sent while no other
+    request is in flight are counted as sequential round trips, so requests sent concurrently
+    only count once.
+    """
+
+    http: AIOHTTP
+    actions: Counter = field(default_factory=Counter)
+    sequential: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    consumed_capacity: float = 0.0
+    in_flight: int = 0
+
+    async def __call__(self, request: Request) -> Response:
+        action = (request.headers or {}).get("X-Amz-Target", "").split(".")[-1]
+        self.actions[action] += 1
+        self.sequential += not self.in_flight
+        self.bytes_sent += len(request.body or b"")
+        self.in_flight += 1
+        try:
+            response = await self.http(request)
+        finally:
+            self.in_flight -= 1
+        self.bytes_received += len(response.body)
+        return response
+
+    @property
+    def total(self) -> int:
+        return sum(self.actions.values())
+
+    def add_consumed_capacity(self, consumed_capacity: dict | list[dict] | None) -> None:
+        # Batch and transaction actions report the capacity consumed per table
+        if isinstance(consumed_capacity, dict):
+            consumed_capacity = [consumed_capacity]
+        self.consumed_capacity += sum(
+            table_capacity.get("CapacityUnits", 0.0)
+            for table_capacity in consumed_capacity or []
+        )
+
+    def reset(self) -> None:
+        self.actions.clear()
+        self.sequential = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.consumed_capacity = 0.0
+
+
+class CapacityMeteredClient(Client):
+    """aiodynamo client that asks DynamoDB for the capacity consumed by each request.
+
+    The consumed capacity is added to the `RoundTripCounter` the client sends requests with.
+    """
+
+    async def send_request(
+        self, *, action: str, payload: Mapping[str, Any]
+    ) -> dict[str, Any]:
+        if action not in CAPACITY_ACTIONS:
+            return await super().send_request(action=action, payload=payload)
+
+        response = await super().send_request(
+            action=action, payload={**payload, "ReturnConsumedCapacity": "TOTAL"}
+        )
+        self.http.add_consumed_capacity(response.get("ConsumedCapacity"))
+        return response
+
+
+@pytest.fixture
+async def dynamodb_local():
+    """Yields an aiodynamo client against dynamodb-local along with its round trip counter."""
+    if not is_dynamodb_local_running():
+        pytest.skip("dynamodb-local is not running, start it with docker/docker-compose.yml")
+
+    async with ClientSession() as session:
+        http = RoundTripCounter(AIOHTTP(session))
+        client = CapacityMeteredClient(
+            http=http,
+            credentials=StaticCredentials(Key("local", "local")),
+            region=settings.AWS_REGION_NAME,
+            endpoint=URL.build(
+                scheme="http", host=DYNAMODB_LOCAL_HOST, port=DYNAMODB_LOCAL_PORT
+            ),
+        )
+        yield client, http
+
+
+@pytest.fixture
+async def dynamodb_local_saver(dynamodb_local):
+    """Yields an AsyncDynamoDBSaver backed by a throwaway table in dynamodb-local."""
+    client, http = dynamodb_local
+    saver = AsyncDynamoDBSaver(client, client.table(f"Checkpoints-{uuid4().hex}"))
+    await saver.asetup()
+    http.reset()
+
+    yield saver, http
+
+    await saver.table.delete()
+
+
+@pytest.fixture
+async def redis_local_tiered_saver(dynamodb_local_saver):
+    """Yields an AsyncRedisTieredSaver backed by redis-stack and a throwaway dynamodb-local
+    table, its Redis keys use a throwaway prefix."""
+    if not is_listening(REDIS_LOCAL_HOST, REDIS_LOCAL_PORT):
+        pytest.skip("redis-stack is not running, start it with docker/docker-compose.yml")
+
+    saver, http = dynamodb_local_saver
+    durable = AsyncDynamoDBSaver(saver.client, saver.table, durability=Durability.ASYNC)
+    durable.start()
+    redis = Redis(host=REDIS_LOCAL_HOST, port=REDIS_LOCAL_PORT)
+    tiered_saver = AsyncRedisTieredSaver(
+        durable, redis, key_prefix=f"checkpoint-{uuid4().hex}"
+    )
+
+    yield tiered_saver, http
+
+    await durable.aclose()
+    async for key in redis.scan_iter(match=f"{tiered_saver.key_prefix}:*"):
+        await redis.unlink(key)
+    await redis.aclose()
+
+
+@pytest.fixture(params=list(CHECKPOINT_SAVER_FIXTURES))
+def metered_checkpoint_saver(request):
+    """Yields each checkpoint saver of CHECKPOINT_SAVER_FIXTURES along with the round trip
+    counter of its DynamoDB client."""
+    return request.getfixturevalue(CHECKPOINT_SAVER_FIXTURES[request.param])
+
+
+@pytest.fixture
+def checkpoint_saver(metered_checkpoint_saver):
+    """Yields each checkpoint saver the checkpoint conformance tests run against."""
+    saver, _ = metered_checkpoint_saver
+    return saver
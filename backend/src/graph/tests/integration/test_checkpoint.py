@@ -0,0 +1,301 @@
+import asyncio
+import os
+from datetime import timedelta
+
+import pytest
+from aiodynamo.expressions import F
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from src.common.constants import Durability
+
+from ...cache import CheckpointCache
+from ...checkpoint import AsyncDynamoDBSaver
+from ...payloads import LocalBlobStore, PayloadCodec
+from ...retention import RetentionPolicy
+
+
+async def _scan_blob_items(saver):
+    return [
+        item
+        async for item in saver.table.scan(filter_expression=F("PK").begins_with("blobs#"))
+    ]
+
+
+async def _put_checkpoints(saver, thread_id, sources):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    for step, source in enumerate(sources):
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        config = await saver.aput(
+            config, checkpoint, {"source": source, "step": step, "user": "u1"}, {}
+        )
+    return config
+
+
+@pytest.mark.integration
+class TestAsyncDynamoDBSaverList:
+    async def test_should_filter_by_metadata(self, dynamodb_local_saver):
+        saver, _ = dynamodb_local_saver
+        await _put_checkpoints(saver, "thread", ["input", "loop", "loop", "input"])
+        config = {"configurable": {"thread_id": "thread"}}
+
+        loop_steps = [
+            checkpoint_tuple.metadata["step"]
+            async for checkpoint_tuple in saver.alist(config, filter={"source": "loop"})
+        ]
+        latest_input_steps = [
+            checkpoint_tuple.metadata["step"]
+            async for checkpoint_tuple in saver.alist(
+                config, filter={"source": "input", "user": "u1"}, limit=1
+            )
+        ]
+        no_match = [
+            checkpoint_tuple
+            async for checkpoint_tuple in saver.alist(config, filter={"user": "u2"})
+        ]
+
+        assert loop_steps == [2, 1]
+        assert latest_input_steps == [3]
+        assert no_match == []
+
+    async def test_should_list_before_checkpoint_with_limit(self, dynamodb_local_saver):
+        saver, _ = dynamodb_local_saver
+        latest_config = await _put_checkpoints(saver, "thread", ["loop"] * 5)
+
+        steps = [
+            checkpoint_tuple.metadata["step"]
+            async for checkpoint_tuple in saver.alist(
+                {"configurable": {"thread_id": "thread"}},
+                before=latest_config,
+                limit=2,
+            )
+        ]
+
+        assert steps == [3, 2]
+
+
+@pytest.mark.integration
+class TestAsyncDynamoDBSaverPayloads:
+    async def test_should_round_trip_compressed_and_offloaded_checkpoints(
+        self, dynamodb_local_saver, tmp_path
+    ):
+        saver, _ = dynamodb_local_saver
+        saver.payload_codec = PayloadCodec(
+            LocalBlobStore(str(tmp_path)), compression_threshold=16, offload_threshold=512
+        )
+        config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+        checkpoints = []
+        # Small, compressible and incompressible (offloaded) channel values
+        for step, value in enumerate(["small", "listing " * 500, os.urandom(2048).hex()]):
+            checkpoint = create_checkpoint(empty_checkpoint(), None, step)
+            version = saver.get_next_version(None, None)
+            checkpoint["channel_values"] = {"value": value}
+            checkpoint["channel_versions"] = {"value": version}
+            config = await saver.aput(
+                config, checkpoint, {"step": step}, {"value": version}
+            )
+            checkpoints.append(checkpoint)
+
+        latest = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+        listed = [
+            checkpoint_tuple.checkpoint
+            async for checkpoint_tuple in saver.alist(
+                {"configurable": {"thread_id": "thread"}}
+            )
+        ]
+
+        assert latest.checkpoint == checkpoints[-1]
+        assert listed == checkpoints[::-1]
+        assert len([path for path in tmp_path.rglob("*") if path.is_file()]) == 1
+
+
+@pytest.mark.integration
+class TestAsyncDynamoDBSaverChannelBlobs:
+    config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+
+    async def _put(self, saver, config, checkpoint, channel_values, new_versions):
+        checkpoint = create_checkpoint(checkpoint, None, 0)
+        checkpoint["channel_values"] = channel_values
+        checkpoint["channel_versions"] = {
+            **checkpoint["channel_versions"],
+            **new_versions,
+        }
+        return checkpoint, await saver.aput(config, checkpoint, {}, new_versions)
+
+    async def test_should_only_write_changed_channels(self, dynamodb_local_saver):
+        saver, _ = dynamodb_local_saver
+        messages_version = saver.get_next_version(None, None)
+        listings_version = saver.get_next_version(None, None)
+        first, first_config = await self._put(
+            saver,
+            self.config,
+            empty_checkpoint(),
+            {"messages": ["hello"], "listings": ["listing"] * 100},
+            {"messages": messages_version, "listings": listings_version},
+        )
+        messages_version = saver.get_next_version(messages_version, None)
+        second, second_config = await self._put(
+            saver,
+            first_config,
+            first,
+            {"messages": ["hello", "hi"], "listings": ["listing"] * 100},
+            {"messages": messages_version},
+        )
+
+        assert len(await _scan_blob_items(saver)) == 3
+        assert (await saver.aget_tuple(first_config)).checkpoint == first
+        assert (await saver.aget_tuple(second_config)).checkpoint == second
+        assert [
+            checkpoint_tuple.checkpoint
+            async for checkpoint_tuple in saver.alist(self.config)
+        ] == [second, first]
+
+    async def test_should_drop_channels_updated_to_empty(self, dynamodb_local_saver):
+        saver, _ = dynamodb_local_saver
+        version = saver.get_next_version(None, None)
+        first, first_config = await self._put(
+            saver, self.config, empty_checkpoint(), {"branch": "node"}, {"branch": version}
+        )
+        second, _ = await self._put(
+            saver,
+            first_config,
+            first,
+            {},
+            {"branch": saver.get_next_version(version, None)},
+        )
+
+        checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+
+        assert checkpoint_tuple.checkpoint["channel_values"] == {}
+        assert checkpoint_tuple.checkpoint == second
+
+
+@pytest.mark.integration
+class TestAsyncDynamoDBSaverCache:
+    async def test_should_not_serve_stale_checkpoints_across_workers(
+        self, dynamodb_local_saver
+    ):
+        saver, _ = dynamodb_local_saver
+        worker_a = AsyncDynamoDBSaver(saver.client, saver.table, cache=CheckpointCache())
+        worker_b = AsyncDynamoDBSaver(saver.client, saver.table, cache=CheckpointCache())
+        latest_config = {"configurable": {"thread_id": "thread"}}
+
+        config = await _put_checkpoints(worker_a, "thread", ["input"])
+        assert (await worker_a.aget_tuple(latest_config)).config == config
+        assert worker_a.cache.stats["hits"] == 1
+
+        newer_config = await worker_b.aput(
+            config,
+            create_checkpoint(empty_checkpoint(), None, 1),
+            {"source": "loop", "step": 1},
+            {},
+        )
+
+        assert (await worker_a.aget_tuple(latest_config)).config == newer_config
+        assert (await worker_a.aget_tuple(latest_config)).config == newer_config
+        assert worker_a.cache.stats == {"hits": 2, "misses": 1, "entries": 1}
+
+
+@pytest.mark.integration
+class TestAsyncDynamoDBSaverCompaction:
+    async def test_should_keep_retained_checkpoints_readable(self, dynamodb_local_saver):
+        saver, _ = dynamodb_local_saver
+        saver.retention_policy = RetentionPolicy(
+            keep_last=2, keep_newer_than=timedelta(0)
+        )
+        config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_versions"] = {"intent": saver.get_next_version(None, None)}
+        checkpoint["channel_values"] = {"intent": "greeting"}
+        for step in range(5):
+            checkpoint = create_checkpoint(checkpoint, None, step)
+            new_versions = {
+                "messages": saver.get_next_version(
+                    checkpoint["channel_versions"].get("messages"), None
+                ),
+                **({} if step else {"intent": checkpoint["channel_versions"]["intent"]}),
+            }
+            checkpoint["channel_values"]["messages"] = [f"message {step}"]
+            checkpoint["channel_versions"] = {
+                **checkpoint["channel_versions"],
+                **new_versions,
+            }
+            config = await saver.aput(config, checkpoint, {"step": step}, new_versions)
+            await saver.aput_writes(config, [("messages", f"write {step}")], "task")
+        thread_config = {"configurable": {"thread_id": "thread"}}
+        retained = [
+            checkpoint_tuple
+            async for checkpoint_tuple in saver.alist(thread_config, limit=2)
+        ]
+
+        result = await saver.acompact_thread("thread")
+
+        # 3 expired checkpoints, their writes and 3 old message blobs
+        assert (result.checkpoints, result.writes, result.blobs) == (3, 3, 3)
+        assert [
+            checkpoint_tuple async for checkpoint_tuple in saver.alist(thread_config)
+        ] == retained
+        assert retained[1].checkpoint["channel_values"] == {
+            "intent": "greeting",
+            "messages": ["message 3"],
+        }
+        assert (await saver.aget_tuple(retained[1].config)).pending_writes == [
+            ("task", "messages", "write 3")
+        ]
+        assert (await saver.aget_tuple(config)).pending_writes == [
+            ("task", "messages", "write 4")
+        ]
+        assert (await saver.acompact_thread("thread")).items == 0
+
+
+@pytest.mark.integration
+class TestAsyncDynamoDBSaverDurability:
+    async def _count_items(self, saver):
+        return len([item async for item in saver.table.scan(projection=F("PK"))])
+
+    async def test_should_persist_on_read_and_close_in_exit_mode(
+        self, dynamodb_local_saver
+    ):
+        saver, _ = dynamodb_local_saver
+        saver = AsyncDynamoDBSaver(saver.client, saver.table, durability=Durability.EXIT)
+        saver.start()
+
+        config = await _put_checkpoints(saver, "thread-1", ["input", "loop"])
+        await saver.aput_writes(config, [("messages", "hi")], "task")
+        await _put_checkpoints(saver, "thread-2", ["input"])
+        assert await self._count_items(saver) == 0
+        assert saver.write_buffer.stats["queue_depth"] == 4
+
+        checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": "thread-1"}})
+        assert checkpoint_tuple.config == config
+        assert checkpoint_tuple.pending_writes == [("task", "messages", "hi")]
+        assert await self._count_items(saver) == 3
+
+        await saver.aclose()
+        assert await self._count_items(saver) == 4
+
+    async def test_should_flush_each_super_step_in_background_in_async_mode(
+        self, dynamodb_local_saver
+    ):
+        saver, http = dynamodb_local_saver
+        saver = AsyncDynamoDBSaver(
+            saver.client, saver.table, durability=Durability.ASYNC
+        )
+        saver.start()
+
+        config = await _put_checkpoints(saver, "thread", ["input"])
+        await saver.aput_writes(config, [("messages", "hi")], "task")
+        await saver.aput_writes(config, [("intent", "greeting")], "other-task")
+        http.reset()
+        await _put_checkpoints(saver, "thread", ["loop"])
+        # The writes and the checkpoint of the super-step are flushed in one BatchWriteItem
+        # after aput returned
+        assert http.total == 0
+        for _ in range(100):
+            if not len(saver.write_buffer):
+                break
+            await asyncio.sleep(0.01)
+
+        assert http.actions == {"BatchWriteItem": 2}
+        assert await self._count_items(saver) == 4
+        await saver.aclose()
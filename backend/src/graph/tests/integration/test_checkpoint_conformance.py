@@ -0,0 +1,154 @@
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.graph import END, START, StateGraph
+
+# Every checkpoint saver must pass these tests, see CHECKPOINT_SAVER_FIXTURES in conftest.py
+
+
+def _make_config(thread_id: str, checkpoint_ns: str = "", checkpoint_id=None) -> dict:
+    configurable = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+async def _put_steps(saver, thread_id: str, steps: int, checkpoint_ns: str = ""):
+    config = _make_config(thread_id, checkpoint_ns)
+    checkpoint = empty_checkpoint()
+    checkpoints = []
+    for step in range(steps):
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        version = saver.get_next_version(
+            checkpoint["channel_versions"].get("messages"), None
+        )
+        checkpoint["channel_values"] = {"messages": [f"message {i}" for i in range(step + 1)]}
+        checkpoint["channel_versions"] = {"messages": version}
+        config = await saver.aput(
+            config,
+            checkpoint,
+            {"source": "input" if step == 0 else "loop", "step": step},
+            {"messages": version},
+        )
+        checkpoints.append((config, checkpoint))
+    return checkpoints
+
+
+class _State(TypedDict):
+    messages: Annotated[list[str], operator.add]
+
+
+def _build_graph(saver):
+    def reply(state: _State):
+        return {"messages": [f"reply {len(state['messages'])}"]}
+
+    graph = StateGraph(_State)
+    graph.add_node("reply", reply)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=saver)
+
+
+@pytest.mark.integration
+class TestCheckpointSaverConformance:
+    async def test_should_return_none_for_unknown_thread(self, checkpoint_saver):
+        assert await checkpoint_saver.aget_tuple(_make_config("unknown")) is None
+
+    async def test_should_get_latest_and_specific_checkpoints(self, checkpoint_saver):
+        (first_config, first), (second_config, second) = await _put_steps(
+            checkpoint_saver, "thread", 2
+        )
+
+        latest = await checkpoint_saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+        specific = await checkpoint_saver.aget_tuple(first_config)
+
+        assert latest.config == second_config
+        assert latest.checkpoint == second
+        assert latest.metadata == {"source": "loop", "step": 1}
+        assert latest.parent_config == first_config
+        assert specific.checkpoint == first
+        assert specific.parent_config is None
+
+    async def test_should_return_pending_writes_of_checkpoint(self, checkpoint_saver):
+        (config, _), = await _put_steps(checkpoint_saver, "thread", 1)
+
+        await checkpoint_saver.aput_writes(config, [("messages", "a"), ("intent", "x")], "task-1")
+        await checkpoint_saver.aput_writes(config, [("messages", "b")], "task-2")
+        # Retrying a task overwrites its writes
+        await checkpoint_saver.aput_writes(config, [("messages", "c")], "task-2")
+
+        latest = await checkpoint_saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+        assert sorted(latest.pending_writes) == [
+            ("task-1", "intent", "x"),
+            ("task-1", "messages", "a"),
+            ("task-2", "messages", "c"),
+        ]
+
+    async def test_should_return_more_pending_writes_than_a_batch_holds(
+        self, checkpoint_saver
+    ):
+        (config, _), = await _put_steps(checkpoint_saver, "thread", 1)
+        writes = [(f"channel_{i}", i) for i in range(100)]
+
+        await checkpoint_saver.aput_writes(config, writes, "task")
+
+        latest = await checkpoint_saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+        assert latest.pending_writes == [("task", channel, value) for channel, value in writes]
+
+    async def test_should_not_return_pending_writes_of_parent(self, checkpoint_saver):
+        (config, _), = await _put_steps(checkpoint_saver, "thread", 1)
+        await checkpoint_saver.aput_writes(config, [("messages", "a")], "task")
+        await checkpoint_saver.aput(
+            config, create_checkpoint(empty_checkpoint(), None, 1), {"step": 1}, {}
+        )
+
+        latest = await checkpoint_saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+        parent = await checkpoint_saver.aget_tuple(config)
+
+        assert latest.pending_writes == []
+        assert parent.pending_writes == [("task", "messages", "a")]
+
+    async def test_should_list_newest_first_with_filter_before_and_limit(
+        self, checkpoint_saver
+    ):
+        checkpoints = await _put_steps(checkpoint_saver, "thread", 4)
+        config = {"configurable": {"thread_id": "thread"}}
+
+        async def list_steps(**kwargs):
+            return [
+                checkpoint_tuple.metadata["step"]
+                async for checkpoint_tuple in checkpoint_saver.alist(config, **kwargs)
+            ]
+
+        assert await list_steps() == [3, 2, 1, 0]
+        assert await list_steps(filter={"source": "input"}) == [0]
+        assert await list_steps(before=checkpoints[-1][0], limit=2) == [2, 1]
+
+    async def test_should_keep_namespaces_apart(self, checkpoint_saver):
+        (root_config, _), = await _put_steps(checkpoint_saver, "thread", 1)
+        (subgraph_config, _), = await _put_steps(
+            checkpoint_saver, "thread", 1, checkpoint_ns="subgraph"
+        )
+
+        root = await checkpoint_saver.aget_tuple(_make_config("thread"))
+        subgraph = await checkpoint_saver.aget_tuple(_make_config("thread", "subgraph"))
+
+        assert root.config == root_config
+        assert subgraph.config == subgraph_config
+
+    async def test_should_persist_graph_state_across_runs(self, checkpoint_saver):
+        graph = _build_graph(checkpoint_saver)
+        config = {"configurable": {"thread_id": "thread"}}
+
+        for turn in range(3):
+            await graph.ainvoke({"messages": [f"turn {turn}"]}, config)
+        state = await graph.aget_state(config)
+        history = [snapshot async for snapshot in graph.aget_state_history(config)]
+
+        assert state.values["messages"] == [
+            "turn 0", "reply 1", "turn 1", "reply 3", "turn 2", "reply 5"
+        ]
+        # The input, loop and end checkpoints of each run
+        assert len(history) == 9
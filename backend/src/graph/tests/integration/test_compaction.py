@@ -0,0 +1,61 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from aiodynamo.expressions import F
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from ...checkpoint import _make_checkpoint_key
+from ...compaction import compact_table
+from ...retention import RetentionPolicy
+
+
+async def _put_turns(saver, thread_id, turns):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    for step in range(turns):
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        version = saver.get_next_version(
+            checkpoint["channel_versions"].get("messages"), None
+        )
+        checkpoint["channel_values"] = {"messages": [f"message {step}"]}
+        checkpoint["channel_versions"] = {"messages": version}
+        config = await saver.aput(config, checkpoint, {"step": step}, {"messages": version})
+        await saver.aput_writes(config, [("messages", f"write {step}")], "task")
+    return config
+
+
+@pytest.mark.integration
+class TestCompactTable:
+    @patch("src.graph.checkpoint.COMPACTION_IN_FLIGHT_GRACE_SECONDS", 0)
+    async def test_should_compact_every_thread_and_orphaned_blobs(
+        self, dynamodb_local_saver
+    ):
+        saver, _ = dynamodb_local_saver
+        saver.retention_policy = RetentionPolicy(
+            keep_last=1, keep_newer_than=timedelta(0)
+        )
+        await _put_turns(saver, "thread-1", 3)
+        await _put_turns(saver, "thread-2", 2)
+        # Simulate a thread whose checkpoint expired, leaving its blob behind
+        config = await _put_turns(saver, "thread-3", 1)
+        await saver.table.delete_item(
+            _make_checkpoint_key("thread-3", "", config["configurable"]["checkpoint_id"])
+        )
+
+        result = await compact_table(saver)
+
+        assert (result.threads, result.checkpoints, result.blobs) == (3, 3, 4)
+        # Writes of superseded checkpoints, and the orphaned write of thread-3
+        assert result.writes == 4
+        # One checkpoint, one write and one blob are left in the two active threads
+        assert sorted(
+            [item["PK"] async for item in saver.table.scan(projection=F("PK"))]
+        ) == [
+            "blobs#thread-1",
+            "blobs#thread-2",
+            "checkpoint#thread-1",
+            "checkpoint#thread-2",
+            "writes#thread-1",
+            "writes#thread-2",
+        ]
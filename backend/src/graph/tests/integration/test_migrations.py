@@ -0,0 +1,100 @@
+import pytest
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from ...checkpoint import _make_checkpoint_key
+from ...migrations import (
+    backfill_channel_blobs,
+    backfill_metadata_attributes,
+    verify_latest_checkpoint_lookup,
+)
+
+
+@pytest.mark.integration
+class TestVerifyLatestCheckpointLookup:
+    async def test_should_verify_every_thread_namespace(self, dynamodb_local_saver):
+        saver, _ = dynamodb_local_saver
+        for thread_id in ("thread-1", "thread-2"):
+            for checkpoint_ns in ("", "child:1"):
+                config = {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                    }
+                }
+                checkpoint = empty_checkpoint()
+                for step in range(3):
+                    checkpoint = create_checkpoint(checkpoint, None, step)
+                    config = await saver.aput(config, checkpoint, {"step": step}, {})
+
+        result = await verify_latest_checkpoint_lookup(saver)
+
+        assert result == {"verified": 4, "mismatches": 0}
+
+
+@pytest.mark.integration
+class TestBackfillMetadataAttributes:
+    async def test_should_make_existing_checkpoints_filterable(
+        self, dynamodb_local_saver
+    ):
+        saver, _ = dynamodb_local_saver
+        config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+        checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+        await saver.aput(config, checkpoint, {"source": "input", "step": 1}, {})
+        # Simulate a checkpoint written before the metadata attributes existed
+        key = _make_checkpoint_key("thread", "", checkpoint["id"])
+        item = await saver.table.get_item(key)
+        await saver.table.put_item(
+            {k: v for k, v in item.items() if not k.startswith("metadata_")}
+        )
+
+        async def list_input_checkpoints():
+            return [
+                checkpoint_tuple
+                async for checkpoint_tuple in saver.alist(
+                    {"configurable": {"thread_id": "thread"}},
+                    filter={"source": "input"},
+                )
+            ]
+
+        assert await list_input_checkpoints() == []
+        assert await backfill_metadata_attributes(saver) == {"updated": 1}
+        assert len(await list_input_checkpoints()) == 1
+
+
+@pytest.mark.integration
+class TestBackfillChannelBlobs:
+    async def test_should_resolve_manifests_on_threads_with_inline_checkpoints(
+        self, dynamodb_local_saver
+    ):
+        saver, _ = dynamodb_local_saver
+        config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+        # Checkpoint written before channel blobs existed, with its channel values inline
+        inline = create_checkpoint(empty_checkpoint(), None, 1)
+        inline["channel_values"] = {"messages": ["hello"], "intent": "greeting"}
+        inline["channel_versions"] = {"messages": 1, "intent": 1}
+        key = _make_checkpoint_key("thread", "", inline["id"])
+        type_, serialized_checkpoint = saver.serde.dumps_typed(inline)
+        await saver.table.put_item(
+            {
+                **key,
+                "checkpoint": serialized_checkpoint,
+                "type": type_,
+                "checkpoint_id": inline["id"],
+                "metadata": saver.serde.dumps({}),
+                "parent_checkpoint_id": "",
+            }
+        )
+        # A new checkpoint only writes its changed channel, "intent" is unchanged
+        manifest = create_checkpoint(inline, None, 2)
+        manifest["channel_values"] = {"messages": ["hello", "hi"], "intent": "greeting"}
+        new_versions = {"messages": saver.get_next_version(1, None)}
+        manifest["channel_versions"] = {**inline["channel_versions"], **new_versions}
+        inline_config = {
+            "configurable": {**config["configurable"], "checkpoint_id": inline["id"]}
+        }
+        config = await saver.aput(inline_config, manifest, {}, new_versions)
+
+        assert await backfill_channel_blobs(saver) == {"checkpoints": 1, "blobs": 2}
+        assert await backfill_channel_blobs(saver) == {"checkpoints": 1, "blobs": 2}
+        assert (await saver.aget_tuple(config)).checkpoint == manifest
+        assert (await saver.aget_tuple(inline_config)).checkpoint == inline
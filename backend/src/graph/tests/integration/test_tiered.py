@@ -0,0 +1,141 @@
+import pytest
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+
+async def _put_checkpoint(saver, config, step):
+    return await saver.aput(
+        config, create_checkpoint(empty_checkpoint(), None, step), {"step": step}, {}
+    )
+
+
+async def _put_channels(saver, config, checkpoint, step, channel_values):
+    """Puts a child checkpoint of checkpoint with the given channels changed."""
+    checkpoint = create_checkpoint(checkpoint, None, step)
+    new_versions = {
+        channel: saver.get_next_version(
+            checkpoint["channel_versions"].get(channel), None
+        )
+        for channel in channel_values
+    }
+    checkpoint["channel_values"] = {**checkpoint["channel_values"], **channel_values}
+    checkpoint["channel_versions"] = {**checkpoint["channel_versions"], **new_versions}
+    config = await saver.aput(config, checkpoint, {"step": step}, new_versions)
+    return config, checkpoint
+
+
+@pytest.mark.integration
+class TestAsyncRedisTieredSaver:
+    config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+    latest_config = {"configurable": {"thread_id": "thread"}}
+
+    async def test_should_read_active_threads_from_redis(self, redis_local_tiered_saver):
+        saver, http = redis_local_tiered_saver
+        config = await _put_checkpoint(saver, self.config, 0)
+        await saver.aput_writes(config, [("messages", "hi")], "task")
+        http.reset()
+
+        checkpoint_tuple = await saver.aget_tuple(self.latest_config)
+
+        assert checkpoint_tuple.config == config
+        assert checkpoint_tuple.pending_writes == [("task", "messages", "hi")]
+        assert saver.stats == {"hits": 1, "misses": 0}
+        # Nothing was read from DynamoDB, which still gets the checkpoint in the background
+        assert http.actions["Query"] == 0
+        await saver.aflush()
+        assert (await saver.durable.aget_tuple(self.latest_config)).config == config
+
+    async def test_should_promote_demoted_threads(self, redis_local_tiered_saver):
+        saver, _ = redis_local_tiered_saver
+        config = await _put_checkpoint(saver, self.config, 0)
+        await saver.aput_writes(config, [("messages", "a"), ("intent", "x")], "task")
+        latest_key = saver._make_latest_key("thread", "")
+        assert 0 < await saver.redis.ttl(latest_key) <= saver.ttl_seconds
+
+        # Simulate the keys of the idle thread expiring
+        writes_key = saver._make_writes_key(
+            "thread", "", config["configurable"]["checkpoint_id"]
+        )
+        await saver.redis.unlink(latest_key, writes_key)
+        demoted = await saver.aget_tuple(self.latest_config)
+        promoted = await saver.aget_tuple(self.latest_config)
+
+        assert saver.stats == {"hits": 1, "misses": 1}
+        assert promoted.config == demoted.config == config
+        assert promoted.pending_writes == demoted.pending_writes == [
+            ("task", "messages", "a"),
+            ("task", "intent", "x"),
+        ]
+
+    async def test_should_not_promote_over_newer_checkpoint(self, redis_local_tiered_saver):
+        saver, _ = redis_local_tiered_saver
+        config = await _put_checkpoint(saver, self.config, 0)
+        stale_tuple = await saver.durable.aget_tuple(self.latest_config)
+        newer_config = await _put_checkpoint(saver, config, 1)
+
+        await saver._apromote("thread", "", stale_tuple)
+
+        assert (await saver.aget_tuple(self.latest_config)).config == newer_config
+
+    async def test_should_only_write_blobs_of_changed_channels(
+        self, redis_local_tiered_saver
+    ):
+        saver, _ = redis_local_tiered_saver
+        config, checkpoint = await _put_channels(
+            saver, self.config, empty_checkpoint(), 0, {"messages": ["hi"], "intent": "x"}
+        )
+        intent_key = saver._make_blob_key(
+            "thread", "", "intent", checkpoint["channel_versions"]["intent"]
+        )
+        await saver.redis.set(intent_key, b"not rewritten", keepttl=True)
+
+        config, checkpoint = await _put_channels(
+            saver, config, checkpoint, 1, {"messages": ["hi", "hello"]}
+        )
+
+        assert await saver.redis.get(intent_key) == b"not rewritten"
+        assert 0 < await saver.redis.ttl(intent_key) <= saver.ttl_seconds
+        assert len(await saver.redis.keys(f"{saver.key_prefix}:blobs:*")) == 3
+
+    async def test_should_read_channel_values_from_blobs(self, redis_local_tiered_saver):
+        saver, http = redis_local_tiered_saver
+        config, checkpoint = await _put_channels(
+            saver, self.config, empty_checkpoint(), 0, {"messages": ["hi"], "intent": "x"}
+        )
+        config, checkpoint = await _put_channels(
+            saver, config, checkpoint, 1, {"messages": ["hi", "hello"]}
+        )
+        http.reset()
+
+        checkpoint_tuple = await saver.aget_tuple(self.latest_config)
+
+        assert checkpoint_tuple.config == config
+        assert checkpoint_tuple.checkpoint["channel_values"] == {
+            "messages": ["hi", "hello"],
+            "intent": "x",
+        }
+        assert saver.stats == {"hits": 1, "misses": 0}
+        assert http.actions["Query"] == 0
+
+    async def test_should_promote_checkpoints_with_a_missing_blob(
+        self, redis_local_tiered_saver
+    ):
+        saver, _ = redis_local_tiered_saver
+        config, checkpoint = await _put_channels(
+            saver, self.config, empty_checkpoint(), 0, {"messages": ["hi"], "intent": "x"}
+        )
+        await saver.redis.unlink(
+            saver._make_blob_key(
+                "thread", "", "intent", checkpoint["channel_versions"]["intent"]
+            )
+        )
+
+        demoted = await saver.aget_tuple(self.latest_config)
+        promoted = await saver.aget_tuple(self.latest_config)
+
+        assert saver.stats == {"hits": 1, "misses": 1}
+        assert promoted.config == demoted.config == config
+        assert (
+            promoted.checkpoint["channel_values"]
+            == demoted.checkpoint["channel_values"]
+            == {"messages": ["hi"], "intent": "x"}
+        )
@@ -0,0 +1,165 @@
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from ...answer_cache import CACHED_ANSWER_CHUNK_EVENT, SemanticAnswerCache
+from ...nodes import cache_answer, lookup_cached_answer
+from ...schemas import QuestionIntent, RetrievedDocument
+
+DEBT_FREE_PRICE = [1.0, 0.0, 0.0]
+DEBT_FREE_PRICE_REPHRASED = [0.99, 0.1, 0.0]
+TRANSFER_TAX = [0.0, 1.0, 0.0]
+ANSWER = "The debt-free price is the sales price plus the share of the housing company loan."
+DEBT_FREE_PRICE_DOCUMENT = (
+    "Debt-free price: the sales price of the shares plus their share of the housing "
+    "company loan, as stated in the listing of the apartment."
+)
+
+
+@pytest.mark.unit
+class TestSemanticAnswerCache:
+    def test_should_return_answer_of_similar_question(self):
+        cache = SemanticAnswerCache(similarity_threshold=0.95)
+        cache.put("knowledge", DEBT_FREE_PRICE, ANSWER, {"doc-1": "hash-1"})
+
+        cached_answer = cache.get("knowledge", DEBT_FREE_PRICE_REPHRASED)
+
+        assert cached_answer.answer == ANSWER
+        assert cached_answer.source_hashes == {"doc-1": "hash-1"}
+        assert cached_answer.similarity == pytest.approx(0.995, abs=1e-3)
+        assert cache.get("knowledge", TRANSFER_TAX) is None
+        assert cache.get("greeting", DEBT_FREE_PRICE) is None
+        assert cache.stats == {"hits": 1, "misses": 2, "entries": 1, "hit_rate": 1 / 3}
+
+    def test_should_expire_entries(self):
+        cache = SemanticAnswerCache(ttl_seconds=10)
+        with patch("src.graph.answer_cache.time.monotonic", return_value=100):
+            cache.put("knowledge", DEBT_FREE_PRICE, ANSWER)
+
+        with patch("src.graph.answer_cache.time.monotonic", return_value=109):
+            assert cache.get("knowledge", DEBT_FREE_PRICE) is not None
+        with patch("src.graph.answer_cache.time.monotonic", return_value=110):
+            assert cache.get("knowledge", DEBT_FREE_PRICE) is None
+            assert len(cache) == 0
+
+    def test_should_evict_least_recently_used_entry(self):
+        cache = SemanticAnswerCache(max_entries=2)
+        cache.put("knowledge", DEBT_FREE_PRICE, "debt-free price")
+        cache.put("knowledge", TRANSFER_TAX, "transfer tax")
+        cache.get("knowledge", DEBT_FREE_PRICE)
+
+        cache.put("knowledge", [0.0, 0.0, 1.0], "maintenance charge")
+
+        assert len(cache) == 2
+        assert cache.get("knowledge", DEBT_FREE_PRICE).answer == "debt-free price"
+        assert cache.get("knowledge", TRANSFER_TAX) is None
+
+    def test_should_invalidate_entry(self):
+        cache = SemanticAnswerCache()
+        cache.put("knowledge", DEBT_FREE_PRICE, ANSWER)
+
+        cache.invalidate(cache.get("knowledge", DEBT_FREE_PRICE))
+
+        assert cache.get("knowledge", DEBT_FREE_PRICE) is None
+
+
+@pytest.mark.unit
+class TestAnswerCacheNodes:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.answer_cache = SemanticAnswerCache()
+        self.llm_registry = Mock()
+        self.llm_registry.aembed_query = AsyncMock(return_value=DEBT_FREE_PRICE)
+        # The documents of the Chroma collection by their IDs
+        self.documents = {"doc-1": DEBT_FREE_PRICE_DOCUMENT}
+        self.document_collection = Mock()
+        self.document_collection.get.side_effect = lambda ids, include: {
+            "ids": [id for id in ids if id in self.documents],
+            "documents": [self.documents[id] for id in ids if id in self.documents],
+        }
+        with (
+            patch("src.graph.nodes.get_answer_cache", return_value=self.answer_cache),
+            patch("src.graph.nodes.get_llm_registry", return_value=self.llm_registry),
+            patch(
+                "src.embedding.service.get_chroma_db",
+                return_value=Mock(document_collection=self.document_collection),
+            ),
+        ):
+            yield
+
+    def _make_state(self, *messages) -> dict:
+        return {
+            "messages": [HumanMessage(content="What is the debt-free price?"), *messages],
+            "intent": QuestionIntent.HOUSE_BUYING_KNOWLEDGE,
+            "documents": [
+                RetrievedDocument(
+                    id="doc-1", content=DEBT_FREE_PRICE_DOCUMENT, metadata={}
+                )
+            ],
+        }
+
+    async def test_should_stream_cached_answer_of_similar_question(self):
+        miss = await lookup_cached_answer(self._make_state(), {})
+        assert miss == {"is_answer_cached": False}
+        await cache_answer({**self._make_state(AIMessage(content=ANSWER)), **miss})
+        self.llm_registry.aembed_query.assert_awaited_with("What is the debt-free price?")
+
+        events = [
+            event
+            async for event in RunnableLambda(lookup_cached_answer).astream_events(
+                self._make_state(), version="v2"
+            )
+        ]
+
+        chunks = [
+            event["data"]
+            for event in events
+            if event["event"] == "on_custom_event"
+            and event["name"] == CACHED_ANSWER_CHUNK_EVENT
+        ]
+        hit = events[-1]["data"]["output"]
+        assert hit["is_answer_cached"]
+        assert hit["messages"][0].content == "".join(chunk.content for chunk in chunks) == ANSWER
+        assert {chunk.id for chunk in chunks} == {hit["messages"][0].id}
+        self.document_collection.get.assert_called_once_with(
+            ids=["doc-1"], include=["documents"]
+        )
+
+    async def test_should_not_serve_answer_when_its_documents_were_removed(self):
+        miss = await lookup_cached_answer(self._make_state(), {})
+        await cache_answer({**self._make_state(AIMessage(content=ANSWER)), **miss})
+        del self.documents["doc-1"]
+
+        miss = await lookup_cached_answer(self._make_state(), {})
+
+        assert not miss["is_answer_cached"]
+        assert len(self.answer_cache) == 0
+
+    async def test_should_not_serve_answer_when_content_of_its_documents_changed(self):
+        miss = await lookup_cached_answer(self._make_state(), {})
+        await cache_answer({**self._make_state(AIMessage(content=ANSWER)), **miss})
+        # The ID stays the same, like the fingerprint of a chunk edited in the middle
+        self.documents["doc-1"] = DEBT_FREE_PRICE_DOCUMENT.replace(
+            "housing company loan", "housing company loans and fees"
+        )
+
+        miss = await lookup_cached_answer(self._make_state(), {})
+
+        assert not miss["is_answer_cached"]
+        assert len(self.answer_cache) == 0
+
+    async def test_should_only_look_up_small_talk_at_the_start_of_a_conversation(self):
+        state = {
+            **self._make_state(AIMessage(content="Hi!"), HumanMessage(content="Hello")),
+            "intent": QuestionIntent.GREETING,
+        }
+
+        assert await lookup_cached_answer(state, {}) == {"is_answer_cached": None}
+        await cache_answer(
+            {**state, "messages": [*state["messages"], AIMessage(content="Hey")]}
+        )
+
+        self.llm_registry.aembed_query.assert_not_called()
+        assert len(self.answer_cache) == 0
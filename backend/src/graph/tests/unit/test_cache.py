@@ -0,0 +1,85 @@
+from unittest.mock import patch
+
+import pytest
+from langgraph.checkpoint.base import CheckpointTuple, empty_checkpoint
+
+from ...cache import CheckpointCache
+
+
+def _make_checkpoint_tuple(thread_id, checkpoint_id, checkpoint_ns=""):
+    return CheckpointTuple(
+        config={
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        },
+        checkpoint={**empty_checkpoint(), "id": checkpoint_id},
+        metadata={},
+    )
+
+
+@pytest.mark.unit
+class TestCheckpointCache:
+    def test_should_count_hits_and_misses(self):
+        cache = CheckpointCache()
+        cache.put(_make_checkpoint_tuple("thread", "2"))
+
+        assert cache.get("thread", "", "2").checkpoint["id"] == "2"
+        assert cache.get("thread", "", "1") is None
+        assert cache.get("other", "", "2") is None
+        assert cache.stats == {"hits": 1, "misses": 2, "entries": 1}
+
+    def test_should_evict_least_recently_used_thread(self):
+        cache = CheckpointCache(max_entries=2)
+        cache.put(_make_checkpoint_tuple("thread-1", "1"))
+        cache.put(_make_checkpoint_tuple("thread-2", "1"))
+        cache.get("thread-1", "", "1")
+
+        cache.put(_make_checkpoint_tuple("thread-3", "1"))
+
+        assert cache.has("thread-1", "")
+        assert not cache.has("thread-2", "")
+        assert cache.has("thread-3", "")
+
+    def test_should_expire_entries_after_ttl(self):
+        cache = CheckpointCache(ttl_seconds=10)
+        with patch("src.graph.cache.time.monotonic", return_value=100):
+            cache.put(_make_checkpoint_tuple("thread", "1"))
+
+        with patch("src.graph.cache.time.monotonic", return_value=109):
+            assert cache.has("thread", "")
+        with patch("src.graph.cache.time.monotonic", return_value=110):
+            assert cache.get("thread", "", "1") is None
+            assert len(cache) == 0
+
+    def test_should_not_replace_a_newer_checkpoint(self):
+        cache = CheckpointCache()
+        cache.put(_make_checkpoint_tuple("thread", "2"))
+
+        cache.put(_make_checkpoint_tuple("thread", "1"))
+
+        assert cache.get("thread", "", "2") is not None
+
+    def test_should_not_cache_pending_writes(self):
+        cache = CheckpointCache()
+        cache.put(
+            _make_checkpoint_tuple("thread", "2")._replace(
+                pending_writes=[("task", "messages", "a")]
+            )
+        )
+
+        assert cache.get("thread", "", "2").pending_writes is None
+        assert cache.get_checkpoint_id("thread", "") == "2"
+        assert cache.get_checkpoint_id("other", "") is None
+
+    def test_should_return_copies(self):
+        cache = CheckpointCache()
+        checkpoint_tuple = _make_checkpoint_tuple("thread", "1")
+        cache.put(checkpoint_tuple)
+
+        checkpoint_tuple.checkpoint["channel_values"]["messages"] = ["mutated"]
+        cache.get("thread", "", "1").checkpoint["channel_values"]["other"] = "mutated"
+
+        assert cache.get("thread", "", "1").checkpoint["channel_values"] == {}
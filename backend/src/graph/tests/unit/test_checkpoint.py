@@ -0,0 +1,843 @@
+import time
+
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiodynamo.errors import ItemNotFound
+from aiodynamo.expressions import F, HashKey, RangeKey
+from aiodynamo.models import BatchGetResponse, BatchWriteResult, Page
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.common.constants import CheckpointSerializer
+
+from ...cache import CheckpointCache
+from ...checkpoint import (
+    AsyncDynamoDBSaver,
+    _make_channel_blob_key,
+    _make_checkpoint_key,
+    _make_writes_key,
+)
+from ...retention import CompactionResult, RetentionPolicy
+from ...serde import MsgpackSerializer
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def _make_checkpoint_item(
+    saver,
+    thread_id,
+    checkpoint_ns,
+    checkpoint_id,
+    metadata={"step": 1},
+    channel_versions={},
+):
+    checkpoint = {
+        **empty_checkpoint(),
+        "id": checkpoint_id,
+        "channel_versions": channel_versions,
+    }
+    type_, serialized_checkpoint = saver.serde.dumps_typed(checkpoint)
+    return {
+        **_make_checkpoint_key(thread_id, checkpoint_ns, checkpoint_id),
+        "checkpoint": serialized_checkpoint,
+        "type": type_,
+        "checkpoint_id": checkpoint_id,
+        "metadata": saver.serde.dumps(metadata),
+        "parent_checkpoint_id": "",
+    }
+
+
+def _make_writes_item(saver, thread_id, checkpoint_ns, checkpoint_id, task_id, idx):
+    type_, value = saver.serde.dumps_typed(f"{task_id}-{idx}")
+    return {
+        **_make_writes_key(thread_id, checkpoint_ns, checkpoint_id, task_id, idx),
+        "channel": "messages",
+        "type": type_,
+        "value": value,
+    }
+
+
+def _pages_by_partition(pages):
+    async def query_single_page(key_condition, **kwargs):
+        return pages[key_condition.hash_key.value]
+
+    return query_single_page
+
+
+@pytest.fixture
+def saver():
+    client = MagicMock()
+    client.batch_write = AsyncMock(return_value={})
+    table = MagicMock()
+    table.name = "Checkpoints"
+    table.get_item = AsyncMock()
+    table.put_item = AsyncMock()
+    table.query_single_page = AsyncMock()
+    return AsyncDynamoDBSaver(client, table)
+
+
+def _batch_put_items(call):
+    return call.args[0]["Checkpoints"].items_to_put
+
+
+def _batch_deleted_keys(call):
+    return call.args[0]["Checkpoints"].keys_to_delete
+
+
+@pytest.mark.unit
+class TestAsyncDynamoDBSaverGetTuple:
+    async def test_should_load_pending_writes_with_a_single_query(self, saver):
+        config = {
+            "configurable": {
+                "thread_id": "thread",
+                "checkpoint_ns": "",
+                "checkpoint_id": "checkpoint",
+            }
+        }
+        saver.table.get_item.return_value = _make_checkpoint_item(
+            saver, "thread", "", "checkpoint"
+        )
+        saver.table.query.side_effect = lambda **kwargs: _aiter(
+            [
+                _make_writes_item(saver, "thread", "", "checkpoint", "task-b", 0),
+                _make_writes_item(saver, "thread", "", "checkpoint", "task-a", 10),
+                _make_writes_item(saver, "thread", "", "checkpoint", "task-a", 2),
+            ]
+        )
+
+        checkpoint_tuple = await saver.aget_tuple(config)
+
+        saver.table.get_item.assert_awaited_once_with(
+            _make_checkpoint_key("thread", "", "checkpoint")
+        )
+        saver.table.query.assert_called_once()
+        assert "projection" not in saver.table.query.call_args.kwargs
+        assert checkpoint_tuple.config == config
+        assert checkpoint_tuple.pending_writes == [
+            ("task-a", "messages", "task-a-2"),
+            ("task-a", "messages", "task-a-10"),
+            ("task-b", "messages", "task-b-0"),
+        ]
+
+    async def test_should_return_none_when_checkpoint_does_not_exist(self, saver):
+        saver.table.get_item.side_effect = ItemNotFound()
+        saver.table.query.side_effect = lambda **kwargs: _aiter([])
+
+        checkpoint_tuple = await saver.aget_tuple(
+            {
+                "configurable": {
+                    "thread_id": "thread",
+                    "checkpoint_ns": "",
+                    "checkpoint_id": "missing",
+                }
+            }
+        )
+
+        assert checkpoint_tuple is None
+
+    async def test_should_resolve_latest_checkpoint_with_a_single_descending_read(
+        self, saver
+    ):
+        saver.table.query_single_page.side_effect = _pages_by_partition(
+            {
+                "checkpoint#thread": Page(
+                    items=[_make_checkpoint_item(saver, "thread", "", "checkpoint-2")],
+                    last_evaluated_key={
+                        "PK": "checkpoint#thread",
+                        "SK": "#checkpoint-2",
+                    },
+                ),
+                "writes#thread": Page(items=[], last_evaluated_key=None),
+            }
+        )
+
+        checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+
+        checkpoints_call, writes_call = saver.table.query_single_page.await_args_list
+        assert checkpoints_call.kwargs["scan_forward"] is False
+        assert checkpoints_call.kwargs["limit"] == 1
+        assert writes_call.kwargs["scan_forward"] is False
+        saver.table.query.assert_not_called()
+        saver.table.get_item.assert_not_awaited()
+        assert checkpoint_tuple.config["configurable"]["checkpoint_id"] == "checkpoint-2"
+
+    async def test_should_read_pending_writes_of_latest_checkpoint_along_with_it(
+        self, saver
+    ):
+        saver.table.query_single_page.side_effect = _pages_by_partition(
+            {
+                "checkpoint#thread": Page(
+                    items=[_make_checkpoint_item(saver, "thread", "", "checkpoint-2")],
+                    last_evaluated_key=None,
+                ),
+                # Newest first, the older checkpoint ends the writes of the latest one
+                "writes#thread": Page(
+                    items=[
+                        _make_writes_item(saver, "thread", "", "checkpoint-2", "task", 1),
+                        _make_writes_item(saver, "thread", "", "checkpoint-2", "task", 0),
+                        _make_writes_item(saver, "thread", "", "checkpoint-1", "task", 0),
+                    ],
+                    last_evaluated_key={"PK": "writes#thread"},
+                ),
+            }
+        )
+
+        checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+
+        saver.table.query.assert_not_called()
+        assert checkpoint_tuple.pending_writes == [
+            ("task", "messages", "task-0"),
+            ("task", "messages", "task-1"),
+        ]
+
+    async def test_should_query_pending_writes_beyond_the_newest_writes(self, saver):
+        saver.table.query_single_page.side_effect = _pages_by_partition(
+            {
+                "checkpoint#thread": Page(
+                    items=[_make_checkpoint_item(saver, "thread", "", "checkpoint-2")],
+                    last_evaluated_key=None,
+                ),
+                "writes#thread": Page(
+                    items=[
+                        _make_writes_item(saver, "thread", "", "checkpoint-2", "task", 1)
+                    ],
+                    last_evaluated_key={"PK": "writes#thread"},
+                ),
+            }
+        )
+        saver.table.query.side_effect = lambda **kwargs: _aiter(
+            [
+                _make_writes_item(saver, "thread", "", "checkpoint-2", "task", idx)
+                for idx in range(2)
+            ]
+        )
+
+        checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+
+        saver.table.query.assert_called_once()
+        assert len(checkpoint_tuple.pending_writes) == 2
+
+    async def test_should_return_none_when_thread_has_no_checkpoints(self, saver):
+        saver.table.query_single_page.return_value = Page(
+            items=[], last_evaluated_key=None
+        )
+
+        checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+
+        assert checkpoint_tuple is None
+        saver.table.query.assert_not_called()
+
+    async def test_should_serve_latest_checkpoint_from_cache_after_version_check(
+        self, saver
+    ):
+        saver.cache = CheckpointCache()
+        config = await saver.aput(
+            {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}},
+            {**empty_checkpoint(), "id": "checkpoint-2"},
+            {"step": 2},
+            {},
+        )
+        await saver.aput_writes(config, [("messages", "hi")], task_id="task")
+        saver.table.query_single_page.return_value = Page(
+            items=[_make_checkpoint_key("thread", "", "checkpoint-2")],
+            last_evaluated_key=None,
+        )
+        # Another worker added a write to the cached checkpoint
+        saver.table.query.side_effect = lambda **kwargs: _aiter(
+            [
+                _make_writes_item(saver, "thread", "", "checkpoint-2", "task", 0),
+                _make_writes_item(saver, "thread", "", "checkpoint-2", "task", 1),
+            ]
+        )
+
+        checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+
+        call = saver.table.query_single_page.await_args
+        assert call.kwargs["projection"] is not None
+        assert call.kwargs["consistent_read"] is True
+        saver.table.query.assert_called_once()
+        saver.table.get_item.assert_not_called()
+        assert checkpoint_tuple.config == config
+        assert checkpoint_tuple.pending_writes == [
+            ("task", "messages", "task-0"),
+            ("task", "messages", "task-1"),
+        ]
+        assert saver.cache.stats["hits"] == 1
+
+    async def test_should_reload_when_another_worker_wrote_a_newer_checkpoint(
+        self, saver
+    ):
+        saver.cache = CheckpointCache()
+        await saver.aput(
+            {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}},
+            {**empty_checkpoint(), "id": "checkpoint-1"},
+            {"step": 1},
+            {},
+        )
+        saver.table.query_single_page.side_effect = [
+            Page(
+                items=[_make_checkpoint_key("thread", "", "checkpoint-2")],
+                last_evaluated_key=None,
+            ),
+            Page(
+                items=[_make_checkpoint_item(saver, "thread", "", "checkpoint-2")],
+                last_evaluated_key=None,
+            ),
+            Page(items=[], last_evaluated_key=None),
+        ]
+        saver.table.query.side_effect = lambda **kwargs: _aiter([])
+
+        checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": "thread"}})
+
+        assert checkpoint_tuple.config["configurable"]["checkpoint_id"] == "checkpoint-2"
+        assert saver.cache.stats["misses"] == 1
+        # The reloaded checkpoint replaces the stale one
+        assert saver.cache.get("thread", "", "checkpoint-2") is not None
+
+
+@pytest.mark.unit
+class TestAsyncDynamoDBSaverPut:
+    async def test_should_store_scalar_metadata_as_top_level_attributes(self, saver):
+        checkpoint = {**empty_checkpoint(), "id": "checkpoint"}
+        metadata = {"source": "loop", "step": 3, "writes": {"node": {"a": 1}}}
+
+        await saver.aput(
+            {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}},
+            checkpoint,
+            metadata,
+            {},
+        )
+
+        item = saver.table.put_item.await_args.args[0]
+        assert item["metadata_source"] == "loop"
+        assert item["metadata_step"] == 3
+        assert "metadata_writes" not in item
+        assert saver.serde.loads(item["metadata"]) == metadata
+
+    async def test_should_write_only_new_channel_versions_as_blobs(self, saver):
+        checkpoint = {
+            **empty_checkpoint(),
+            "id": "checkpoint",
+            "channel_values": {"messages": ["hi"], "documents": ["doc"]},
+            "channel_versions": {"messages": 2, "documents": 1, "branch": 2},
+        }
+
+        await saver.aput(
+            {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}},
+            checkpoint,
+            {},
+            {"messages": 2, "branch": 2},
+        )
+
+        blobs = _batch_put_items(saver.client.batch_write.await_args)
+        assert [(blob["SK"], blob["type"]) for blob in blobs] == [
+            ("#messages#2", "msgpack"),
+            ("#branch#2", "empty"),
+        ]
+        item = saver.table.put_item.await_args.args[0]
+        assert "channel_values" not in saver.serde.loads_typed(
+            (item["type"], item["checkpoint"])
+        )
+        assert item["channel_versions"] == {
+            "messages": "2",
+            "documents": "1",
+            "branch": "2",
+        }
+
+    async def test_should_expire_blobs_after_checkpoints_and_writes(self, saver):
+        saver.retention_policy = RetentionPolicy(ttl=timedelta(days=1))
+        checkpoint = {
+            **empty_checkpoint(),
+            "id": "checkpoint",
+            "channel_values": {"messages": ["hi"]},
+            "channel_versions": {"messages": 1},
+        }
+
+        config = await saver.aput(
+            {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}},
+            checkpoint,
+            {},
+            {"messages": 1},
+        )
+        await saver.aput_writes(config, [("messages", "hey")], task_id="task")
+
+        blobs_call, writes_call = saver.client.batch_write.await_args_list
+        checkpoint_expires_at = saver.table.put_item.await_args.args[0]["expires_at"]
+        assert _batch_put_items(writes_call)[0]["expires_at"] == checkpoint_expires_at
+        assert (
+            _batch_put_items(blobs_call)[0]["expires_at"]
+            >= checkpoint_expires_at + timedelta(days=1).total_seconds()
+        )
+
+    async def test_should_rewrite_blobs_of_unchanged_channels_expiring_first(
+        self, saver
+    ):
+        saver.retention_policy = RetentionPolicy(ttl=timedelta(days=1))
+        checkpoint = {
+            **empty_checkpoint(),
+            "id": "checkpoint-1",
+            "channel_values": {"messages": ["hi"], "intent": "greeting"},
+            "channel_versions": {"messages": 1.5, "intent": 1.5},
+        }
+        config = await saver.aput(
+            {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}},
+            checkpoint,
+            {},
+            {"messages": 1.5, "intent": 1.5},
+        )
+        saver.client.batch_write.reset_mock()
+
+        # The blob of "messages" is still referenced two days later
+        with patch(
+            "src.graph.retention.time.time", return_value=time.time() + 2 * 24 * 3600
+        ):
+            await saver.aput(
+                config,
+                {
+                    **checkpoint,
+                    "id": "checkpoint-2",
+                    "channel_values": {"messages": ["hi"], "intent": "knowledge"},
+                    "channel_versions": {"messages": 1.5, "intent": 2.5},
+                },
+                {},
+                {"intent": 2.5},
+            )
+
+        blobs = _batch_put_items(saver.client.batch_write.await_args)
+        assert [blob["SK"] for blob in blobs] == ["#intent#2.5", "#messages#1.5"]
+        assert {blob["expires_at"] for blob in blobs} == {
+            max(blob["expires_at"] for blob in blobs)
+        }
+
+    async def test_should_write_blobs_of_unchanged_channels_of_inline_parent(
+        self, saver
+    ):
+        # A thread whose latest checkpoint was written before channel blobs existed
+        stored_items = {}
+
+        async def batch_write(request):
+            for item in request["Checkpoints"].items_to_put:
+                stored_items[item["PK"], item["SK"]] = item
+            return {}
+
+        async def batch_get(request):
+            items = [
+                stored_items[key["PK"], key["SK"]]
+                for key in request["Checkpoints"].keys
+                if (key["PK"], key["SK"]) in stored_items
+            ]
+            return BatchGetResponse(
+                items={"Checkpoints": items}, unprocessed_keys={}
+            )
+
+        saver.client.batch_write.side_effect = batch_write
+        saver.client.batch_get = AsyncMock(side_effect=batch_get)
+        legacy_checkpoint = {
+            **empty_checkpoint(),
+            "id": "legacy",
+            "channel_values": {"messages": ["hi"], "intent": "greeting"},
+            "channel_versions": {"messages": 1, "intent": 1, "branch": 1},
+        }
+        config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+
+        config = await saver.aput(
+            {"configurable": {**config["configurable"], "checkpoint_id": "legacy"}},
+            {
+                **legacy_checkpoint,
+                "id": "checkpoint-1",
+                "channel_values": {"messages": ["hi"], "intent": "knowledge"},
+                "channel_versions": {"messages": 1, "intent": 2.5, "branch": 1},
+            },
+            {},
+            {"intent": 2.5},
+        )
+        await saver.aput(
+            config,
+            {
+                **legacy_checkpoint,
+                "id": "checkpoint-2",
+                "channel_values": {"messages": ["hi", "hey"], "intent": "knowledge"},
+                "channel_versions": {"messages": 2.5, "intent": 2.5, "branch": 1},
+            },
+            {},
+            {"messages": 2.5},
+        )
+
+        assert sorted(key for _, key in stored_items) == [
+            "#branch#1",
+            "#intent#2.5",
+            "#messages#1",
+            "#messages#2.5",
+        ]
+        # The blobs are looked up once, the second checkpoint knows they exist
+        saver.client.batch_get.assert_awaited_once()
+        saver.table.get_item.return_value = saver.table.put_item.await_args_list[
+            0
+        ].args[0]
+        saver.table.query.side_effect = lambda **kwargs: _aiter([])
+        checkpoint_tuple = await saver.aget_tuple(
+            {"configurable": {**config["configurable"], "checkpoint_id": "checkpoint-1"}}
+        )
+        assert checkpoint_tuple.checkpoint["channel_values"] == {
+            "messages": ["hi"],
+            "intent": "knowledge",
+        }
+
+    def test_should_generate_unique_increasing_versions(self, saver):
+        first = saver.get_next_version(None, None)
+        second = saver.get_next_version(first, None)
+
+        assert 1 <= first < 2 <= second < 3
+        assert saver.get_next_version(1, None) != saver.get_next_version(1, None)
+        assert saver.get_next_version(5, None) > 5
+
+
+@pytest.mark.unit
+class TestAsyncDynamoDBSaverPutWrites:
+    config = {
+        "configurable": {
+            "thread_id": "thread",
+            "checkpoint_ns": "",
+            "checkpoint_id": "checkpoint",
+        }
+    }
+
+    async def test_should_write_in_batches_of_25_items(self, saver):
+        writes = [(f"channel_{i}", i) for i in range(60)]
+
+        await saver.aput_writes(self.config, writes, task_id="task")
+
+        batches = [
+            _batch_put_items(call) for call in saver.client.batch_write.await_args_list
+        ]
+        assert [len(batch) for batch in batches] == [25, 25, 10]
+        assert [item["SK"] for batch in batches for item in batch] == [
+            f"#checkpoint#task#{i}" for i in range(60)
+        ]
+        saver.table.put_item.assert_not_called()
+
+    async def test_should_write_same_keys_for_same_task_writes(self, saver):
+        writes = [("channel_a", "a"), ("channel_b", "b")]
+
+        await saver.aput_writes(self.config, writes, task_id="task")
+        await saver.aput_writes(self.config, writes, task_id="task")
+
+        first_call, second_call = saver.client.batch_write.await_args_list
+        assert _batch_put_items(first_call) == _batch_put_items(second_call)
+
+    @patch("src.graph.checkpoint.asyncio.sleep", new_callable=AsyncMock)
+    async def test_should_retry_unprocessed_items_with_backoff(self, mock_sleep, saver):
+        writes = [("channel_a", "a"), ("channel_b", "b")]
+        saver.client.batch_write.side_effect = lambda request: (
+            {
+                "Checkpoints": BatchWriteResult(
+                    undeleted_keys=[],
+                    unput_items=request["Checkpoints"].items_to_put[1:],
+                )
+            }
+            if len(request["Checkpoints"].items_to_put) > 1
+            else {}
+        )
+
+        await saver.aput_writes(self.config, writes, task_id="task")
+
+        first_call, retry_call = saver.client.batch_write.await_args_list
+        assert _batch_put_items(retry_call) == _batch_put_items(first_call)[1:]
+        mock_sleep.assert_awaited_once()
+
+    @patch("src.graph.checkpoint.asyncio.sleep", new_callable=AsyncMock)
+    async def test_should_raise_when_items_stay_unprocessed(self, mock_sleep, saver):
+        saver.client.batch_write.side_effect = lambda request: {
+            "Checkpoints": BatchWriteResult(
+                undeleted_keys=[], unput_items=request["Checkpoints"].items_to_put
+            )
+        }
+
+        with pytest.raises(RuntimeError):
+            await saver.aput_writes(self.config, [("channel", "a")], task_id="task")
+
+        assert saver.client.batch_write.await_count == 5
+
+
+@pytest.mark.unit
+class TestAsyncDynamoDBSaverList:
+    config = {"configurable": {"thread_id": "thread", "checkpoint_ns": ""}}
+
+    def _make_page(self, saver, checkpoint_ids, last_evaluated_key=None):
+        return Page(
+            items=[
+                _make_checkpoint_item(saver, "thread", "", checkpoint_id)
+                for checkpoint_id in checkpoint_ids
+            ],
+            last_evaluated_key=last_evaluated_key,
+        )
+
+    async def test_should_push_before_and_limit_into_a_descending_query(self, saver):
+        saver.table.query_single_page.return_value = self._make_page(
+            saver, ["5", "4", "3"], last_evaluated_key={"PK": "checkpoint#thread"}
+        )
+        before = {"configurable": {"checkpoint_id": "5"}}
+
+        checkpoint_tuples = [
+            checkpoint_tuple
+            async for checkpoint_tuple in saver.alist(
+                self.config, before=before, limit=2
+            )
+        ]
+
+        saver.table.query_single_page.assert_awaited_once_with(
+            key_condition=HashKey("PK", "checkpoint#thread")
+            & RangeKey("SK").between("#", "#5"),
+            start_key=None,
+            filter_expression=None,
+            scan_forward=False,
+            limit=3,
+        )
+        assert [
+            checkpoint_tuple.config["configurable"]["checkpoint_id"]
+            for checkpoint_tuple in checkpoint_tuples
+        ] == ["4", "3"]
+
+    async def test_should_stream_pages_until_limit_is_reached(self, saver):
+        saver.table.query_single_page.side_effect = [
+            self._make_page(saver, ["5", "4"], last_evaluated_key={"SK": "#4"}),
+            self._make_page(saver, ["3"], last_evaluated_key={"SK": "#3"}),
+        ]
+
+        checkpoint_tuples = [
+            checkpoint_tuple
+            async for checkpoint_tuple in saver.alist(self.config, limit=3)
+        ]
+
+        assert len(checkpoint_tuples) == 3
+        first_call, second_call = saver.table.query_single_page.await_args_list
+        assert first_call.kwargs["limit"] == 3
+        assert second_call.kwargs["limit"] == 1
+        assert second_call.kwargs["start_key"] == {"SK": "#4"}
+
+    async def test_should_list_all_checkpoints_without_limit(self, saver):
+        saver.table.query_single_page.side_effect = [
+            self._make_page(saver, ["5", "4"], last_evaluated_key={"SK": "#4"}),
+            self._make_page(saver, ["3"]),
+        ]
+
+        checkpoint_tuples = [
+            checkpoint_tuple async for checkpoint_tuple in saver.alist(self.config)
+        ]
+
+        assert len(checkpoint_tuples) == 3
+        assert all(
+            call.kwargs["limit"] is None
+            for call in saver.table.query_single_page.await_args_list
+        )
+        saver.table.get_item.assert_not_awaited()
+
+    async def test_should_evaluate_scalar_metadata_filters_in_dynamodb(self, saver):
+        saver.table.query_single_page.return_value = Page(
+            items=[
+                _make_checkpoint_item(
+                    saver, "thread", "", "5", {"source": "loop", "parents": {"": "1"}}
+                ),
+                _make_checkpoint_item(
+                    saver, "thread", "", "4", {"source": "loop", "parents": {}}
+                ),
+            ],
+            last_evaluated_key={"SK": "#4"},
+        )
+
+        checkpoint_tuples = [
+            checkpoint_tuple
+            async for checkpoint_tuple in saver.alist(
+                self.config,
+                filter={"source": "loop", "step": 2, "parents": {}},
+                limit=1,
+            )
+        ]
+
+        call = saver.table.query_single_page.await_args
+        assert call.kwargs["filter_expression"] == F("metadata_source").equals(
+            "loop"
+        ) & F("metadata_step").equals(2)
+        # The page size is applied before the filter expression, so it is not pushed down
+        assert call.kwargs["limit"] is None
+        assert [
+            checkpoint_tuple.config["configurable"]["checkpoint_id"]
+            for checkpoint_tuple in checkpoint_tuples
+        ] == ["4"]
+
+
+@pytest.mark.unit
+class TestAsyncDynamoDBSaverCompaction:
+    async def test_should_delete_expired_checkpoints_superseded_writes_and_blobs(
+        self, saver
+    ):
+        saver.retention_policy = RetentionPolicy(
+            keep_last=1, keep_newer_than=timedelta(0)
+        )
+        old_id, latest_id, in_flight_id = (str(uuid6()) for _ in range(3))
+        items = {
+            "checkpoint#thread": [
+                {
+                    **_make_checkpoint_key("thread", "", checkpoint_id),
+                    "channel_versions": {"messages": version},
+                }
+                for checkpoint_id, version in ((latest_id, "2"), (old_id, "1"))
+            ],
+            "writes#thread": [
+                _make_writes_item(saver, "thread", "", checkpoint_id, "task", 0)
+                for checkpoint_id in (old_id, latest_id, in_flight_id)
+            ],
+            "blobs#thread": [
+                {
+                    **_make_channel_blob_key("thread", "", "messages", version),
+                    "type": "empty",
+                    "checkpoint_id": checkpoint_id,
+                }
+                for version, checkpoint_id in enumerate(
+                    (old_id, latest_id, in_flight_id), start=1
+                )
+            ],
+        }
+        saver.table.query.side_effect = lambda key_condition, **kwargs: _aiter(
+            items[key_condition.value]
+        )
+
+        result = await saver.acompact_thread("thread")
+
+        assert _batch_deleted_keys(saver.client.batch_write.await_args) == [
+            _make_checkpoint_key("thread", "", old_id),
+            _make_writes_key("thread", "", old_id, "task", 0),
+            _make_channel_blob_key("thread", "", "messages", 1),
+        ]
+        assert result.items == 3
+        assert result.bytes > 0
+        assert result == CompactionResult(
+            threads=1, checkpoints=1, writes=1, blobs=1, bytes=result.bytes
+        )
+
+    async def test_should_read_referenced_blobs_without_deserializing_checkpoints(
+        self, saver
+    ):
+        saver.retention_policy = RetentionPolicy(
+            keep_last=2, keep_newer_than=timedelta(0)
+        )
+        legacy_id, latest_id = (str(uuid6()) for _ in range(2))
+        # The checkpoints query only reads the keys and channel versions
+        items = {
+            "checkpoint#thread": [
+                {
+                    **_make_checkpoint_key("thread", "", latest_id),
+                    "channel_versions": {"messages": "2.5"},
+                },
+                _make_checkpoint_key("thread", "", legacy_id),
+            ],
+            "writes#thread": [],
+            "blobs#thread": [
+                {
+                    **_make_channel_blob_key("thread", "", "messages", version),
+                    "type": "empty",
+                    "checkpoint_id": checkpoint_id,
+                }
+                for version, checkpoint_id in ((1, legacy_id), (2.5, latest_id))
+            ],
+        }
+        saver.table.query.side_effect = lambda key_condition, **kwargs: _aiter(
+            items[key_condition.value]
+        )
+        saver.table.get_item.return_value = _make_checkpoint_item(
+            saver, "thread", "", legacy_id, channel_versions={"messages": 1}
+        )
+
+        with patch.object(
+            saver.serde_offloader,
+            "aloads_typed",
+            wraps=saver.serde_offloader.aloads_typed,
+        ) as mock_aloads_typed:
+            result = await saver.acompact_thread("thread")
+
+        checkpoints_query = saver.table.query.call_args_list[0]
+        assert checkpoints_query.kwargs["projection"] == F("PK") & F("SK") & F(
+            "channel_versions"
+        ) & F("checkpoint_ref")
+        # Only the checkpoint written before the attribute existed is read and deserialized
+        saver.table.get_item.assert_awaited_once_with(
+            _make_checkpoint_key("thread", "", legacy_id)
+        )
+        mock_aloads_typed.assert_awaited_once()
+        assert result.items == 0
+
+    async def test_should_keep_writes_of_retained_checkpoints(self, saver):
+        saver.retention_policy = RetentionPolicy(
+            keep_last=2, keep_newer_than=timedelta(0)
+        )
+        old_id, retained_id, latest_id = (str(uuid6()) for _ in range(3))
+        items = {
+            "checkpoint#thread": [
+                {**_make_checkpoint_key("thread", "", checkpoint_id), "channel_versions": {}}
+                for checkpoint_id in (latest_id, retained_id, old_id)
+            ],
+            "writes#thread": [
+                _make_writes_item(saver, "thread", "", checkpoint_id, "task", 0)
+                for checkpoint_id in (old_id, retained_id, latest_id)
+            ],
+            "blobs#thread": [],
+        }
+        saver.table.query.side_effect = lambda key_condition, **kwargs: _aiter(
+            items[key_condition.value]
+        )
+
+        await saver.acompact_thread("thread")
+
+        assert _batch_deleted_keys(saver.client.batch_write.await_args) == [
+            _make_checkpoint_key("thread", "", old_id),
+            _make_writes_key("thread", "", old_id, "task", 0),
+        ]
+
+    @patch("src.graph.checkpoint.asyncio.sleep", new_callable=AsyncMock)
+    async def test_should_retry_undeleted_keys_with_backoff(self, mock_sleep, saver):
+        keys = [_make_writes_key("thread", "", "checkpoint", "task", i) for i in range(2)]
+        saver.client.batch_write.side_effect = lambda request: (
+            {
+                "Checkpoints": BatchWriteResult(
+                    undeleted_keys=request["Checkpoints"].keys_to_delete[1:],
+                    unput_items=[],
+                )
+            }
+            if len(request["Checkpoints"].keys_to_delete) > 1
+            else {}
+        )
+
+        await saver._abatch_delete_keys(keys)
+
+        _, retry_call = saver.client.batch_write.await_args_list
+        assert _batch_deleted_keys(retry_call) == keys[1:]
+        mock_sleep.assert_awaited_once()
+
+
+@pytest.mark.unit
+class TestAsyncDynamoDBSaverFromConnInfo:
+    @pytest.mark.parametrize(
+        "serializer, serde_class",
+        [
+            (CheckpointSerializer.JSONPLUS, JsonPlusSerializer),
+            (CheckpointSerializer.MSGPACK, MsgpackSerializer),
+        ],
+    )
+    @patch("src.graph.checkpoint.S3BlobStore", MagicMock())
+    @patch("src.graph.checkpoint.settings")
+    async def test_should_use_serializer_of_settings(
+        self, mock_settings, serializer, serde_class
+    ):
+        mock_settings.ENVIRONMENT.is_local = False
+        mock_settings.CHECKPOINT_SERIALIZER = serializer
+
+        async with AsyncDynamoDBSaver.from_conn_info(
+            region="eu-north-1", table_name="Checkpoints"
+        ) as saver:
+            assert isinstance(saver.serde, serde_class)
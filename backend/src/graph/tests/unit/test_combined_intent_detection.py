@@ -0,0 +1,90 @@
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.properties.schemas import SearchPropertiesFilters
+
+from ...nodes import (
+    build_search_properties_filters,
+    detect_intent_with_search_properties_filters,
+)
+from ...schemas import (
+    IntentAndSearchPropertiesFiltersResponse,
+    LLMChain,
+    QuestionIntent,
+)
+
+
+@pytest.mark.unit
+class TestCombinedIntentDetection:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.chains = {
+            LLMChain.INTENT_DETECTION_WITH_SEARCH_PROPERTIES_FILTERS: Mock(),
+            LLMChain.BUILD_SEARCH_PROPERTIES_FILTERS: Mock(ainvoke=AsyncMock()),
+        }
+        self.llm_registry = Mock()
+        self.llm_registry.ainvoke_chain = AsyncMock(side_effect=self._ainvoke_chain)
+        with (
+            patch("src.graph.nodes.settings.INTENT_CLASSIFIER_ENABLED", False),
+            patch("src.graph.nodes.get_llm_registry", return_value=self.llm_registry),
+        ):
+            yield
+
+    async def _ainvoke_chain(self, name: LLMChain, inputs: dict):
+        return await self.chains[name].ainvoke(inputs)
+
+    def _respond(self, response: IntentAndSearchPropertiesFiltersResponse) -> None:
+        chain = self.chains[LLMChain.INTENT_DETECTION_WITH_SEARCH_PROPERTIES_FILTERS]
+        chain.ainvoke = AsyncMock(return_value=response)
+
+    def _make_state(self, question: str) -> dict:
+        return {"messages": [HumanMessage(content=question, id="message-1")]}
+
+    async def test_should_build_filters_of_property_search_in_the_same_call(self):
+        self._respond(
+            IntentAndSearchPropertiesFiltersResponse(
+                intent=QuestionIntent.FINDING_PROPERTY,
+                reasoning="The user is looking for a flat in Espoo",
+                filters=SearchPropertiesFilters(city="Espoo"),
+                has_enough_search_properties_filters=True,
+            )
+        )
+        state = self._make_state("Find me a flat in Espoo")
+
+        update = await detect_intent_with_search_properties_filters(state)
+        filters_update = await build_search_properties_filters({**state, **update})
+
+        assert update["intent"] == QuestionIntent.FINDING_PROPERTY
+        assert filters_update == {
+            "search_properties_filters": SearchPropertiesFilters(city="Espoo"),
+            "has_enough_search_properties_filters": True,
+        }
+        self.chains[LLMChain.BUILD_SEARCH_PROPERTIES_FILTERS].ainvoke.assert_not_called()
+
+    async def test_should_not_keep_filters_of_other_intents(self):
+        self._respond(
+            IntentAndSearchPropertiesFiltersResponse(
+                intent=QuestionIntent.HOUSE_BUYING_KNOWLEDGE, reasoning=""
+            )
+        )
+
+        update = await detect_intent_with_search_properties_filters(
+            self._make_state("What is the transfer tax?")
+        )
+
+        assert update == {
+            "intent": QuestionIntent.HOUSE_BUYING_KNOWLEDGE,
+            "speculative_results": None,
+        }
+
+    def test_should_convert_to_filters_response_without_filters(self):
+        response = IntentAndSearchPropertiesFiltersResponse(
+            intent=QuestionIntent.FINDING_PROPERTY, reasoning="No city given"
+        )
+
+        filters_response = response.to_search_properties_filters_response()
+
+        assert filters_response.filters == SearchPropertiesFilters()
+        assert not filters_response.has_enough_search_properties_filters
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+import pytest
+
+from ...embedding_cache import QueryEmbeddingCache
+
+
+@pytest.mark.unit
+class TestQueryEmbeddingCache:
+    def test_should_return_copy_of_cached_embedding(self):
+        cache = QueryEmbeddingCache()
+        cache.put("What is the transfer tax?", [0.1, 0.2])
+
+        embedding = cache.get("What is the transfer tax? ")
+        embedding.append(0.3)
+
+        assert cache.get("What is the transfer tax?") == [0.1, 0.2]
+        assert cache.get("What is the debt-free price?") is None
+        assert cache.stats == {"hits": 2, "misses": 1, "entries": 1, "hit_rate": 2 / 3}
+
+    def test_should_evict_least_recently_used_entry(self):
+        cache = QueryEmbeddingCache(max_entries=2)
+        cache.put("first", [1.0])
+        cache.put("second", [2.0])
+        cache.get("first")
+
+        cache.put("third", [3.0])
+
+        assert cache.get("second") is None
+        assert cache.get("first") == [1.0]
+        assert cache.get("third") == [3.0]
+
+    def test_should_expire_entries(self):
+        cache = QueryEmbeddingCache(ttl_seconds=60)
+        with patch("src.graph.embedding_cache.time.monotonic", return_value=1000.0):
+            cache.put("first", [1.0])
+
+        with patch("src.graph.embedding_cache.time.monotonic", return_value=1060.0):
+            assert cache.get("first") is None
+        assert len(cache) == 0
+
+    def test_should_not_cache_without_entries(self):
+        cache = QueryEmbeddingCache(max_entries=0)
+        cache.put("first", [1.0])
+
+        assert cache.get("first") is None
@@ -0,0 +1,138 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, StateGraph
+
+from ...graph import build_graph
+from ...history import MESSAGE_OVERHEAD_TOKENS, ChatHistoryWindow, get_tokenizer
+from ...router import summarize_history_after_run
+from ...schemas import OverallState
+
+
+def _count_words(text: str) -> int:
+    return len(text.split())
+
+
+def _make_messages(turns: int) -> list:
+    """Messages of 6 words, 10 tokens along with the overhead."""
+    messages = []
+    for turn in range(turns):
+        messages += [
+            HumanMessage(content=f"question {turn} about flats in Espoo", id=f"human-{turn}"),
+            AIMessage(content=f"answer {turn} about flats in Espoo", id=f"ai-{turn}"),
+        ]
+    return messages
+
+
+@pytest.mark.unit
+class TestChatHistoryWindow:
+    @pytest.fixture
+    def window(self):
+        return ChatHistoryWindow(
+            max_tokens=40, summary_target_tokens=20, count_tokens=_count_words
+        )
+
+    def test_should_keep_recent_messages_within_budget(self, window):
+        messages = _make_messages(5)
+
+        history = window.build({"messages": messages})
+
+        assert window.count_message_tokens(messages[0]) == 6 + MESSAGE_OVERHEAD_TOKENS
+        assert history == messages[-4:]
+
+    def test_should_always_keep_the_latest_message(self, window):
+        question = HumanMessage(content="word " * 100, id="long")
+
+        assert window.build({"messages": [*_make_messages(1), question]}) == [question]
+
+    async def test_should_fold_oldest_messages_into_summary(self, window):
+        messages = _make_messages(3)
+        summarize = AsyncMock(return_value="The user looks for flats in Espoo.")
+
+        assert await window.aupdate_summary({"messages": messages[:4]}, summarize) == {}
+        update = await window.aupdate_summary({"messages": messages}, summarize)
+
+        summarize.assert_called_once_with(None, messages[:4])
+        assert update == {
+            "history_summary": "The user looks for flats in Espoo.",
+            "summarized_message_id": "ai-1",
+        }
+        assert window.build({"messages": messages, **update}) == [
+            SystemMessage(
+                content="Summary of the earlier conversation: The user looks for flats in Espoo."
+            ),
+            *messages[4:],
+        ]
+
+    async def test_should_update_summary_incrementally(self, window):
+        messages = _make_messages(6)
+        state = {
+            "messages": messages,
+            "history_summary": "Earlier summary",
+            "summarized_message_id": "ai-1",
+        }
+        summarize = AsyncMock(return_value="Updated summary")
+
+        update = await window.aupdate_summary(state, summarize)
+
+        # Only the messages after the summarized ones are folded
+        summarize.assert_called_once_with("Earlier summary", messages[4:10])
+        assert update["summarized_message_id"] == "ai-4"
+
+    def test_should_cache_tokenizer_per_process(self):
+        count_tokens = get_tokenizer()
+
+        assert get_tokenizer() is count_tokens
+        assert count_tokens("Find me a flat in Espoo") > 0
+
+
+@pytest.mark.unit
+class TestSummarizeHistoryAfterRun:
+    @pytest.fixture
+    def agent(self):
+        async def answer(state: OverallState):
+            return {"messages": [AIMessage(content="An answer", id="ai-0")]}
+
+        builder = StateGraph(OverallState)
+        builder.add_node("answer", answer)
+        builder.set_entry_point("answer")
+        builder.add_edge("answer", END)
+        return builder.compile(checkpointer=MemorySaver())
+
+    def test_should_not_summarize_before_the_end_of_a_run(self):
+        assert "summarize_history" not in build_graph().nodes
+
+    @patch("src.graph.router.summarize_history")
+    async def test_should_update_summary_of_the_run(self, mock_summarize_history, agent):
+        mock_summarize_history.return_value = {
+            "history_summary": "The user asked a question.",
+            "summarized_message_id": "ai-0",
+        }
+        config = {"configurable": {"thread_id": "thread"}}
+        await agent.ainvoke(
+            {"messages": [HumanMessage(content="A question", id="human-0")]}, config
+        )
+
+        await summarize_history_after_run(agent, "thread")
+
+        state = await agent.aget_state(config)
+        summarized_state = mock_summarize_history.call_args.args[0]
+        assert [message.id for message in summarized_state["messages"]] == ["human-0", "ai-0"]
+        assert state.values["history_summary"] == "The user asked a question."
+        assert state.values["summarized_message_id"] == "ai-0"
+        assert state.next == ()
+
+    @patch("src.graph.router.summarize_history")
+    async def test_should_not_fail_when_summarization_fails(
+        self, mock_summarize_history, agent
+    ):
+        mock_summarize_history.side_effect = RuntimeError("Timeout")
+        config = {"configurable": {"thread_id": "thread"}}
+        await agent.ainvoke({"messages": [HumanMessage(content="A question")]}, config)
+
+        await summarize_history_after_run(agent, "thread")
+
+        state = await agent.aget_state(config)
+        assert "history_summary" not in state.values
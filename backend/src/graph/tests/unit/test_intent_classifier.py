@@ -0,0 +1,190 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import HumanMessage
+
+from ...intent_classifier import LocalIntentClassifier
+from ...nodes import detect_intent
+from ...schemas import IntentDetectionResponse, QuestionIntent
+
+VECTORS = {
+    "What is the debt-free price?": [1.0, 0.0, 0.0],
+    "How does the transfer tax work?": [0.95, 0.3, 0.0],
+    "What is a maintenance charge?": [0.9, 0.4, 0.0],
+    "Write me a poem": [0.0, 0.0, 1.0],
+    "Recommend a restaurant": [0.0, 0.3, 0.95],
+}
+
+
+class _KeyedEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded_documents = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded_documents += len(texts)
+        return [VECTORS[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return VECTORS[text]
+
+
+@pytest.fixture
+def classifier():
+    return LocalIntentClassifier(
+        _KeyedEmbeddings(),
+        [
+            ("What is the debt-free price?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+            ("How does the transfer tax work?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+            ("What is a maintenance charge?", QuestionIntent.HOUSE_BUYING_KNOWLEDGE),
+            ("Write me a poem", QuestionIntent.UNSUPPORTED),
+            ("Recommend a restaurant", QuestionIntent.UNSUPPORTED),
+        ],
+        k=3,
+        min_similarity=0.9,
+        min_agreement=0.6,
+    )
+
+
+@pytest.mark.unit
+class TestLocalIntentClassifier:
+    @pytest.mark.parametrize(
+        "message, intent",
+        [
+            ("Hello!", QuestionIntent.GREETING),
+            ("Thank you so much, bye", QuestionIntent.GREETING),
+            ("Moi", QuestionIntent.GREETING),
+            ("Find me a 2-room flat in Espoo", QuestionIntent.FINDING_PROPERTY),
+            ("3 bedroom house in Vantaa with a sauna", QuestionIntent.FINDING_PROPERTY),
+            ("Etsi kaksio Kalliosta", QuestionIntent.FINDING_PROPERTY),
+            ("Hello, how do I pay the transfer tax?", None),
+            ("How much is the transfer tax of a 2-room flat?", None),
+            ("Can a foreigner buy a house in Finland?", None),
+            ("And in Tampere?", None),
+        ],
+    )
+    def test_should_classify_clear_cut_messages_with_rules(
+        self, classifier, message, intent
+    ):
+        prediction = classifier.classify_with_rules(message)
+
+        assert (prediction and prediction.intent) == intent
+
+    async def test_should_classify_by_vote_of_nearest_examples(self, classifier):
+        prediction = await classifier.aclassify_with_knn([0.98, 0.2, 0.0])
+
+        assert prediction.intent == QuestionIntent.HOUSE_BUYING_KNOWLEDGE
+        assert prediction.confidence == 1.0
+        assert prediction.source == "knn"
+
+    async def test_should_not_classify_when_not_confident(self, classifier):
+        # Not similar enough to any example
+        assert await classifier.aclassify_with_knn([0.5, 0.5, 0.5]) is None
+        # Two of the three nearest examples agree
+        classifier.min_similarity = 0.0
+        classifier.min_agreement = 0.8
+        assert await classifier.aclassify_with_knn([0.5, 0.5, 0.5]) is None
+
+    async def test_should_embed_examples_once(self, classifier):
+        await classifier.aclassify_with_knn([1.0, 0.0, 0.0])
+        await classifier.aclassify_with_knn([0.0, 0.0, 1.0])
+        classifier.record_llm_prediction()
+
+        assert classifier.embeddings.embedded_documents == 5
+        assert classifier.stats == {"rules": 0, "knn": 2, "llm": 1, "llm_cancelled": 0}
+
+
+@pytest.mark.unit
+class TestDetectIntentWithLocalClassifier:
+    @pytest.fixture(autouse=True)
+    def setup(self, classifier):
+        self.classifier = classifier
+        self.llm_registry = Mock()
+        self.llm_cancelled = asyncio.Event()
+        self.release_llm = asyncio.Event()
+
+        async def ainvoke_chain(name, inputs):
+            try:
+                await self.release_llm.wait()
+            except asyncio.CancelledError:
+                self.llm_cancelled.set()
+                raise
+            return IntentDetectionResponse(
+                intent=QuestionIntent.UNSUPPORTED, reasoning=""
+            )
+
+        self.llm_registry.ainvoke_chain = AsyncMock(side_effect=ainvoke_chain)
+        with (
+            patch("src.graph.nodes.settings.INTENT_CLASSIFIER_ENABLED", True),
+            patch(
+                "src.graph.nodes.settings.INTENT_CLASSIFIER_KNN_TIMEOUT_SECONDS", 0.01
+            ),
+            patch("src.graph.nodes.get_intent_classifier", return_value=classifier),
+            patch("src.graph.nodes.get_llm_registry", return_value=self.llm_registry),
+        ):
+            yield
+
+    def _make_state(self, question: str) -> dict:
+        return {"messages": [HumanMessage(content=question)]}
+
+    async def test_should_not_call_llm_when_knn_is_confident(self):
+        self.llm_registry.aembed_query = AsyncMock(return_value=[0.98, 0.2, 0.0])
+
+        update = await detect_intent(self._make_state("What is the debt-free price?"))
+
+        assert update == {"intent": QuestionIntent.HOUSE_BUYING_KNOWLEDGE}
+        self.llm_registry.ainvoke_chain.assert_not_awaited()
+        assert self.classifier.stats["knn"] == 1
+
+    async def test_should_call_llm_only_when_knn_is_not_confident(self):
+        self.llm_registry.aembed_query = AsyncMock(return_value=[0.5, 0.5, 0.5])
+        self.release_llm.set()
+
+        update = await detect_intent(self._make_state("Write me a song"))
+
+        assert update == {"intent": QuestionIntent.UNSUPPORTED}
+        self.llm_registry.ainvoke_chain.assert_awaited_once()
+        assert self.classifier.stats["llm"] == 1
+
+    async def test_should_cancel_llm_started_after_timeout_when_knn_is_confident(self):
+        async def aembed_query(text):
+            # The LLM classification started once the kNN timeout passed
+            await asyncio.wait_for(self._wait_for_llm_call(), 1)
+            return [0.98, 0.2, 0.0]
+
+        self.llm_registry.aembed_query = AsyncMock(side_effect=aembed_query)
+
+        update = await detect_intent(self._make_state("What is the debt-free price?"))
+
+        assert update == {"intent": QuestionIntent.HOUSE_BUYING_KNOWLEDGE}
+        await asyncio.wait_for(self.llm_cancelled.wait(), 1)
+        assert self.classifier.stats["knn"] == 1
+        assert self.classifier.stats["llm_cancelled"] == 1
+
+    async def test_should_classify_with_llm_while_slow_message_is_embedded(self):
+        async def aembed_query(text):
+            await asyncio.wait_for(self._wait_for_llm_call(), 1)
+            self.release_llm.set()
+            return [0.5, 0.5, 0.5]
+
+        self.llm_registry.aembed_query = AsyncMock(side_effect=aembed_query)
+
+        update = await detect_intent(self._make_state("Write me a song"))
+
+        assert update == {"intent": QuestionIntent.UNSUPPORTED}
+        self.llm_registry.ainvoke_chain.assert_awaited_once()
+        assert self.classifier.stats["llm"] == 1
+
+    async def test_should_fall_back_to_llm_when_embedding_fails(self):
+        self.llm_registry.aembed_query = AsyncMock(side_effect=RuntimeError("Timeout"))
+        self.release_llm.set()
+
+        update = await detect_intent(self._make_state("Write me a song"))
+
+        assert update == {"intent": QuestionIntent.UNSUPPORTED}
+        assert self.classifier.stats["llm"] == 1
+
+    async def _wait_for_llm_call(self) -> None:
+        while not self.llm_registry.ainvoke_chain.await_count:
+            await asyncio.sleep(0)
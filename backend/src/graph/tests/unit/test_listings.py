@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pytest
+
+from src.properties.schemas import BuildingType, Property
+
+from ...listings import ListingRenderer, get_listing_renderer
+
+
+def _count_words(text: str) -> int:
+    return len(text.split())
+
+
+@pytest.mark.unit
+class TestListingRenderer:
+    @pytest.fixture
+    def renderer(self):
+        return ListingRenderer(renovations_max_tokens=5, count_tokens=_count_words)
+
+    def test_should_render_listings_as_table_without_empty_columns(self, renderer):
+        listings = [
+            Property(
+                id=1,
+                location="Pekankatu 5 D 49, Helsinki",
+                building_type=BuildingType.APARTMENT,
+                debt_free_price=Decimal("250000.00"),
+                living_area=Decimal("50.50"),
+                building_has_sauna=False,
+                url="https://www.example.url/1",
+            ),
+            Property(id=2, location="Mannerheimintie 1 | A 2", build_year=1970),
+        ]
+
+        assert renderer.render(listings) == "\n".join(
+            [
+                "| # | Address | Building | m² | Built | Debt-free € | Sauna | URL |",
+                "|---|---|---|---|---|---|---|---|",
+                "| 1 | Pekankatu 5 D 49, Helsinki | apartment building | 50.5 |  | 250000 "
+                "| no | https://www.example.url/1 |",
+                "| 2 | Mannerheimintie 1 / A 2 |  |  | 1970 |  |  |  |",
+            ]
+        )
+
+    def test_should_truncate_renovations_to_token_budget(self, renderer):
+        listing = Property(
+            id=1,
+            completed_renovations="Facade 2019, roof 2015, windows 2012 and pipes 2010",
+            future_renovations="Balconies",
+        )
+
+        rendered = renderer.render([listing])
+
+        assert rendered.endswith(
+            "Renovations:\n1. done: Facade 2019, roof 2015, windows…; planned: Balconies"
+        )
+        assert renderer.truncate("Balconies") == "Balconies"
+
+    def test_should_render_nothing_without_listings(self, renderer):
+        assert renderer.render([]) == ""
+
+    def test_should_compile_renderer_once_per_process(self):
+        assert get_listing_renderer() is get_listing_renderer()
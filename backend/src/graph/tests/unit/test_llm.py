@@ -0,0 +1,89 @@
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiohttp import web
+from langchain_core.messages import HumanMessage
+
+from ...embedding_cache import QueryEmbeddingCache
+from ...llm import LLMRegistry
+from ...schemas import LLMChain
+
+
+async def _stream_chat_completion(request: web.Request) -> web.StreamResponse:
+    """A chat completions endpoint that streams a single chunk, like OpenAI does."""
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    chunk = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"role": "assistant", "content": "Hei!"},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+    await response.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+    await response.write_eof()
+    return response
+
+
+@pytest.fixture
+async def openai_base_url():
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", _stream_chat_completion)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0]
+
+    yield f"http://{host}:{port}/v1"
+
+    await runner.cleanup()
+
+
+@pytest.mark.unit
+class TestLLMRegistry:
+    async def test_should_build_chains_once_with_a_shared_http_client(self):
+        registry = LLMRegistry(api_key="test")
+
+        chain = registry.get_chain(LLMChain.PURE_LLM_ANSWER)
+
+        assert registry.get_chain(LLMChain.PURE_LLM_ANSWER) is chain
+        assert chain.root_async_client._client is registry.http_async_client
+        await registry.aclose()
+
+    async def test_should_reuse_connections_across_node_runs(self, openai_base_url):
+        registry = LLMRegistry(api_key="test", base_url=openai_base_url)
+        llm = registry.get_chain(LLMChain.PURE_LLM_ANSWER)
+
+        for _ in range(3):
+            response = await llm.ainvoke([HumanMessage(content="Moi")])
+            assert response.content == "Hei!"
+
+        assert registry.stats == {
+            "requests": 3,
+            "connections_opened": 1,
+            "connections_reused": 2,
+            "tls_handshakes": 0,
+        }
+        await registry.aclose()
+
+    async def test_should_embed_repeated_questions_once(self):
+        registry = LLMRegistry(
+            api_key="test", query_embedding_cache=QueryEmbeddingCache(max_entries=2)
+        )
+        registry.embeddings = Mock(aembed_query=AsyncMock(return_value=[0.1, 0.2]))
+
+        for question in ("Mikä on varainsiirtovero?", " Mikä on varainsiirtovero?\n"):
+            assert await registry.aembed_query(question) == [0.1, 0.2]
+
+        registry.embeddings.aembed_query.assert_awaited_once_with(
+            "Mikä on varainsiirtovero?"
+        )
+        assert registry.query_embedding_cache.stats["hits"] == 1
+        await registry.aclose()
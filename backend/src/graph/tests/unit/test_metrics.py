@@ -0,0 +1,222 @@
+from typing import Annotated, TypedDict
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AnyMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langgraph.graph import END, START, StateGraph, add_messages
+from prometheus_client import REGISTRY, CollectorRegistry, Gauge, generate_latest
+
+from ...metrics import (
+    ComponentStats,
+    GraphMetricsCallbackHandler,
+    component_stats,
+    make_metrics_registry,
+    observe_checkpoint_io,
+)
+from ...router import stream_events
+
+
+class _State(TypedDict, total=False):
+    intent: str
+    answer: str
+
+
+class _MessagesState(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages]
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(f"house_hunt_{name}", labels) or 0
+
+
+@pytest.mark.unit
+class TestGraphMetricsCallbackHandler:
+    async def test_should_record_node_durations_labelled_by_intent(self):
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content="Hello there")]))
+
+        async def detect_intent(state: _State):
+            return {"intent": "metrics_small_talk"}
+
+        async def pure_llm_answer(state: _State):
+            return {"answer": (await llm.ainvoke("Hello")).content}
+
+        builder = StateGraph(_State)
+        builder.add_node("detect_intent", detect_intent)
+        builder.add_node("pure_llm_answer", pure_llm_answer)
+        builder.add_edge(START, "detect_intent")
+        builder.add_edge("detect_intent", "pure_llm_answer")
+        builder.add_edge("pure_llm_answer", END)
+        labels = {"intent": "metrics_small_talk"}
+        before = {
+            node: _sample("graph_node_duration_seconds_count", node=node, **labels)
+            for node in ("detect_intent", "pure_llm_answer")
+        }
+        llm_labels = {"node": "pure_llm_answer", "model": "", **labels}
+        first_tokens_before = _sample(
+            "llm_time_to_first_token_seconds_count", **llm_labels
+        )
+
+        async for _ in builder.compile().astream_events(
+            {"answer": ""},
+            {"callbacks": [GraphMetricsCallbackHandler()]},
+            version="v2",
+        ):
+            pass
+
+        for node, count in before.items():
+            assert (
+                _sample("graph_node_duration_seconds_count", node=node, **labels)
+                == count + 1
+            )
+        assert (
+            _sample("llm_time_to_first_token_seconds_count", **llm_labels)
+            == first_tokens_before + 1
+        )
+
+    async def test_should_record_tokens_of_llm_calls(self):
+        handler = GraphMetricsCallbackHandler()
+        run_id = uuid4()
+        labels = {"node": "metrics_node", "intent": "unknown", "model": "gpt-4o-mini"}
+        message = AIMessage(
+            content="Hello",
+            usage_metadata={"input_tokens": 120, "output_tokens": 8, "total_tokens": 128},
+        )
+
+        await handler.on_chat_model_start(
+            {},
+            [],
+            run_id=run_id,
+            metadata={"langgraph_node": "metrics_node", "ls_model_name": "gpt-4o-mini"},
+        )
+        await handler.on_llm_end(
+            LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id
+        )
+
+        assert _sample("llm_call_duration_seconds_count", **labels) == 1
+        assert _sample("llm_tokens_sum", direction="input", **labels) == 120
+        assert _sample("llm_tokens_sum", direction="output", **labels) == 8
+
+
+@pytest.mark.unit
+class TestStreamEventsTimeToFirstToken:
+    @patch("src.graph.router.get_speculation_stats")
+    async def test_should_not_record_placeholder_message_as_first_token(
+        self, mock_get_speculation_stats
+    ):
+        placeholder = AIMessage(content="Let me find the property listings for you...")
+
+        async def find_property_listings(state: _MessagesState):
+            return {"messages": [placeholder]}
+
+        builder = StateGraph(_MessagesState)
+        builder.add_node("find_property_listings", find_property_listings)
+        builder.add_edge(START, "find_property_listings")
+        builder.add_edge("find_property_listings", END)
+
+        events = [
+            event
+            async for event in stream_events(
+                builder.compile(), {"input": {"messages": []}, "config": {}}
+            )
+        ]
+
+        assert [event["event"] for event in events] == ["messages/complete", "message"]
+        mock_get_speculation_stats().record_time_to_first_token.assert_not_called()
+
+    @patch("src.graph.router.get_speculation_stats")
+    async def test_should_record_first_token_of_answer(self, mock_get_speculation_stats):
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content="Hello there")]))
+
+        async def pure_llm_answer(state: _MessagesState):
+            return {"messages": [await llm.ainvoke("Hello")]}
+
+        builder = StateGraph(_MessagesState)
+        builder.add_node("pure_llm_answer", pure_llm_answer)
+        builder.add_edge(START, "pure_llm_answer")
+        builder.add_edge("pure_llm_answer", END)
+
+        async for _ in stream_events(
+            builder.compile(), {"input": {"messages": []}, "config": {}}
+        ):
+            pass
+
+        mock_get_speculation_stats().record_time_to_first_token.assert_called_once()
+
+
+@pytest.mark.unit
+class TestObserveCheckpointIO:
+    async def test_should_record_latency_of_calls_and_listings(self):
+        class MetricsSaver:
+            @observe_checkpoint_io("get_tuple")
+            async def aget_tuple(self, config):
+                return config
+
+            @observe_checkpoint_io("list")
+            async def alist(self, config):
+                for item in range(3):
+                    yield item
+
+        saver = MetricsSaver()
+
+        assert await saver.aget_tuple("config") == "config"
+        assert [item async for item in saver.alist("config")] == [0, 1, 2]
+        assert (
+            _sample(
+                "checkpoint_io_duration_seconds_count",
+                saver="MetricsSaver",
+                operation="get_tuple",
+            )
+            == 1
+        )
+        assert (
+            _sample(
+                "checkpoint_io_duration_seconds_count",
+                saver="MetricsSaver",
+                operation="list",
+            )
+            == 1
+        )
+
+
+@pytest.mark.unit
+class TestComponentStats:
+    def test_should_export_flattened_stats_as_gauges(self):
+        gauge = Gauge(
+            "component_stat", "", ["component", "stat"], registry=CollectorRegistry()
+        )
+        component_stats = ComponentStats(gauge)
+        component_stats.register(
+            "speculation",
+            lambda: {"branches": {"knowledge_retrieval": {"kept": 3}}, "mode": "combined"},
+        )
+
+        component_stats.refresh()
+
+        [metric] = gauge.collect()
+        assert [(sample.labels, sample.value) for sample in metric.samples] == [
+            ({"component": "speculation", "stat": "branches.knowledge_retrieval.kept"}, 3.0)
+        ]
+        component_stats.unregister("speculation")
+        component_stats.refresh()
+        assert list(gauge.collect())[0].samples == []
+
+    def test_should_be_served_in_the_exposition_format(self):
+        component_stats.register("answer_cache", lambda: {"hits": 1})
+        component_stats.refresh()
+
+        assert b"house_hunt_component_stat" in generate_latest(make_metrics_registry())
+        component_stats.unregister("answer_cache")
+
+    def test_should_aggregate_metrics_of_every_worker_in_multiprocess_mode(
+        self, tmp_path, monkeypatch
+    ):
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+        registry = make_metrics_registry()
+
+        # The metrics are read from the files of the workers, there are none yet
+        assert registry is not REGISTRY
+        assert generate_latest(registry) == b""
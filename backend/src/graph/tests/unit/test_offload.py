@@ -0,0 +1,68 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from ...offload import SerdeOffloader
+
+LARGE_VALUE = ["listing " * 100] * 20
+SMALL_VALUE = ["listing"]
+
+
+@pytest.fixture
+def offloader():
+    return SerdeOffloader(JsonPlusSerializer(), threshold_bytes=1024, max_size_hints=2)
+
+
+@pytest.fixture
+def to_thread():
+    with patch("src.graph.offload.asyncio.to_thread", wraps=asyncio.to_thread) as mock:
+        yield mock
+
+
+@pytest.mark.unit
+class TestSerdeOffloader:
+    async def test_should_serialize_in_thread_once_the_key_was_large(
+        self, offloader, to_thread
+    ):
+        await offloader.adumps_typed(LARGE_VALUE, "messages")
+        assert to_thread.call_count == 0
+
+        await offloader.adumps_typed(LARGE_VALUE, "messages")
+        await offloader.adumps_typed(SMALL_VALUE, "messages")
+        await offloader.adumps_typed(SMALL_VALUE, "messages")
+
+        assert to_thread.call_count == 2
+        assert offloader.stats == {"inline": 2, "offloaded": 2}
+
+    async def test_should_deserialize_large_values_in_thread(self, offloader, to_thread):
+        large = offloader.serde.dumps_typed(LARGE_VALUE)
+
+        assert await offloader.aloads_typed(large, "messages") == LARGE_VALUE
+        assert await offloader.aloads_typed(offloader.serde.dumps_typed(SMALL_VALUE)) == (
+            SMALL_VALUE
+        )
+
+        assert to_thread.call_count == 1
+        # The size of the loaded value is the hint for the next version of the channel
+        await offloader.adumps_typed(LARGE_VALUE, "messages")
+        assert to_thread.call_count == 2
+
+    async def test_should_keep_the_most_recent_size_hints(self, offloader, to_thread):
+        for key in ("messages", "documents", "listings"):
+            await offloader.adumps_typed(LARGE_VALUE, key)
+
+        await offloader.adumps_typed(LARGE_VALUE, "messages")
+        await offloader.adumps_typed(LARGE_VALUE, "listings")
+
+        assert to_thread.call_count == 1
+
+    async def test_should_not_offload_when_disabled(self, to_thread):
+        offloader = SerdeOffloader(JsonPlusSerializer(), threshold_bytes=0)
+        data = await offloader.adumps_typed(LARGE_VALUE, "messages")
+
+        await offloader.adumps_typed(LARGE_VALUE, "messages")
+        await offloader.aloads_typed(data)
+
+        assert to_thread.call_count == 0
@@ -0,0 +1,96 @@
+import os
+import zlib
+from unittest.mock import MagicMock
+
+import pytest
+
+from ...payloads import (
+    PAYLOAD_CODEC_NONE,
+    PAYLOAD_CODEC_ZLIB,
+    LocalBlobStore,
+    PayloadCodec,
+    S3BlobStore,
+)
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    return LocalBlobStore(str(tmp_path))
+
+
+@pytest.fixture
+def codec(blob_store):
+    return PayloadCodec(blob_store, compression_threshold=16, offload_threshold=1024)
+
+
+@pytest.mark.unit
+class TestPayloadCodec:
+    async def test_should_store_small_payloads_as_is(self, codec):
+        attributes = await codec.aencode("checkpoint", "key", b"small")
+
+        assert attributes == {"checkpoint": b"small", "checkpoint_codec": PAYLOAD_CODEC_NONE}
+        assert await codec.adecode("checkpoint", attributes) == b"small"
+
+    async def test_should_compress_payloads_inline(self, codec, blob_store):
+        payload = b"listing " * 500
+
+        attributes = await codec.aencode("checkpoint", "key", payload)
+
+        assert attributes["checkpoint_codec"] == PAYLOAD_CODEC_ZLIB
+        assert len(attributes["checkpoint"]) < len(payload)
+        assert "checkpoint_ref" not in attributes
+        assert not (blob_store.root / "key").exists()
+        assert await codec.adecode("checkpoint", attributes) == payload
+
+    async def test_should_offload_payloads_over_the_threshold(self, codec, blob_store):
+        # Random bytes do not compress, so the payload stays over the offload threshold
+        payload = os.urandom(4096)
+
+        attributes = await codec.aencode("checkpoint", "thread/checkpoint", payload)
+
+        assert attributes == {
+            "checkpoint_ref": "thread/checkpoint",
+            "checkpoint_codec": PAYLOAD_CODEC_ZLIB,
+        }
+        assert (blob_store.root / "thread" / "checkpoint").exists()
+        assert await codec.adecode("checkpoint", attributes) == payload
+
+    async def test_should_keep_payloads_inline_without_blob_store(self):
+        codec = PayloadCodec(compression_threshold=16, offload_threshold=1024)
+        payload = os.urandom(4096)
+
+        attributes = await codec.aencode("checkpoint", "key", payload)
+
+        assert zlib.decompress(attributes["checkpoint"]) == payload
+
+    async def test_should_read_items_written_without_codec(self, codec):
+        assert await codec.adecode("checkpoint", {"checkpoint": b"legacy"}) == b"legacy"
+
+    async def test_should_raise_on_unknown_codec(self, codec):
+        with pytest.raises(ValueError):
+            await codec.adecode(
+                "checkpoint", {"checkpoint": b"data", "checkpoint_codec": "lz4"}
+            )
+
+
+@pytest.mark.unit
+class TestS3BlobStore:
+    async def test_should_delete_keys_in_batches_of_1000(self):
+        client = MagicMock()
+        blob_store = S3BlobStore("bucket", client)
+
+        await blob_store.adelete([f"key-{i}" for i in range(1500)])
+
+        batches = [
+            call.kwargs["Delete"]["Objects"]
+            for call in client.delete_objects.call_args_list
+        ]
+        assert [len(batch) for batch in batches] == [1000, 500]
+
+    async def test_should_get_object_body(self):
+        client = MagicMock()
+        client.get_object.return_value = {"Body": MagicMock(read=lambda: b"blob")}
+        blob_store = S3BlobStore("bucket", client)
+
+        assert await blob_store.aget("key") == b"blob"
+        client.get_object.assert_called_once_with(Bucket="bucket", Key="key")
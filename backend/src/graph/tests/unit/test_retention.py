@@ -0,0 +1,52 @@
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from langgraph.checkpoint.base.id import uuid6
+
+from ...retention import (
+    CompactionResult,
+    RetentionPolicy,
+    checkpoint_timestamp,
+    estimate_item_size,
+)
+
+
+@pytest.mark.unit
+class TestRetentionPolicy:
+    def test_should_read_creation_time_from_checkpoint_id(self):
+        assert checkpoint_timestamp(str(uuid6())) == pytest.approx(time.time(), abs=1)
+
+    def test_should_keep_last_checkpoints_and_recent_ones(self):
+        policy = RetentionPolicy(keep_last=2, keep_newer_than=timedelta(hours=1))
+        checkpoint_id = str(uuid6())
+        now = checkpoint_timestamp(checkpoint_id)
+
+        assert policy.is_retained(1, checkpoint_id, now + 2 * 3600)
+        assert policy.is_retained(5, checkpoint_id, now + 1800)
+        assert not policy.is_retained(2, checkpoint_id, now + 2 * 3600)
+
+    def test_should_only_expire_items_with_a_ttl(self):
+        assert RetentionPolicy().expires_at() is None
+
+        with patch("src.graph.retention.time.time", return_value=1000.0):
+            assert RetentionPolicy(ttl=timedelta(days=1)).expires_at() == 1000 + 86400
+
+
+@pytest.mark.unit
+class TestCompactionResult:
+    def test_should_add_up_results(self):
+        result = CompactionResult()
+        result += CompactionResult(threads=1, checkpoints=2, writes=3, bytes=100)
+        result += CompactionResult(threads=1, blobs=4, offloaded_payloads=1, bytes=50)
+
+        assert result == CompactionResult(
+            threads=2, checkpoints=2, writes=3, blobs=4, offloaded_payloads=1, bytes=150
+        )
+        assert result.items == 9
+
+    def test_should_estimate_item_size_from_attribute_names_and_values(self):
+        item = {"PK": "writes#thread", "value": b"\x00" * 10, "idx": 1, "ok": True}
+
+        assert estimate_item_size(item) == 2 + 13 + 5 + 10 + 3 + 1 + 2 + 1
@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.properties.schemas import BuildingType, Property, SearchPropertiesFilters
+
+from ...schemas import QuestionIntent, RetrievedDocument
+from ...serde import MSGPACK_TYPE, MsgpackSerializer
+
+
+def _make_state() -> dict:
+    return {
+        "messages": [
+            HumanMessage(content="Apartments in Kallio under 300k", id="1"),
+            AIMessage(
+                content="",
+                id="2",
+                tool_calls=[{"name": "search", "args": {"city": "Helsinki"}, "id": "call"}],
+            ),
+            ToolMessage(content="2 listings", tool_call_id="call", id="3"),
+        ],
+        "intent": QuestionIntent.FINDING_PROPERTY,
+        "documents": [
+            RetrievedDocument(id="doc", content="Transfer tax", metadata={"page": 1})
+        ],
+        "search_properties_filters": SearchPropertiesFilters(city="Helsinki"),
+        "retrieved_property_listings": [
+            Property(
+                id=1,
+                building_type=BuildingType.APARTMENT,
+                living_area=Decimal("55.5"),
+                debt_free_price=Decimal("289000.00"),
+                image_urls=["https://example.com/1.jpg"],
+            )
+        ],
+    }
+
+
+@pytest.fixture
+def serde():
+    return MsgpackSerializer()
+
+
+@pytest.mark.unit
+class TestMsgpackSerializer:
+    def test_should_round_trip_state(self, serde):
+        state = _make_state()
+
+        type_, data = serde.dumps_typed(state)
+        loaded = serde.loads_typed((type_, data))
+
+        assert type_ == MSGPACK_TYPE
+        assert loaded == state
+        assert loaded["intent"] is QuestionIntent.FINDING_PROPERTY
+        listing = loaded["retrieved_property_listings"][0]
+        assert listing.building_type is BuildingType.APARTMENT
+        assert listing.debt_free_price == Decimal("289000.00")
+        assert isinstance(listing.living_area, Decimal)
+
+    def test_should_preserve_fields_set(self, serde):
+        filters = SearchPropertiesFilters(city="Helsinki")
+
+        loaded = serde.loads_typed(serde.dumps_typed(filters))
+
+        assert loaded.model_fields_set == {"city"}
+        assert loaded.model_dump(exclude_unset=True) == {"city": "Helsinki"}
+
+    def test_should_round_trip_values_encoded_like_jsonplus(self, serde):
+        value = {
+            "when": datetime(2024, 5, 1, tzinfo=timezone.utc),
+            "tags": {"sauna"},
+            "pair": (1, 2),
+        }
+
+        loaded = serde.loads_typed(serde.dumps_typed(value))
+
+        assert loaded == {**value, "pair": [1, 2]}
+
+    def test_should_load_values_written_by_jsonplus(self, serde):
+        state = _make_state()
+
+        loaded = serde.loads_typed(JsonPlusSerializer().dumps_typed(state))
+
+        assert loaded["messages"] == state["messages"]
+        assert loaded["retrieved_property_listings"] == state["retrieved_property_listings"]
+
+    def test_should_keep_bytes_and_metadata_compatible_with_jsonplus(self, serde):
+        metadata = {"source": "loop", "step": 1, "writes": None}
+
+        assert serde.dumps_typed(b"raw") == ("bytes", b"raw")
+        assert JsonPlusSerializer().loads(serde.dumps(metadata)) == metadata
@@ -0,0 +1,185 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from src.core.singleflight import SingleFlight, make_key
+
+from ...llm import COALESCED_ANSWER_CHUNK_EVENT, LLMRegistry
+from ...schemas import LLMChain
+
+
+async def _wait_for(predicate) -> None:
+    while not predicate():
+        await asyncio.sleep(0)
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+    async def test_should_share_call_between_concurrent_callers(self):
+        single_flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def wait_until_started():
+            return await started.wait()
+
+        call = AsyncMock(side_effect=wait_until_started)
+
+        leader = asyncio.create_task(single_flight.ado("key", call))
+        await _wait_for(lambda: call.await_count == 1)
+        follower = asyncio.create_task(single_flight.ado("key", call))
+        await _wait_for(lambda: single_flight.followers == 1)
+        started.set()
+
+        assert await asyncio.gather(leader, follower) == [True, True]
+        assert call.await_count == 1
+        assert single_flight.stats == {"leaders": 1, "followers": 1, "in_flight": 0}
+
+        # Nothing is kept once the call completed
+        assert await single_flight.ado("key", call) is True
+        assert call.await_count == 2
+
+    async def test_should_raise_error_of_call_to_every_caller(self):
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise RuntimeError("OpenSearch is down")
+
+        callers = [asyncio.create_task(single_flight.ado("key", fail)) for _ in range(3)]
+        await _wait_for(lambda: single_flight.followers == 2)
+        release.set()
+
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def test_should_cancel_call_once_every_caller_is_cancelled(self):
+        single_flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def call():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        leader = asyncio.create_task(single_flight.ado("key", call))
+        follower = asyncio.create_task(single_flight.ado("key", call))
+        await _wait_for(lambda: single_flight.followers == 1)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert not cancelled.is_set()
+
+        follower.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert len(single_flight) == 0
+
+    async def test_should_replay_streamed_items_to_late_follower(self):
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            yield "Hei"
+            await release.wait()
+            yield "!"
+
+        leader = single_flight.stream("key", call)
+        leader_items = []
+
+        async def consume():
+            async for item in leader:
+                leader_items.append(item)
+
+        consumer = asyncio.create_task(consume())
+        await _wait_for(lambda: leader_items == ["Hei"])
+        follower = single_flight.stream("key", call)
+        release.set()
+
+        assert [item async for item in follower] == ["Hei", "!"]
+        await consumer
+        assert leader_items == ["Hei", "!"]
+        assert leader.is_leader and not follower.is_leader
+
+    async def test_should_not_coalesce_when_disabled(self):
+        single_flight = SingleFlight(enabled=False)
+        call = AsyncMock(return_value="answer")
+
+        await asyncio.gather(*(single_flight.ado("key", call) for _ in range(3)))
+
+        assert call.await_count == 3
+
+    def test_should_key_on_normalized_inputs(self):
+        inputs = {"question": "Find me a flat\nin Espoo ", "chat_history": []}
+
+        assert make_key("chain:a", inputs) == make_key(
+            "chain:a", {"chat_history": [], "question": "Find me a flat in Espoo"}
+        )
+        assert make_key("chain:a", inputs) != make_key("chain:b", inputs)
+        assert make_key("chain:a", [HumanMessage(content="Hei")]) != make_key(
+            "chain:a", [AIMessage(content="Hei")]
+        )
+
+
+@pytest.mark.unit
+class TestCoalescedAnswerStream:
+    async def test_should_fan_out_answer_of_leader_to_follower(self):
+        registry = LLMRegistry(api_key="test")
+        release = asyncio.Event()
+
+        async def wait_for_followers(messages):
+            await release.wait()
+            return messages
+
+        # A second call would fail, the fake model only has one answer
+        registry._chains[LLMChain.PURE_LLM_ANSWER] = RunnableLambda(
+            wait_for_followers
+        ) | GenericFakeChatModel(messages=iter(["Hei, how can I help?"]))
+
+        async def answer(messages, config):
+            return await registry.astream_chain(
+                LLMChain.PURE_LLM_ANSWER, messages, config
+            )
+
+        async def stream_answer() -> tuple[list[dict], AIMessage]:
+            events = [
+                event
+                async for event in RunnableLambda(answer).astream_events(
+                    [HumanMessage(content="Hei")], version="v2"
+                )
+            ]
+            return events, events[-1]["data"]["output"]
+
+        runs = [asyncio.create_task(stream_answer()) for _ in range(2)]
+        await _wait_for(lambda: registry.single_flight.followers == 1)
+        release.set()
+        (leader_events, leader_answer), (follower_events, follower_answer) = (
+            await asyncio.gather(*runs)
+        )
+
+        assert leader_answer.content == follower_answer.content == "Hei, how can I help?"
+        assert leader_answer.id != follower_answer.id
+        leader_chunks = [
+            event["data"]["chunk"]
+            for event in leader_events
+            if event["event"] == "on_chat_model_stream"
+        ]
+        follower_chunks = [
+            event["data"]
+            for event in follower_events
+            if event["event"] == "on_custom_event"
+            and event["name"] == COALESCED_ANSWER_CHUNK_EVENT
+        ]
+        assert [chunk.content for chunk in follower_chunks] == [
+            chunk.content for chunk in leader_chunks
+        ]
+        assert {chunk.id for chunk in follower_chunks} == {follower_answer.id}
+        assert not any(
+            event["event"] == "on_chat_model_stream" for event in follower_events
+        )
+        await registry.aclose()
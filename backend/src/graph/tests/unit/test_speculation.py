@@ -0,0 +1,172 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.properties.schemas import SearchPropertiesFilters
+
+from ...nodes import (
+    build_search_properties_filters,
+    detect_intent_speculatively,
+    knowledge_retrieval,
+)
+from ...schemas import (
+    GraphNode,
+    IntentDetectionResponse,
+    LLMChain,
+    QuestionIntent,
+    RetrievedDocument,
+    SearchPropertiesFiltersResponse,
+    SpeculativeResults,
+)
+from ...speculation import SpeculationStats, SpeculativeRun
+
+QUESTION_EMBEDDING = [1.0, 0.0, 0.0]
+DOCUMENTS = [RetrievedDocument(id="doc-1", content="Debt-free price", metadata={})]
+
+
+async def _sleep_and_return(seconds: float, result):
+    await asyncio.sleep(seconds)
+    return result
+
+
+@pytest.mark.unit
+class TestSpeculativeRun:
+    async def test_should_keep_branch_and_cancel_the_others(self):
+        stats = SpeculationStats()
+        speculative_run = SpeculativeRun(stats)
+        speculative_run.launch("retrieval", _sleep_and_return(0.01, "documents"))
+        speculative_run.launch("filters", _sleep_and_return(10, "filters"))
+        speculative_run.launch("finished", _sleep_and_return(0, "finished"))
+        await asyncio.sleep(0.02)
+
+        assert await speculative_run.aresolve("retrieval") == "documents"
+
+        branches = stats.stats["branches"]
+        assert branches["retrieval"]["kept"] == 1
+        assert branches["retrieval"]["saved_ms"] >= 10
+        assert branches["filters"]["cancelled"] == 1
+        assert branches["filters"]["wasted_ms"] >= 20
+        assert branches["finished"]["discarded"] == 1
+
+    async def test_should_return_none_when_kept_branch_failed(self):
+        async def fail():
+            raise RuntimeError("Chroma is down")
+
+        stats = SpeculationStats()
+        speculative_run = SpeculativeRun(stats)
+        speculative_run.launch("retrieval", fail())
+
+        assert await speculative_run.aresolve("retrieval") is None
+        assert await SpeculativeRun(stats).aresolve("retrieval") is None
+        assert stats.stats["branches"]["retrieval"]["failed"] == 1
+
+    def test_should_record_time_to_first_token_per_mode_and_intent(self):
+        stats = SpeculationStats()
+        for latency_ms in range(1, 101):
+            stats.record_time_to_first_token("greeting", "speculative", latency_ms)
+        stats.record_time_to_first_token(None, "sequential", 5.0)
+
+        assert stats.stats["time_to_first_token_ms"] == {
+            "speculative:greeting": {"samples": 100, "p50": 50.5, "p95": 96},
+            "sequential:unknown": {"samples": 1, "p50": 5.0, "p95": 5.0},
+        }
+
+
+@pytest.mark.unit
+class TestSpeculativeNodes:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.filters_response = SearchPropertiesFiltersResponse(
+            filters=SearchPropertiesFilters(city="Espoo"), reasoning=""
+        )
+        self.chains = {
+            LLMChain.INTENT_DETECTION: Mock(),
+            LLMChain.BUILD_SEARCH_PROPERTIES_FILTERS: Mock(
+                ainvoke=AsyncMock(return_value=self.filters_response)
+            ),
+        }
+        self.llm_registry = Mock()
+        self.llm_registry.ainvoke_chain = AsyncMock(side_effect=self._ainvoke_chain)
+        self.llm_registry.aembed_query = AsyncMock(
+            return_value=QUESTION_EMBEDDING
+        )
+        self.embedding_service = Mock()
+        self.embedding_service.aquery_similar_documents = AsyncMock(
+            return_value={
+                "ids": ["doc-1"],
+                "documents": ["Debt-free price"],
+                "metadatas": [{}],
+            }
+        )
+        self.stats = SpeculationStats()
+        with (
+            patch("src.graph.nodes.settings.INTENT_CLASSIFIER_ENABLED", False),
+            patch("src.graph.nodes.settings.SPECULATIVE_FILTERS_ENABLED", True),
+            patch("src.graph.nodes.get_llm_registry", return_value=self.llm_registry),
+            patch("src.graph.nodes.EmbeddingService", return_value=self.embedding_service),
+            patch("src.graph.nodes.get_speculation_stats", return_value=self.stats),
+        ):
+            yield
+
+    async def _ainvoke_chain(self, name: LLMChain, inputs: dict):
+        return await self.chains[name].ainvoke(inputs)
+
+    def _make_state(self, message_id: str = "message-1") -> dict:
+        return {
+            "messages": [HumanMessage(content="What is the debt-free price?", id=message_id)]
+        }
+
+    def _detect(self, intent: QuestionIntent) -> None:
+        self.chains[LLMChain.INTENT_DETECTION].ainvoke = AsyncMock(
+            return_value=IntentDetectionResponse(intent=intent, reasoning="")
+        )
+
+    async def test_should_keep_retrieved_documents_of_knowledge_question(self):
+        self._detect(QuestionIntent.HOUSE_BUYING_KNOWLEDGE)
+
+        update = await detect_intent_speculatively(self._make_state())
+
+        assert update["intent"] == QuestionIntent.HOUSE_BUYING_KNOWLEDGE
+        assert update["speculative_results"] == SpeculativeResults(
+            message_id="message-1", documents=DOCUMENTS
+        )
+        self.embedding_service.aquery_similar_documents.assert_awaited_once_with(
+            "What is the debt-free price?", n_results=3, query_embedding=QUESTION_EMBEDDING
+        )
+        assert await knowledge_retrieval({**self._make_state(), **update}) == {
+            "documents": DOCUMENTS
+        }
+        self.embedding_service.aquery_similar_documents.assert_awaited_once()
+        branches = self.stats.stats["branches"]
+        assert branches[GraphNode.KNOWLEDGE_RETRIEVAL]["kept"] == 1
+        assert branches[GraphNode.BUILD_SEARCH_PROPERTIES_FILTERS]["launched"] == 1
+
+    async def test_should_keep_filters_of_property_search(self):
+        self._detect(QuestionIntent.FINDING_PROPERTY)
+
+        update = await detect_intent_speculatively(self._make_state())
+        filters_update = await build_search_properties_filters(
+            {**self._make_state(), **update}
+        )
+
+        assert update["speculative_results"].documents is None
+        assert filters_update == {
+            "search_properties_filters": self.filters_response.filters,
+            "has_enough_search_properties_filters": True,
+        }
+        build_filters_chain = self.chains[LLMChain.BUILD_SEARCH_PROPERTIES_FILTERS]
+        build_filters_chain.ainvoke.assert_called_once()
+
+    async def test_should_not_use_results_of_an_earlier_message(self):
+        state = {
+            **self._make_state("message-2"),
+            "speculative_results": SpeculativeResults(
+                message_id="message-1", documents=[]
+            ),
+        }
+
+        update = await knowledge_retrieval(state)
+
+        assert update == {"documents": DOCUMENTS}
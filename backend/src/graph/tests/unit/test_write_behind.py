@@ -0,0 +1,92 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from ...write_behind import WriteBehindBuffer
+
+
+def _item(pk, sk, value=None):
+    return {"PK": pk, "SK": sk, "value": value}
+
+
+@pytest.fixture
+def write_items():
+    return AsyncMock()
+
+
+@pytest.mark.unit
+class TestWriteBehindBuffer:
+    async def test_should_write_deduplicated_items_before_checkpoints(
+        self, write_items
+    ):
+        buffer = WriteBehindBuffer(write_items)
+        await buffer.aput("thread", [_item("writes#thread", "1", "a")])
+        await buffer.aput(
+            "thread",
+            [_item("writes#thread", "1", "b"), _item("blobs#thread", "1")],
+            _item("checkpoint#thread", "1"),
+        )
+        assert len(buffer) == 3
+
+        await buffer.aflush("thread")
+
+        items_call, checkpoints_call = write_items.await_args_list
+        assert items_call.args[0] == [
+            _item("writes#thread", "1", "b"),
+            _item("blobs#thread", "1"),
+        ]
+        assert checkpoints_call.args[0] == [_item("checkpoint#thread", "1")]
+        assert buffer.stats["queue_depth"] == 0
+        assert buffer.stats["pending_threads"] == 0
+        assert buffer.stats["flushed_items"] == 3
+
+    async def test_should_flush_when_full(self, write_items):
+        buffer = WriteBehindBuffer(write_items, max_items=3)
+        await buffer.aput("thread-1", [_item("writes#thread-1", "1")])
+        await buffer.aput("thread-2", [_item("writes#thread-2", "1")])
+
+        await buffer.aput("thread-1", [_item("writes#thread-1", "2")])
+
+        # The thread adding items is flushed first, the other thread stays buffered
+        assert write_items.await_args_list[0].args[0] == [_item("writes#thread-1", "1")]
+        assert len(buffer) == 2
+        assert buffer.stats["max_queue_depth"] == 2
+
+    async def test_should_keep_items_when_flush_fails(self, write_items):
+        buffer = WriteBehindBuffer(write_items)
+        await buffer.aput("thread", [_item("writes#thread", "1")])
+        write_items.side_effect = RuntimeError("throttled")
+
+        with pytest.raises(RuntimeError):
+            await buffer.aflush("thread")
+
+        assert len(buffer) == 1
+        write_items.side_effect = None
+        await buffer.aflush()
+        assert len(buffer) == 0
+
+    async def test_should_flush_in_background_when_requested(self, write_items):
+        buffer = WriteBehindBuffer(write_items)
+        buffer.start()
+
+        await buffer.aput(
+            "thread", [], _item("checkpoint#thread", "1"), request_flush=True
+        )
+        await asyncio.sleep(0.01)
+
+        write_items.assert_awaited_with([_item("checkpoint#thread", "1")])
+        await buffer.aclose()
+
+    @patch("src.graph.write_behind.FLUSH_MAX_DELAY_SECONDS", 0.01)
+    async def test_should_flush_writes_without_checkpoint_after_max_delay(
+        self, write_items
+    ):
+        buffer = WriteBehindBuffer(write_items)
+        buffer.start()
+
+        await buffer.aput("thread", [_item("writes#thread", "1")])
+        await asyncio.sleep(0.05)
+
+        assert len(buffer) == 0
+        await buffer.aclose()
@@ -0,0 +1,419 @@
+import asyncio
+from collections import Counter
+from typing import Any, AsyncIterator, Sequence
+
+import msgpack
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    PendingWrite,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.serde.types import ChannelProtocol
+from redis.asyncio import Redis
+
+from .checkpoint import EMPTY_CHANNEL_TYPE, AsyncDynamoDBSaver, _dump_writes
+from .metrics import observe_checkpoint_io
+from .schemas import ChannelVersion
+
+REDIS_KEY_PREFIX = "checkpoint"
+
+
+def _make_writes_field(task_id: str, idx: int) -> str:
+    return f"{task_id}:{idx}"
+
+
+def _parse_writes_field(field: bytes) -> tuple[str, int]:
+    task_id, idx = field.decode().rsplit(":", 1)
+    return task_id, int(idx)
+
+
+def _make_config(
+    thread_id: str, checkpoint_ns: str, checkpoint_id: str
+) -> RunnableConfig:
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint_id,
+        }
+    }
+
+
+class AsyncRedisTieredSaver(BaseCheckpointSaver):
+    """Checkpointer keeping the latest checkpoint of active threads in Redis.
+
+    DynamoDB, through the wrapped AsyncDynamoDBSaver, stays the durable store. Checkpoints and
+    writes are written to Redis and handed to the DynamoDB saver, which mirrors them in the
+    background in its async durability mode. In sync mode every write still waits for DynamoDB
+    and the tier only speeds up reads. The latest checkpoint of a thread namespace and its
+    pending writes are read from Redis, without flushing the DynamoDB saver.
+
+    Checkpoints are stored like in DynamoDB: the latest checkpoint of a namespace is a manifest
+    without channel values, and the value of each channel version is a separate blob key. A
+    checkpoint only writes the blobs of the channels it changed.
+
+    Redis keys expire after ttl_seconds without reads or writes, which demotes idle threads to
+    DynamoDB. The latest checkpoint of a demoted thread is promoted back to Redis when it is
+    read, as is a checkpoint with a missing blob, e.g. one forked from an older checkpoint.
+    Older checkpoints and listings are always read from DynamoDB.
+    """
+
+    durable: AsyncDynamoDBSaver
+    redis: Redis
+    ttl_seconds: int
+    key_prefix: str
+
+    def __init__(
+        self,
+        durable: AsyncDynamoDBSaver,
+        redis: Redis,
+        *,
+        ttl_seconds: int = 1800,
+        key_prefix: str = REDIS_KEY_PREFIX,
+    ):
+        super().__init__(serde=durable.serde)
+        self.durable = durable
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    async def aflush(self, thread_id: str | None = None) -> None:
+        """Persists the checkpoints of a thread, or of every thread, to DynamoDB."""
+        await self.durable.aflush(thread_id)
+
+    def get_next_version(
+        self, current: ChannelVersion | None, channel: ChannelProtocol
+    ) -> float:
+        return self.durable.get_next_version(current, channel)
+
+    @observe_checkpoint_io("put")
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Save a checkpoint to Redis and hand it to the DynamoDB saver.
+
+        Only the channels in new_versions are written as blobs, the expiry of the blobs of the
+        unchanged channels is extended along with the manifest. The writes of the parent
+        checkpoint are dropped from Redis, they are only read as the pending writes of the
+        latest checkpoint.
+
+        Args:
+            config (RunnableConfig): The config to associate with the checkpoint.
+            checkpoint (Checkpoint): The checkpoint to save.
+            metadata (CheckpointMetadata): Additional metadata to save with the checkpoint.
+            new_versions (ChannelVersions): New channel versions as of this write.
+
+        Returns:
+            RunnableConfig: Updated configuration after storing the checkpoint.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+
+        blobs = {
+            self._make_blob_key(thread_id, checkpoint_ns, channel, version): (
+                await self._adump_channel_blob(
+                    thread_id, checkpoint_ns, channel, checkpoint["channel_values"]
+                )
+            )
+            for channel, version in new_versions.items()
+        }
+        pipeline = self.redis.pipeline(transaction=True)
+        for key, blob in blobs.items():
+            pipeline.set(key, blob, ex=self.ttl_seconds)
+        for channel, version in checkpoint["channel_versions"].items():
+            if channel not in new_versions:
+                pipeline.expire(
+                    self._make_blob_key(thread_id, checkpoint_ns, channel, version),
+                    self.ttl_seconds,
+                )
+        pipeline.set(
+            self._make_latest_key(thread_id, checkpoint_ns),
+            self._dump_checkpoint(checkpoint, metadata, parent_checkpoint_id),
+            ex=self.ttl_seconds,
+        )
+        if parent_checkpoint_id:
+            pipeline.unlink(
+                self._make_writes_key(thread_id, checkpoint_ns, parent_checkpoint_id)
+            )
+
+        checkpoint_config, _ = await asyncio.gather(
+            self.durable.aput(config, checkpoint, metadata, new_versions),
+            pipeline.execute(),
+        )
+        return checkpoint_config
+
+    @observe_checkpoint_io("put_writes")
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+    ) -> RunnableConfig:
+        """Store intermediate writes linked to a checkpoint in Redis and hand them to the
+        DynamoDB saver.
+
+        Args:
+            config (RunnableConfig): Configuration of the related checkpoint.
+            writes (Sequence[tuple[str, Any]]): List of writes to store, each as (channel, value) pair.
+            task_id (str): Identifier for the task creating the writes.
+
+        Returns:
+            RunnableConfig: Updated configuration after storing the writes.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        key = self._make_writes_key(thread_id, checkpoint_ns, checkpoint_id)
+        if not writes:
+            return await self.durable.aput_writes(config, writes, task_id)
+
+        pipeline = self.redis.pipeline(transaction=True)
+        pipeline.hset(
+            key,
+            mapping={
+                _make_writes_field(task_id, idx): msgpack.packb(
+                    {"task_id": task_id, **data}
+                )
+                for idx, data in enumerate(_dump_writes(self.serde, writes))
+            },
+        )
+        pipeline.expire(key, self.ttl_seconds)
+
+        await asyncio.gather(
+            self.durable.aput_writes(config, writes, task_id),
+            pipeline.execute(),
+        )
+        return config
+
+    @observe_checkpoint_io("get_tuple")
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Get a checkpoint tuple, the latest one from Redis if the thread is active.
+
+        Args:
+            config (RunnableConfig): The config to use for retrieving the checkpoint.
+
+        Returns:
+            CheckpointTuple | None: The retrieved checkpoint tuple, or None if no matching checkpoint was found.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        checkpoint_tuple = await self._aget_active_tuple(
+            thread_id, checkpoint_ns, checkpoint_id
+        )
+        if checkpoint_tuple:
+            self.hits += 1
+            return checkpoint_tuple
+
+        self.misses += 1
+        checkpoint_tuple = await self.durable.aget_tuple(config)
+        if checkpoint_tuple and not checkpoint_id:
+            await self._apromote(thread_id, checkpoint_ns, checkpoint_tuple)
+
+        return checkpoint_tuple
+
+    @observe_checkpoint_io("list")
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """List checkpoints from DynamoDB, see `AsyncDynamoDBSaver.alist`."""
+        async for checkpoint_tuple in self.durable.alist(
+            config, filter=filter, before=before, limit=limit
+        ):
+            yield checkpoint_tuple
+
+    def _make_latest_key(self, thread_id: str, checkpoint_ns: str) -> str:
+        return f"{self.key_prefix}:latest:{thread_id}:{checkpoint_ns}"
+
+    def _make_writes_key(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> str:
+        return f"{self.key_prefix}:writes:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+    def _make_blob_key(
+        self, thread_id: str, checkpoint_ns: str, channel: str, version: ChannelVersion
+    ) -> str:
+        return f"{self.key_prefix}:blobs:{thread_id}:{checkpoint_ns}:{channel}:{version}"
+
+    async def _aget_active_tuple(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str | None
+    ) -> CheckpointTuple | None:
+        latest_key = self._make_latest_key(thread_id, checkpoint_ns)
+        data = await self.redis.getex(latest_key, ex=self.ttl_seconds)
+        if data is None:
+            return None
+
+        data = msgpack.unpackb(data)
+        if checkpoint_id and checkpoint_id != data["checkpoint_id"]:
+            return None
+
+        checkpoint = self.serde.loads_typed((data["type"], data["checkpoint"]))
+        channel_versions = checkpoint["channel_versions"]
+        writes_key = self._make_writes_key(thread_id, checkpoint_ns, data["checkpoint_id"])
+        pipeline = self.redis.pipeline(transaction=False)
+        for channel, version in channel_versions.items():
+            pipeline.getex(
+                self._make_blob_key(thread_id, checkpoint_ns, channel, version),
+                ex=self.ttl_seconds,
+            )
+        pipeline.hgetall(writes_key)
+        pipeline.expire(writes_key, self.ttl_seconds)
+        *blobs, serialized_writes, _ = await pipeline.execute()
+        # A blob that expired or was never written to Redis is read from DynamoDB instead
+        if any(blob is None for blob in blobs):
+            return None
+
+        checkpoint["channel_values"] = await self._aload_channel_values(
+            thread_id, checkpoint_ns, list(channel_versions), blobs
+        )
+        return CheckpointTuple(
+            config=_make_config(thread_id, checkpoint_ns, data["checkpoint_id"]),
+            checkpoint=checkpoint,
+            metadata=self.serde.loads(data["metadata"]),
+            parent_config=_make_config(
+                thread_id, checkpoint_ns, data["parent_checkpoint_id"]
+            )
+            if data["parent_checkpoint_id"]
+            else None,
+            pending_writes=self._load_writes(serialized_writes),
+        )
+
+    async def _aload_channel_values(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        channels: list[str],
+        blobs: list[bytes],
+    ) -> dict[str, Any]:
+        channel_values = {}
+        for channel, blob in zip(channels, blobs):
+            blob = msgpack.unpackb(blob)
+            if blob["type"] == EMPTY_CHANNEL_TYPE:
+                continue
+
+            channel_values[channel] = await self.durable.serde_offloader.aloads_typed(
+                (blob["type"], blob["value"]), (thread_id, checkpoint_ns, channel)
+            )
+        return channel_values
+
+    def _load_writes(self, serialized_writes: dict[bytes, bytes]) -> list[PendingWrite]:
+        writes = []
+        for field in sorted(serialized_writes, key=_parse_writes_field):
+            data = msgpack.unpackb(serialized_writes[field])
+            writes.append(
+                (
+                    data["task_id"],
+                    data["channel"],
+                    self.serde.loads_typed((data["type"], data["value"])),
+                )
+            )
+        return writes
+
+    def _dump_checkpoint(
+        self,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        parent_checkpoint_id: str | None,
+    ) -> bytes:
+        manifest = checkpoint.copy()
+        manifest.pop("channel_values")
+        type_, serialized_checkpoint = self.serde.dumps_typed(manifest)
+        return msgpack.packb(
+            {
+                "checkpoint_id": checkpoint["id"],
+                "parent_checkpoint_id": parent_checkpoint_id or "",
+                "type": type_,
+                "checkpoint": serialized_checkpoint,
+                "metadata": self.serde.dumps(metadata),
+            }
+        )
+
+    async def _adump_channel_blob(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        channel: str,
+        channel_values: dict[str, Any],
+    ) -> bytes:
+        # Large values are serialized in a worker thread, like the channel blobs of the
+        # DynamoDB saver. Channels that were updated to an empty value have no value.
+        if channel not in channel_values:
+            return msgpack.packb({"type": EMPTY_CHANNEL_TYPE})
+
+        type_, value = await self.durable.serde_offloader.adumps_typed(
+            channel_values[channel], (thread_id, checkpoint_ns, channel)
+        )
+        return msgpack.packb({"type": type_, "value": value})
+
+    async def _apromote(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_tuple: CheckpointTuple
+    ) -> None:
+        """Writes the latest checkpoint of a demoted thread back to Redis.
+
+        The blobs of its channels are always written, a blob holds the value of a single
+        channel version, so an existing one has the same value. The manifest is only written
+        if no other checkpoint was put meanwhile.
+        """
+        checkpoint = checkpoint_tuple.checkpoint
+        checkpoint_id = checkpoint_tuple.config["configurable"]["checkpoint_id"]
+        pipeline = self.redis.pipeline(transaction=True)
+        for channel, version in checkpoint["channel_versions"].items():
+            pipeline.set(
+                self._make_blob_key(thread_id, checkpoint_ns, channel, version),
+                await self._adump_channel_blob(
+                    thread_id, checkpoint_ns, channel, checkpoint["channel_values"]
+                ),
+                ex=self.ttl_seconds,
+            )
+        pipeline.set(
+            self._make_latest_key(thread_id, checkpoint_ns),
+            self._dump_checkpoint(
+                checkpoint,
+                checkpoint_tuple.metadata,
+                get_checkpoint_id(checkpoint_tuple.parent_config)
+                if checkpoint_tuple.parent_config
+                else None,
+            ),
+            ex=self.ttl_seconds,
+            nx=True,
+        )
+        *_, promoted = await pipeline.execute()
+        if not promoted or not checkpoint_tuple.pending_writes:
+            return
+
+        # The index of a write is its position among the writes of its task
+        mapping = {}
+        task_write_counts = Counter()
+        for task_id, channel, value in checkpoint_tuple.pending_writes:
+            (data,) = _dump_writes(self.serde, [(channel, value)])
+            field = _make_writes_field(task_id, task_write_counts[task_id])
+            mapping[field] = msgpack.packb({"task_id": task_id, **data})
+            task_write_counts[task_id] += 1
+
+        writes_key = self._make_writes_key(thread_id, checkpoint_ns, checkpoint_id)
+        pipeline = self.redis.pipeline(transaction=True)
+        pipeline.hset(writes_key, mapping=mapping)
+        pipeline.expire(writes_key, self.ttl_seconds)
+        await pipeline.execute()
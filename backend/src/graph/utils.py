@@ -1,5 +1,7 @@
 from typing import Any
 
+import numpy as np
+
 from langchain_core.messages import (
     AIMessage,
     BaseMessage,
@@ -9,8 +11,9 @@ from langchain_core.messages import (
 )
 from langchain_core.runnables import RunnableConfig
 
+from src.core.config import settings
 from src.core.logging import Logger
-from src.properties.schemas import Property
+from .metrics import GraphMetricsCallbackHandler
 from .schemas import ThreadRunsStreamInput, ChatMessage
 
 logger = Logger(__name__).logger
@@ -22,7 +25,13 @@ def parse_input(thread_id: str, user_input: ThreadRunsStreamInput) -> dict[str,
 
     return dict(
         input={"messages": user_input.messages},
-        config=RunnableConfig(configurable={"thread_id": thread_id}),
+        config=RunnableConfig(
+            configurable={"thread_id": thread_id},
+            # A handler per run, it keeps the intent of the run's message
+            callbacks=[GraphMetricsCallbackHandler()]
+            if settings.METRICS_ENABLED
+            else None,
+        ),
     )
 
 
@@ -92,28 +101,8 @@ def remove_tool_calls(content: str | list[str | dict]) -> str | list[str | dict]
     ]
 
 
-def parse_property_details_to_template(properties: list[Property]) -> str:
-    """Parse property details to a template string."""
-    property_details_template = ""
-    for index, property in enumerate(properties):
-        property_details_template += f"""
-        {index + 1}. {property.location}
-        # URL: {property.url}
-        # Location: {property.location}
-        # District: {property.district}
-        # Building type: {property.building_type}
-        # Housing type: {property.housing_type}
-        # Debt-free price: {property.debt_free_price}
-        # Living area: {property.living_area}
-        # Build year: {property.build_year}
-        # Apartment layout: {property.apartment_layout}
-        # Plot ownership: {property.plot_ownership}
-        # Maintenance charge: {property.maintenance_charge}
-        # Water charge: {property.water_charge}
-        # Total housing charge: {property.total_housing_charge}
-        # Completed renovations: {property.completed_renovations}
-        # Future renovations: {property.future_renovations}
-        # Has sauna: {property.building_has_sauna}
-        # Has elevator: {property.building_has_elevator}
-        """
-    return property_details_template
+def normalize_embedding(embedding: list[float]) -> np.ndarray:
+    """Scale an embedding to unit length, so the dot product of two is their cosine similarity."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,200 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from src.core.logging import Logger
+
+# Writes without a following checkpoint (e.g. the writes of an interrupted step) are flushed
+# after at most this delay
+FLUSH_MAX_DELAY_SECONDS = 1.0
+FLUSH_RETRY_DELAY_SECONDS = 1.0
+
+logger = Logger(__name__).logger
+
+
+def _item_key(item: dict) -> tuple[str, str]:
+    return item["PK"], item["SK"]
+
+
+@dataclass
+class _PendingThread:
+    items: dict[tuple[str, str], dict] = field(default_factory=dict)
+    checkpoints: dict[tuple[str, str], dict] = field(default_factory=dict)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def __len__(self) -> int:
+        return len(self.items) + len(self.checkpoints)
+
+
+class WriteBehindBuffer:
+    """Bounded buffer of the DynamoDB items of checkpoints that are not persisted yet.
+
+    Items are buffered per thread and deduplicated by key. A flush writes the channel blobs and
+    writes of a thread first and its checkpoint items after them, so a persisted checkpoint never
+    references a missing blob. Flushes of the same thread never overlap, so checkpoints are
+    persisted in order.
+
+    Threads are flushed by the background flusher when a flush is requested (once per super-step,
+    when its checkpoint is buffered), or explicitly with `aflush`. When the buffer is full, the
+    caller adding items flushes first, which slows the graph down instead of growing the buffer.
+    """
+
+    def __init__(
+        self,
+        write_items: Callable[[list[dict]], Awaitable[None]],
+        *,
+        max_items: int = 10_000,
+    ):
+        self.max_items = max_items
+        self.flushes = 0
+        self.flushed_items = 0
+        self.max_depth = 0
+        self._write_items = write_items
+        self._threads: dict[str, _PendingThread] = {}
+        self._depth = 0
+        self._dirty_thread_ids: set[str] = set()
+        self._flush_requested = asyncio.Event()
+        self._flush_latencies_ms: deque[float] = deque(maxlen=1000)
+        self._flusher: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return self._depth
+
+    @property
+    def stats(self) -> dict[str, float]:
+        latencies_ms = sorted(self._flush_latencies_ms)
+        return {
+            "queue_depth": self._depth,
+            "max_queue_depth": self.max_depth,
+            "pending_threads": len(self._threads),
+            "flushes": self.flushes,
+            "flushed_items": self.flushed_items,
+            "flush_latency_ms_p50": statistics.median(latencies_ms)
+            if latencies_ms
+            else 0.0,
+            "flush_latency_ms_max": latencies_ms[-1] if latencies_ms else 0.0,
+        }
+
+    def start(self) -> None:
+        """Starts the background flusher."""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def aclose(self) -> None:
+        """Stops the background flusher and flushes every buffered item."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.aflush()
+
+    async def aput(
+        self,
+        thread_id: str,
+        items: list[dict],
+        checkpoint: dict | None = None,
+        *,
+        request_flush: bool = False,
+    ) -> None:
+        """Buffers the items of a thread.
+
+        Args:
+            thread_id (str): The thread ID of the items.
+            items (list[dict]): Channel blob and writes items.
+            checkpoint (dict | None): The checkpoint item referencing the blobs, written after
+                them. Defaults to None.
+            request_flush (bool): Whether the background flusher should flush the thread now.
+                Otherwise the thread is flushed after at most FLUSH_MAX_DELAY_SECONDS by the
+                background flusher, if it runs. Defaults to False.
+        """
+        if self._depth + len(items) + 1 > self.max_items:
+            await self.aflush(thread_id)
+        if self._depth + len(items) + 1 > self.max_items:
+            await self.aflush()
+
+        pending = self._threads.setdefault(thread_id, _PendingThread())
+        depth = len(pending)
+        pending.items.update((_item_key(item), item) for item in items)
+        if checkpoint:
+            pending.checkpoints[_item_key(checkpoint)] = checkpoint
+        self._depth += len(pending) - depth
+        self.max_depth = max(self.max_depth, self._depth)
+
+        self._dirty_thread_ids.add(thread_id)
+        if request_flush:
+            self._flush_requested.set()
+
+    async def aflush(self, thread_id: str | None = None) -> None:
+        """Persists the buffered items of a thread, or of every thread.
+
+        Args:
+            thread_id (str | None): The thread ID to flush, or None for every thread.
+                Defaults to None.
+        """
+        thread_ids = [thread_id] if thread_id is not None else list(self._threads)
+        await asyncio.gather(*(self._aflush_thread(thread_id) for thread_id in thread_ids))
+
+    async def _aflush_thread(self, thread_id: str) -> None:
+        pending = self._threads.get(thread_id)
+        if pending is None:
+            return
+
+        async with pending.lock:
+            items, checkpoints = pending.items, pending.checkpoints
+            pending.items, pending.checkpoints = {}, {}
+            taken = len(items) + len(checkpoints)
+            if taken:
+                started_at = time.perf_counter()
+                try:
+                    await self._write_items(list(items.values()))
+                    await self._write_items(list(checkpoints.values()))
+                except BaseException:
+                    # The items are flushed again later, unless newer items replaced them
+                    depth = len(pending)
+                    pending.items = {**items, **pending.items}
+                    pending.checkpoints = {**checkpoints, **pending.checkpoints}
+                    self._depth -= taken + depth - len(pending)
+                    raise
+
+                self._depth -= taken
+                self.flushes += 1
+                self.flushed_items += taken
+                self._flush_latencies_ms.append((time.perf_counter() - started_at) * 1000)
+
+            if not pending and self._threads.get(thread_id) is pending:
+                del self._threads[thread_id]
+
+    async def _run_flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=FLUSH_MAX_DELAY_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            thread_ids = list(self._dirty_thread_ids)
+            self._dirty_thread_ids.clear()
+            results = await asyncio.gather(
+                *(self._aflush_thread(thread_id) for thread_id in thread_ids),
+                return_exceptions=True,
+            )
+            failed_thread_ids = {
+                thread_id
+                for thread_id, result in zip(thread_ids, results)
+                if isinstance(result, Exception)
+            }
+            if failed_thread_ids:
+                logger.error(
+                    f"Failed to flush checkpoints of {len(failed_thread_ids)} threads, retrying"
+                )
+                self._dirty_thread_ids |= failed_thread_ids
+                await asyncio.sleep(FLUSH_RETRY_DELAY_SECONDS)
@@ -1,9 +1,14 @@
 import uvicorn
-from fastapi import FastAPI
+import asyncio
+import contextlib
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from collections.abc import AsyncIterator
 from fastapi_lifespan_manager import LifespanManager, State
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from redis.asyncio import Redis
 
+from src.core.event_loop import EventLoopLagMonitor
 from src.core.logging import Logger
 from src.core.config import settings
 from src.core.opensearch import initialize_search_properties_index, opensearch_client
@@ -13,8 +18,17 @@ from .common.exception_handlers import exception_handlers
 from .router import api_router
 from .embedding.vectordb import get_chroma_db
 
+from .graph.answer_cache import get_answer_cache
+from .graph.cache import CheckpointCache
 from .graph.checkpoint import AsyncDynamoDBSaver
+from .graph.compaction import get_retention_policy, run_periodic_compaction
 from .graph.graph import default_agent
+from .graph.intent_classifier import get_intent_classifier
+from .graph.llm import get_llm_registry
+from .graph.metrics import component_stats, make_metrics_registry
+from .graph.speculation import get_speculation_stats
+from .graph.tiered import AsyncRedisTieredSaver
+from .properties.service import get_property_search_service
 
 # Initialize logger
 logger = Logger(__name__).logger
@@ -24,6 +38,21 @@ logger.debug(
 
 manager = LifespanManager()
 
+
+@manager.add
+async def export_component_stats() -> AsyncIterator[State]:
+    refresh_task = asyncio.create_task(
+        component_stats.arun_periodic_refresh(
+            settings.METRICS_COMPONENT_STATS_INTERVAL_SECONDS
+        )
+    )
+
+    yield {}
+
+    refresh_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await refresh_task
+
 # TODO: Currently disabled
 # @manager.add
 # async def init_chroma_db() -> AsyncIterator[State]:
@@ -33,10 +62,68 @@ manager = LifespanManager()
 #     yield {"chromadb": chroma_db}
 
 
+@manager.add
+async def monitor_event_loop() -> AsyncIterator[State]:
+    monitor = EventLoopLagMonitor()
+    monitor.start()
+    component_stats.register("event_loop", lambda: monitor.stats)
+
+    yield {"event_loop_lag_monitor": monitor}
+
+    component_stats.unregister("event_loop")
+    await monitor.aclose()
+    logger.info(f"Event loop lag stats: {monitor.stats}")
+
+
 @manager.add
 async def init_opensearch_db() -> AsyncIterator[State]:
     initialize_search_properties_index()
-    yield {"opensearch_client": opensearch_client}
+    property_search_service = get_property_search_service()
+    await property_search_service.ainitialize(
+        max_connections=settings.PROPERTY_SEARCH_MAX_CONNECTIONS
+    )
+
+    yield {
+        "opensearch_client": opensearch_client,
+        "property_search_service": property_search_service,
+    }
+
+    await property_search_service.aclose()
+
+
+@manager.add
+async def init_llm_registry() -> AsyncIterator[State]:
+    llm_registry = get_llm_registry()
+    component_stats.register("llm_connections", lambda: llm_registry.stats)
+    component_stats.register(
+        "query_embedding_cache", lambda: llm_registry.query_embedding_cache.stats
+    )
+    component_stats.register("answer_cache", lambda: get_answer_cache().stats)
+    component_stats.register("intent_classifier", lambda: get_intent_classifier().stats)
+    component_stats.register("speculation", lambda: get_speculation_stats().stats)
+    component_stats.register("singleflight", lambda: llm_registry.single_flight.stats)
+
+    yield {"llm_registry": llm_registry}
+
+    for component in (
+        "llm_connections",
+        "query_embedding_cache",
+        "answer_cache",
+        "intent_classifier",
+        "speculation",
+        "singleflight",
+    ):
+        component_stats.unregister(component)
+    logger.info(f"LLM connection stats: {llm_registry.stats}")
+    logger.info(
+        f"Query embedding cache stats: {llm_registry.query_embedding_cache.stats}"
+    )
+    logger.info(f"Answer cache stats: {get_answer_cache().stats}")
+    logger.info(f"Intent classifier stats: {get_intent_classifier().stats}")
+    logger.info(f"Speculation stats: {get_speculation_stats().stats}")
+    logger.info(f"Single flight stats: {llm_registry.single_flight.stats}")
+    await llm_registry.aclose()
+    get_llm_registry.cache_clear()
 
 
 @manager.add
@@ -44,11 +131,76 @@ async def setup_llm_agents() -> AsyncIterator[State]:
     async with AsyncDynamoDBSaver.from_conn_info(
         region=settings.AWS_REGION_NAME,
         table_name=Database.CHECKPOINTS_TABLE_NAME,
+        cache=CheckpointCache(
+            max_entries=settings.CHECKPOINT_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CHECKPOINT_CACHE_TTL_SECONDS,
+        )
+        if settings.CHECKPOINT_CACHE_ENABLED
+        else None,
+        retention_policy=get_retention_policy(),
+        durability=settings.CHECKPOINT_DURABILITY,
+        max_pending_writes=settings.CHECKPOINT_MAX_PENDING_WRITES,
+        serde_thread_threshold=settings.CHECKPOINT_SERDE_THREAD_THRESHOLD_BYTES,
     ) as checkpointer:
         default_agent.checkpointer = checkpointer
+        redis = None
+        if settings.CHECKPOINT_REDIS_URL:
+            redis = Redis.from_url(settings.CHECKPOINT_REDIS_URL)
+            default_agent.checkpointer = AsyncRedisTieredSaver(
+                checkpointer, redis, ttl_seconds=settings.CHECKPOINT_REDIS_TTL_SECONDS
+            )
+        component_stats.register(
+            "checkpoint_serde", lambda: checkpointer.serde_offloader.stats
+        )
+        if checkpointer.cache is not None:
+            component_stats.register("checkpoint_cache", lambda: checkpointer.cache.stats)
+        if checkpointer.write_buffer is not None:
+            component_stats.register(
+                "checkpoint_write_buffer", lambda: checkpointer.write_buffer.stats
+            )
+        if redis is not None:
+            component_stats.register(
+                "checkpoint_redis_tier", lambda: default_agent.checkpointer.stats
+            )
+        compaction_task = asyncio.create_task(
+            run_periodic_compaction(
+                checkpointer, settings.CHECKPOINT_COMPACTION_INTERVAL_SECONDS
+            )
+        )
 
         yield {"agents": {"default": default_agent}}
 
+        # A compaction still deleting items must stop before the client is closed
+        compaction_task.cancel()
+        try:
+            with contextlib.suppress(asyncio.CancelledError):
+                await compaction_task
+        finally:
+            for component in (
+                "checkpoint_serde",
+                "checkpoint_cache",
+                "checkpoint_write_buffer",
+                "checkpoint_redis_tier",
+            ):
+                component_stats.unregister(component)
+            # Persists the checkpoints buffered by the async and exit durability modes
+            await checkpointer.aclose()
+
+        if checkpointer.cache is not None:
+            logger.info(f"Checkpoint cache stats: {checkpointer.cache.stats}")
+        if checkpointer.write_buffer is not None:
+            logger.info(
+                f"Checkpoint write buffer stats: {checkpointer.write_buffer.stats}"
+            )
+        logger.info(
+            f"Checkpoint serialization stats: {checkpointer.serde_offloader.stats}"
+        )
+        if redis is not None:
+            logger.info(
+                f"Checkpoint Redis tier stats: {default_agent.checkpointer.stats}"
+            )
+            await redis.aclose()
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -77,6 +229,15 @@ def healthcheck():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics of every worker process, see src/graph/metrics.py."""
+    component_stats.refresh()
+    return Response(
+        generate_latest(make_metrics_registry()), media_type=CONTENT_TYPE_LATEST
+    )
+
+
 # For development
 if __name__ == "__main__":
     uvicorn.run(
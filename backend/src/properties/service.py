@@ -1,10 +1,19 @@
+import asyncio
+import random
+from functools import lru_cache
 from typing import Any
 
-from src.core.db import get_db
+from aiodynamo.client import Client
+from aiodynamo.models import BatchGetRequest
+from aiohttp import ClientSession, TCPConnector
+from opensearchpy import AsyncOpenSearch
+
+from src.core.db import create_async_dynamodb_client, get_db
 from src.common.exceptions import InternalServerErrorHTTPException
 from src.core.logging import Logger
 from src.common.constants import Database
-from src.core.opensearch import opensearch_client
+from src.core.opensearch import create_async_opensearch_client, opensearch_client
+from src.core.singleflight import SingleFlight, get_singleflight, make_key
 from .schemas import (
     Property,
     SearchPropertiesFilters,
@@ -16,6 +25,11 @@ logger = Logger(__name__).logger
 
 properties_table = get_db().resource.Table(Database.PROPERTIES_TABLE_NAME)
 
+# Keys DynamoDB did not return in a batch get, e.g. when throttled, are requested again
+# after an exponential backoff with full jitter
+MAX_BATCH_GET_ATTEMPTS = 3
+BATCH_GET_BASE_BACKOFF_SECONDS = 0.05
+
 
 def search_properties(
     filters: SearchPropertiesFilters,
@@ -61,6 +75,131 @@ def search_properties(
         raise InternalServerErrorHTTPException()
 
 
+class AsyncPropertySearchService:
+    """Searches properties like `search_properties`, without blocking the event loop.
+
+    The listings are searched with an AsyncOpenSearch client and fetched with an aiodynamo
+    DynamoDB client. Each client keeps a pool of up to max_connections connections shared by
+    every search of the worker, they are created by `ainitialize` in the lifespan of the app
+    and closed by `aclose`.
+
+    Concurrent searches with the same filters and limit share one search, see `SingleFlight`.
+    """
+
+    def __init__(
+        self,
+        opensearch: AsyncOpenSearch | None = None,
+        dynamodb: Client | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
+        self._opensearch = opensearch
+        self._dynamodb = dynamodb
+        self._single_flight = single_flight or SingleFlight()
+        self._session: ClientSession | None = None
+
+    async def ainitialize(self, max_connections: int = 100) -> None:
+        """Create the OpenSearch and DynamoDB clients that were not given."""
+        if self._opensearch is None:
+            self._opensearch = create_async_opensearch_client(max_connections)
+        if self._dynamodb is None:
+            self._session = ClientSession(connector=TCPConnector(limit=max_connections))
+            self._dynamodb = create_async_dynamodb_client(self._session)
+
+    async def aclose(self) -> None:
+        """Close the connection pools of the clients."""
+        if self._opensearch is not None:
+            await self._opensearch.close()
+            self._opensearch = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._dynamodb = None
+
+    async def asearch_properties(
+        self,
+        filters: SearchPropertiesFilters,
+        limit: int = 10,
+    ) -> SearchPropertiesResponse:
+        return await self._single_flight.ado(
+            make_key("search_properties", filters, limit),
+            lambda: self._asearch_properties(filters, limit),
+        )
+
+    async def _asearch_properties(
+        self,
+        filters: SearchPropertiesFilters,
+        limit: int,
+    ) -> SearchPropertiesResponse:
+        if self._opensearch is None or self._dynamodb is None:
+            raise RuntimeError(
+                "The property search service has not been initialized. Call ainitialize() first."
+            )
+
+        try:
+            logger.info(
+                f"Searching properties for filters: {filters.model_dump_json(indent=2)}"
+            )
+
+            query = build_property_query_from_filters(filters, limit)
+
+            response = await self._opensearch.search(index="properties", body=query)
+
+            logger.debug("Response from opensearch: %s", response)
+
+            properties_ids = [hit["_source"]["id"] for hit in response["hits"]["hits"]]
+
+            properties = [
+                Property.model_validate(item)
+                for item in await self._abatch_get_properties(properties_ids)
+            ]
+
+            logger.info(f"Found {len(properties)} properties")
+
+            return SearchPropertiesResponse(
+                properties=properties,
+                total_count=response["hits"]["total"]["value"],
+            )
+        except Exception as e:
+            logger.error("Error searching properties: %s", e)
+            raise InternalServerErrorHTTPException()
+
+    async def _abatch_get_properties(self, properties_ids: list) -> list[dict]:
+        """Reads the properties of the ids, the ones still unprocessed after every attempt
+        are left out of the result."""
+        items = []
+        keys = [{"id": pid} for pid in properties_ids]
+        for attempt in range(MAX_BATCH_GET_ATTEMPTS):
+            if not keys:
+                break
+
+            if attempt:
+                await asyncio.sleep(
+                    random.uniform(0, BATCH_GET_BASE_BACKOFF_SECONDS * 2**attempt)
+                )
+
+            batch_response = await self._dynamodb.batch_get(
+                {Database.PROPERTIES_TABLE_NAME: BatchGetRequest(keys=keys)}
+            )
+            items += batch_response.items.get(Database.PROPERTIES_TABLE_NAME, [])
+            keys = batch_response.unprocessed_keys.get(Database.PROPERTIES_TABLE_NAME, [])
+
+        if keys:
+            logger.warning(
+                "%d properties were left unprocessed after %d attempts: %s",
+                len(keys),
+                MAX_BATCH_GET_ATTEMPTS,
+                [key["id"] for key in keys],
+            )
+
+        return items
+
+
+@lru_cache
+def get_property_search_service() -> AsyncPropertySearchService:
+    """Get the async property search service of the process, see `AsyncPropertySearchService.ainitialize`."""
+    return AsyncPropertySearchService(single_flight=get_singleflight())
+
+
 def build_property_query_from_filters(
     filters: SearchPropertiesFilters,
     limit: int = 10,
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+
+from aiodynamo.models import BatchGetResponse
+
+from src.common.constants import Database
+from src.common.exceptions import InternalServerErrorHTTPException
+from src.properties.schemas import SearchPropertiesFilters
+from src.properties.service import MAX_BATCH_GET_ATTEMPTS, AsyncPropertySearchService
+
+
+def _search_response(*ids: int) -> dict:
+    return {
+        "hits": {
+            "total": {"value": len(ids)},
+            "hits": [{"_source": {"id": pid}} for pid in ids],
+        }
+    }
+
+
+def _batch_get_response(ids: list[int], unprocessed_ids: list[int] = []):
+    return BatchGetResponse(
+        items={
+            Database.PROPERTIES_TABLE_NAME: [
+                {"id": Decimal(pid), "city": "Espoo"} for pid in ids
+            ]
+        },
+        unprocessed_keys={
+            Database.PROPERTIES_TABLE_NAME: [{"id": pid} for pid in unprocessed_ids]
+        }
+        if unprocessed_ids
+        else {},
+    )
+
+
+@pytest.mark.unit
+class TestAsyncPropertySearchService:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.opensearch = Mock(search=AsyncMock(), close=AsyncMock())
+        self.dynamodb = Mock(batch_get=AsyncMock())
+        self.service = AsyncPropertySearchService(self.opensearch, self.dynamodb)
+
+    async def test_should_search_and_fetch_properties(self):
+        self.opensearch.search.return_value = _search_response(1, 2)
+        self.dynamodb.batch_get.return_value = _batch_get_response([1, 2])
+
+        response = await self.service.asearch_properties(
+            SearchPropertiesFilters(city="Espoo"), limit=5
+        )
+
+        assert [p.id for p in response.properties] == [1, 2]
+        assert response.total_count == 2
+        query = self.opensearch.search.call_args.kwargs["body"]
+        assert query["size"] == 5
+        assert {"term": {"city.keyword": "Espoo"}} in query["query"]["bool"]["must"]
+        [request] = self.dynamodb.batch_get.call_args.args[0].values()
+        assert request.keys == [{"id": 1}, {"id": 2}]
+
+    @patch("src.properties.service.asyncio.sleep", new_callable=AsyncMock)
+    async def test_should_request_unprocessed_keys_again_with_backoff(self, mock_sleep):
+        self.opensearch.search.return_value = _search_response(1, 2)
+        self.dynamodb.batch_get.side_effect = [
+            _batch_get_response([1], unprocessed_ids=[2]),
+            _batch_get_response([2]),
+        ]
+
+        response = await self.service.asearch_properties(SearchPropertiesFilters())
+
+        assert [p.id for p in response.properties] == [1, 2]
+        assert self.dynamodb.batch_get.await_count == 2
+        mock_sleep.assert_awaited_once()
+
+    @patch("src.properties.service.logger")
+    @patch("src.properties.service.asyncio.sleep", new_callable=AsyncMock)
+    async def test_should_warn_about_keys_left_unprocessed(self, mock_sleep, mock_logger):
+        self.opensearch.search.return_value = _search_response(1, 2)
+        self.dynamodb.batch_get.side_effect = [
+            _batch_get_response([1], unprocessed_ids=[2])
+        ] + [_batch_get_response([], unprocessed_ids=[2])] * (MAX_BATCH_GET_ATTEMPTS - 1)
+
+        response = await self.service.asearch_properties(SearchPropertiesFilters())
+
+        assert [p.id for p in response.properties] == [1]
+        assert mock_sleep.await_count == MAX_BATCH_GET_ATTEMPTS - 1
+        mock_logger.warning.assert_called_once()
+
+    async def test_should_share_concurrent_identical_searches(self):
+        self.opensearch.search.return_value = _search_response(1)
+        self.dynamodb.batch_get.return_value = _batch_get_response([1])
+
+        responses = await asyncio.gather(
+            self.service.asearch_properties(SearchPropertiesFilters(city="Espoo"), 5),
+            self.service.asearch_properties(SearchPropertiesFilters(city="Espoo"), 5),
+            self.service.asearch_properties(SearchPropertiesFilters(city="Vantaa"), 5),
+        )
+
+        assert responses[0] is responses[1]
+        assert self.opensearch.search.await_count == 2
+
+    async def test_should_not_fetch_properties_without_hits(self):
+        self.opensearch.search.return_value = _search_response()
+
+        response = await self.service.asearch_properties(SearchPropertiesFilters())
+
+        assert response.properties == []
+        self.dynamodb.batch_get.assert_not_called()
+
+    async def test_should_raise_internal_server_error_when_search_fails(self):
+        self.opensearch.search.side_effect = Exception("Connection refused")
+
+        with pytest.raises(InternalServerErrorHTTPException):
+            await self.service.asearch_properties(SearchPropertiesFilters())
+
+    async def test_should_require_initialization(self):
+        await self.service.aclose()
+
+        with pytest.raises(RuntimeError):
+            await AsyncPropertySearchService().asearch_properties(
+                SearchPropertiesFilters()
+            )
+        self.opensearch.close.assert_awaited_once()
@@ -10,6 +10,10 @@ data "aws_dynamodb_table" "user_message_logs" {
   name = "UserMessageLogs"
 }
 
+data "aws_s3_bucket" "checkpoint_blobs" {
+  bucket = "weavens-checkpoint-blobs"
+}
+
 resource "aws_iam_policy" "backend_dynamodb_tables_access" {
   name = "backend-${var.environment}-dynamodb-tables-access"
   policy = jsonencode({
@@ -21,7 +25,8 @@ resource "aws_iam_policy" "backend_dynamodb_tables_access" {
           "dynamodb:GetItem",
           "dynamodb:Query",
           "dynamodb:PutItem",
-          "dynamodb:BatchGetItem"
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
         ]
         Resource = [
           data.aws_dynamodb_table.properties.arn,
@@ -36,6 +41,28 @@ resource "aws_iam_policy" "backend_dynamodb_tables_access" {
   tags = var.tags
 }
 
+resource "aws_iam_policy" "backend_checkpoint_blobs_access" {
+  name = "backend-${var.environment}-checkpoint-blobs-access"
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject",
+          "s3:DeleteObject"
+        ]
+        Resource = [
+          "${data.aws_s3_bucket.checkpoint_blobs.arn}/*"
+        ]
+      }
+    ]
+  })
+
+  tags = var.tags
+}
+
 resource "aws_iam_policy" "backend_opensearch_access" {
   name = "backend-${var.environment}-opensearch-access"
   policy = jsonencode({
@@ -62,6 +89,10 @@ output "backend_dynamodb_tables_access_policy_arn" {
   value = aws_iam_policy.backend_dynamodb_tables_access.arn
 }
 
+output "backend_checkpoint_blobs_access_policy_arn" {
+  value = aws_iam_policy.backend_checkpoint_blobs_access.arn
+}
+
 output "backend_opensearch_access_policy_arn" {
   value = aws_iam_policy.backend_opensearch_access.arn
 }
@@ -154,8 +154,9 @@ module "backend_ecs" {
       task_iam_role_name         = "${local.name}-tasks"
       tasks_iam_role_description = "Tasks IAM role for ${local.name}"
       tasks_iam_role_policies = {
-        DynamoDBTablesAccess = var.backend_dynamodb_tables_access_policy_arn
-        OpenSearchAccess     = var.backend_opensearch_access_policy_arn
+        DynamoDBTablesAccess  = var.backend_dynamodb_tables_access_policy_arn
+        OpenSearchAccess      = var.backend_opensearch_access_policy_arn
+        CheckpointBlobsAccess = var.backend_checkpoint_blobs_access_policy_arn
       }
 
       load_balancer = {
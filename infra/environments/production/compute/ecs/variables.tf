@@ -58,6 +58,11 @@ variable "backend_dynamodb_tables_access_policy_arn" {
   description = "The ARN of the IAM policy for the backend DynamoDB tables access"
 }
 
+variable "backend_checkpoint_blobs_access_policy_arn" {
+  type        = string
+  description = "The ARN of the IAM policy for the backend checkpoint blobs bucket access"
+}
+
 variable "backend_opensearch_access_policy_arn" {
   type        = string
   description = "The ARN of the IAM policy for the backend OpenSearch access"
@@ -63,6 +63,11 @@ variable "backend_dynamodb_tables_access_policy_arn" {
   description = "The ARN of the IAM policy for the backend DynamoDB tables access"
 }
 
+variable "backend_checkpoint_blobs_access_policy_arn" {
+  type        = string
+  description = "The ARN of the IAM policy for the backend checkpoint blobs bucket access"
+}
+
 variable "backend_opensearch_access_policy_arn" {
   type        = string
   description = "The ARN of the IAM policy for the backend OpenSearch access"
@@ -96,6 +101,8 @@ module "ecs" {
   backend_dynamodb_tables_access_policy_arn = var.backend_dynamodb_tables_access_policy_arn
   backend_opensearch_access_policy_arn      = var.backend_opensearch_access_policy_arn
 
+  backend_checkpoint_blobs_access_policy_arn = var.backend_checkpoint_blobs_access_policy_arn
+
   production_openai_api_key    = var.production_openai_api_key
   production_firecrawl_api_key = var.production_firecrawl_api_key
   opensearch_domain            = var.opensearch_domain
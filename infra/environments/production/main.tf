@@ -46,6 +46,8 @@ module "compute" {
   backend_dynamodb_tables_access_policy_arn = module.iam.backend_dynamodb_tables_access_policy_arn
   backend_opensearch_access_policy_arn      = module.iam.backend_opensearch_access_policy_arn
 
+  backend_checkpoint_blobs_access_policy_arn = module.iam.backend_checkpoint_blobs_access_policy_arn
+
   # Lambda
   dynamo_es_property_lambda_sg_id = module.networking.dynamo_es_property_lambda_sg_id
 
@@ -64,6 +66,8 @@ module "iam" {
   tags        = merge(module.common_tags.tags, { Type = "iam" })
 
   opensearch_domain_arn = module.storage.opensearch_domain_arn
+
+  depends_on = [module.storage]
 }
 
 output "github_actions_access_key_id" {
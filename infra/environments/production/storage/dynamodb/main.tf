@@ -21,6 +21,7 @@ module "dynamodb_tables" {
     billing_mode                   = "PAY_PER_REQUEST"
     point_in_time_recovery_enabled = true
     server_side_encryption_enabled = true
+    ttl_enabled                    = true
   }
 
   scrape_jobs_table_config = {
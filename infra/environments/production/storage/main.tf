@@ -44,6 +44,13 @@ module "opensearch" {
 }
 
 
+module "s3" {
+  source = "./s3"
+
+  environment = var.environment
+  tags        = var.tags
+}
+
 module "ecr" {
   source = "./ecr"
 
@@ -0,0 +1,59 @@
+variable "environment" {
+  type        = string
+  description = "The environment to deploy to"
+}
+
+variable "tags" {
+  type        = map(string)
+  description = "The tags to apply to the s3 buckets"
+}
+
+# Checkpoint payloads that are too large to be stored inline in the Checkpoints table
+module "checkpoint_blobs" {
+  source = "terraform-aws-modules/s3-bucket/aws"
+
+  bucket = "weavens-checkpoint-blobs"
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+
+  server_side_encryption_configuration = {
+    rule = {
+      apply_server_side_encryption_by_default = {
+        sse_algorithm = "AES256"
+      }
+    }
+  }
+
+  versioning = {
+    enabled = false
+  }
+
+  # Offloaded checkpoint payloads belong to a single checkpoint item, which expires after the
+  # backend's retention TTL (30 days). DynamoDB deletes expired items within a few days.
+  # Offloaded channel values are shared by checkpoints and deleted by compaction instead.
+  lifecycle_rule = [
+    {
+      id      = "expire-checkpoint-payloads"
+      enabled = true
+
+      filter = {
+        prefix = "checkpoint#"
+      }
+
+      expiration = {
+        days = 35
+      }
+    }
+  ]
+
+  tags = var.tags
+}
+
+
+# Outputs
+output "checkpoint_blobs_bucket_name" {
+  value = module.checkpoint_blobs.s3_bucket_id
+}
@@ -62,6 +62,10 @@ module "checkpoints" {
   server_side_encryption_enabled = try(var.checkpoints_table_config.server_side_encryption_enabled, false)
   point_in_time_recovery_enabled = try(var.checkpoints_table_config.point_in_time_recovery_enabled, false)
 
+  # Checkpoints and writes are written with an "expires_at" attribute when the backend has a retention TTL
+  ttl_enabled        = try(var.checkpoints_table_config.ttl_enabled, false)
+  ttl_attribute_name = "expires_at"
+
   attributes = [
     { name = "PK", type = "S" },
     { name = "SK", type = "S" }
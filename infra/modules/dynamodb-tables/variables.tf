@@ -47,6 +47,7 @@ variable "checkpoints_table_config" {
     write_capacity                 = optional(number)
     point_in_time_recovery_enabled = optional(bool)
     server_side_encryption_enabled = optional(bool)
+    ttl_enabled                    = optional(bool)
   })
 
   validation {